@@ -1,8 +1,11 @@
+import os
+import io
+import json
+import hashlib
+import tempfile
 from datetime import datetime as dt, date
-from typing import Optional
+from typing import Dict, Optional, Tuple
 import numpy as np
-import statistics
-from statistics import mean
 import matplotlib
 from matplotlib.artist import Artist
 from matplotlib.dates import DayLocator, DateFormatter, ConciseDateFormatter, AutoDateLocator
@@ -10,12 +13,122 @@ from matplotlib.ticker import FuncFormatter
 import pandas as pd
 from pandas import ExcelWriter
 from xlsxwriter.utility import xl_rowcol_to_cell
+import sklearn
 from sklearn.ensemble import RandomForestClassifier
+import joblib
 import time
 from PyQt5.QtWidgets import (QApplication, QMessageBox)
 from flowbot_helper import PlotWidget, resource_path, getBlankFigure
 from flowbot_monitors import classifiedFlowMonitors
 from flowbot_survey_events import plottedSurveyEvents, surveyEvent
+from flowbot_logging import get_logger
+
+logger = get_logger('flowbot_logger')
+
+
+def user_cache_dir() -> str:
+    """The per-user cache directory: under LOCALAPPDATA on Windows, otherwise under XDG_CACHE_HOME or ~/.cache."""
+    if os.name == 'nt':
+        base_dir = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), 'AppData', 'Local')
+        return os.path.join(base_dir, 'Flowbot', 'cache')
+    base_dir = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base_dir, 'flowbot')
+
+
+classifier_cache_dir = os.path.join(user_cache_dir(), 'classifier_cache')
+# The most recently used fitted classifier for each monitor type, with its cache key
+fitted_classifiers: Dict[str, Tuple[str, RandomForestClassifier]] = {}
+
+
+def owned_by_user(path: str) -> bool:
+    """
+    True if path is owned by the current user and cannot be written by anyone else.  Windows has no
+    POSIX ownership; there the per-user profile directory the cache lives in is what protects it.
+    """
+    if os.name == 'nt':
+        return True
+    st = os.lstat(path)
+    return st.st_uid == os.getuid() and not (st.st_mode & 0o022)
+
+
+def ensure_classifier_cache_dir() -> bool:
+    """Creates the classifier cache directory, readable by the current user only, and checks nobody else controls it."""
+    os.makedirs(classifier_cache_dir, mode=0o700, exist_ok=True)
+    if not os.path.isdir(classifier_cache_dir) or os.path.islink(classifier_cache_dir):
+        return False
+    return owned_by_user(classifier_cache_dir)
+
+
+def load_random_forest(training_file_spec: str, m_type: str, params: dict) -> Optional[RandomForestClassifier]:
+    """
+    Returns a RandomForestClassifier(**params) fitted to the m_type rows of the training CSV, or None if
+    the CSV has no training rows for m_type.  Fitted classifiers are saved with joblib in a cache file
+    keyed by a hash of the training file, m_type, params and the scikit-learn version, so the forest is
+    only trained again when one of them changes.  Loading a cache file unpickles it, so the cache lives in
+    a per-user directory and a file is only loaded if the current user wrote it and nobody else can
+    change it or the directory.
+    """
+    with open(training_file_spec, 'rb') as training_file:
+        training_bytes = training_file.read()
+    key_hash = hashlib.sha256(training_bytes)
+    key_hash.update(json.dumps([m_type, params, sklearn.__version__], sort_keys=True).encode('utf-8'))
+    cache_key = key_hash.hexdigest()
+
+    if m_type in fitted_classifiers and fitted_classifiers[m_type][0] == cache_key:
+        return fitted_classifiers[m_type][1]
+
+    rf = None
+    cache_file_spec = os.path.join(classifier_cache_dir, f'random_forest_{cache_key}.joblib')
+    try:
+        cache_usable = ensure_classifier_cache_dir()
+    except OSError:
+        logger.error(f'Could not create classifier cache {classifier_cache_dir}', exc_info=True)
+        cache_usable = False
+    if not cache_usable:
+        logger.error(f'Classifier cache {classifier_cache_dir} is not private to this user; not using it')
+
+    if cache_usable and os.path.isfile(cache_file_spec) and not os.path.islink(cache_file_spec):
+        if owned_by_user(cache_file_spec):
+            try:
+                rf = joblib.load(cache_file_spec)
+            except Exception:
+                logger.error(f'Could not load cached classifier {cache_file_spec}', exc_info=True)
+        else:
+            logger.error(f'Ignoring cached classifier {cache_file_spec} not written by this user')
+
+    if rf is None:
+        balance_data = pd.read_csv(io.BytesIO(training_bytes), sep=',', header=0)
+
+        M_variable = balance_data['m_type'] == m_type
+        training_df = balance_data[M_variable]
+
+        if m_type == 'FM':
+            X_train = training_df.values[:, 5:15]
+        else:
+            X_train = training_df.values[:, 5:10]
+        y_train = training_df.values[:, 4]
+
+        if len(X_train) == 0 or len(y_train) == 0:
+            return None
+
+        rf = RandomForestClassifier(**params)
+        rf.fit(X_train, y_train)
+
+        if cache_usable:
+            temp_file_spec = None
+            try:
+                # Written under a temporary name, created user-only, so another instance never reads a partial file
+                temp_fd, temp_file_spec = tempfile.mkstemp(suffix='.tmp', dir=classifier_cache_dir)
+                with os.fdopen(temp_fd, 'wb') as temp_file:
+                    joblib.dump(rf, temp_file)
+                os.replace(temp_file_spec, cache_file_spec)
+            except OSError:
+                logger.error(f'Could not cache classifier to {cache_file_spec}', exc_info=True)
+                if temp_file_spec is not None and os.path.exists(temp_file_spec):
+                    os.remove(temp_file_spec)
+
+    fitted_classifiers[m_type] = (cache_key, rf)
+    return rf
 
 
 class dataClassification():
@@ -245,27 +358,18 @@ class dataClassification():
 
         event_analysis_df = self.join_df[pd.to_datetime(
             self.join_df["Day"], format="%d/%m/%Y").isin(DAY_List)]
-        CATEGORY_List = []
-        CONFIDENCE_List = []
-        for fm in FM_List:
-            currentCatRow = []
-            currentConfRow = []
-            for d in DAY_List:
-                myD = d.strftime("%d/%m/%Y")
-                # event_analysis_df_2 = event_analysis_df.query(r'Day == @myD and FM == @fm')
-                event_analysis_df_2 = event_analysis_df.query(f'Day == "{myD}" and FM == "{fm}"')
-                if len(event_analysis_df_2) > 0:
-                    currentCatRow.append(
-                        event_analysis_df_2.iloc[0]['Predicted_rf'])
-                    dfMax = event_analysis_df_2[[
-                        'B', 'D', 'E', 'H', 'L', 'P', 'Q', 'R', 'S', 'V', 'W', 'X']].max(axis=1)
-                    currentConfRow.append(dfMax.iloc[0])
-                else:
-                    currentCatRow.append('')
-                    currentConfRow.append(np.nan)
-
-            CATEGORY_List.append(currentCatRow)
-            CONFIDENCE_List.append(currentConfRow)
+        # The first classification of each monitor and day, laid out as a monitor x day grid
+        day_labels = [d.strftime("%d/%m/%Y") for d in DAY_List]
+        first_rows = event_analysis_df.drop_duplicates(subset=['Day', 'FM']).set_index(['FM', 'Day'])
+        grid = pd.MultiIndex.from_product([FM_List, day_labels], names=['FM', 'Day'])
+        grid_shape = (len(FM_List), len(day_labels))
+        per_diem_df = first_rows.reindex(grid)
+
+        has_class = grid.isin(first_rows.index).reshape(grid_shape)
+        CATEGORY_List = np.where(
+            has_class, per_diem_df['Predicted_rf'].to_numpy(dtype=object).reshape(grid_shape), '').tolist()
+        CONFIDENCE_List = per_diem_df[['B', 'D', 'E', 'H', 'L', 'P', 'Q', 'R', 'S', 'V', 'W', 'X']].max(
+            axis=1).to_numpy(dtype=np.float64).reshape(grid_shape).tolist()
 
         return (DAY_List, FM_List, CATEGORY_List, CONFIDENCE_List)
 
@@ -416,6 +520,62 @@ class dataClassification():
 
     #     return results
 
+    def getDailyFeatureData(self, start_date: dt, end_date: dt) -> pd.DataFrame:
+        """
+        Returns the daily depth and velocity statistics the classifier works on, one row per classified
+        flow monitor and day from start_date to end_date.  Days with five readings or fewer are left out;
+        zero counts are scaled to a full day of 2 minute readings.  A missing (NaN) depth or velocity
+        reading makes every statistic of that series for the day NaN rather than being skipped.
+        """
+        data_columns = ['monitor_name', 'day', 'max_depth', 'min_depth', 'ave_depth', 'std_dev_depth',
+                        'zero_depth', 'max_velocity', 'min_velocity', 'ave_velocity', 'std_dev_velocity', 'zero_velocity']
+
+        fm_readings = [pd.DataFrame({'monitor_name': fm.monitorName,
+                                     'date': pd.DatetimeIndex(fm.dateArray).floor('D'),
+                                     'depth': fm.depthArray,
+                                     'velocity': fm.velocityArray})
+                       for fm in self.classifiedFMs.classFMs.values()]
+        if not fm_readings:
+            return pd.DataFrame(columns=data_columns)
+
+        readings = pd.concat(fm_readings, ignore_index=True)
+        readings = readings[(readings['date'] >= start_date) & (readings['date'] <= end_date)]
+        readings = readings.assign(zero_depth=(readings['depth'] == 0), zero_velocity=(readings['velocity'] == 0),
+                                   nan_depth=readings['depth'].isna(), nan_velocity=readings['velocity'].isna())
+
+        daily_df = readings.groupby(['monitor_name', 'date'], sort=False).agg(
+            no_of_readings=('depth', 'size'),
+            max_depth=('depth', 'max'), min_depth=('depth', 'min'),
+            ave_depth=('depth', 'mean'), std_dev_depth=('depth', 'std'),
+            zero_depth=('zero_depth', 'sum'),
+            max_velocity=('velocity', 'max'), min_velocity=('velocity', 'min'),
+            ave_velocity=('velocity', 'mean'), std_dev_velocity=('velocity', 'std'),
+            zero_velocity=('zero_velocity', 'sum'),
+            nan_depth=('nan_depth', 'any'), nan_velocity=('nan_velocity', 'any'))
+        daily_df = daily_df[daily_df['no_of_readings'] > 5].reset_index()
+
+        # The aggregations skip NaN, so put it back for days with a missing reading
+        for series in ('depth', 'velocity'):
+            stat_columns = [f'max_{series}', f'min_{series}', f'ave_{series}', f'std_dev_{series}']
+            daily_df.loc[daily_df[f'nan_{series}'], stat_columns] = np.nan
+
+        # This allows for days that arnt installed for a full day to utilise the zero stats
+        norm_factor = 720 / daily_df['no_of_readings']
+        daily_df['zero_depth'] = daily_df['zero_depth'] * norm_factor
+        daily_df['zero_velocity'] = daily_df['zero_velocity'] * norm_factor
+        daily_df['day'] = daily_df['date'].dt.strftime('%d/%m/%Y')
+
+        return daily_df[data_columns]
+
+    def random_forest_params(self) -> dict:
+        return {'bootstrap': self.blnBootstrap,
+                'max_depth': int(self.strMaxDepth),
+                'max_features': ('sqrt' if self.strMaxFeatures == 'auto' else int(self.strMaxFeatures)),
+                'min_samples_leaf': int(self.strMinSamplesLeaf),
+                'min_samples_split': int(self.strMinSamplesSplit),
+                'n_estimators': int(self.strN_Estimators),
+                'random_state': 1234567}
+
     def updateFlowSurveyDataClassification(self):
         # ret = False
 
@@ -436,106 +596,19 @@ class dataClassification():
             # class_start_time = dt.now()
             # dateformat = '%d/%m/%Y'
 
-            data_columns = ['monitor_name', 'day', 'max_depth', 'min_depth', 'ave_depth', 'std_dev_depth',
-                            'zero_depth', 'max_velocity', 'min_velocity', 'ave_velocity', 'std_dev_velocity', 'zero_velocity']
-
-            data_df = pd.DataFrame(columns=data_columns)
-
-            # total_m = len(self.classifiedFMs.classFMs)
-
-            # m_list = ['FM', 'DM']
-
-            # y = 0
-
-            data_df = data_df.iloc[0:0]
-
             progress_count = 0
             self.parent.progressBar.setValue(progress_count)
             self.parent.statusBar().showMessage(
                 'Progress: Refreshing FM Classification Data...')
+            if self.app is not None:
+                self.app.processEvents()
 
-            for fm in self.classifiedFMs.classFMs.values():
-
-                FDV_zip_list_dates = []
-                FDV_zip_list_days = []
-                for i in range(len(fm.dateRange)):
-
-                    FDV_zip_list_dates.append(
-                        fm.dateRange[i].strftime("%d/%m/%Y %H:%M"))
-
-                    FDV_zip_list_days.append(
-                        fm.dateRange[i].strftime("%d/%m/%Y"))
-
-                FDV_zip_list = list(zip(FDV_zip_list_dates, FDV_zip_list_days,
-                                    fm.flowDataRange, fm.depthDataRange, fm.velocityDataRange))
-
-                FDV_dataframe = pd.DataFrame(FDV_zip_list, columns=[
-                                             'Date', 'Day', 'Flow', 'Depth', 'Velocity'])
-
-                list_of_days = []
-
-                list_of_days = list(set(FDV_zip_list_days))
-
-                # list_of_flow = []
-                list_of_depth = []
-                list_of_velocity = []
-                zero_depth = 0
-                zero_velocity = 0
-                std_dev_depth = 0
-                std_dev_velocity = 0
-                ave_depth = 0
-                ave_velocity = 0
-
-                for i in range(len(list_of_days)):
-
-                    if start_date <= dt.strptime(list_of_days[i], "%d/%m/%Y") <= end_date:
-
-                        day = list_of_days[i]
-
-                        day_variable = FDV_dataframe['Day'] == day
-
-                        day_df = FDV_dataframe[day_variable]
-
-                        list_of_depth = day_df['Depth'].tolist()
-
-                        list_of_velocity = day_df['Velocity'].tolist()
-
-                        # This allows for days that arnt installed for a full day to utilise the zero stats
-                        norm_factor = 720/len(list_of_depth)
-
-                        zero_depth = list_of_depth.count(0.0) * norm_factor
-
-                        zero_velocity = list_of_velocity.count(
-                            0.0) * norm_factor
-
-                        if int(len(list_of_depth)) > 5:
-
-                            max_depth = (max(list_of_depth))
-                            min_depth = (min(list_of_depth))
-                            std_dev_depth = (statistics.stdev(list_of_depth))
-                            ave_depth = mean(list_of_depth)
-
-                            max_velocity = (max(list_of_velocity))
-                            min_velocity = (min(list_of_velocity))
-                            std_dev_velocity = (
-                                statistics.stdev(list_of_velocity))
-                            ave_velocity = mean(list_of_velocity)
-
-                            new_data = pd.DataFrame({'monitor_name': [fm.monitorName], 'day': [day], 'max_depth': [max_depth],
-                                                     'min_depth': [min_depth], 'ave_depth': [ave_depth], 'std_dev_depth': [std_dev_depth],
-                                                     'zero_depth': [zero_depth], 'max_velocity': [max_velocity], 'min_velocity': [min_velocity],
-                                                     'ave_velocity': [ave_velocity], 'std_dev_velocity': [std_dev_velocity], 'zero_velocity': [zero_velocity]})
-                            data_df = pd.concat([data_df, new_data], ignore_index=True)
-                            # data_df = data_df.append({'monitor_name': fm.monitorName, 'day': day, 'max_depth': max_depth,
-                            #                           'min_depth': min_depth, 'ave_depth': ave_depth, 'std_dev_depth': std_dev_depth,
-                            #                           'zero_depth': zero_depth, 'max_velocity': max_velocity, 'min_velocity': min_velocity,
-                            #                           'ave_velocity': ave_velocity, 'std_dev_velocity': std_dev_velocity,
-                            #                           'zero_velocity': zero_velocity}, ignore_index=True)
+            data_df = self.getDailyFeatureData(start_date, end_date)
 
-                progress_count += 1
-                self.parent.progressBar.setValue(progress_count)
-                if self.app is not None:
-                    self.app.processEvents()
+            progress_count += len(self.classifiedFMs.classFMs)
+            self.parent.progressBar.setValue(progress_count)
+            if self.app is not None:
+                self.app.processEvents()
 
             self.parent.statusBar().showMessage('Progress: Building Classifier...')
             progress_count += 1
@@ -550,56 +623,20 @@ class dataClassification():
             elif m_type == 'DM':
                 data_df_2 = data_df_2.append(data_df, ignore_index=True)
 
-            balance_data = pd.read_csv(
-                self.strTrainingDataFileSpec, sep=',', header=0)
-
-            M_variable = balance_data['m_type'] == m_type
-            training_df = balance_data[M_variable]
-
             if m_type == 'FM':
 
-                X_train = training_df.values[:, 5:15]
-                y_train = training_df.values[:, 4]
-
                 X_test = data_df.iloc[:, 2:12].values.tolist()
 
             elif m_type == 'DM':
 
-                X_train = training_df.values[:, 5:10]
-                y_train = training_df.values[:, 4]
-
                 X_test = data_df.iloc[:, 2:7].values.tolist()
 
-            if len(X_train) > 0 and len(y_train) > 0 and len(X_test) > 0:
-
-                # rf = RandomForestClassifier(bootstrap=self.blnBootstrap,
-                #                             max_depth=int(
-                #                                 self.strMaxDepth),
-                #                             max_features=(self.strMaxFeatures if self.strMaxFeatures == 'auto' else int(
-                #                                 self.strMaxFeatures)),
-                #                             min_samples_leaf=int(
-                #                                 self.strMinSamplesLeaf),
-                #                             min_samples_split=int(
-                #                                 self.strMinSamplesSplit),
-                #                             n_estimators=int(
-                #                                 self.strN_Estimators),
-                #                             random_state=1234567)
-
-                rf = RandomForestClassifier(bootstrap=self.blnBootstrap,
-                                            max_depth=int(
-                                                self.strMaxDepth),
-                                            max_features=('sqrt' if self.strMaxFeatures == 'auto' else int(
-                                                self.strMaxFeatures)),
-                                            min_samples_leaf=int(
-                                                self.strMinSamplesLeaf),
-                                            min_samples_split=int(
-                                                self.strMinSamplesSplit),
-                                            n_estimators=int(
-                                                self.strN_Estimators),
-                                            random_state=1234567)
-
-                self.parent.statusBar().showMessage('Progress: Building Classifier...')
-                rf.fit(X_train, y_train)
+            rf = None
+            if len(X_test) > 0:
+                rf = load_random_forest(self.strTrainingDataFileSpec, m_type, self.random_forest_params())
+
+            if rf is not None:
+
                 progress_count += 1
                 self.parent.progressBar.setValue(progress_count)
                 if self.app is not None:
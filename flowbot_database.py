@@ -1,6 +1,12 @@
+import os
+import ctypes
 import sqlite3
 from sqlite3 import Error
 from queue import Queue
+from contextlib import closing
+from typing import Callable, Dict, Iterable, List, Tuple
+from flowbot_logging import get_logger
+logger = get_logger('flowbot_logger')
 
 
 class Tables:
@@ -23,6 +29,287 @@ class Tables:
     WQ_MONITOR = "wq_monitor"
     FB_VERSION = "fb_version"
     FSM_RAWDATA = "fsm_rawdata"
+    SCHEMA_VERSION = "schema_version"
+
+
+# Applied to every pooled connection, after the journal mode (see configure_connection)
+CONNECTION_PRAGMAS = (
+    "PRAGMA cache_size=-32768",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA temp_store=MEMORY",
+)
+
+# Windows GetDriveType result for a mapped network drive
+DRIVE_REMOTE = 4
+
+SCHEMA_VERSION = 2
+
+# Secondary indexes for the columns that rows are looked up by in a WHERE clause.  Projects are otherwise
+# read a whole table at a time, where an index only slows the save.
+SCHEMA_INDEXES: Dict[str, List[Tuple[str, ...]]] = {
+    Tables.ICM_TRACE_LOCATION: [('it_traceID', 'itl_index')],
+}
+
+
+class TrackedObject(object):
+    """
+    Base class for objects saved as a database row.
+
+    Assigning any public attribute marks the object dirty so that a save only writes the rows that
+    have changed.  Code that edits a mutable attribute in place (e.g. a DataFrame cell) must call
+    mark_dirty().  New objects start dirty and are marked clean once read from or saved to the database.
+
+    Objects held in a project's secondary indexes name the attributes those indexes are keyed on in
+    INDEXED_ATTRIBUTES; assigning one of them tells the owning project to rebuild its indexes.
+    """
+
+    INDEXED_ATTRIBUTES: Tuple[str, ...] = ()
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if not name.startswith('_'):
+            object.__setattr__(self, '_dirty', True)
+            if name in self.INDEXED_ATTRIBUTES:
+                index_owner = self.__dict__.get('_index_owner')
+                if index_owner is not None:
+                    index_owner.invalidate_indexes()
+
+    def __getstate__(self):
+        # Copies and pickles do not belong to the project that indexed the original
+        state = self.__dict__.copy()
+        state.pop('_index_owner', None)
+        return state
+
+    def set_index_owner(self, owner):
+        object.__setattr__(self, '_index_owner', owner)
+
+    def is_dirty(self) -> bool:
+        return self.__dict__.get('_dirty', True)
+
+    def mark_dirty(self):
+        object.__setattr__(self, '_dirty', True)
+
+    def mark_clean(self):
+        object.__setattr__(self, '_dirty', False)
+
+
+class deferredColumn():
+    """
+    Descriptor for a large attribute that can be left in the project database until it is first read.
+    set_loader stores a callable in place of the value; it is called on first access, and assigning
+    the attribute discards it.  If the loader raises, the exception propagates and the loader is kept,
+    so the attribute is never mistaken for an empty value.
+    """
+
+    def __set_name__(self, owner, name):
+        self.value_attr = f'_{name}_value'
+        self.loader_attr = f'_{name}_loader'
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        loader = obj.__dict__.get(self.loader_attr)
+        if loader is not None:
+            obj.__dict__[self.value_attr] = loader()
+            del obj.__dict__[self.loader_attr]
+        return obj.__dict__.get(self.value_attr)
+
+    def __set__(self, obj, value):
+        obj.__dict__.pop(self.loader_attr, None)
+        obj.__dict__[self.value_attr] = value
+
+    def set_loader(self, obj, loader: Callable[[], object]):
+        obj.__dict__[self.loader_attr] = loader
+
+    def is_loaded(self, obj) -> bool:
+        """True unless the value is still left in the database."""
+        return self.loader_attr not in obj.__dict__
+
+
+def database_file(conn: sqlite3.Connection) -> str:
+    return conn.execute("PRAGMA database_list").fetchone()[2]
+
+
+def read_rows_deferring(conn: sqlite3.Connection, table: str, deferred_columns: Iterable[str]) -> Tuple[List[Dict], List[str]]:
+    """
+    Reads every row of table as a dict, leaving out those of deferred_columns that the table has.
+    Returns the rows and the columns that were left out.  Raises sqlite3.OperationalError if the
+    table does not exist.
+    """
+    columns = [info[1] for info in conn.execute(f"PRAGMA table_info({table})")]
+    if not columns:
+        raise sqlite3.OperationalError(f"no such table: {table}")
+    deferred_columns = set(deferred_columns)
+    selected = [column for column in columns if column not in deferred_columns]
+    rows = conn.execute(f"SELECT {', '.join(selected)} FROM {table}").fetchall()
+    return [dict(zip(selected, row)) for row in rows], [column for column in columns if column in deferred_columns]
+
+
+class columnLoadError(Exception):
+    """A deferred column could not be read from the project database."""
+
+
+class columnLoader():
+    """
+    Reads one column of one row from the database file and decodes it, or returns None if the value
+    is NULL.  Raises columnLoadError if it cannot be read, so that a failed read is never saved back
+    over the stored value as NULL.  Each call opens its own connection, so a loader stays valid however
+    the connection pool is used in the meantime.  Being a plain object rather than a closure, it is
+    pickled along with the object it loads for, which can then be sent to a worker process.
+    """
+
+    def __init__(self, database: str, table: str, key_column: str, key, column: str,
+                 decode: Callable[[object], object]):
+        self.database = database
+        self.table = table
+        self.key_column = key_column
+        self.key = key
+        self.column = column
+        self.decode = decode
+
+    def __call__(self):
+        try:
+            with closing(sqlite3.connect(self.database)) as conn:
+                row = conn.execute(f"SELECT {self.column} FROM {self.table} WHERE {self.key_column} = ?",
+                                   (self.key,)).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Database error loading {self.table}.{self.column} for {self.key}: {e}")
+            raise columnLoadError(f"Could not load {self.table}.{self.column} for {self.key}: {e}") from e
+        if row is None or row[0] is None:
+            return None
+        return self.decode(row[0])
+
+
+def column_loader(database: str, table: str, key_column: str, key, column: str,
+                  decode: Callable[[object], object]) -> Callable[[], object]:
+    """Returns a columnLoader for one column of one row of the database file."""
+    return columnLoader(database, table, key_column, key, column, decode)
+
+
+def is_network_path(path: str) -> bool:
+    """True if path is a UNC path or, on Windows, on a mapped network drive."""
+    if path.startswith(('\\\\', '//')):
+        return True
+    if os.name == 'nt':
+        drive = os.path.splitdrive(os.path.abspath(path))[0]
+        if drive:
+            return ctypes.windll.kernel32.GetDriveTypeW(drive + '\\') == DRIVE_REMOTE
+    return False
+
+
+def configure_connection(conn: sqlite3.Connection, database: str):
+    """
+    Uses a write-ahead log for local files.  SQLite does not refuse WAL on a network share, but its
+    shared memory index is not safe there, so files on a share keep a rollback journal.  If SQLite
+    cannot switch mode the connection keeps whichever mode the file already has.
+    """
+    if is_network_path(database):
+        journal_mode, synchronous = 'delete', 'FULL'
+    else:
+        journal_mode, synchronous = 'wal', 'NORMAL'
+    mode = conn.execute(f"PRAGMA journal_mode={journal_mode}").fetchone()[0]
+    if mode.lower() != journal_mode:
+        logger.warning(f"Could not set journal_mode={journal_mode} for {database}, using {mode}")
+        synchronous = 'FULL'
+    conn.execute(f"PRAGMA synchronous={synchronous}")
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+
+
+def update_schema(conn: sqlite3.Connection):
+    """
+    Creates any missing secondary indexes on the tables that exist, drops those no longer listed in
+    SCHEMA_INDEXES and records the schema version.  Index creation is idempotent, and is repeated after
+    each save because tables recreated by a schema change lose their indexes.  Does not commit.
+    """
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    wanted = set()
+    for table, indexes in SCHEMA_INDEXES.items():
+        if table not in tables:
+            continue
+        table_columns = {info[1] for info in conn.execute(f"PRAGMA table_info({table})")}
+        for columns in indexes:
+            if set(columns) <= table_columns:
+                wanted.add(f"idx_{table}_{columns[0]}")
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{columns[0]} ON {table} ({', '.join(columns)})")
+    for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type='index' AND name LIKE 'idx\\_%' ESCAPE '\\'").fetchall():
+        if name not in wanted:
+            conn.execute(f"DROP INDEX {name}")
+
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {Tables.SCHEMA_VERSION} (version INTEGER NOT NULL)")
+    row = conn.execute(f"SELECT MAX(version) FROM {Tables.SCHEMA_VERSION}").fetchone()
+    if row[0] is None or row[0] < SCHEMA_VERSION:
+        conn.execute(f"DELETE FROM {Tables.SCHEMA_VERSION}")
+        conn.execute(f"INSERT INTO {Tables.SCHEMA_VERSION} VALUES (?)", (SCHEMA_VERSION,))
+
+
+table_schema_cache: Dict[str, Tuple[List[Tuple[str, str]], List[str]]] = {}
+
+
+def get_table_schema(table: str, create_sql: str) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """
+    Returns the (name, type) column list and primary key columns that create_sql defines for table.
+    """
+    schema = table_schema_cache.get(create_sql)
+    if schema is None:
+        with closing(sqlite3.connect(':memory:')) as mem_conn:
+            mem_conn.execute(create_sql)
+            table_info = mem_conn.execute(f"PRAGMA table_info({table})").fetchall()
+        columns = [(row[1], row[2]) for row in table_info]
+        primary_key = [row[1] for row in sorted(table_info, key=lambda row: row[5]) if row[5] > 0]
+        schema = (columns, primary_key)
+        table_schema_cache[create_sql] = schema
+    return schema
+
+
+def ensure_table(conn: sqlite3.Connection, table: str, create_sql: str) -> bool:
+    """
+    Creates table from create_sql, recreating it if an existing table has different columns.
+
+    Returns:
+        bool: True if the table was (re)created and so every row needs writing.
+    """
+    columns, primary_key = get_table_schema(table, create_sql)
+    existing = [(row[1], row[2]) for row in conn.execute(f"PRAGMA table_info({table})")]
+    if existing == columns:
+        return False
+    if existing:
+        conn.execute(f"DROP TABLE {table}")
+    conn.execute(create_sql)
+    return True
+
+
+def write_changed_rows(conn: sqlite3.Connection, table: str, create_sql: str, objects: Iterable,
+                       row_key: Callable[[object], tuple], row_values: Callable[[object], tuple]):
+    """
+    Brings table into line with objects within the caller's transaction.
+
+    Rows whose primary key no longer belongs to an object are deleted.  Objects are written with
+    INSERT OR REPLACE if they are dirty, are not TrackedObjects, have no row yet, or the table was
+    just (re)created.  Keys are compared as strings so that SQLite's type affinity cannot hide a row.
+
+    Args:
+        row_key: Returns the primary key values of an object's row, in primary key column order.
+        row_values: Returns the full row for an object, in table column order.
+    """
+    objects = list(objects)
+    columns, primary_key = get_table_schema(table, create_sql)
+    created = ensure_table(conn, table, create_sql)
+
+    saved_rows: Dict[tuple, int] = {}
+    if not created:
+        for rowid, *key in conn.execute(f"SELECT rowid, {', '.join(primary_key)} FROM {table}"):
+            saved_rows[tuple(str(value) for value in key)] = rowid
+
+    object_keys = [tuple(str(value) for value in row_key(obj)) for obj in objects]
+    live_keys = set(object_keys)
+    conn.executemany(f"DELETE FROM {table} WHERE rowid = ?",
+                     [(rowid,) for key, rowid in saved_rows.items() if key not in live_keys])
+
+    changed = (obj for obj, key in zip(objects, object_keys)
+               if created or key not in saved_rows or not isinstance(obj, TrackedObject) or obj.is_dirty())
+    conn.executemany(f"INSERT OR REPLACE INTO {table} VALUES ({', '.join('?' * len(columns))})",
+                     (row_values(obj) for obj in changed))
 
 
 class DatabaseManager:
@@ -136,6 +423,7 @@ class SQLiteConnectionPool:
     def _create_connection(self):
         try:
             conn = sqlite3.connect(self.database)
+            configure_connection(conn, self.database)
             self.connection_pool.put(conn)
         except Error as e:
             print("Error creating SQLite connection:", e)
@@ -145,26 +145,7 @@ class flowbot_dialog_fsm_review_classification(QtWidgets.QDialog, Ui_Dialog):
                 selected_day, 'D')]
 
             for date in matching_dates['Date']:
-                # if date not in self.current_inst.class_data_user['Date'].values:
-                new_entry = pd.DataFrame({
-                    'Date': [date],
-                    'Classification': [class_code],
-                    # or any default confidence value you wish to use
-                    'Confidence': [1.0]
-                })
-
-                # Find the index of the date in the existing dataframe
-                idx = self.current_inst.class_data_user.index[self.current_inst.class_data_user['Date'] == date].tolist(
-                )
-
-                if idx:  # if the date exists, update the existing entry
-                    self.current_inst.class_data_user.loc[idx[0],
-                                                          'Classification'] = class_code
-                    self.current_inst.class_data_user.loc[idx[0],
-                                                          'Confidence'] = 1.0
-                else:  # if the date does not exist, append the new entry
-                    self.current_inst.class_data_user = pd.concat(
-                        [self.current_inst.class_data_user, new_entry], ignore_index=True)
+                self.current_inst.set_user_classification(date, class_code)
 
         self.update_plot()
 
@@ -24,6 +24,7 @@ import numpy as np
 
 # from flowbot_monitors import plottedFlowMonitors
 from flowbot_management import fsmInterim, fsmInterimReview, fsmMonitor, fsmProject, fsmSite, fsmInstall
+from flowbot_dwf_profile import dwf_profiles
 from ui_elements.ui_flowbot_dialog_fsm_review_flowmonitor_base import Ui_Dialog
 
 class flowbot_dialog_fsm_review_flowmonitor(QtWidgets.QDialog, Ui_Dialog):
@@ -788,76 +789,24 @@ class flowbot_dialog_fsm_review_flowmonitor(QtWidgets.QDialog, Ui_Dialog):
 
         if self.current_inst.install_type == 'Flow Monitor':
 
-            # flow_monitor_data = self.current_inst.data.copy()  # Make a copy of the data
-            flow_monitor_data = self.df_filtered.copy()  # Make a copy of the data
+            dry_days = frozenset(dry_days_df['Date'])
+            exclude_zero_flow = self.chk_dwf_no_zeros.isChecked()
 
-            if self.chk_dwf_no_zeros.isChecked():
-                flow_monitor_data = flow_monitor_data[flow_monitor_data['FlowData'] != 0]
-
-            # Filter flow monitor data to include only dry days
-            flow_monitor_data['Date'] = pd.to_datetime(flow_monitor_data['Date'])
-            flow_monitor_data['Day'] = flow_monitor_data['Date'].dt.date
-            flow_monitor_data = flow_monitor_data[flow_monitor_data['Day'].isin(dry_days_df['Date'])]
-
-            # Remove date information and keep only time part
-            flow_monitor_data['TimeOfDay'] = flow_monitor_data['Date'].dt.time
-
-            # Group by time and calculate the average flow, velocity, and depth for each time point
-            avg_dwf_per_time = flow_monitor_data.groupby('TimeOfDay').agg({
-                'FlowData': 'mean',
-                'DepthData': 'mean',
-                'VelocityData': 'mean'
-                }).reset_index()
-
-            # Rename the columns for clarity
-            avg_dwf_per_time.columns = ['TimeOfDay', 'AvgFlowData', 'AvgDepthData', 'AvgVelocityData']
-
-            # Optional: sort by time if needed
-            avg_dwf_per_time = avg_dwf_per_time.sort_values(by='TimeOfDay').reset_index(drop=True)
-
-            self.df_dwf_filtered = pd.merge(flow_monitor_data, avg_dwf_per_time, on='TimeOfDay', how='right')
-
-            self.df_dwf_filtered['TimeOfDay'] = self.df_dwf_filtered['Date'].dt.hour * 3600 + \
-                self.df_dwf_filtered['Date'].dt.minute * 60 + self.df_dwf_filtered['Date'].dt.second
-
-            self.df_dwf_average = self.df_dwf_filtered.drop_duplicates(
-                subset=['TimeOfDay', 'AvgFlowData', 'AvgDepthData', 'AvgVelocityData'])
+            if self.chk_dwf_full_period.isChecked():
+                profile = dwf_profiles.get_profile(self.current_inst.data, dry_days,
+                                                   exclude_zero_flow=exclude_zero_flow)
+            else:
+                profile = dwf_profiles.get_profile(self.current_inst.data, dry_days, start=self.start_date,
+                                                   end=self.end_date, exclude_zero_flow=exclude_zero_flow)
+            self.df_dwf_filtered = profile.filtered
+            self.df_dwf_average = profile.average
 
             if self.chk_dwf_compare_full_period.isChecked():
 
-                flow_monitor_data = self.current_inst.data.copy()
-
-                if self.chk_dwf_no_zeros.isChecked():
-                    flow_monitor_data = flow_monitor_data[flow_monitor_data['FlowData'] != 0]
-
-                # Filter flow monitor data to include only dry days
-                flow_monitor_data['Date'] = pd.to_datetime(flow_monitor_data['Date'])
-                flow_monitor_data['Day'] = flow_monitor_data['Date'].dt.date
-                flow_monitor_data = flow_monitor_data[flow_monitor_data['Day'].isin(dry_days_df['Date'])]
-
-                # Remove date information and keep only time part
-                flow_monitor_data['TimeOfDay'] = flow_monitor_data['Date'].dt.time
-
-                # Group by time and calculate the average flow, velocity, and depth for each time point
-                avg_dwf_per_time = flow_monitor_data.groupby('TimeOfDay').agg({
-                    'FlowData': 'mean',
-                    'DepthData': 'mean',
-                    'VelocityData': 'mean'
-                    }).reset_index()
-
-                # Rename the columns for clarity
-                avg_dwf_per_time.columns = ['TimeOfDay', 'AvgFlowData', 'AvgDepthData', 'AvgVelocityData']
-
-                # Optional: sort by time if needed
-                avg_dwf_per_time = avg_dwf_per_time.sort_values(by='TimeOfDay').reset_index(drop=True)
-
-                self.df_dwf_compare = pd.merge(flow_monitor_data, avg_dwf_per_time, on='TimeOfDay', how='right')
-
-                self.df_dwf_compare['TimeOfDay'] = self.df_dwf_compare['Date'].dt.hour * 3600 + \
-                    self.df_dwf_compare['Date'].dt.minute * 60 + self.df_dwf_compare['Date'].dt.second
-
-                self.df_dwf_compare_average = self.df_dwf_compare.drop_duplicates(
-                    subset=['TimeOfDay', 'AvgFlowData', 'AvgDepthData', 'AvgVelocityData'])
+                compare_profile = dwf_profiles.get_profile(self.current_inst.data, dry_days,
+                                                           exclude_zero_flow=exclude_zero_flow)
+                self.df_dwf_compare = compare_profile.filtered
+                self.df_dwf_compare_average = compare_profile.average
 
     def onAccept(self):
         self.update_interim_review()
@@ -0,0 +1,217 @@
+"""
+Dry weather flow (DWF) profiles for flow monitors and flow survey installs.
+
+A profile is the set of curves, one value per time of day, built from the readings that fall on dry
+days: the mean, max and min of flow, depth and velocity, the same split into weekdays and weekends,
+and the DWF_PERCENTILES percentiles. dwfProfileEngine builds every curve in one pass over the dry day
+readings and memoises the result, so that redrawing a DWF plot with different smoothing options, or
+showing the same profile in the review dialog and the report, reuses the aggregation.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Iterable, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from scipy.signal import savgol_filter
+
+if TYPE_CHECKING:
+    from flowbot_monitors import flowMonitor
+
+DWF_SERIES = ('FlowData', 'DepthData', 'VelocityData')
+DWF_STATISTICS = (('Avg', 'mean'), ('Max', 'max'), ('Min', 'min'))
+DWF_PERCENTILES = (10, 90)
+DWF_PROFILE_COLUMNS = [f'{prefix}{name}' for name in DWF_SERIES for prefix, _ in DWF_STATISTICS]
+
+
+def dry_days_from_events(events) -> frozenset:
+    """
+    Returns the dates covered by the 'Dry Day' and 'Dry Period' survey events. A dry period covers
+    each day from its start, in whole day steps, up to its end.
+    """
+    dry_days = set()
+    one_day = timedelta(days=1)
+    for se in events:
+        if se.eventType == 'Dry Day':
+            dry_days.add(se.eventStart.date())
+        elif se.eventType == 'Dry Period':
+            if se.eventEnd < se.eventStart:
+                continue
+            day_count = (se.eventEnd - se.eventStart) // one_day
+            first_day = se.eventStart.date()
+            dry_days.update(first_day + (one_day * i) for i in range(day_count + 1))
+    return frozenset(dry_days)
+
+
+@dataclass
+class dwfAggregate:
+    """Dry day readings ordered by time of day, and the unsmoothed curves built from them."""
+    readings: pd.DataFrame
+    time_codes: np.ndarray
+    curves: pd.DataFrame
+
+
+@dataclass
+class dwfProfile:
+    """
+    A DWF profile as used by the DWF plots. curves holds every curve, one row per time of day.
+    filtered holds the dry day readings, ordered by time of day, with the Avg/Max/Min curves of
+    their time of day alongside; average holds one of those rows per time of day. The frames are
+    shared by every caller asking for the same profile and must not be modified.
+    """
+    curves: pd.DataFrame
+    filtered: pd.DataFrame
+    average: pd.DataFrame
+
+
+class dwfProfileEngine():
+    """
+    Builds DWF profiles and memoises them, keyed by the version of the source data, the set of dry
+    days, the period and the zero flow filter. The smoothed profiles are memoised separately, keyed
+    additionally by the Savitzky-Golay parameters, so a change of smoothing only re-runs the filter.
+
+    The version of a flowMonitor is its series arrays, and that of a DataFrame is the frame itself;
+    both are replaced, never modified in place, when the data changes. Cache entries hold on to the
+    version objects so that their ids, used in the keys, cannot be reused while the entry exists.
+    """
+
+    def __init__(self, max_entries: int = 8):
+        self.max_entries: int = max_entries
+        self._aggregates: OrderedDict = OrderedDict()
+        self._profiles: OrderedDict = OrderedDict()
+
+    def clear(self):
+        self._aggregates.clear()
+        self._profiles.clear()
+
+    def get_profile(self, source: Union['flowMonitor', pd.DataFrame], dry_days: Iterable,
+                    start: Optional[datetime] = None, end: Optional[datetime] = None,
+                    exclude_zero_flow: bool = False, use_sg_filter: bool = False,
+                    sg_window: int = 11, sg_polyorder: int = 3) -> dwfProfile:
+
+        version = self._data_version(source)
+        aggregate_key = (tuple(id(v) for v in version), frozenset(dry_days), start, end, exclude_zero_flow)
+        if use_sg_filter:
+            profile_key = (aggregate_key, sg_window, sg_polyorder)
+        else:
+            profile_key = (aggregate_key, None, None)
+
+        profile = self._cached(self._profiles, profile_key, version)
+        if profile is None:
+            aggregate = self._cached(self._aggregates, aggregate_key, version)
+            if aggregate is None:
+                aggregate = self._aggregate(source, aggregate_key[1], start, end, exclude_zero_flow)
+                self._store(self._aggregates, aggregate_key, version, aggregate)
+            profile = self._build_profile(aggregate, use_sg_filter, sg_window, sg_polyorder)
+            self._store(self._profiles, profile_key, version, profile)
+        return profile
+
+    def _data_version(self, source) -> Tuple:
+        if isinstance(source, pd.DataFrame):
+            return (source,)
+        return (source.dateArray, source.flowArray, source.depthArray, source.velocityArray)
+
+    def _cached(self, cache: OrderedDict, key, version):
+        entry = cache.get(key)
+        if entry is None or not all(a is b for a, b in zip(entry[0], version)):
+            return None
+        cache.move_to_end(key)
+        return entry[1]
+
+    def _store(self, cache: OrderedDict, key, version, value):
+        cache[key] = (version, value)
+        cache.move_to_end(key)
+        while len(cache) > self.max_entries:
+            cache.popitem(last=False)
+
+    def _source_arrays(self, source):
+        if isinstance(source, pd.DataFrame):
+            dates = pd.to_datetime(source['Date']).to_numpy(dtype='datetime64[ns]')
+            series = {name: source[name].to_numpy(dtype=float, na_value=np.nan) for name in DWF_SERIES}
+        else:
+            dates = source.dateArray
+            series = {'FlowData': source.flowArray, 'DepthData': source.depthArray,
+                      'VelocityData': source.velocityArray}
+        return dates, series
+
+    def _aggregate(self, source, dry_days: frozenset, start: Optional[datetime], end: Optional[datetime],
+                   exclude_zero_flow: bool) -> dwfAggregate:
+
+        dates, series = self._source_arrays(source)
+        days = dates.astype('datetime64[D]')
+
+        keep = np.isin(days, np.array(sorted(dry_days), dtype='datetime64[D]'))
+        if start is not None:
+            keep &= dates >= np.datetime64(start)
+        if end is not None:
+            keep &= dates <= np.datetime64(end)
+        if exclude_zero_flow:
+            keep &= series['FlowData'] != 0
+        rows = np.flatnonzero(keep)
+
+        time_of_day = (dates[rows] - days[rows]).astype('timedelta64[ns]').astype(np.int64)
+        time_codes, times = pd.factorize(time_of_day, sort=True)
+        # Readings in time of day order, keeping date order within each time of day
+        order = np.argsort(time_codes, kind='stable')
+        rows = rows[order]
+        time_codes = time_codes[order]
+
+        readings = pd.DataFrame({'Date': dates[rows]})
+        for name in DWF_SERIES:
+            readings[name] = series[name][rows]
+        readings['Day'] = days[rows].astype(object)
+        readings['TimeOfDay'] = time_of_day[order] // 1_000_000_000
+
+        weekend = ((days[rows].astype(np.int64) + 3) % 7) >= 5
+        curves = self._build_curves(readings[list(DWF_SERIES)], time_codes, weekend, len(times))
+        curves.insert(0, 'TimeOfDay', np.asarray(times, dtype=np.int64) // 1_000_000_000)
+
+        return dwfAggregate(readings=readings, time_codes=time_codes, curves=curves)
+
+    def _build_curves(self, values: pd.DataFrame, time_codes: np.ndarray, weekend: np.ndarray,
+                      time_count: int) -> pd.DataFrame:
+
+        functions = [function for _, function in DWF_STATISTICS]
+        time_index = pd.RangeIndex(time_count)
+
+        overall = values.groupby(time_codes).agg(functions).reindex(time_index)
+        # Weekday and weekend readings of each time of day fall in alternate groups
+        by_day_type = values.groupby(time_codes * 2 + weekend).agg(functions).reindex(
+            pd.RangeIndex(time_count * 2))
+        day_types = (('', overall), ('Weekday', by_day_type.iloc[0::2]), ('Weekend', by_day_type.iloc[1::2]))
+
+        curves = {}
+        for day_type, stats in day_types:
+            for name in DWF_SERIES:
+                for prefix, function in DWF_STATISTICS:
+                    curves[f'{day_type}{prefix}{name}'] = stats[(name, function)].to_numpy(dtype=float)
+        for p in DWF_PERCENTILES:
+            percentile = values.groupby(time_codes).quantile(p / 100).reindex(time_index)
+            for name in DWF_SERIES:
+                curves[f'P{p}{name}'] = percentile[name].to_numpy(dtype=float)
+
+        return pd.DataFrame(curves, index=time_index)
+
+    def _build_profile(self, aggregate: dwfAggregate, use_sg_filter: bool, sg_window: int,
+                       sg_polyorder: int) -> dwfProfile:
+
+        curves = aggregate.curves
+        if use_sg_filter and len(curves) >= sg_window:
+            # Only the Avg/Max/Min curves are smoothed, as the plots show. The weekday and weekend curves
+            # are NaN at any time of day without a dry day reading of that kind, which savgol_filter rejects.
+            curves = curves.copy()
+            for column in DWF_PROFILE_COLUMNS:
+                curves[column] = savgol_filter(curves[column], sg_window, sg_polyorder)
+
+        filtered = aggregate.readings.copy()
+        for column in DWF_PROFILE_COLUMNS:
+            filtered[column] = curves[column].to_numpy()[aggregate.time_codes]
+        # The readings are in time of day order, so each time of day starts where its code changes
+        codes = aggregate.time_codes
+        average = filtered.iloc[np.flatnonzero(np.diff(codes, prepend=-1))]
+
+        return dwfProfile(curves=curves, filtered=filtered, average=average)
+
+
+dwf_profiles = dwfProfileEngine()
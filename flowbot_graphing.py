@@ -36,6 +36,7 @@ from flowbot_monitors import (
     rainGauge,
 )
 from flowbot_survey_events import surveyEvent, plottedSurveyEvents
+from flowbot_dwf_profile import dwf_profiles, dry_days_from_events
 from flowbot_verification import plottedICMTrace, icmTraceLocation, icmTrace
 from flowbot_water_quality import plottedWQMonitors
 import mplcursors
@@ -49,7 +50,6 @@ from matplotlib.offsetbox import OffsetImage, AnnotationBbox
 from PIL import Image
 import matplotlib.colors as mcolors
 import scipy.stats as st
-from scipy.signal import savgol_filter
 # from matplotlib.widgets import Button
 # from matplotlib.backend_bases import PickEvent
 # from matplotlib.figure import Figure
@@ -57,9 +57,43 @@ from scipy.signal import savgol_filter
 from PyQt5.QtWidgets import QApplication
 # import traceback
 
+def decimate_min_max(x: np.ndarray, y: np.ndarray, x_min: float, x_max: float,
+                     buckets: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Reduces a sorted series to at most two points per bucket over the range x_min to x_max,
+    keeping each bucket's minimum and maximum so that no peak or trough is lost.
+    The points either side of the range are kept so lines run to the axes edges.
+    Series with fewer than two points per bucket are returned unchanged.
+    """
+    i = max(int(np.searchsorted(x, x_min, side='left')) - 1, 0)
+    j = min(int(np.searchsorted(x, x_max, side='right')) + 1, len(x))
+    x_vis = x[i:j]
+    y_vis = y[i:j]
+    n = len(x_vis)
+    if buckets < 1 or n <= 2 * buckets:
+        return x_vis, y_vis
+
+    bucket_size = -(-n // buckets)
+    bucket_count = -(-n // bucket_size)
+    padded = np.full(bucket_count * bucket_size, np.nan)
+    padded[:n] = y_vis
+    padded = padded.reshape(bucket_count, bucket_size)
+    nan_values = np.isnan(padded)
+    offsets = np.arange(bucket_count) * bucket_size
+    i_min = offsets + np.where(nan_values, np.inf, padded).argmin(axis=1)
+    i_max = offsets + np.where(nan_values, -np.inf, padded).argmax(axis=1)
+
+    keep = np.unique(np.concatenate(([0, n - 1], i_min, i_max)))
+    keep = keep[keep < n]
+    return x_vis[keep], y_vis[keep]
+
+
 class GraphFDV:
     """Class to create and modify the Flow, Depth, Velocity Plots"""
 
+    # Lines with more points than this are drawn decimated to the visible x-range
+    decimation_threshold: int = 10000
+
     def __init__(self, mw_pw: Optional[PlotWidget] = None):
 
         self.main_window_plot_widget: PlotWidget = mw_pw
@@ -90,6 +124,8 @@ class GraphFDV:
         self.c_flow_legend_lines: Optional[dict[lines.Line2D, lines.Line2D]] = None
         self.c_depth_legend_lines: Optional[dict[lines.Line2D, lines.Line2D]] = None
         self.c_vel_legend_lines: Optional[dict[lines.Line2D, lines.Line2D]] = None
+        # Full resolution (x, y) data for each decimated line, keyed by line
+        self.full_res_lines: Dict[lines.Line2D, Tuple[np.ndarray, np.ndarray]] = {}
 
     def set_plot_event(self, se: surveyEvent):
 
@@ -124,6 +160,7 @@ class GraphFDV:
     def update_plot(self):
 
         self.main_window_plot_widget.figure.clear()
+        self.full_res_lines = {}
 
         if len(self.plotted_fms.plotFMs) + len(self.plotted_rgs.plotRGs) == 0:
             getBlankFigure(self.main_window_plot_widget)
@@ -186,25 +223,28 @@ class GraphFDV:
 
                 fm_title = fm_title + ", " + fm.monitorName
 
-            (multi_flow,) = self.plot_axis_flow.plot(
-                fm.dateRange,
-                fm.flowDataRange,
+            multi_flow = self.plot_decimated_line(
+                self.plot_axis_flow,
+                fm.dateArray,
+                fm.flowArray,
                 "-",
                 linewidth=1.1,
                 label=fm.monitorName,
                 color=flow_colour,
             )
-            (multi_depth,) = self.plot_axis_depth.plot(
-                fm.dateRange,
-                fm.depthDataRange,
+            multi_depth = self.plot_decimated_line(
+                self.plot_axis_depth,
+                fm.dateArray,
+                fm.depthArray,
                 "-",
                 linewidth=1,
                 label=fm.monitorName,
                 color=depth_colour,
             )
-            (multi_velocity,) = self.plot_axis_velocity.plot(
-                fm.dateRange,
-                fm.velocityDataRange,
+            multi_velocity = self.plot_decimated_line(
+                self.plot_axis_velocity,
+                fm.dateArray,
+                fm.velocityArray,
                 "-",
                 linewidth=1,
                 label=fm.monitorName,
@@ -230,9 +270,10 @@ class GraphFDV:
             else:
                 rg_title = rg_title + ", " + rg.gaugeName
 
-            self.plot_axis_rg.plot(
-                rg.dateRange,
-                rg.rainfallDataRange,
+            self.plot_decimated_line(
+                self.plot_axis_rg,
+                rg.dateArray,
+                rg.rainfallArray,
                 "-",
                 linewidth=1,
                 color="midnightblue",
@@ -387,12 +428,45 @@ class GraphFDV:
             self.update_plotStats(xmin, xmax)
 
     def onPlotXlimsChange(self, event_ax):
+        self.update_decimated_lines(*event_ax.get_xlim())
         if not self.main_window_plot_widget._dragging:
             xmin, xmax = event_ax.get_xlim()
             xmin = mpl_dates.num2date(xmin)
             xmax = mpl_dates.num2date(xmax)
             self.update_plotStats(xmin, xmax)
 
+    def plot_decimated_line(self, ax: axes.Axes, dates: np.ndarray, values: np.ndarray, *args, **kwargs) -> lines.Line2D:
+        """
+        Plots a series on ax, drawing long series decimated with decimate_min_max.
+        The full resolution data is kept so the line can be re-decimated as the view changes.
+        """
+        x = mpl_dates.date2num(dates)
+        y = np.asarray(values, dtype=np.float64)
+        if len(x) > self.decimation_threshold:
+            x_plot, y_plot = decimate_min_max(x, y, x[0], x[-1], self.get_decimation_buckets(ax))
+        else:
+            x_plot, y_plot = x, y
+        (line,) = ax.plot(dates[:0], y[:0], *args, **kwargs)
+        line.set_data(x_plot, y_plot)
+        ax.relim()
+        ax.autoscale_view()
+        if len(x) > self.decimation_threshold:
+            self.full_res_lines[line] = (x, y)
+        return line
+
+    def get_decimation_buckets(self, ax: axes.Axes) -> int:
+        # Two buckets per pixel column keeps the decimation invisible at the rendered size
+        return max(int(ax.bbox.width) * 2, 500)
+
+    def update_decimated_lines(self, x_min: float, x_max: float):
+        """Re-decimates every long line for the x-range, with a margin of one view width either side for panning."""
+        if not self.full_res_lines:
+            return
+        margin = x_max - x_min
+        for line, (x, y) in self.full_res_lines.items():
+            line.set_data(*decimate_min_max(x, y, x_min - margin, x_max + margin,
+                                            self.get_decimation_buckets(line.axes) * 3))
+
     def onPick(self, event):
 
         legline = event.artist
@@ -3602,62 +3676,48 @@ class graphScatter:
         if self._plot_flow_monitor is None:
             return None, None, [], None, None, None
 
-        dates = self._plot_flow_monitor.dateRange
-        depth = self._plot_flow_monitor.depthDataRange
+        dates = self._plot_flow_monitor.dateArray
+        depth = self._plot_flow_monitor.depthArray
+        velocity = self._plot_flow_monitor.velocityArray
+        flow = self._plot_flow_monitor.flowArray
+        plotX = velocity if self.plotVelocityScattergraph else flow
 
-        if self.plotVelocityScattergraph:
-            plotX = self._plot_flow_monitor.velocityDataRange
-        else:
-            plotX = self._plot_flow_monitor.flowDataRange
-
-        tobedeleted = []
+        keep = np.ones(len(depth), dtype=bool)
 
         # Shape-aware soffit filter
         if self.ignoreDataAboveSoffit and self._plot_flow_monitor.hasModelData:
             soffit_mm = float(getattr(self._plot_flow_monitor, "modelDataPipeHeight" if self._shape()=="RECT" else "modelDataPipeDia", 0.0))
             if soffit_mm > 0:
-                for i in reversed(range(len(depth))):
-                    if depth[i] > soffit_mm:
-                        tobedeleted.append(i)
+                keep &= ~(depth > soffit_mm)
 
         if self.ignoreZeros:
-            for i in range(len(plotX)):
-                try:
-                    if float(plotX[i]) == 0.0:
-                        tobedeleted.append(i)
-                except Exception:
-                    pass
-
-        if len(tobedeleted) > 0:
-            dates = np.delete(np.array(dates), np.array(tobedeleted))
-            depth = np.delete(np.array(depth), np.array(tobedeleted))
-            plotX = np.delete(np.array(plotX), np.array(tobedeleted))
+            keep &= plotX != 0.0
 
         # Build main series
-        fp_x = np.asarray(plotX)
-        fp_y = np.asarray(depth)
-        dat_all = np.asarray(dates) if dates is not None else None
+        fp_x = plotX[keep]
+        fp_y = depth[keep]
+        dat_all = dates[keep]
 
         # Keep vel/flow for hover meta
-        if len(tobedeleted) > 0:
-            vel_all = np.delete(np.array(self._plot_flow_monitor.velocityDataRange), np.array(tobedeleted))
-            flow_all = np.delete(np.array(self._plot_flow_monitor.flowDataRange), np.array(tobedeleted))
-        else:
-            vel_all = np.asarray(self._plot_flow_monitor.velocityDataRange)
-            flow_all = np.asarray(self._plot_flow_monitor.flowDataRange)
+        vel_all = velocity[keep]
+        flow_all = flow[keep]
 
-        # Event subsets for plotting later
+        # Event subsets for plotting later: each event is a slice of the (sorted) timestamps
         events_payload = []
         if len(self.plotted_events.plotEvents) > 0:
+            dates_sorted = bool(np.all(dat_all[1:] >= dat_all[:-1]))
             for se in self.plotted_events.plotEvents.values():
-                idx_del = []
-                for i in reversed(range(len(dates))):
-                    if dates[i] < se.eventStart or dates[i] > se.eventEnd:
-                        idx_del.append(i)
-                if len(idx_del) > 0:
-                    ev_x = np.delete(fp_x, idx_del)
-                    ev_y = np.delete(fp_y, idx_del)
-                    events_payload.append({"name": se.eventName, "x": ev_x, "y": ev_y})
+                event_start = np.datetime64(se.eventStart).astype(dat_all.dtype)
+                event_end = np.datetime64(se.eventEnd).astype(dat_all.dtype)
+                if dates_sorted:
+                    in_event = slice(np.searchsorted(dat_all, event_start, side='left'),
+                                     np.searchsorted(dat_all, event_end, side='right'))
+                    no_in_event = in_event.stop - in_event.start
+                else:
+                    in_event = (dat_all >= event_start) & (dat_all <= event_end)
+                    no_in_event = int(np.count_nonzero(in_event))
+                if no_in_event < len(dat_all):
+                    events_payload.append({"name": se.eventName, "x": fp_x[in_event], "y": fp_y[in_event]})
 
         return fp_x, fp_y, events_payload, vel_all, flow_all, dat_all
 
@@ -4256,8 +4316,8 @@ class graphDWF:
         self.plot_axis_velocity: axes.Axes = None
 
         # Data storage
-        self.df_filtered: pd.DataFrame
         self.df_dwf_filtered: pd.DataFrame
+        self.df_dwf_average: pd.DataFrame
         # self.cbw_data = {"depth": [], "flow": [], "velocity": []}
 
     @property
@@ -4610,106 +4670,13 @@ class graphDWF:
 
     def filter_dwf_data(self):
 
-        # Create the DataFrame
-        self.df_filtered = pd.DataFrame(
-            {
-                "Date": self._plot_flow_monitor.dateRange,
-                "FlowData": self._plot_flow_monitor.flowDataRange,
-                "DepthData": self._plot_flow_monitor.depthDataRange,
-                "VelocityData": self._plot_flow_monitor.velocityDataRange,
-            }
-        )
-
-        dry_days_df = pd.DataFrame({"Date": []})
-
-        # Loop through each plotted event and add the corresponding dates.
-        for se in self.plotted_events.plotEvents.values():
-            if se.eventType == 'Dry Day':
-                # For a dry day, add just the eventStart date.
-                dry_day = se.eventStart.date()
-                dry_days_df = pd.concat(
-                    [dry_days_df, pd.DataFrame({"Date": [dry_day]})],
-                    ignore_index=True
-                )
-            elif se.eventType == 'Dry Period':
-                # For a dry period, add every day from eventStart to eventEnd (inclusive).
-                # Create a date range with daily frequency.
-                all_days = pd.date_range(start=se.eventStart, end=se.eventEnd, freq='D')
-                # Convert Timestamp objects to date objects.
-                all_days = [d.date() for d in all_days]
-                dry_days_df = pd.concat(
-                    [dry_days_df, pd.DataFrame({"Date": all_days})],
-                    ignore_index=True
-                )
-
-        # flow_monitor_data = self.current_inst.data.copy()  # Make a copy of the data
-        flow_monitor_data = self.df_filtered.copy()  # Make a copy of the data
-
-        # Filter flow monitor data to include only dry days
-        flow_monitor_data['Date'] = pd.to_datetime(flow_monitor_data['Date'])
-        flow_monitor_data['Day'] = flow_monitor_data['Date'].dt.date
-        flow_monitor_data = flow_monitor_data[flow_monitor_data['Day'].isin(dry_days_df['Date'])]
-
-        # Remove date information and keep only time part
-        flow_monitor_data['TimeOfDay'] = flow_monitor_data['Date'].dt.time
-
-        # Group by time and calculate the average, max, and min for flow, velocity, and depth
-        avg_dwf_per_time = flow_monitor_data.groupby('TimeOfDay').agg({
-            'FlowData': ['mean', 'max', 'min'],
-            'DepthData': ['mean', 'max', 'min'],
-            'VelocityData': ['mean', 'max', 'min']
-        }).reset_index()
-
-        # Flatten the MultiIndex columns
-        avg_dwf_per_time.columns = ['TimeOfDay', 'AvgFlowData', 'MaxFlowData', 'MinFlowData',
-                                    'AvgDepthData', 'MaxDepthData', 'MinDepthData',
-                                    'AvgVelocityData', 'MaxVelocityData', 'MinVelocityData']
-
-        # Optional: sort by time if needed
-        avg_dwf_per_time = avg_dwf_per_time.sort_values(by='TimeOfDay').reset_index(drop=True)
-
-        # # Apply Savitzky-Golay smoothing on the average data
-        if self.use_sg_filter:
-            if len(avg_dwf_per_time) >= self.sg_window:
-                avg_dwf_per_time['AvgFlowData'] = savgol_filter(avg_dwf_per_time['AvgFlowData'], self.sg_window, self.sg_polyorder)
-                avg_dwf_per_time['AvgDepthData'] = savgol_filter(avg_dwf_per_time['AvgDepthData'], self.sg_window, self.sg_polyorder)
-                avg_dwf_per_time['AvgVelocityData'] = savgol_filter(avg_dwf_per_time['AvgVelocityData'], self.sg_window, self.sg_polyorder)
-                avg_dwf_per_time['MaxFlowData'] = savgol_filter(avg_dwf_per_time['MaxFlowData'], self.sg_window, self.sg_polyorder)
-                avg_dwf_per_time['MaxDepthData'] = savgol_filter(avg_dwf_per_time['MaxDepthData'], self.sg_window, self.sg_polyorder)
-                avg_dwf_per_time['MaxVelocityData'] = savgol_filter(avg_dwf_per_time['MaxVelocityData'], self.sg_window, self.sg_polyorder)
-                avg_dwf_per_time['MinFlowData'] = savgol_filter(avg_dwf_per_time['MinFlowData'], self.sg_window, self.sg_polyorder)
-                avg_dwf_per_time['MinDepthData'] = savgol_filter(avg_dwf_per_time['MinDepthData'], self.sg_window, self.sg_polyorder)
-                avg_dwf_per_time['MinVelocityData'] = savgol_filter(avg_dwf_per_time['MinVelocityData'], self.sg_window, self.sg_polyorder)
-            else:
-                avg_dwf_per_time['AvgFlowData'] = avg_dwf_per_time['AvgFlowData']
-                avg_dwf_per_time['AvgDepthData'] = avg_dwf_per_time['AvgDepthData']
-                avg_dwf_per_time['AvgVelocityData'] = avg_dwf_per_time['AvgVelocityData']
-                avg_dwf_per_time['MaxFlowData'] = avg_dwf_per_time['MaxFlowData']
-                avg_dwf_per_time['MaxDepthData'] = avg_dwf_per_time['MaxDepthData']
-                avg_dwf_per_time['MaxVelocityData'] = avg_dwf_per_time['MaxVelocityData']
-                avg_dwf_per_time['MinFlowData'] = avg_dwf_per_time['MinFlowData']
-                avg_dwf_per_time['MinDepthData'] = avg_dwf_per_time['MinDepthData']
-                avg_dwf_per_time['MinVelocityData'] = avg_dwf_per_time['MinVelocityData']
-
-        self.df_dwf_filtered = pd.merge(
-            flow_monitor_data,
-            avg_dwf_per_time,
-            on='TimeOfDay',
-            how='right'
-        )
-
-        self.df_dwf_filtered['TimeOfDay'] = (
-            self.df_dwf_filtered['Date'].dt.hour * 3600 +
-            self.df_dwf_filtered['Date'].dt.minute * 60 +
-            self.df_dwf_filtered['Date'].dt.second
-        )
-
-        self.df_dwf_average = self.df_dwf_filtered.drop_duplicates(
-            subset=['TimeOfDay', 'AvgFlowData', 'MaxFlowData', 'MinFlowData',
-                    'AvgDepthData', 'MaxDepthData', 'MinDepthData',
-                    'AvgVelocityData', 'MaxVelocityData', 'MinVelocityData']
-        )
+        dry_days = dry_days_from_events(self.plotted_events.plotEvents.values())
+        profile = dwf_profiles.get_profile(
+            self._plot_flow_monitor, dry_days, use_sg_filter=self.use_sg_filter,
+            sg_window=self.sg_window, sg_polyorder=self.sg_polyorder)
 
+        self.df_dwf_filtered = profile.filtered
+        self.df_dwf_average = profile.average
 
     def clearFigure(self):
         self.main_window_plot_widget.figure.clear()
@@ -6992,15 +6959,15 @@ class graphCumulativeDepth:
 
             if self.has_plot_event():
 
-                for i in reversed(range(len(rg.dateRange))):
+                for i in reversed(range(len(dates))):
                     if (
-                        rg.dateRange[i] < self.__plot_event.eventStart
-                        or rg.dateRange[i] > self.__plot_event.eventEnd
+                        dates[i] < self.__plot_event.eventStart
+                        or dates[i] > self.__plot_event.eventEnd
                     ):
                         tobedeleted.append(i)
             else:
-                for i in reversed(range(len(rg.dateRange))):
-                    if rg.dateRange[i] < self.startDate:
+                for i in reversed(range(len(dates))):
+                    if dates[i] < self.startDate:
                         tobedeleted.append(i)
 
             if len(tobedeleted) > 0:
@@ -7900,50 +7867,49 @@ class graph_fsm_classification:
         fm_data_list = []
         dm_data_list = []
         rg_data_list = []
-        for a_int_rev in self.a_project.dict_fsm_interim_reviews.values():
-            if a_int_rev.interim_id == self.interim_id:
-                if (
-                    self.a_project.dict_fsm_installs[a_int_rev.install_id].install_type
-                    == "Flow Monitor"
-                ):
-                    fm_data_list.append(
-                        [
-                            self.a_project.dict_fsm_installs[
-                                a_int_rev.install_id
-                            ].client_ref
-                        ]
-                        + self.a_project.get_class_list(
-                            self.interim_id, a_int_rev.install_id
-                        )
+        for a_int_rev in self.a_project.filter_interim_reviews_by_interim_id(self.interim_id).values():
+            if (
+                self.a_project.dict_fsm_installs[a_int_rev.install_id].install_type
+                == "Flow Monitor"
+            ):
+                fm_data_list.append(
+                    [
+                        self.a_project.dict_fsm_installs[
+                            a_int_rev.install_id
+                        ].client_ref
+                    ]
+                    + self.a_project.get_class_list(
+                        self.interim_id, a_int_rev.install_id
                     )
-                elif (
-                    self.a_project.dict_fsm_installs[a_int_rev.install_id].install_type
-                    == "Depth Monitor"
-                ):
-                    dm_data_list.append(
-                        [
-                            self.a_project.dict_fsm_installs[
-                                a_int_rev.install_id
-                            ].client_ref
-                        ]
-                        + self.a_project.get_class_list(
-                            self.interim_id, a_int_rev.install_id
-                        )
+                )
+            elif (
+                self.a_project.dict_fsm_installs[a_int_rev.install_id].install_type
+                == "Depth Monitor"
+            ):
+                dm_data_list.append(
+                    [
+                        self.a_project.dict_fsm_installs[
+                            a_int_rev.install_id
+                        ].client_ref
+                    ]
+                    + self.a_project.get_class_list(
+                        self.interim_id, a_int_rev.install_id
                     )
-                elif (
-                    self.a_project.dict_fsm_installs[a_int_rev.install_id].install_type
-                    == "Rain Gauge"
-                ):
-                    rg_data_list.append(
-                        [
-                            self.a_project.dict_fsm_installs[
-                                a_int_rev.install_id
-                            ].client_ref
-                        ]
-                        + self.a_project.get_class_list(
-                            self.interim_id, a_int_rev.install_id
-                        )
+                )
+            elif (
+                self.a_project.dict_fsm_installs[a_int_rev.install_id].install_type
+                == "Rain Gauge"
+            ):
+                rg_data_list.append(
+                    [
+                        self.a_project.dict_fsm_installs[
+                            a_int_rev.install_id
+                        ].client_ref
+                    ]
+                    + self.a_project.get_class_list(
+                        self.interim_id, a_int_rev.install_id
                     )
+                )
 
         for a_interim in self.a_project.dict_fsm_interims.values():
             if a_interim.interim_id <= self.interim_id:
@@ -7952,74 +7918,73 @@ class graph_fsm_classification:
                 days_list.extend(self.a_project.get_day_list(a_interim.interim_id))
                 dates_list.extend(self.a_project.get_date_list(a_interim.interim_id))
 
-                for a_int_rev in self.a_project.dict_fsm_interim_reviews.values():
-                    if a_int_rev.interim_id == a_interim.interim_id:
-                        if (
+                for a_int_rev in self.a_project.filter_interim_reviews_by_interim_id(a_interim.interim_id).values():
+                    if (
+                        self.a_project.dict_fsm_installs[
+                            a_int_rev.install_id
+                        ].install_type
+                        == "Flow Monitor"
+                    ):
+                        current_list = fm_data_dict.get(
                             self.a_project.dict_fsm_installs[
                                 a_int_rev.install_id
-                            ].install_type
-                            == "Flow Monitor"
-                        ):
-                            current_list = fm_data_dict.get(
-                                self.a_project.dict_fsm_installs[
-                                    a_int_rev.install_id
-                                ].client_ref,
-                                [],
-                            )
-                            current_list.extend(
-                                self.a_project.get_class_list(
-                                    a_interim.interim_id, a_int_rev.install_id
-                                )
+                            ].client_ref,
+                            [],
+                        )
+                        current_list.extend(
+                            self.a_project.get_class_list(
+                                a_interim.interim_id, a_int_rev.install_id
                             )
-                            fm_data_dict[
-                                self.a_project.dict_fsm_installs[
-                                    a_int_rev.install_id
-                                ].client_ref
-                            ] = current_list
-                        elif (
+                        )
+                        fm_data_dict[
                             self.a_project.dict_fsm_installs[
                                 a_int_rev.install_id
-                            ].install_type
-                            == "Depth Monitor"
-                        ):
-                            current_list = dm_data_dict.get(
-                                self.a_project.dict_fsm_installs[
-                                    a_int_rev.install_id
-                                ].client_ref,
-                                [],
-                            )
-                            current_list.extend(
-                                self.a_project.get_class_list(
-                                    a_interim.interim_id, a_int_rev.install_id
-                                )
-                            )
-                            dm_data_dict[
-                                self.a_project.dict_fsm_installs[
-                                    a_int_rev.install_id
-                                ].client_ref
-                            ] = current_list
-                        elif (
+                            ].client_ref
+                        ] = current_list
+                    elif (
+                        self.a_project.dict_fsm_installs[
+                            a_int_rev.install_id
+                        ].install_type
+                        == "Depth Monitor"
+                    ):
+                        current_list = dm_data_dict.get(
                             self.a_project.dict_fsm_installs[
                                 a_int_rev.install_id
-                            ].install_type
-                            == "Rain Gauge"
-                        ):
-                            current_list = rg_data_dict.get(
-                                self.a_project.dict_fsm_installs[
-                                    a_int_rev.install_id
-                                ].client_ref,
-                                [],
+                            ].client_ref,
+                            [],
+                        )
+                        current_list.extend(
+                            self.a_project.get_class_list(
+                                a_interim.interim_id, a_int_rev.install_id
                             )
-                            current_list.extend(
-                                self.a_project.get_class_list(
-                                    a_interim.interim_id, a_int_rev.install_id
-                                )
+                        )
+                        dm_data_dict[
+                            self.a_project.dict_fsm_installs[
+                                a_int_rev.install_id
+                            ].client_ref
+                        ] = current_list
+                    elif (
+                        self.a_project.dict_fsm_installs[
+                            a_int_rev.install_id
+                        ].install_type
+                        == "Rain Gauge"
+                    ):
+                        current_list = rg_data_dict.get(
+                            self.a_project.dict_fsm_installs[
+                                a_int_rev.install_id
+                            ].client_ref,
+                            [],
+                        )
+                        current_list.extend(
+                            self.a_project.get_class_list(
+                                a_interim.interim_id, a_int_rev.install_id
                             )
-                            rg_data_dict[
-                                self.a_project.dict_fsm_installs[
-                                    a_int_rev.install_id
-                                ].client_ref
-                            ] = current_list
+                        )
+                        rg_data_dict[
+                            self.a_project.dict_fsm_installs[
+                                a_int_rev.install_id
+                            ].client_ref
+                        ] = current_list
 
         fm_data_list = []
         for a_id, a_list in fm_data_dict.items():
@@ -8512,55 +8477,54 @@ class graph_fsm_fm_install_summary:
         data = []
         fm_data = []
         dm_data = []
-        for a_int_rev in self.a_project.dict_fsm_interim_reviews.values():
-            if a_int_rev.interim_id == self.interim_id:
-                a_inst = self.a_project.dict_fsm_installs[a_int_rev.install_id]
-                if a_inst.install_type != "Rain Gauge":
-                    a_site = self.a_project.dict_fsm_sites[a_inst.install_site_id]
-                    a_mon = self.a_project.dict_fsm_monitors[
-                        a_inst.install_monitor_asset_id
-                    ]
-                    data_list = []
-                    data_list.append(a_inst.client_ref)
-                    data_list.append(a_site.address)
-                    data_list.append(a_inst.fm_pipe_letter)
-                    data_list.append(str(a_inst.fm_pipe_height_mm))
-                    data_list.append(str(a_inst.fm_pipe_width_mm))
-                    data_list.append(
-                        self.a_project.get_pipe_shape_code(a_inst.fm_pipe_shape)
-                    )
-                    data_list.append(str(a_inst.fm_pipe_depth_to_invert_mm))
-                    data_list.append(a_mon.monitor_sub_type[0])
-                    data_list.append(a_site.mh_ref)
-                    data_list.append(a_inst.install_date.strftime("%d/%m/%Y"))
-                    if a_inst.remove_date > a_inst.install_date:
-                        data_list.append(a_inst.remove_date.strftime("%d/%m/%Y"))
-                        date_delta = a_inst.remove_date - a_inst.install_date
-                        no_of_weeks = math.floor(date_delta.days / 7)
-                        no_of_days = math.floor((date_delta.days - (no_of_weeks * 7)))
-                        data_list.append(str(no_of_weeks))
-                        data_list.append(str(no_of_days))
-                    elif (
+        for a_int_rev in self.a_project.filter_interim_reviews_by_interim_id(self.interim_id).values():
+            a_inst = self.a_project.dict_fsm_installs[a_int_rev.install_id]
+            if a_inst.install_type != "Rain Gauge":
+                a_site = self.a_project.dict_fsm_sites[a_inst.install_site_id]
+                a_mon = self.a_project.dict_fsm_monitors[
+                    a_inst.install_monitor_asset_id
+                ]
+                data_list = []
+                data_list.append(a_inst.client_ref)
+                data_list.append(a_site.address)
+                data_list.append(a_inst.fm_pipe_letter)
+                data_list.append(str(a_inst.fm_pipe_height_mm))
+                data_list.append(str(a_inst.fm_pipe_width_mm))
+                data_list.append(
+                    self.a_project.get_pipe_shape_code(a_inst.fm_pipe_shape)
+                )
+                data_list.append(str(a_inst.fm_pipe_depth_to_invert_mm))
+                data_list.append(a_mon.monitor_sub_type[0])
+                data_list.append(a_site.mh_ref)
+                data_list.append(a_inst.install_date.strftime("%d/%m/%Y"))
+                if a_inst.remove_date > a_inst.install_date:
+                    data_list.append(a_inst.remove_date.strftime("%d/%m/%Y"))
+                    date_delta = a_inst.remove_date - a_inst.install_date
+                    no_of_weeks = math.floor(date_delta.days / 7)
+                    no_of_days = math.floor((date_delta.days - (no_of_weeks * 7)))
+                    data_list.append(str(no_of_weeks))
+                    data_list.append(str(no_of_days))
+                elif (
+                    self.a_project.dict_fsm_interims[
+                        self.interim_id
+                    ].interim_end_date
+                    > a_inst.install_date
+                ):
+                    data_list.append("")
+                    date_delta = (
                         self.a_project.dict_fsm_interims[
                             self.interim_id
                         ].interim_end_date
-                        > a_inst.install_date
-                    ):
-                        data_list.append("")
-                        date_delta = (
-                            self.a_project.dict_fsm_interims[
-                                self.interim_id
-                            ].interim_end_date
-                            - a_inst.install_date
-                        )
-                        no_of_weeks = math.floor(date_delta.days / 7)
-                        no_of_days = math.floor((date_delta.days - (no_of_weeks * 7)))
-                        data_list.append(str(no_of_weeks))
-                        data_list.append(str(no_of_days))
-                    if a_inst.install_type == "Flow Monitor":
-                        fm_data.append(data_list)
-                    else:
-                        dm_data.append(data_list)
+                        - a_inst.install_date
+                    )
+                    no_of_weeks = math.floor(date_delta.days / 7)
+                    no_of_days = math.floor((date_delta.days - (no_of_weeks * 7)))
+                    data_list.append(str(no_of_weeks))
+                    data_list.append(str(no_of_days))
+                if a_inst.install_type == "Flow Monitor":
+                    fm_data.append(data_list)
+                else:
+                    dm_data.append(data_list)
 
         fm_data.sort(key=lambda x: x[0])
         dm_data.sort(key=lambda x: x[0])
@@ -8910,49 +8874,48 @@ class graph_fsm_rg_install_summary:
         # CREATE INPUT DATA
         data = []
         rg_data = []
-        for a_int_rev in self.a_project.dict_fsm_interim_reviews.values():
-            if a_int_rev.interim_id == self.interim_id:
-                a_inst = self.a_project.dict_fsm_installs[a_int_rev.install_id]
-                if a_inst.install_type == "Rain Gauge":
-                    a_site = self.a_project.dict_fsm_sites[a_inst.install_site_id]
-                    a_mon = self.a_project.dict_fsm_monitors[
-                        a_inst.install_monitor_asset_id
-                    ]
-                    data_list = []
-                    data_list.append(a_inst.client_ref)
-                    data_list.append(a_site.address)
-                    data_list.append(
-                        self.a_project.get_rg_position_code(a_inst.rg_position)
-                    )
-                    data_list.append(a_mon.monitor_sub_type[0])
-                    data_list.append(a_site.easting)
-                    data_list.append(a_site.northing)
-                    data_list.append(a_inst.install_date.strftime("%d/%m/%Y"))
-                    if a_inst.remove_date > a_inst.install_date:
-                        data_list.append(a_inst.remove_date.strftime("%d/%m/%Y"))
-                        date_delta = a_inst.remove_date - a_inst.install_date
-                        no_of_weeks = math.floor(date_delta.days / 7)
-                        no_of_days = math.floor((date_delta.days - (no_of_weeks * 7)))
-                        data_list.append(str(no_of_weeks))
-                        data_list.append(str(no_of_days))
-                    elif (
+        for a_int_rev in self.a_project.filter_interim_reviews_by_interim_id(self.interim_id).values():
+            a_inst = self.a_project.dict_fsm_installs[a_int_rev.install_id]
+            if a_inst.install_type == "Rain Gauge":
+                a_site = self.a_project.dict_fsm_sites[a_inst.install_site_id]
+                a_mon = self.a_project.dict_fsm_monitors[
+                    a_inst.install_monitor_asset_id
+                ]
+                data_list = []
+                data_list.append(a_inst.client_ref)
+                data_list.append(a_site.address)
+                data_list.append(
+                    self.a_project.get_rg_position_code(a_inst.rg_position)
+                )
+                data_list.append(a_mon.monitor_sub_type[0])
+                data_list.append(a_site.easting)
+                data_list.append(a_site.northing)
+                data_list.append(a_inst.install_date.strftime("%d/%m/%Y"))
+                if a_inst.remove_date > a_inst.install_date:
+                    data_list.append(a_inst.remove_date.strftime("%d/%m/%Y"))
+                    date_delta = a_inst.remove_date - a_inst.install_date
+                    no_of_weeks = math.floor(date_delta.days / 7)
+                    no_of_days = math.floor((date_delta.days - (no_of_weeks * 7)))
+                    data_list.append(str(no_of_weeks))
+                    data_list.append(str(no_of_days))
+                elif (
+                    self.a_project.dict_fsm_interims[
+                        self.interim_id
+                    ].interim_end_date
+                    > a_inst.install_date
+                ):
+                    data_list.append("")
+                    date_delta = (
                         self.a_project.dict_fsm_interims[
                             self.interim_id
                         ].interim_end_date
-                        > a_inst.install_date
-                    ):
-                        data_list.append("")
-                        date_delta = (
-                            self.a_project.dict_fsm_interims[
-                                self.interim_id
-                            ].interim_end_date
-                            - a_inst.install_date
-                        )
-                        no_of_weeks = math.floor(date_delta.days / 7)
-                        no_of_days = math.floor((date_delta.days - (no_of_weeks * 7)))
-                        data_list.append(str(no_of_weeks))
-                        data_list.append(str(no_of_days))
-                    rg_data.append(data_list)
+                        - a_inst.install_date
+                    )
+                    no_of_weeks = math.floor(date_delta.days / 7)
+                    no_of_days = math.floor((date_delta.days - (no_of_weeks * 7)))
+                    data_list.append(str(no_of_weeks))
+                    data_list.append(str(no_of_days))
+                rg_data.append(data_list)
 
         rg_data.sort(key=lambda x: x[0])
         data.extend(rg_data)
@@ -11232,10 +11195,6 @@ class graph_fsm_dwf_plot:
 
         i_soffit_mm = self.current_inst.fm_pipe_height_mm
 
-        df_filtered = self.current_inst.data[
-            (self.current_inst.data["Date"] >= self.start_date)
-            & (self.current_inst.data["Date"] <= self.end_date)
-        ].copy()
         # df_compare = self.current_inst.data.copy()
 
         # Initialize an empty list to collect daily rainfall data
@@ -11300,102 +11259,23 @@ class graph_fsm_dwf_plot:
         dry_days_df = total_daily_rainfall[dry_days]
 
         if self.current_inst.install_type == "Flow Monitor":
-            # flow_monitor_data = self.current_inst.data.copy()  # Make a copy of the data
-            flow_monitor_data = df_filtered.copy()  # Make a copy of the data
-
-            flow_monitor_data = flow_monitor_data[flow_monitor_data["FlowData"] != 0]
-
-            # Filter flow monitor data to include only dry days
-            flow_monitor_data["Date"] = pd.to_datetime(flow_monitor_data["Date"])
-            flow_monitor_data["Day"] = flow_monitor_data["Date"].dt.date
-            flow_monitor_data = flow_monitor_data[
-                flow_monitor_data["Day"].isin(dry_days_df["Date"])
-            ]
-
-            # Remove date information and keep only time part
-            flow_monitor_data["TimeOfDay"] = flow_monitor_data["Date"].dt.time
-
-            # Group by time and calculate the average flow, velocity, and depth for each time point
-            avg_dwf_per_time = (
-                flow_monitor_data.groupby("TimeOfDay")
-                .agg({"FlowData": "mean", "DepthData": "mean", "VelocityData": "mean"})
-                .reset_index()
-            )
-
-            # Rename the columns for clarity
-            avg_dwf_per_time.columns = [
-                "TimeOfDay",
-                "AvgFlowData",
-                "AvgDepthData",
-                "AvgVelocityData",
-            ]
-
-            # Optional: sort by time if needed
-            avg_dwf_per_time = avg_dwf_per_time.sort_values(by="TimeOfDay").reset_index(
-                drop=True
-            )
-
-            df_dwf_filtered = pd.merge(
-                flow_monitor_data, avg_dwf_per_time, on="TimeOfDay", how="right"
-            )
-
-            df_dwf_filtered["TimeOfDay"] = (
-                df_dwf_filtered["Date"].dt.hour * 3600
-                + df_dwf_filtered["Date"].dt.minute * 60
-                + df_dwf_filtered["Date"].dt.second
-            )
-
-            df_dwf_average = df_dwf_filtered.drop_duplicates(
-                subset=["TimeOfDay", "AvgFlowData", "AvgDepthData", "AvgVelocityData"]
-            )
-
-            flow_monitor_data = self.current_inst.data.copy()
-
-            flow_monitor_data = flow_monitor_data[flow_monitor_data["FlowData"] != 0]
-
-            # Filter flow monitor data to include only dry days
-            flow_monitor_data["Date"] = pd.to_datetime(flow_monitor_data["Date"])
-            flow_monitor_data["Day"] = flow_monitor_data["Date"].dt.date
-            flow_monitor_data = flow_monitor_data[
-                flow_monitor_data["Day"].isin(dry_days_df["Date"])
-            ]
-
-            # Remove date information and keep only time part
-            flow_monitor_data["TimeOfDay"] = flow_monitor_data["Date"].dt.time
-
-            # Group by time and calculate the average flow, velocity, and depth for each time point
-            avg_dwf_per_time = (
-                flow_monitor_data.groupby("TimeOfDay")
-                .agg({"FlowData": "mean", "DepthData": "mean", "VelocityData": "mean"})
-                .reset_index()
-            )
-
-            # Rename the columns for clarity
-            avg_dwf_per_time.columns = [
-                "TimeOfDay",
-                "AvgFlowData",
-                "AvgDepthData",
-                "AvgVelocityData",
-            ]
-
-            # Optional: sort by time if needed
-            avg_dwf_per_time = avg_dwf_per_time.sort_values(by="TimeOfDay").reset_index(
-                drop=True
-            )
-
-            df_dwf_compare = pd.merge(
-                flow_monitor_data, avg_dwf_per_time, on="TimeOfDay", how="right"
-            )
-
-            df_dwf_compare["TimeOfDay"] = (
-                df_dwf_compare["Date"].dt.hour * 3600
-                + df_dwf_compare["Date"].dt.minute * 60
-                + df_dwf_compare["Date"].dt.second
+            dry_days = frozenset(dry_days_df["Date"])
+
+            profile = dwf_profiles.get_profile(
+                self.current_inst.data,
+                dry_days,
+                start=self.start_date,
+                end=self.end_date,
+                exclude_zero_flow=True,
             )
+            df_dwf_filtered = profile.filtered
+            df_dwf_average = profile.average
 
-            df_dwf_compare_average = df_dwf_compare.drop_duplicates(
-                subset=["TimeOfDay", "AvgFlowData", "AvgDepthData", "AvgVelocityData"]
+            compare_profile = dwf_profiles.get_profile(
+                self.current_inst.data, dry_days, exclude_zero_flow=True
             )
+            df_dwf_compare = compare_profile.filtered
+            df_dwf_compare_average = compare_profile.average
 
         # Create a figure and subplots
         (plot_axis_flow, plot_axis_depth, plot_axis_velocity) = (
@@ -21,6 +21,8 @@ from PIL import Image
 import io
 import json
 import pickle
+import struct
+import zlib
 from datetime import datetime, timedelta
 import pandas as pd
 from pandas import Timestamp
@@ -69,6 +71,10 @@ def root_path():
 
 
 def serialize_list(data):
+    encoded = encode_series(data)
+    if encoded is not None:
+        return encoded
+
     if not data:  # Check if the list is empty
         return json.dumps(data)
 
@@ -81,6 +87,12 @@ def serialize_list(data):
 
 
 def deserialize_list(data):
+    if is_encoded_series(data):
+        array = decode_series(data)
+        if array.dtype.kind == 'M':
+            return array.astype('datetime64[us]').tolist()
+        return array.tolist()
+
     parsed_data = json.loads(data)
     if len(parsed_data) > 0:
         if isinstance(parsed_data[0], str):
@@ -118,14 +130,234 @@ def deserialize_timestamp_list(json_string):
     return data_timestamps
 
 
+def deserialize_array(data):
+    """
+    As deserialize_list, but a series stored by encode_series is returned as its numpy array
+    without building a list. Older JSON rows still come back as lists.
+    """
+    if is_encoded_series(data):
+        return decode_series(data)
+    return deserialize_list(data)
+
+
 def serialize_item(item):
+    encoded = encode_frame(item)
+    if encoded is not None:
+        return encoded
     return pickle.dumps(item)
 
 
 def deserialize_item(data):
+    if is_encoded_series(data):
+        return decode_frame(data)
     return pickle.loads(data)
 
 
+# Binary series codec
+#
+# A stored series or DataFrame is a BLOB made of a 7 byte header (magic, format version, kind,
+# compressed flag) and a body that is zlib compressed whenever that makes it smaller.  Each
+# column is stored as its numpy dtype, the dtype of the bytes actually stored and the raw little
+# endian values.  Datetimes are stored as int64 deltas, so regular timestamps compress to almost
+# nothing, and float64 values that survive a round trip through float32 are stored as float32.
+# String columns fall back to a JSON list.  Anything else is left to JSON or pickle by the
+# callers, and rows written by older versions are recognised by their missing magic.
+
+SERIES_CODEC_MAGIC = b'FBSC'
+SERIES_CODEC_VERSION = 1
+SERIES_CODEC_HEADER = struct.Struct('<4sBBB')
+SERIES_KIND = ord('S')
+FRAME_KIND = ord('F')
+
+
+class unencodableSeries(Exception):
+    pass
+
+
+def is_encoded_series(data) -> bool:
+    return isinstance(data, (bytes, bytearray, memoryview)) and bytes(data[:4]) == SERIES_CODEC_MAGIC
+
+
+def encode_series(data):
+    """
+    Encodes a numpy array, or a list of naive datetimes, floats or ints, as a binary series.
+    Returns None for anything else (including empty lists) so the caller can fall back to JSON.
+    """
+    try:
+        if isinstance(data, np.ndarray):
+            if data.ndim != 1 or data.dtype.kind not in 'Mfiu':
+                return None
+            array = data
+        elif isinstance(data, list) and len(data) > 0:
+            array = series_list_to_array(data)
+            if array is None:
+                return None
+        else:
+            return None
+        return pack_series_body(SERIES_KIND, pack_column(array))
+    except unencodableSeries:
+        return None
+
+
+def decode_series(data) -> np.ndarray:
+    kind, body = unpack_series_body(data)
+    if kind != SERIES_KIND:
+        raise ValueError('Stored value is not a series')
+    array, _ = unpack_column(body, 0)
+    return array
+
+
+def encode_frame(item):
+    """
+    Encodes a DataFrame column by column, returning None if any part of it cannot be stored
+    exactly (e.g. categoricals, tz-aware datetimes, mixed object columns or a MultiIndex).
+    """
+    if not isinstance(item, pd.DataFrame) or item.attrs or item.columns.name is not None:
+        return None
+    try:
+        names = list(item.columns)
+        if len(set(names)) != len(names) or not all(isinstance(name, str) for name in names):
+            return None
+        index = item.index
+        parts = [pack_text(json.dumps(names)), struct.pack('<Q', len(item))]
+        if isinstance(index, pd.MultiIndex) or not (index.name is None or isinstance(index.name, str)):
+            return None
+        if isinstance(index, pd.RangeIndex):
+            parts.append(b'\x00' + pack_text(json.dumps(index.name)) + struct.pack('<qq', index.start, index.step))
+        else:
+            parts.append(b'\x01' + pack_text(json.dumps(index.name)) + pack_column(index))
+        for i in range(len(names)):
+            parts.append(pack_column(item.iloc[:, i]))
+        return pack_series_body(FRAME_KIND, b''.join(parts))
+    except unencodableSeries:
+        return None
+
+
+def decode_frame(data) -> pd.DataFrame:
+    kind, body = unpack_series_body(data)
+    if kind != FRAME_KIND:
+        raise ValueError('Stored value is not a DataFrame')
+    names_json, offset = unpack_text(body, 0)
+    names = json.loads(names_json)
+    (row_count,), offset = struct.unpack_from('<Q', body, offset), offset + 8
+    stored_index = body[offset]
+    index_name, offset = unpack_text(body, offset + 1)
+    if stored_index:
+        index_values, offset = unpack_column(body, offset)
+        index = pd.Index(index_values, name=json.loads(index_name))
+    else:
+        start, step = struct.unpack_from('<qq', body, offset)
+        offset += 16
+        index = pd.RangeIndex(start, start + step * row_count, step, name=json.loads(index_name))
+    columns = {}
+    for name in names:
+        columns[name], offset = unpack_column(body, offset)
+    return pd.DataFrame(columns, index=index)
+
+
+def series_list_to_array(data: list):
+    value_types = set(map(type, data))
+    if all(issubclass(value_type, datetime) for value_type in value_types):
+        dates = pd.DatetimeIndex(data)
+        if dates.tz is not None:
+            return None
+        return dates.values
+    if all(issubclass(value_type, float) for value_type in value_types):
+        return np.array(data, dtype=np.float64)
+    if all(issubclass(value_type, (int, np.integer)) and not issubclass(value_type, (bool, np.bool_))
+           for value_type in value_types):
+        try:
+            return np.array(data, dtype=np.int64)
+        except OverflowError:
+            return None
+    return None
+
+
+def pack_series_body(kind: int, body: bytes) -> bytes:
+    compressed = zlib.compress(body, 6)
+    if len(compressed) < len(body):
+        return SERIES_CODEC_HEADER.pack(SERIES_CODEC_MAGIC, SERIES_CODEC_VERSION, kind, 1) + compressed
+    return SERIES_CODEC_HEADER.pack(SERIES_CODEC_MAGIC, SERIES_CODEC_VERSION, kind, 0) + body
+
+
+def unpack_series_body(data):
+    data = bytes(data)
+    _, version, kind, compressed = SERIES_CODEC_HEADER.unpack_from(data, 0)
+    if version > SERIES_CODEC_VERSION:
+        raise ValueError(f'Stored series format version {version} is newer than this version of Flowbot')
+    body = data[SERIES_CODEC_HEADER.size:]
+    if compressed:
+        body = zlib.decompress(body)
+    return kind, body
+
+
+def pack_text(text: str) -> bytes:
+    encoded = text.encode('utf-8')
+    return struct.pack('<I', len(encoded)) + encoded
+
+
+def unpack_text(body: bytes, offset: int):
+    (length,) = struct.unpack_from('<I', body, offset)
+    offset += 4
+    return body[offset:offset + length].decode('utf-8'), offset + length
+
+
+def pack_column(values) -> bytes:
+    """Packs one column as (dtype, storage dtype, delta flag, payload)."""
+    dtype = values.dtype
+    if isinstance(dtype, pd.StringDtype) or (dtype == object and pd.api.types.infer_dtype(values, skipna=False) == 'string'):
+        strings = np.asarray(values, dtype=object)
+        strings = [None if pd.isna(value) else value for value in strings] if isinstance(dtype, pd.StringDtype) else strings.tolist()
+        payload = json.dumps(strings).encode('utf-8')
+        return pack_text(str(dtype)) + pack_text('json') + b'\x00' + struct.pack('<Q', len(payload)) + payload
+
+    if not isinstance(dtype, np.dtype):
+        raise unencodableSeries(str(dtype))
+    array = np.asarray(values)
+    delta = 0
+    if dtype.kind in 'Mm':
+        stored = array.view(np.int64)
+        # int64 subtraction wraps for NaT, and the cumulative sum on decoding wraps it back
+        stored = np.diff(stored, prepend=np.int64(0))
+        delta = 1
+    elif dtype.kind == 'f':
+        stored = array
+        if dtype.itemsize > 4:
+            narrowed = array.astype(np.float32)
+            if np.array_equal(narrowed.astype(dtype), array, equal_nan=True):
+                stored = narrowed
+    elif dtype.kind in 'iub':
+        stored = array
+    else:
+        raise unencodableSeries(str(dtype))
+    stored = stored.astype(stored.dtype.newbyteorder('<'), copy=False)
+    payload = stored.tobytes()
+    return (pack_text(dtype.newbyteorder('<').str) + pack_text(stored.dtype.str) + bytes([delta])
+            + struct.pack('<Q', len(payload)) + payload)
+
+
+def unpack_column(body: bytes, offset: int):
+    dtype_name, offset = unpack_text(body, offset)
+    storage, offset = unpack_text(body, offset)
+    delta = body[offset]
+    (length,) = struct.unpack_from('<Q', body, offset + 1)
+    offset += 9
+    payload = body[offset:offset + length]
+    offset += length
+
+    if storage == 'json':
+        strings = json.loads(payload.decode('utf-8'))
+        if dtype_name == 'object':
+            return np.array(strings, dtype=object), offset
+        return pd.array(strings, dtype=dtype_name), offset
+
+    stored = np.frombuffer(payload, dtype=np.dtype(storage))
+    if delta:
+        stored = np.cumsum(stored, dtype=np.int64)
+        return stored.view(np.dtype(dtype_name)), offset
+    return stored.astype(np.dtype(dtype_name)), offset
+
+
 def get_classification_legend_dataframe():
     # Define the legend data
     legendData = [['X', 'Not Working', '', 'G', 'Dry Pipe', '', 'L', 'Low Flow <10l/s', '', 'P', 'Pluming', '', 'U', 'Dislodged Sensor', '', 'O', 'Taken Out'],
@@ -897,6 +1129,125 @@ def parse_payload(payload_lines, record_format, record_length, field_names):
 
     return records
 
+def get_unit_field_layout(unit_format_tokens, fields):
+    """
+    Given the unit format tokens (e.g. ["I5", "F5.2"]) and the payload field names,
+    returns a list of (field_name, type, offset, width) tuples giving the position of
+    every value-bearing field within a unit. Skip tokens advance the offset but
+    produce no field, matching the behaviour of parse_fixed_width.
+    """
+    layout = []
+    pos = 0
+    i_value = 0
+    for token in unit_format_tokens:
+        token_info = parse_format_token(token)
+        typ = token_info[0]
+        if typ == 'repeat':
+            continue
+        width = token_info[1]
+        for _ in range(token_info[-1]):
+            if typ != 'skip':
+                if i_value < len(fields):
+                    layout.append((fields[i_value], typ, pos, width))
+                i_value += 1
+            pos += width
+    return layout
+
+def decode_fixed_width_column(column, typ):
+    """
+    Converts a numpy unicode array of fixed-width fields into values.
+    Numeric fields are returned as float64 with NaN wherever parse_fixed_width
+    would have returned None (blank or unparseable text). String and date fields
+    are returned as an object array of stripped strings.
+    """
+    if typ in ('string', 'date'):
+        return np.char.strip(column).astype(object)
+
+    converter = int if typ == 'int' else float
+    values = np.full(len(column), np.nan, dtype=np.float64)
+    stripped = np.char.strip(column)
+    has_value = stripped != ''
+    try:
+        if typ == 'int':
+            values[has_value] = stripped[has_value].astype(np.int64)
+        else:
+            values[has_value] = stripped[has_value].astype(np.float64)
+    except (ValueError, OverflowError):
+        # Fall back to per-value conversion only for columns holding bad text.
+        for i in np.flatnonzero(has_value):
+            try:
+                values[i] = converter(str(stripped[i]))
+            except ValueError:
+                pass
+    return values
+
+def parse_payload_arrays(payload_lines, record_format, record_length, field_names):
+    """
+    Vectorised equivalent of parse_payload.
+    The payload lines are joined into a single buffer of whole units and the fixed-width
+    fields are sliced out column-wise, so no per-unit Python objects are created.
+    Returns a tuple of (columns, unit_count) where columns maps each field name to a
+    numpy array holding one value per unit, in file order.
+    """
+    tokens = [tok.strip() for tok in record_format.split(',') if tok.strip()]
+    tokens.pop(0)  # Remove the count token.
+    repeat_token = tokens.pop(-1)
+    repeat_count = int(repeat_token.strip('[]'))
+    unit_format_tokens = tokens
+    fields = [f.strip() for f in field_names.split(',')]
+
+    unit_width = record_length // repeat_count
+    layout = get_unit_field_layout(unit_format_tokens, fields)
+
+    # Keep only the complete units from each line, as parse_payload does.
+    unit_text = []
+    for line in payload_lines:
+        line = line.rstrip('\n')
+        if line.startswith('*END'):
+            break
+        if not line.strip():
+            continue
+        max_units = len(line) // unit_width
+        if max_units:
+            unit_text.append(line[:max_units * unit_width])
+    buffer = ''.join(unit_text)
+    unit_count = len(buffer) // unit_width if unit_width else 0
+
+    # View the buffer as a (units x characters) grid of UCS4 code points.
+    chars = np.frombuffer(buffer.encode('utf-32-le'), dtype='<u4')
+    chars = chars.reshape(unit_count, unit_width) if unit_count else chars.reshape(0, max(unit_width, 1))
+
+    columns = {}
+    for field, typ, offset, width in layout:
+        # Fields overrunning the unit are truncated, as slicing the unit text would be.
+        width = min(offset + width, unit_width) - offset
+        if width <= 0:
+            column = np.full(unit_count, '', dtype='<U1')
+        else:
+            column = np.ascontiguousarray(chars[:, offset:offset + width]).view(f'<U{width}').reshape(unit_count)
+        columns[field] = decode_fixed_width_column(column, typ)
+
+    return columns, unit_count
+
+def get_blank_payload_column(template, length):
+    """
+    Returns a gap-filler column matching the dtype of template: NaN for numeric
+    columns and None for string columns.
+    """
+    if template.dtype == object:
+        return np.full(length, None, dtype=object)
+    return np.full(length, np.nan, dtype=template.dtype)
+
+def get_payload_values(payload, field, no_of_records):
+    """
+    Given a payload returned by parse_file(..., as_arrays=True), returns the first
+    no_of_records values of field as a float64 array, with missing values as 0.0.
+    """
+    unit_count = min(len(next(iter(payload.values()), [])), no_of_records)
+    if field not in payload:
+        return np.zeros(unit_count, dtype=np.float64)
+    return np.nan_to_num(payload[field][:unit_count].astype(np.float64), nan=0.0)
+
 # def parse_file(filename):
 #     """
 #     Main parser function. It reads the file, splits it into header,
@@ -1098,7 +1449,14 @@ def parse_payload(payload_lines, record_format, record_length, field_names):
 #     # }
 
 
-def parse_file(filename):
+def parse_file(filename, as_arrays=False):
+    """
+    Parses an FDV/R style file into its header, constants and payload.
+    By default the payload is a list of records, each a list of unit dictionaries.
+    With as_arrays=True the payload (and each block's payload) is instead a dictionary
+    mapping field names to numpy arrays with one value per unit, decoded by
+    parse_payload_arrays. Numeric values are identical; None becomes NaN.
+    """
     with open(filename, 'r') as f:
         lines = f.readlines()
     
@@ -1179,6 +1537,9 @@ def parse_file(filename):
     constants = {}
     blocks = []
     previous_end = None
+    # Position of each block's first (gap-filled) unit within the full payload.
+    block_offsets = []
+    offset = 0
 
     for idx, (const_lines, payload_lines) in enumerate(data_blocks):
         parsed_constants = parse_constants(const_lines, c_format, constants_names)
@@ -1187,21 +1548,29 @@ def parse_file(filename):
         interval_minutes = int(parsed_constants["INTERVAL"])
 
         # First, parse the current block
-        parsed_payload = parse_payload(payload_lines, record_format, record_length, field_names)
+        if as_arrays:
+            parsed_payload, payload_length = parse_payload_arrays(payload_lines, record_format, record_length, field_names)
+        else:
+            parsed_payload = parse_payload(payload_lines, record_format, record_length, field_names)
 
         # If there's a gap from the previous block
+        missing_steps = 0
         if previous_end is not None:
             expected_start = previous_end + timedelta(minutes=interval_minutes)
             if start_dt > expected_start:
                 gap_minutes = int((start_dt - expected_start).total_seconds() / 60)
                 missing_steps = gap_minutes // interval_minutes
 
-                unit_template = parsed_payload[0] if parsed_payload else [
-                    dict.fromkeys([f.strip() for f in field_names.split(',')], None)
-                    for _ in range(record_length // (record_length // int(record_format.strip().split(',')[-1].strip('[]'))))
-                ]
+                if as_arrays:
+                    # The blank units are written when the blocks are assembled below.
+                    payload_length += missing_steps
+                else:
+                    unit_template = parsed_payload[0] if parsed_payload else [
+                        dict.fromkeys([f.strip() for f in field_names.split(',')], None)
+                        for _ in range(record_length // (record_length // int(record_format.strip().split(',')[-1].strip('[]'))))
+                    ]
 
-                parsed_payload = fill_payload_gap(parsed_payload, missing_steps, unit_template)
+                    parsed_payload = fill_payload_gap(parsed_payload, missing_steps, unit_template)
 
                 # Update the start date in constants
                 parsed_constants["START"] = format_value(
@@ -1211,13 +1580,18 @@ def parse_file(filename):
 
         duration_mins = (parse_date(parsed_constants["END"]) - parse_date(parsed_constants["START"])).total_seconds() / 60
         no_of_records = int(duration_mins / interval_minutes) + 1
-        payload_length = sum(len(nested_list) for nested_list in parsed_payload)
+        if not as_arrays:
+            payload_length = sum(len(nested_list) for nested_list in parsed_payload)
 
         if payload_length != no_of_records:
             raise ValueError("Error in flowbot_helper::parse_file: Payload length does not match number of records inferred by dates")
-                    
+
         blocks.append({'constants': parsed_constants, 'payload': parsed_payload})
-        full_payload.extend(parsed_payload)
+        if as_arrays:
+            block_offsets.append((offset, missing_steps))
+            offset += payload_length
+        else:
+            full_payload.extend(parsed_payload)
         if idx == 0:
             constants = parsed_constants
         previous_end = parse_date(parsed_constants["END"])
@@ -1287,6 +1661,21 @@ def parse_file(filename):
         if 'END' in last_constants:
             constants['END'] = last_constants['END']
 
+    if as_arrays:
+        # Write every block into one preallocated array per field at its offset; gaps
+        # stay blank. Each block's payload then becomes a view onto its slice.
+        full_payload = {}
+        if blocks:
+            for field, template in blocks[0]['payload'].items():
+                full_payload[field] = get_blank_payload_column(template, offset)
+            for block, (block_start, missing_steps) in zip(blocks, block_offsets):
+                block_payload = block['payload']
+                data_start = block_start + missing_steps
+                block_end = data_start + len(next(iter(block_payload.values()), []))
+                for field, column in full_payload.items():
+                    column[data_start:block_end] = block_payload[field]
+                block['payload'] = {field: column[block_start:block_end] for field, column in full_payload.items()}
+
     return {
         'header': header,
         'constants': constants,
@@ -1320,14 +1709,8 @@ def fill_payload_gap(parsed_payload, missing_steps, unit_template):
     # Combine blank units and parsed units
     all_units = blank_units + flat_parsed_units
 
-    # Regroup into records
-    new_payload = []
-    while all_units:
-        record = all_units[:repeat_count]
-        new_payload.append(record)
-        all_units = all_units[repeat_count:]
-
-    return new_payload
+    # Regroup into records by offset rather than repeatedly slicing the remainder.
+    return [all_units[i:i + repeat_count] for i in range(0, len(all_units), repeat_count)]
 
 def parse_date(date_str: str) -> datetime:
     """
@@ -892,8 +892,8 @@ class FlowbotMainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
                                 startDate = se.eventStart
                                 endDate = se.eventEnd
                             else:
-                                startDate = fm.dateRange[0]
-                                endDate = fm.dateRange[len(fm.dateRange)-1]
+                                startDate = fm.firstDate
+                                endDate = fm.lastDate
                             flowVol = fm.getFlowVolumeBetweenDates(
                                 startDate, endDate)
                             self.schematicGraphicsView.schematicFMUSTrace(
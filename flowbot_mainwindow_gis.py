@@ -7,7 +7,7 @@ import re
 import shutil
 import time
 # from datetime import datetime
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 # , List
 # import fiona
 from flowbot_dialog_fsm_add_inspection import flowbot_dialog_fsm_add_inspection
@@ -48,13 +48,12 @@ import numpy as np
 import gc
 from pathlib import Path
 
-from matplotlib.backends.backend_pdf import PdfPages
 
 # from matplotlib.dates import DateFormatter
 # from matplotlib.ticker import MaxNLocator, FuncFormatter
 
 from PyQt5 import (QtCore, QtWidgets, QtGui)
-from PyQt5.QtWidgets import (QProgressBar, QMessageBox, QDialog, QInputDialog, QMenu, QGraphicsView,
+from PyQt5.QtWidgets import (QProgressBar, QProgressDialog, QMessageBox, QDialog, QInputDialog, QMenu, QGraphicsView,
                              QToolBar, QAction, QActionGroup, QListWidget, QPushButton)
 # , QScrollArea)
 from PyQt5.QtGui import (
@@ -84,6 +83,12 @@ from flowbot_graphing import (GraphFDV, graph_fsm_classification,
                               graphDWF, dashboardFSM,
                               graphMerge)
 from flowbot_verification import icmTraces
+from flowbot_raw_data_jobs import (rawDataJobScheduler, decode_dat_file, decode_flo_file, decode_hobo_csv_file,
+                                   read_raw_data_file, import_raw_data, apply_imported_raw_data,
+                                   merge_imported_raw_data,
+                                   process_raw_data, apply_processed_raw_data,
+                                   PROCESSED_INSTALL_TYPES)
+from flowbot_report_jobs import reportPage, render_report_pages, write_report_pdf
 from flowbot_data_classification import dataClassification
 from flowbot_monitors import (flowMonitors, plottedFlowMonitors, rainGauges, summedFlowMonitor, 
                               dummyFlowMonitor, classifiedFlowMonitors, plottedRainGauges, 
@@ -113,11 +118,11 @@ from flowbot_dialog_scattergraph_export import flowbot_dialog_scattergraph_expor
 from flowbot_dialog_verification_setpeaks import flowbot_dialog_verification_setpeaks, icmTraceLocation
 from flowbot_dialog_verification_viewfitmeasure import flowbot_dialog_verification_viewfitmeasure
 from flowbot_dialog_projection import fsp_flowbot_projectionDialog
-from flowbot_database import DatabaseManager, Tables
+from flowbot_database import DatabaseManager, Tables, update_schema
+from flowbot_dwf_profile import dwf_profiles
 from flowbot_dialog_fsm_add_site import flowbot_dialog_fsm_add_site
 from flowbot_management import (fsmDataClassification, fsmInspection, fsmInstall, fsmInterim,
-                                fsmInterimReview, fsmMonitor, fsmProject, fsmSite, fsmRawData,
-                                MonitorDataFlowCalculator, PumpLoggerDataCalculator)
+                                fsmInterimReview, fsmMonitor, fsmProject, fsmSite, fsmRawData)
 from flowbot_dialog_fsm_set_interim_dates import flowbot_dialog_fsm_set_interim_dates
 from flowbot_dialog_fsm_storm_events import flowbot_dialog_fsm_storm_events
 from flowbot_dialog_fsm_review_classification import flowbot_dialog_fsm_review_classification
@@ -187,6 +192,7 @@ class FlowbotMainWindowGis(QtWidgets.QMainWindow, Ui_MainWindow):
         self.dummyFMs: Optional[Dict[str, dummyFlowMonitor]] = None
         self.openIcmTraces: Optional[icmTraces] = None
         self.fsmProject: Optional[fsmProject] = None
+        self.raw_data_jobs: Optional[rawDataJobScheduler] = None
         self.fsm_project_model: QStandardItemModel = QStandardItemModel()
         self.root_item: QStandardItem
         self.openWQMonitors: Optional[fwqMonitors] = None
@@ -421,69 +427,69 @@ class FlowbotMainWindowGis(QtWidgets.QMainWindow, Ui_MainWindow):
 
                 install_item = QStandardItem(f"Install ID: {a_install.install_id}")
 
-                for a_raw in self.fsmProject.dict_fsm_rawdata.values():
-                    if a_raw.install_id == inst_id:
-                        rawdata_item = QStandardItem("Raw Data")
-
-                        # rawdata_item.appendRow(QStandardItem("Settings"))
-                        if a_install.install_type in ["Flow Monitor", "Depth Monitor"]:
-
-                            dep_data_item = QStandardItem("Depth")
-                            if a_raw.dep_data is not None:
-                                dep_data_item.appendRow(QStandardItem(
-                                    f"Start: {a_raw.dep_data_start.strftime('%d/%m/%Y %H:%M')}"))
-                                dep_data_item.appendRow(QStandardItem(
-                                    f"End: {a_raw.dep_data_end.strftime('%d/%m/%Y %H:%M')}"))
-                            dep_data_item.setFlags(
-                                dep_data_item.flags() & ~Qt.ItemIsDragEnabled)
-                            rawdata_item.appendRow(dep_data_item)
-
-                        if a_install.install_type == "Flow Monitor":
-                            vel_data_item = QStandardItem("Velocity")
-                            if a_raw.dep_data is not None:
-                                vel_data_item.appendRow(QStandardItem(
-                                    f"Start: {a_raw.vel_data_start.strftime('%d/%m/%Y %H:%M')}"))
-                                vel_data_item.appendRow(QStandardItem(
-                                    f"End: {a_raw.vel_data_end.strftime('%d/%m/%Y %H:%M')}"))
-                                vel_data_item.setFlags(
-                                    vel_data_item.flags() & ~Qt.ItemIsDragEnabled)
-                                rawdata_item.appendRow(vel_data_item)
-
-                        if a_install.install_type == "Pump Logger":
-                            pl_data_item = QStandardItem("Logger")
-                            if a_raw.pl_data is not None:
-                                pl_data_item.appendRow(QStandardItem(
-                                    f"Start: {a_raw.pl_data_start.strftime('%d/%m/%Y %H:%M')}"))
-                                pl_data_item.appendRow(QStandardItem(
-                                    f"End: {a_raw.pl_data_end.strftime('%d/%m/%Y %H:%M')}"))
-                                pl_data_item.setFlags(
-                                    pl_data_item.flags() & ~Qt.ItemIsDragEnabled)
-                                rawdata_item.appendRow(pl_data_item)
-
-                        if a_install.install_type == "Rain Gauge":
-                            rg_data_item = QStandardItem("Raingauge")
-                            if a_raw.rg_data is not None:
-                                rg_data_item.appendRow(QStandardItem(
-                                    f"Start: {a_raw.rg_data_start.strftime('%d/%m/%Y %H:%M')}"))
-                                rg_data_item.appendRow(QStandardItem(
-                                    f"End: {a_raw.rg_data_end.strftime('%d/%m/%Y %H:%M')}"))
-                                rg_data_item.setFlags(
-                                    rg_data_item.flags() & ~Qt.ItemIsDragEnabled)
-                                rawdata_item.appendRow(rg_data_item)
-
-                        bat_data_item = QStandardItem("Voltage")
-                        if a_raw.bat_data is not None:
-                            bat_data_item.appendRow(QStandardItem(
-                                f"Start: {a_raw.bat_data_start.strftime('%d/%m/%Y %H:%M')}"))
-                            bat_data_item.appendRow(QStandardItem(
-                                f"End: {a_raw.bat_data_end.strftime('%d/%m/%Y %H:%M')}"))
-                            bat_data_item.setFlags(
-                                bat_data_item.flags() & ~Qt.ItemIsDragEnabled)
-                            rawdata_item.appendRow(bat_data_item)
-
-                        rawdata_item.setFlags(
-                            rawdata_item.flags() & ~Qt.ItemIsDragEnabled)
-                        install_item.appendRow(rawdata_item)
+                a_raw = self.fsmProject.get_raw_data_by_install(inst_id)
+                if a_raw is not None:
+                    rawdata_item = QStandardItem("Raw Data")
+
+                    # rawdata_item.appendRow(QStandardItem("Settings"))
+                    if a_install.install_type in ["Flow Monitor", "Depth Monitor"]:
+
+                        dep_data_item = QStandardItem("Depth")
+                        if a_raw.dep_data is not None:
+                            dep_data_item.appendRow(QStandardItem(
+                                f"Start: {a_raw.dep_data_start.strftime('%d/%m/%Y %H:%M')}"))
+                            dep_data_item.appendRow(QStandardItem(
+                                f"End: {a_raw.dep_data_end.strftime('%d/%m/%Y %H:%M')}"))
+                        dep_data_item.setFlags(
+                            dep_data_item.flags() & ~Qt.ItemIsDragEnabled)
+                        rawdata_item.appendRow(dep_data_item)
+
+                    if a_install.install_type == "Flow Monitor":
+                        vel_data_item = QStandardItem("Velocity")
+                        if a_raw.dep_data is not None:
+                            vel_data_item.appendRow(QStandardItem(
+                                f"Start: {a_raw.vel_data_start.strftime('%d/%m/%Y %H:%M')}"))
+                            vel_data_item.appendRow(QStandardItem(
+                                f"End: {a_raw.vel_data_end.strftime('%d/%m/%Y %H:%M')}"))
+                            vel_data_item.setFlags(
+                                vel_data_item.flags() & ~Qt.ItemIsDragEnabled)
+                            rawdata_item.appendRow(vel_data_item)
+
+                    if a_install.install_type == "Pump Logger":
+                        pl_data_item = QStandardItem("Logger")
+                        if a_raw.pl_data is not None:
+                            pl_data_item.appendRow(QStandardItem(
+                                f"Start: {a_raw.pl_data_start.strftime('%d/%m/%Y %H:%M')}"))
+                            pl_data_item.appendRow(QStandardItem(
+                                f"End: {a_raw.pl_data_end.strftime('%d/%m/%Y %H:%M')}"))
+                            pl_data_item.setFlags(
+                                pl_data_item.flags() & ~Qt.ItemIsDragEnabled)
+                            rawdata_item.appendRow(pl_data_item)
+
+                    if a_install.install_type == "Rain Gauge":
+                        rg_data_item = QStandardItem("Raingauge")
+                        if a_raw.rg_data is not None:
+                            rg_data_item.appendRow(QStandardItem(
+                                f"Start: {a_raw.rg_data_start.strftime('%d/%m/%Y %H:%M')}"))
+                            rg_data_item.appendRow(QStandardItem(
+                                f"End: {a_raw.rg_data_end.strftime('%d/%m/%Y %H:%M')}"))
+                            rg_data_item.setFlags(
+                                rg_data_item.flags() & ~Qt.ItemIsDragEnabled)
+                            rawdata_item.appendRow(rg_data_item)
+
+                    bat_data_item = QStandardItem("Voltage")
+                    if a_raw.bat_data is not None:
+                        bat_data_item.appendRow(QStandardItem(
+                            f"Start: {a_raw.bat_data_start.strftime('%d/%m/%Y %H:%M')}"))
+                        bat_data_item.appendRow(QStandardItem(
+                            f"End: {a_raw.bat_data_end.strftime('%d/%m/%Y %H:%M')}"))
+                        bat_data_item.setFlags(
+                            bat_data_item.flags() & ~Qt.ItemIsDragEnabled)
+                        rawdata_item.appendRow(bat_data_item)
+
+                    rawdata_item.setFlags(
+                        rawdata_item.flags() & ~Qt.ItemIsDragEnabled)
+                    install_item.appendRow(rawdata_item)
 
                 if a_install.data is not None:
                     data_item = QStandardItem("Processed Data")
@@ -685,6 +691,7 @@ class FlowbotMainWindowGis(QtWidgets.QMainWindow, Ui_MainWindow):
                         table_data.append(row)
 
             self.fsmProject = fsmProject()
+            dwf_profiles.clear()
             self.fsmProject.job_number = key_value_pairs['Survey Number']
             self.fsmProject.job_name = key_value_pairs['Survey Name']
             self.fsmProject.client = key_value_pairs['Client']
@@ -930,6 +937,7 @@ class FlowbotMainWindowGis(QtWidgets.QMainWindow, Ui_MainWindow):
             if ret == QDialog.Accepted:
 
                 self.fsmProject = fsmProject()
+                dwf_profiles.clear()
                 self.fsmProject.job_number = dlg_create_proj.txt_job_no.text()
                 self.fsmProject.job_name = dlg_create_proj.txt_job_name.text()
                 self.fsmProject.client = dlg_create_proj.txt_client.text()
@@ -1454,37 +1462,91 @@ class FlowbotMainWindowGis(QtWidgets.QMainWindow, Ui_MainWindow):
     #             self.update_plot()
 
     def fsm_bulk_import_raw_data(self):
-        i_count = 0
-        self.progressBar.setMinimum(0)
-        self.progressBar.setMaximum(len(self.fsmProject.dict_fsm_installs) - 1)
-        self.progressBar.setValue(0)
-        self.progressBar.show()
+        jobs = []
+        for a_inst in self.fsmProject.dict_fsm_installs.values():
+            a_raw = self.fsmProject.get_raw_data_by_install(a_inst.install_id)
+            if not a_raw:
+                continue
+            file_specs = self.get_raw_data_import_files(a_inst, a_raw)
+            if file_specs:
+                jobs.append((a_inst.install_id, a_inst.install_id + '/' + a_inst.client_ref,
+                             import_raw_data, (a_raw, file_specs)))
 
-        try:
-            for a_inst in self.fsmProject.dict_fsm_installs.values():
-                self.statusBar().showMessage('Importing Raw Data for ' + a_inst.install_id + '/' + a_inst.client_ref)
-                self.progressBar.setValue(i_count)
-                self._thisApp.processEvents()
-                self.import_fsm_raw_data(a_inst, False)
+        def merge_result(install_id, merged):
+            apply_imported_raw_data(self.fsmProject.get_raw_data_by_install(install_id), merged)
 
-                i_count += 1
+        self.run_raw_data_jobs('Import Raw Data', 'Importing Raw Data', jobs, merge_result, 'Import Complete')
 
+    def run_raw_data_jobs(self, title: str, action: str, jobs: list, on_result, complete_message: str,
+                          on_complete=None):
+        """
+        Runs per-install raw data jobs (see rawDataJobScheduler) in worker processes behind a cancellable
+        progress dialog.  on_result(key, result) is called on the main thread as each job finishes and
+        on_complete() once they have all finished or been cancelled.
+        """
+        if self.raw_data_jobs is not None:
+            return
+
+        failures = []
+        scheduler = rawDataJobScheduler(self)
+        self.raw_data_jobs = scheduler
+
+        progress_dialog = QProgressDialog(f'{action}...', 'Cancel', 0, max(len(jobs), 1), self)
+        progress_dialog.setWindowTitle(title)
+        progress_dialog.setWindowIcon(self.myIcon)
+        progress_dialog.setWindowModality(Qt.WindowModal)
+        progress_dialog.setMinimumDuration(0)
+        progress_dialog.setAutoClose(False)
+        progress_dialog.setAutoReset(False)
+
+        def job_progress(done, total, label):
+            progress_dialog.setValue(done)
+            if label:
+                progress_dialog.setLabelText(f'{action} for {label} ({done} of {total})')
+
+        def job_finished(key, result):
+            try:
+                on_result(key, result)
+            except Exception as e:
+                logger.error('Exception occurred', exc_info=True)
+                failures.append(f'{key}: {e}')
+
+        def job_failed(key, message):
+            failures.append(f'{key}: {message}')
+
+        def jobs_finished(cancelled):
+            self.raw_data_jobs = None
+            progress_dialog.close()
+            scheduler.deleteLater()
+            self.update_fsm_project_standard_item_model()
+            if on_complete is not None:
+                on_complete()
+
+            message = f'{title} Cancelled' if cancelled else complete_message
             msg = QMessageBox(self)
             msg.setWindowIcon(self.myIcon)
-            msg.information(self, 'Import Raw Data',
-                            'Import Complete', QMessageBox.Ok)
+            if failures:
+                msg.warning(self, title, message + '\n\nErrors occurred for:\n' + '\n'.join(failures), QMessageBox.Ok)
+            else:
+                msg.information(self, title, message, QMessageBox.Ok)
 
+        scheduler.progress.connect(job_progress)
+        scheduler.jobFinished.connect(job_finished)
+        scheduler.jobFailed.connect(job_failed)
+        scheduler.finished.connect(jobs_finished)
+        progress_dialog.canceled.connect(scheduler.cancel)
+        progress_dialog.show()
+
+        try:
+            scheduler.start(jobs)
         except Exception as e:
             logger.error('Exception occurred', exc_info=True)
-            msg = QMessageBox(self)
-            msg.critical(
-                self, 'Error', f'An error occurred: {e}', QMessageBox.Ok)
-
-        finally:
-            # This block will execute regardless of whether an exception occurred
-            self.statusBar().clearMessage()
-            self.progressBar.hide()
-            self._thisApp.processEvents()
+            failures.append(str(e))
+            if scheduler.executor is not None:
+                scheduler.cancel()
+            else:
+                # The pool was never created, so cancel() has nothing to shut down and would not finish
+                jobs_finished(True)
 
     # def import_fsm_raw_data(self, a_inst:fsmInstall, show_progress: bool = True):
 
@@ -1547,6 +1609,29 @@ class FlowbotMainWindowGis(QtWidgets.QMainWindow, Ui_MainWindow):
 
     #     self.update_fsm_project_standard_item_model()
 
+    def get_raw_data_import_files(self, a_inst: fsmInstall, a_raw: fsmRawData) -> Dict[str, tuple]:
+        """
+        Returns the (file spec, since) of each raw data channel of a_inst that has a file to import,
+        keyed by channel.  since is the end of the data already imported, or None if there is none.
+        Series still left in the project database are not read.
+        """
+        channels = []
+        if a_inst.install_type == 'Rain Gauge':
+            channels.append(('rg_data', a_raw.rainfall_file_format))
+        if a_inst.install_type in ['Flow Monitor', 'Depth Monitor']:
+            channels.append(('dep_data', a_raw.depth_file_format))
+            channels.append(('vel_data', a_raw.velocity_file_format))
+        channels.append(('bat_data', a_raw.battery_file_format))
+        if a_inst.install_type == 'Pump Logger':
+            channels.append(('pl_data', a_raw.pumplogger_file_format))
+
+        file_specs = {}
+        for channel, file_format in channels:
+            file_spec = os.path.join(a_raw.file_path, self.decode_file_format(file_format, a_inst))
+            if os.path.isfile(file_spec):
+                file_specs[channel] = (file_spec, a_raw.channel_data_end(channel))
+        return file_specs
+
     def import_fsm_raw_data(self, a_inst: fsmInstall, show_progress: bool = True):
         if not a_inst:
             return
@@ -1554,80 +1639,14 @@ class FlowbotMainWindowGis(QtWidgets.QMainWindow, Ui_MainWindow):
         a_raw = self.fsmProject.get_raw_data_by_install(a_inst.install_id)
         if not a_raw:
             return
-    
-        def append_new_data(existing_df, new_df, timestamp_col='Timestamp'):
-            if existing_df is not None and not existing_df.empty:
-                last_time = existing_df[timestamp_col].max()
-                new_df = new_df[new_df[timestamp_col] > last_time]
-                if not new_df.empty:
-                    return pd.concat([existing_df, new_df], ignore_index=True)
-                else:
-                    return existing_df
-            else:
-                return new_df
-    
-        # Rain Gauge
-        if a_inst.install_type == 'Rain Gauge':
-            file_spec = os.path.join(a_raw.file_path, self.decode_file_format(a_raw.rainfall_file_format, a_inst))
-            if os.path.isfile(file_spec):
-                suffix = Path(file_spec).suffix.lower()
-                rg_data_exists = getattr(a_raw, 'rg_data', None) is not None and not getattr(a_raw, 'rg_data', pd.DataFrame()).empty
-                since = a_raw.rg_data_end if rg_data_exists else None
-                if suffix == ".dat":
-                    new_data, s_units = self.read_dat_file(file_spec, show_progress, since=since)
-                elif suffix == ".flo":
-                    new_data, s_units = self.read_flo_file(file_spec, show_progress, since=since)
-                else:
-                    new_data = None
-                if new_data is not None:
-                    a_raw.rg_data = append_new_data(getattr(a_raw, 'rg_data', None), new_data)
-                    a_raw.rg_data_start = a_raw.rg_data['Timestamp'].min()
-                    a_raw.rg_data_end = a_raw.rg_data['Timestamp'].max()
-    
-        # Flow/Depth Monitor
-        if a_inst.install_type in ['Flow Monitor', 'Depth Monitor']:
-            file_spec = os.path.join(a_raw.file_path, self.decode_file_format(a_raw.depth_file_format, a_inst))
-            if os.path.isfile(file_spec):
-                dep_data_exists = getattr(a_raw, 'dep_data', None) is not None and not getattr(a_raw, 'dep_data', pd.DataFrame()).empty
-                since = a_raw.dep_data_end if dep_data_exists else None
-                new_data, s_units = self.read_dat_file(file_spec, show_progress, since=since)
-                if new_data is not None:
-                    a_raw.dep_data = append_new_data(getattr(a_raw, 'dep_data', None), new_data)
-                    a_raw.dep_data_start = a_raw.dep_data['Timestamp'].min()
-                    a_raw.dep_data_end = a_raw.dep_data['Timestamp'].max()
-    
-            file_spec = os.path.join(a_raw.file_path, self.decode_file_format(a_raw.velocity_file_format, a_inst))
-            if os.path.isfile(file_spec):
-                vel_data_exists = getattr(a_raw, 'vel_data', None) is not None and not getattr(a_raw, 'vel_data', pd.DataFrame()).empty
-                since = a_raw.vel_data_end if vel_data_exists else None
-                new_data, s_units = self.read_dat_file(file_spec, show_progress, since=since)
-                if new_data is not None:
-                    a_raw.vel_data = append_new_data(getattr(a_raw, 'vel_data', None), new_data)
-                    a_raw.vel_data_start = a_raw.vel_data['Timestamp'].min()
-                    a_raw.vel_data_end = a_raw.vel_data['Timestamp'].max()
-    
-        # Battery
-        file_spec = os.path.join(a_raw.file_path, self.decode_file_format(a_raw.battery_file_format, a_inst))
-        if os.path.isfile(file_spec):
-            bat_data_exists = getattr(a_raw, 'bat_data', None) is not None and not getattr(a_raw, 'bat_data', pd.DataFrame()).empty
-            since = a_raw.bat_data_end if bat_data_exists else None
-            new_data, s_units = self.read_dat_file(file_spec, show_progress, since=since)
-            if new_data is not None:
-                a_raw.bat_data = append_new_data(getattr(a_raw, 'bat_data', None), new_data)
-                a_raw.bat_data_start = a_raw.bat_data['Timestamp'].min()
-                a_raw.bat_data_end = a_raw.bat_data['Timestamp'].max()
-    
-        # Pump Logger
-        if a_inst.install_type == 'Pump Logger':
-            file_spec = os.path.join(a_raw.file_path, self.decode_file_format(a_raw.pumplogger_file_format, a_inst))
-            if os.path.isfile(file_spec):
-                pl_data_exists = getattr(a_raw, 'pl_data', None) is not None and not getattr(a_raw, 'pl_data', pd.DataFrame()).empty
-                since = a_raw.pl_data_end if pl_data_exists else None
-                new_data, s_units = self.read_hobo_csv_file(file_spec, show_progress, since=since)
-                if new_data is not None:
-                    a_raw.pl_data = append_new_data(getattr(a_raw, 'pl_data', None), new_data)
-                    a_raw.pl_data_start = a_raw.pl_data['Timestamp'].min()
-                    a_raw.pl_data_end = a_raw.pl_data['Timestamp'].max()
+
+        new_data = {}
+        for channel, (file_spec, since) in self.get_raw_data_import_files(a_inst, a_raw).items():
+            channel_data = read_raw_data_file(channel, file_spec, since, self.file_read_progress(
+                f'Reading Raw Data File: {file_spec}', show_progress))
+            if channel_data is not None:
+                new_data[channel] = channel_data
+        merge_imported_raw_data(a_raw, new_data)
     
         if show_progress:
             msg = QMessageBox(self)
@@ -1974,267 +1993,54 @@ class FlowbotMainWindowGis(QtWidgets.QMainWindow, Ui_MainWindow):
                 '{prj_id}', self.fsmProject.job_number)
         return file_format
 
-    def read_hobo_csv_file(self, filespec, show_progress: bool = True, since=None):
-        dt_timestamps = []
-        i_values = []
-
-        with open(filespec, mode='r', encoding='utf-8') as file:
-            reader = csv.reader(file)
-            rows = list(reader)  # Read all rows into a list
-            num_rows = len(rows)
-            file.seek(0)
-
-            if show_progress:
-                self.progressBar.setMinimum(0)
-                self.progressBar.setMaximum(num_rows)
-                self.progressBar.setValue(0)
-                self.progressBar.show()
-                self.statusBar().showMessage(f'Reading HOBO CSV File: {filespec}')
-
-            row_num = 0
-
-            for row in reader:
-                row_num += 0
-                if show_progress:
-                    self.progressBar.setValue(row_num)
-                    self._thisApp.processEvents()
-
-                if len(row[0]) == 0:
-                    break
-
-                try:
-                    value = float(row[2].strip())
-                except:
-                    continue
-
-                a_datetime = datetime.strptime(row[1].strip(), "%m/%d/%y %I:%M:%S %p")
+    def file_read_progress(self, message: str, show_progress: bool = True):
+        """Returns a progress callback for the raw data readers that drives the status bar, or None."""
+        if not show_progress:
+            return None
 
-                i_values.append(int(value))
-                dt_timestamps.append(a_datetime)
+        self.progressBar.setMinimum(0)
+        self.progressBar.setValue(0)
+        self.progressBar.show()
+        self.statusBar().showMessage(message)
 
-            if show_progress:
+        def progress(position, total):
+            self.progressBar.setMaximum(total)
+            self.progressBar.setValue(position)
+            if position >= total:
                 self.statusBar().clearMessage()
                 self.progressBar.hide()
-                self._thisApp.processEvents()
-
-        # return pd.DataFrame({'Timestamp': dt_timestamps, 'Value': i_values}), 'on/off'
-            df = pd.DataFrame({'Timestamp': dt_timestamps, 'Value': i_values})
-                
-            if since is not None:
-                df = df[df['Timestamp'] > since]
-            return df, 'on/off'
-
-    def read_flo_file(self, filespec, show_progress: bool = True, since=None):
-        tip_timestamps = []
-
-        with open(filespec, "rb") as file:
-            file.seek(0, 2)  # Move the cursor to the end of the file
-            file_size = file.tell()
-            if show_progress:
-                self.progressBar.setMinimum(0)
-                self.progressBar.setMaximum(file_size)
-                self.progressBar.setValue(0)
-                self.progressBar.show()
-                self.statusBar().showMessage(f'Reading FLO File: {filespec}')
-
-            file.seek(133, 0)  # Move the cursor
-
-            i_year = struct.unpack('<B', file.read(1))[0]
-            full_year = 2000 + i_year
-
-            file.seek(136, 0)  # Move the cursor
-
-            i_day = struct.unpack('<B', file.read(1))[0]
-            i_month = struct.unpack('<B', file.read(1))[0]
-
-            start_date = date(full_year, i_month, i_day)
-            current_date = start_date
-
-            my_pos = 138
-
-            while True:
-                if show_progress:
-                    self.progressBar.setValue(my_pos)
-                    self._thisApp.processEvents()
-
-                i_hour = struct.unpack('<B', file.read(1))[0]
-                my_pos = my_pos + 1
-
-                if i_hour == 254:
-                    current_date = current_date + timedelta(days=1)
-                    if my_pos >= file_size:
-                        break
-                    continue
-
-                i_minute = struct.unpack('<B', file.read(1))[0]
-                my_pos = my_pos + 1
-
-                tip_time = time(i_hour, i_minute)
+            self._thisApp.processEvents()
 
-                tip_datetime = datetime.combine(current_date, tip_time)
-                tip_timestamps.append(tip_datetime)
+        return progress
 
-                if my_pos >= file_size:
-                    break
+    def read_hobo_csv_file(self, filespec, show_progress: bool = True, since=None):
+        return decode_hobo_csv_file(filespec, since, self.file_read_progress(
+            f'Reading HOBO CSV File: {filespec}', show_progress))
 
-            if show_progress:
-                self.statusBar().clearMessage()
-                self.progressBar.hide()
-                self._thisApp.processEvents()
+    def read_flo_file(self, filespec, show_progress: bool = True, since=None):
+        return decode_flo_file(filespec, since, self.file_read_progress(
+            f'Reading FLO File: {filespec}', show_progress))
 
-            # return pd.DataFrame({'Timestamp': tip_timestamps}), ''
-            df = pd.DataFrame({'Timestamp': tip_timestamps})
-            
-            if since is not None:
-                df = df[df['Timestamp'] > since]
-            return df, ''
-                    
     def read_dat_file(self, filespec, show_progress: bool = True, since=None):
-        dt_timestamps = []
-        i_values = []
-
-        with open(filespec, "rb") as file:
-            file.seek(0, 2)  # Move the cursor to the end of the file
-            file_size = file.tell()
-            if show_progress:
-                self.progressBar.setMinimum(0)
-                self.progressBar.setMaximum(file_size)
-                self.progressBar.setValue(0)
-                self.progressBar.show()
-                self.statusBar().showMessage(f'Reading DAT File: {filespec}')
-
-            file.seek(0, 0)  # Move the cursor to the start of the file
-            s_header = bytes_to_text(file.read(30))
-            i_flag = struct.unpack('<B', file.read(1))[0]
-            i_year = struct.unpack('<H', file.read(2))[0]
-            i_month = struct.unpack('<H', file.read(2))[0]
-            i_day = struct.unpack('<H', file.read(2))[0]
-            i_hour = struct.unpack('<H', file.read(2))[0]
-            i_minute = struct.unpack('<H', file.read(2))[0]
-            i_second = struct.unpack('<H', file.read(2))[0]
-            i_interval = int((struct.unpack('<H', file.read(2))[0])/(10*60))
-            s_measurement_type = bytes_to_text(file.read(15))
-            s_units = bytes_to_text(file.read(10))
-            f_max_value = struct.unpack('<f', file.read(4))[0]
-            f_min_value = struct.unpack('<f', file.read(4))[0]
-            start_datetime = datetime(
-                i_year, i_month, i_day, i_hour, i_minute, i_second)
-            i = 0
-            my_pos = 78
-            tip_timestamps = []
-
-            # Determine max threshold based on flag
-            if i_flag == 2:
-                no_of_bytes = 1
-                max_threshold = 255
-            elif i_flag == 8:
-                no_of_bytes = 2
-                max_threshold = 32767
-            elif i_flag == 17:
-                no_of_bytes = 4
-                max_threshold = 1
-
-            while True:
-
-                if show_progress:
-                    self.progressBar.setValue(my_pos)
-                    self._thisApp.processEvents()
-
-                float_bytes = file.read(no_of_bytes)
-                my_pos = my_pos + no_of_bytes
-                if not float_bytes:
-                    break
-
-                try:
-                    # Extract initial value based on flag
-                    if i_flag == 2:
-                        int_value = struct.unpack('<B', float_bytes)[0]
-                    elif i_flag == 8:
-                        int_value = struct.unpack('<H', float_bytes)[0]
-                    elif i_flag == 17:
-                        int_value = struct.unpack('<I', float_bytes)[0]
-
-                    if i_flag != 17:
-                        # Check if value exceeds maximum threshold
-                        if int_value >= max_threshold:
-                            int_value = np.nan
-                        else:
-                            # Normalize and scale the value
-                            int_value = int_value / max_threshold
-                            int_value = f_min_value + \
-                                ((f_max_value - f_min_value) * int_value)
-
-                        i_values.append(int_value)
-                        dt_timestamps.append(
-                            start_datetime + timedelta(minutes=i * i_interval))
-                    else:
-                        if int_value < 4294967295:
-                            tip_time = start_datetime + \
-                                timedelta(seconds=int_value)
-                            tip_timestamps.append(tip_time)
-
-                except Exception as e:
-                    print(f"Error processing value at index {i}: {e}")
-
-                i += 1
-
-            if show_progress:
-                self.statusBar().clearMessage()
-                self.progressBar.hide()
-                self._thisApp.processEvents()
-
-            # Post-processing based on flag type
-            if i_flag == 17:
-                # return pd.DataFrame({'Timestamp': tip_timestamps}), s_units
-                df = pd.DataFrame({'Timestamp': tip_timestamps})
-                # if since is not None:
-                #     df = df[df['Timestamp'] > since]
-                # return df, s_units
-            else:
-                # Round values for non-tipping bucket data
-                i_values = [round(val, 3) if not np.isnan(
-                    val) else val for val in i_values]
-                # Return the DataFrame with rounded values
-                # return pd.DataFrame({'Timestamp': dt_timestamps, 'Value': i_values}), s_units
-                df = pd.DataFrame({'Timestamp': dt_timestamps, 'Value': i_values})
-            
-            if since is not None:
-                df = df[df['Timestamp'] > since]
-            return df, s_units
+        return decode_dat_file(filespec, since, self.file_read_progress(
+            f'Reading DAT File: {filespec}', show_progress))
 
     def fsm_bulk_process_raw_data(self):
-        i_count = 0
-        self.progressBar.setMinimum(0)
-        self.progressBar.setMaximum(len(self.fsmProject.dict_fsm_installs) - 1)
-        self.progressBar.setValue(0)
-        self.progressBar.show()
-
-        try:
-            for a_inst in self.fsmProject.dict_fsm_installs.values():
-                self.statusBar().showMessage('Processing Raw Data for ' + a_inst.install_id + '/' + a_inst.client_ref)
-                self.progressBar.setValue(i_count)
-                self._thisApp.processEvents()
-                self.fsm_process_raw_data(a_inst, False)
-
-                i_count += 1
-
-            msg = QMessageBox(self)
-            msg.setWindowIcon(self.myIcon)
-            msg.information(self, 'Process Raw Data',
-                            'Processing Complete', QMessageBox.Ok)
-            self.update_plot()
+        jobs = []
+        for a_inst in self.fsmProject.dict_fsm_installs.values():
+            if a_inst.install_type not in PROCESSED_INSTALL_TYPES:
+                continue
+            a_raw = self.fsmProject.get_raw_data_by_install(a_inst.install_id)
+            if not a_raw:
+                continue
+            jobs.append((a_inst.install_id, a_inst.install_id + '/' + a_inst.client_ref,
+                         process_raw_data, (a_inst.install_type, a_raw)))
 
-        except Exception as e:
-            logger.error('Exception occurred', exc_info=True)
-            msg = QMessageBox(self)
-            msg.critical(
-                self, 'Error', f'An error occurred: {e}', QMessageBox.Ok)
+        def apply_result(install_id, data):
+            apply_processed_raw_data(self.fsmProject.get_install(install_id), data)
 
-        finally:
-            # This block will execute regardless of whether an exception occurred
-            self.statusBar().clearMessage()
-            self.progressBar.hide()
-            self._thisApp.processEvents()
+        self.run_raw_data_jobs('Process Raw Data', 'Processing Raw Data', jobs, apply_result, 'Processing Complete',
+                               self.update_plot)
 
     def fsm_process_raw_data(self, a_inst: fsmInstall, show_progress: bool = True):
 
@@ -2242,22 +2048,13 @@ class FlowbotMainWindowGis(QtWidgets.QMainWindow, Ui_MainWindow):
             a_raw = self.fsmProject.get_raw_data_by_install(a_inst.install_id)
             if not a_raw:
                 return
-            if a_inst.install_type == 'Rain Gauge':
-                a_inst.data = self.post_process_raw_rainfall_data(
-                    a_raw, show_progress)
-            if a_inst.install_type == 'Flow Monitor':
-                a_inst.data = self.post_process_raw_flowmonitor_data(a_raw)
-            if a_inst.install_type == 'Depth Monitor':
-                a_inst.data = self.post_process_raw_depthmonitor_data(a_raw)
-            if a_inst.install_type == 'Pump Logger':
-                a_inst.data = self.post_process_raw_pumplogger_data(a_raw)
-            if a_inst.data is not None:
-                a_inst.data_start = a_inst.data['Date'].min().to_pydatetime()
-                a_inst.data_end = a_inst.data['Date'].max().to_pydatetime()
-                time_diff = a_inst.data['Date'].diff()
-                time_diff_minutes = time_diff.dt.total_seconds() / 60
-                a_inst.data_interval = int(time_diff_minutes.dropna().iloc[0])
-                a_inst.data_date_updated = datetime.now()
+            if show_progress:
+                self.statusBar().showMessage('Processing Raw Data')
+                self._thisApp.processEvents()
+            apply_processed_raw_data(a_inst, process_raw_data(a_inst.install_type, a_raw))
+            if show_progress:
+                self.statusBar().clearMessage()
+                self._thisApp.processEvents()
 
         if show_progress:
             msg = QMessageBox(self)
@@ -2298,143 +2095,6 @@ class FlowbotMainWindowGis(QtWidgets.QMainWindow, Ui_MainWindow):
 
     #     self.update_fsm_project_standard_item_model()
 
-    def post_process_raw_rainfall_data(self, a_raw: fsmRawData, show_progress: bool = True):
-
-        if a_raw.rg_data is None:
-            return None
-        
-        tip_timestamps = a_raw.rg_data['Timestamp'].to_list()
-
-        # Create full 2-minute interval range
-        start_datetime = min(tip_timestamps)
-        end_datetime = max(tip_timestamps)
-
-        # Round start time to the next 2-minute interval
-        first_interval_start = start_datetime.replace(
-            minute=((start_datetime.minute // 2) * 2 + 2),
-            second=0,
-            microsecond=0
-        )
-
-        full_timestamps = pd.date_range(
-            start=first_interval_start,
-            end=end_datetime.replace(minute=(end_datetime.minute // 2) * 2,
-                                     second=0,
-                                     microsecond=0),
-            freq='2T'
-        )
-
-        # Group tips into 2-minute intervals
-        grouped_tips = {}
-        for tip in tip_timestamps:
-            rounded_time = pd.Timestamp(tip).floor(
-                '2T') + pd.Timedelta(minutes=2)
-            grouped_tips.setdefault(rounded_time, []).append(tip)
-
-        # Calculate rainfall intensities for full interval range
-        df = pd.DataFrame(0.0, index=full_timestamps, columns=['Value'])
-        # dt_timestamps = []
-        # i_values = []
-        # Track the last tip time
-        last_tip_time = None
-
-        i_count = 0
-        if show_progress:
-            self.progressBar.setMinimum(0)
-            self.progressBar.setMaximum(len(full_timestamps) - 1)
-            self.progressBar.setValue(0)
-            self.progressBar.show()
-
-        for timestamp in full_timestamps:
-
-            if show_progress:
-                self.statusBar().showMessage('Processing Raw Data')
-                self.progressBar.setValue(i_count)
-                self._thisApp.processEvents()
-            i_count += 1
-            tips_in_interval = grouped_tips.get(timestamp, [])
-
-            if tips_in_interval:
-                # Calculate time since previous measurement
-                if last_tip_time is None:
-                    time_since_prev = 10  # Default to 10 minutes if first interval
-                else:
-                    time_since_prev = (
-                        timestamp - last_tip_time).total_seconds() / 60
-
-                # Determine averaging period (minimum of time since prev and 10 minutes)
-                avg_period = min(time_since_prev, 10)
-
-                # Calculate total tips and rainfall intensity
-                tips_this_interval = len(tips_in_interval)
-
-                if tips_this_interval > 1:
-                    if avg_period > 2:
-                        tips_current_timestamps = tips_this_interval - 1
-                        mm_per_hour_current_timestamps = tips_current_timestamps * \
-                            (60 / 2) * a_raw.rg_tb_depth
-                        tips_to_distribute = 1
-                        mm_per_hour_to_distribute = tips_to_distribute * \
-                            (60 / (avg_period - 2)) * a_raw.rg_tb_depth
-                    else:
-                        tips_current_timestamps = tips_this_interval
-                        mm_per_hour_current_timestamps = tips_current_timestamps * \
-                            (60 / 2) * a_raw.rg_tb_depth
-                else:
-                    tips_current_timestamps = 1
-                    mm_per_hour_current_timestamps = tips_current_timestamps * \
-                        (60 / avg_period) * a_raw.rg_tb_depth
-                    if avg_period > 2:
-                        tips_to_distribute = 1
-                        mm_per_hour_to_distribute = tips_to_distribute * \
-                            (60 / avg_period) * a_raw.rg_tb_depth
-
-                # Determine number of periods to distribute across
-                periods_in_avg = math.ceil(avg_period / 2)
-
-                # Fill in values for all periods in the averaging interval
-                for period in range(periods_in_avg):
-                    period_timestamp = timestamp - \
-                        pd.Timedelta(
-                            minutes=2 * (periods_in_avg - period))
-                    if period == periods_in_avg - 1:
-                        value_to_add = mm_per_hour_current_timestamps
-                    else:
-                        value_to_add = mm_per_hour_to_distribute
-
-                    if period_timestamp in df.index:
-                        df.loc[period_timestamp, 'Value'] += value_to_add
-                    else:
-                        new_row = pd.DataFrame(
-                            {'Value': value_to_add}, index=[period_timestamp])
-                        df = pd.concat([df, new_row]).sort_index()
-
-                # Update last tip time to the last tip in this interval
-                last_tip_time = timestamp
-
-        # # Convert the index to the desired format
-        # df.index = df.index.to_series().apply(
-        #     lambda x: datetime(x.year, x.month, x.day, x.hour, x.minute))
-        # Return the processed DataFrame
-        if show_progress:
-            self.statusBar().clearMessage()
-            self.progressBar.hide()
-            self._thisApp.processEvents()
-
-        return df.reset_index().rename(columns={'index': 'Date', 'Value': 'IntensityData'})
-
-    def post_process_raw_flowmonitor_data(self, a_raw: fsmRawData):
-        calculator = MonitorDataFlowCalculator(a_raw)
-        return calculator.calculate_flow()
-
-    def post_process_raw_depthmonitor_data(self, a_raw: fsmRawData):
-        calculator = MonitorDataFlowCalculator(a_raw)
-        return calculator.calculate_flow()
-
-    def post_process_raw_pumplogger_data(self, a_raw: fsmRawData):
-        calculator = PumpLoggerDataCalculator(a_raw)
-        return calculator.calculate_pumplog()
-
     def fsm_export_data_processed(self):
 
         file_path = QtWidgets.QFileDialog.getExistingDirectory(self, "Select Output Directory:", self.lastOpenDialogPath, QtWidgets.QFileDialog.ShowDirsOnly)
@@ -2617,11 +2277,10 @@ class FlowbotMainWindowGis(QtWidgets.QMainWindow, Ui_MainWindow):
                 ret = dlg_review.exec_()
                 if ret == QDialog.Accepted:
                     result = True
-                    for a_int_cr in self.fsmProject.dict_fsm_interim_reviews.values():
-                        if a_int_cr.interim_id == interim_id:
-                            if not a_int_cr.cr_complete:
-                                result = False
-                                break
+                    for a_int_cr in self.fsmProject.filter_interim_reviews_by_interim_id(interim_id).values():
+                        if not a_int_cr.cr_complete:
+                            result = False
+                            break
 
                     self.fsmProject.dict_fsm_interims[interim_id].data_classification_complete = result
                     self.update_fsm_project_standard_item_model()
@@ -2649,11 +2308,10 @@ class FlowbotMainWindowGis(QtWidgets.QMainWindow, Ui_MainWindow):
                 ret = dlg_events.exec_()
                 if ret == QDialog.Accepted:
                     result = True
-                    for a_int_ser in self.fsmProject.dict_fsm_interim_reviews.values():
-                        if a_int_ser.interim_id == interim_id:
-                            if not a_int_ser.ser_complete:
-                                result = False
-                                break
+                    for a_int_ser in self.fsmProject.filter_interim_reviews_by_interim_id(interim_id).values():
+                        if not a_int_ser.ser_complete:
+                            result = False
+                            break
 
                     self.fsmProject.dict_fsm_interims[interim_id].identify_events_complete = result
                     self.update_fsm_project_standard_item_model()
@@ -2681,12 +2339,11 @@ class FlowbotMainWindowGis(QtWidgets.QMainWindow, Ui_MainWindow):
                 ret = dlg_review.exec_()
                 if ret == QDialog.Accepted:
                     result = True
-                    for a_int_rg in self.fsmProject.dict_fsm_interim_reviews.values():
-                        if a_int_rg.interim_id == interim_id:
-                            if self.fsmProject.dict_fsm_installs[a_int_rg.install_id].install_type == 'Rain Gauge':
-                                if not a_int_rg.rg_complete:
-                                    result = False
-                                    break
+                    for a_int_rg in self.fsmProject.filter_interim_reviews_by_interim_id(interim_id).values():
+                        if self.fsmProject.dict_fsm_installs[a_int_rg.install_id].install_type == 'Rain Gauge':
+                            if not a_int_rg.rg_complete:
+                                result = False
+                                break
 
                     self.fsmProject.dict_fsm_interims[interim_id].rg_data_review_complete = result
                     self.update_fsm_project_standard_item_model()
@@ -2712,12 +2369,11 @@ class FlowbotMainWindowGis(QtWidgets.QMainWindow, Ui_MainWindow):
                 ret = dlg_review.exec_()
                 if ret == QDialog.Accepted:
                     result = True
-                    for a_int_pl in self.fsmProject.dict_fsm_interim_reviews.values():
-                        if a_int_pl.interim_id == interim_id:
-                            if self.fsmProject.dict_fsm_installs[a_int_pl.install_id].install_type == 'Pump Logger':
-                                if not a_int_pl.pl_complete:
-                                    result = False
-                                    break
+                    for a_int_pl in self.fsmProject.filter_interim_reviews_by_interim_id(interim_id).values():
+                        if self.fsmProject.dict_fsm_installs[a_int_pl.install_id].install_type == 'Pump Logger':
+                            if not a_int_pl.pl_complete:
+                                result = False
+                                break
 
                     self.fsmProject.dict_fsm_interims[interim_id].pl_data_review_complete = result
                     self.update_fsm_project_standard_item_model()
@@ -2745,12 +2401,11 @@ class FlowbotMainWindowGis(QtWidgets.QMainWindow, Ui_MainWindow):
                 ret = dlg_review.exec_()
                 if ret == QDialog.Accepted:
                     result = True
-                    for a_int_fm in self.fsmProject.dict_fsm_interim_reviews.values():
-                        if a_int_fm.interim_id == interim_id:
-                            if self.fsmProject.dict_fsm_installs[a_int_fm.install_id].install_type != 'Rain Gauge':
-                                if not a_int_fm.fm_complete:
-                                    result = False
-                                    break
+                    for a_int_fm in self.fsmProject.filter_interim_reviews_by_interim_id(interim_id).values():
+                        if self.fsmProject.dict_fsm_installs[a_int_fm.install_id].install_type != 'Rain Gauge':
+                            if not a_int_fm.fm_complete:
+                                result = False
+                                break
 
                     self.fsmProject.dict_fsm_interims[interim_id].fm_data_review_complete = result
                     self.update_fsm_project_standard_item_model()
@@ -2783,85 +2438,38 @@ class FlowbotMainWindowGis(QtWidgets.QMainWindow, Ui_MainWindow):
                 ret = dlg_interim.exec_()
                 if ret == QDialog.Accepted:
 
-                    self.statusBar().showMessage('Creating Interim Report: ')
-                    self.progressBar.setMinimum(0)
-                    self.progressBar.setValue(0)
-                    self.progressBar.setMaximum(4)
-                    self.progressBar.show()
-
+                    output_folder = dlg_interim.txt_output_folder.text()
                     output_paths = []
 
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_pdf:
-                        temp_pdf_path = temp_pdf.name
-
-                    with PdfPages(temp_pdf_path) as pdf:
-                        self.i_current_page_no = 0
-                        if dlg_interim.chk_overall_summary.isChecked():
-                            self.createReport_fsm_summary_for_interims(
-                                interim_id, pdf)
-                        if dlg_interim.chk_storm_events.isChecked():
-                            self.createReport_fsm_storm_event_summary(
-                                interim_id, pdf)
-                        if dlg_interim.chk_data_classification.isChecked():
-                            self.createReport_fsm_data_classification(
-                                interim_id, pdf)
-                        if dlg_interim.chk_fm_dm_summary.isChecked():
-                            self.createReport_fsm_flow_monitor_summary(
-                                interim_id, pdf)
-                        if dlg_interim.chk_rg_summary.isChecked():
-                            self.createReport_fsm_rain_gauge_summary(
-                                interim_id, pdf)
-                        if dlg_interim.chk_cumuative_install_summary.isChecked():
-                            for a_inst in self.fsmProject.dict_fsm_installs.values():
-                                self.createReport_fsm_cumulative_install_summaries(
-                                    interim_id, a_inst, pdf)
-
-                    output_pdf = os.path.join(dlg_interim.txt_output_folder.text(),
-                                              f'{self.fsmProject.job_number} {self.fsmProject.job_name} Interim {self.fsmProject.dict_fsm_interims[interim_id].interim_id} Report.pdf')
-
-                    if self.i_current_page_no > 0:
-                        # Move the temporary PDF to the final location
-                        shutil.move(temp_pdf_path, output_pdf)
-                        output_paths.append(output_pdf)
-                    else:
-                        # No content was added, delete the temporary file
-                        os.remove(temp_pdf_path)
+                    # The report and each plot appendix, as (output file, pages)
+                    report_files = []
+                    report_pages = self.interim_report_pages(interim_id, dlg_interim)
+                    if report_pages:
+                        report_files.append((os.path.join(output_folder,
+                                                          f'{self.fsmProject.job_number} {self.fsmProject.job_name} Interim {a_int.interim_id} Report.pdf'),
+                                             report_pages))
 
                     appendix_count = 0
-
-                    if dlg_interim.chk_raingauge_plots.isChecked():
-                        # self.i_current_page_no = 0
-                        appendix_count += 1
-                        output_pdf = os.path.join(dlg_interim.txt_output_folder.text(),
-                                                  f'Appendix {appendix_count} - Raingauge Plots.pdf')
-                        output_paths.append(output_pdf)
-                        self.createReport_fsm_raingauge_plots(
-                            interim_id, output_pdf)
-
-                    if dlg_interim.chk_fdv_plots.isChecked():
-                        # self.i_current_page_no = 0
-                        appendix_count += 1
-                        output_pdf = os.path.join(dlg_interim.txt_output_folder.text(),
-                                                  f'Appendix {appendix_count} - FDV Plots.pdf')
-                        output_paths.append(output_pdf)
-                        self.createReport_fsm_fdv_plots(interim_id, output_pdf)
-
-                    if dlg_interim.chk_dwf_plots.isChecked():
-                        # self.i_current_page_no = 0
-                        appendix_count += 1
-                        output_pdf = os.path.join(dlg_interim.txt_output_folder.text(),
-                                                  f'Appendix {appendix_count} - DWF Plots.pdf')
-                        output_paths.append(output_pdf)
-                        self.createReport_fsm_dwf_plots(interim_id, output_pdf)
-
-                    if dlg_interim.chk_scatter_plots.isChecked():
-                        # self.i_current_page_no = 0
-                        appendix_count += 1
-                        output_pdf = os.path.join(dlg_interim.txt_output_folder.text(),
-                                                  f'Appendix {appendix_count} - Scatter Plots.pdf')
+                    for chk_appendix, appendix_title, a_graph, rain_gauges in [
+                            (dlg_interim.chk_raingauge_plots, 'Raingauge Plots', graph_fsm_raingauge_plot, True),
+                            (dlg_interim.chk_fdv_plots, 'FDV Plots', graph_fsm_fdv_plot, False),
+                            (dlg_interim.chk_dwf_plots, 'DWF Plots', graph_fsm_dwf_plot, False),
+                            (dlg_interim.chk_scatter_plots, 'Scatter Plots', graph_fsm_scatter_plot, False)]:
+                        if chk_appendix.isChecked():
+                            appendix_count += 1
+                            report_files.append((os.path.join(output_folder,
+                                                              f'Appendix {appendix_count} - {appendix_title}.pdf'),
+                                                 self.interim_appendix_pages(interim_id, a_graph, rain_gauges)))
+
+                    # All pages are rendered together so that the process pool is kept busy across files
+                    all_pages = [page for _, pages in report_files for page in pages]
+                    rendered_pages = render_report_pages(self.fsmProject, all_pages,
+                                                         self.file_read_progress('Creating Interim Report'))
+                    first_page = 0
+                    for output_pdf, pages in report_files:
+                        write_report_pdf(rendered_pages[first_page:first_page + len(pages)], output_pdf)
+                        first_page += len(pages)
                         output_paths.append(output_pdf)
-                        self.createReport_fsm_scatter_plots(
-                            interim_id, output_pdf)
 
                     if dlg_interim.chk_site_sheets.isChecked():
                         # self.i_current_page_no = 0
@@ -2906,179 +2514,35 @@ class FlowbotMainWindowGis(QtWidgets.QMainWindow, Ui_MainWindow):
         with open(output_path, 'wb') as f_out:
             writer.write(f_out)
 
-    def createReport_fsm_summary_for_interims(self, interim_id: int, pdf: PdfPages):
-
-        self.statusBar().showMessage('Exporting Survey Summary')
-
-        fig_width = 14.1
-        fig_height = (fig_width * 10) / 14.1
-
-        tempPW = PlotWidget(self, False, (fig_width, fig_height), dpi=100)
-
-        self.i_current_page_no += 1
-        tempGraph = graph_fsm_cumulative_interim_summary(
-            tempPW, self.fsmProject, interim_id, f'Page {self.i_current_page_no}')
-        tempGraph.update_plot()
-        pdf.savefig(tempGraph.a_plot_widget.figure)
-
-    def createReport_fsm_storm_event_summary(self, interim_id: int, pdf: PdfPages):
-
-        self.statusBar().showMessage('Exporting Identified Storms')
-
-        fig_width = 14.1
-        fig_height = (fig_width * 10) / 14.1
-
-        tempPW = PlotWidget(self, False, (fig_width, fig_height), dpi=100)
-
-        self.i_current_page_no += 1
-        tempGraph = graph_fsm_storm_event_summary(
-            tempPW, self.fsmProject, interim_id, f'Page {self.i_current_page_no}')
-        tempGraph.update_plot()
-        pdf.savefig(tempGraph.a_plot_widget.figure)
-
-    def createReport_fsm_data_classification(self, interim_id: int, pdf: PdfPages):
-
-        self.statusBar().showMessage('Exporting Data Classification Summary')
-
-        fig_width = 14.1
-        fig_height = (fig_width * 10) / 14.1
-
-        tempPW = PlotWidget(self, False, (fig_width, fig_height), dpi=100)
-
-        self.i_current_page_no += 1
-        tempGraph = graph_fsm_classification(
-            tempPW, self.fsmProject, interim_id, f'Page {self.i_current_page_no}')
-        tempGraph.update_plot()
-        pdf.savefig(tempGraph.a_plot_widget.figure)
-
-    def createReport_fsm_flow_monitor_summary(self, interim_id, pdf: PdfPages):
-
-        self.statusBar().showMessage('Exporting FM Install Summary')
-
-        fig_width = 14.1
-        fig_height = (fig_width * 10) / 14.1
-
-        tempPW = PlotWidget(self, False, (fig_width, fig_height), dpi=100)
-
-        self.i_current_page_no += 1
-        tempGraph = graph_fsm_fm_install_summary(
-            tempPW, self.fsmProject, interim_id, f'Page {self.i_current_page_no}')
-        tempGraph.update_plot()
-        pdf.savefig(tempGraph.a_plot_widget.figure)
-
-    def createReport_fsm_rain_gauge_summary(self, interim_id, pdf: PdfPages):
-
-        self.statusBar().showMessage('Exporting RG Install Summary')
-
-        fig_width = 14.1
-        fig_height = (fig_width * 10) / 14.1
-
-        tempPW = PlotWidget(self, False, (fig_width, fig_height), dpi=100)
-
-        self.i_current_page_no += 1
-        tempGraph = graph_fsm_rg_install_summary(
-            tempPW, self.fsmProject, interim_id, f'Page {self.i_current_page_no}')
-        tempGraph.update_plot()
-        pdf.savefig(tempGraph.a_plot_widget.figure)
-
-    def createReport_fsm_cumulative_install_summaries(self, interim_id, a_inst: fsmInstall, pdf: PdfPages):
-
-        self.statusBar().showMessage('Exporting Cumulative Install Summary')
-
-        fig_width = 14.1
-        fig_height = (fig_width * 10) / 14.1
-
-        tempPW = PlotWidget(self, False, (fig_width, fig_height), dpi=100)
-
-        self.i_current_page_no += 1
-        tempGraph = graph_fsm_monitor_data_summary(
-            tempPW, self.fsmProject, interim_id, a_inst, f'Page {self.i_current_page_no}')
-        tempGraph.update_plot()
-        pdf.savefig(tempGraph.a_plot_widget.figure)
-
-    def createReport_fsm_raingauge_plots(self, interim_id: int, output_pdf: str):
-
-        self.statusBar().showMessage('Exporting Rain Gauge Plots')
-
-        fig_width = 14.1
-        fig_height = (fig_width * 10) / 14.1
-
-        tempPW = PlotWidget(self, False, (fig_width, fig_height), dpi=100)
-
-        with PdfPages(output_pdf) as pdf:
-            i_pagecount = 0
-            start_date = self.fsmProject.dict_fsm_interims[interim_id].interim_start_date
-            end_date = self.fsmProject.dict_fsm_interims[interim_id].interim_end_date
-            for a_inst in self.fsmProject.dict_fsm_installs.values():
-                if a_inst.install_type == 'Rain Gauge':
-                    i_pagecount += 1
-                    tempGraph = graph_fsm_raingauge_plot(
-                        tempPW, a_inst, start_date, end_date, f'Page {i_pagecount}')
-                    tempGraph.update_plot()
-                    pdf.savefig(tempGraph.a_plot_widget.figure)
-
-    def createReport_fsm_fdv_plots(self, interim_id: int, output_pdf: str):
-
-        self.statusBar().showMessage('Exporting FDV Plots')
-
-        fig_width = 14.1
-        fig_height = (fig_width * 10) / 14.1
-
-        tempPW = PlotWidget(self, False, (fig_width, fig_height), dpi=100)
-
-        with PdfPages(output_pdf) as pdf:
-            i_pagecount = 0
-            start_date = self.fsmProject.dict_fsm_interims[interim_id].interim_start_date
-            end_date = self.fsmProject.dict_fsm_interims[interim_id].interim_end_date
-            for a_inst in self.fsmProject.dict_fsm_installs.values():
-                if a_inst.install_type != 'Rain Gauge':
-                    i_pagecount += 1
-                    tempGraph = graph_fsm_fdv_plot(
-                        tempPW, a_inst, self.fsmProject, start_date, end_date, f'Page {i_pagecount}')
-                    tempGraph.update_plot()
-                    pdf.savefig(tempGraph.a_plot_widget.figure)
-
-    def createReport_fsm_dwf_plots(self, interim_id: int, output_pdf: str):
-
-        self.statusBar().showMessage('Exporting DWF Plots')
-
-        fig_width = 14.1
-        fig_height = (fig_width * 10) / 14.1
-
-        tempPW = PlotWidget(self, False, (fig_width, fig_height), dpi=100)
-
-        with PdfPages(output_pdf) as pdf:
-            i_pagecount = 0
-            start_date = self.fsmProject.dict_fsm_interims[interim_id].interim_start_date
-            end_date = self.fsmProject.dict_fsm_interims[interim_id].interim_end_date
+    def interim_report_pages(self, interim_id: int, dlg_interim) -> List[reportPage]:
+        """Returns the pages of the interim report selected in dlg_interim, numbered in order."""
+        graphs = []
+        if dlg_interim.chk_overall_summary.isChecked():
+            graphs.append((graph_fsm_cumulative_interim_summary, None))
+        if dlg_interim.chk_storm_events.isChecked():
+            graphs.append((graph_fsm_storm_event_summary, None))
+        if dlg_interim.chk_data_classification.isChecked():
+            graphs.append((graph_fsm_classification, None))
+        if dlg_interim.chk_fm_dm_summary.isChecked():
+            graphs.append((graph_fsm_fm_install_summary, None))
+        if dlg_interim.chk_rg_summary.isChecked():
+            graphs.append((graph_fsm_rg_install_summary, None))
+        if dlg_interim.chk_cumuative_install_summary.isChecked():
             for a_inst in self.fsmProject.dict_fsm_installs.values():
-                if a_inst.install_type != 'Rain Gauge':
-                    i_pagecount += 1
-                    tempGraph = graph_fsm_dwf_plot(
-                        tempPW, a_inst, self.fsmProject, start_date, end_date, f'Page {i_pagecount}')
-                    tempGraph.update_plot()
-                    pdf.savefig(tempGraph.a_plot_widget.figure)
-
-    def createReport_fsm_scatter_plots(self, interim_id: int, output_pdf: str):
+                graphs.append((graph_fsm_monitor_data_summary, a_inst.install_id))
 
-        self.statusBar().showMessage('Exporting Scatter Plots')
+        return [reportPage(a_graph, f'Page {i_page}', interim_id=interim_id, install_id=install_id)
+                for i_page, (a_graph, install_id) in enumerate(graphs, start=1)]
 
-        fig_width = 14.1
-        fig_height = (fig_width * 10) / 14.1
+    def interim_appendix_pages(self, interim_id: int, a_graph: type, rain_gauges: bool) -> List[reportPage]:
+        """Returns one page of a_graph for each rain gauge install, or for each other install."""
+        a_int = self.fsmProject.dict_fsm_interims[interim_id]
+        installs = [a_inst for a_inst in self.fsmProject.dict_fsm_installs.values()
+                    if (a_inst.install_type == 'Rain Gauge') == rain_gauges]
 
-        tempPW = PlotWidget(self, False, (fig_width, fig_height), dpi=100)
-
-        with PdfPages(output_pdf) as pdf:
-            i_pagecount = 0
-            start_date = self.fsmProject.dict_fsm_interims[interim_id].interim_start_date
-            end_date = self.fsmProject.dict_fsm_interims[interim_id].interim_end_date
-            for a_inst in self.fsmProject.dict_fsm_installs.values():
-                if a_inst.install_type != 'Rain Gauge':
-                    i_pagecount += 1
-                    tempGraph = graph_fsm_scatter_plot(
-                        tempPW, a_inst, self.fsmProject, start_date, end_date, f'Page {i_pagecount}')
-                    tempGraph.update_plot()
-                    pdf.savefig(tempGraph.a_plot_widget.figure)
+        return [reportPage(a_graph, f'Page {i_page}', interim_id=interim_id, install_id=a_inst.install_id,
+                           start_date=a_int.interim_start_date, end_date=a_int.interim_end_date)
+                for i_page, a_inst in enumerate(installs, start=1)]
 
     def createReport_fsm_site_sheets(self, interim_id: int, output_pdf: str) -> bool:
 
@@ -3334,6 +2798,7 @@ class FlowbotMainWindowGis(QtWidgets.QMainWindow, Ui_MainWindow):
                 inst.install_sheet_filename = dlg_inst.txt_install_sheet.text()
 
                 self.fsmProject.dict_fsm_installs[inst.install_id] = inst
+                self.fsmProject.invalidate_indexes()
 
             self.update_fsm_project_standard_item_model()
         except Exception as e:
@@ -3391,6 +2856,7 @@ class FlowbotMainWindowGis(QtWidgets.QMainWindow, Ui_MainWindow):
                 a_inst.install_sheet_filename = dlg_inst.txt_install_sheet.text()
 
                 self.fsmProject.dict_fsm_installs[a_inst.install_id] = a_inst
+                self.fsmProject.invalidate_indexes()
 
             self.update_fsm_project_standard_item_model()
 
@@ -5789,8 +5255,8 @@ class FlowbotMainWindowGis(QtWidgets.QMainWindow, Ui_MainWindow):
                                 startDate = se.eventStart
                                 endDate = se.eventEnd
                             else:
-                                startDate = fm.dateRange[0]
-                                endDate = fm.dateRange[len(fm.dateRange)-1]
+                                startDate = fm.firstDate
+                                endDate = fm.lastDate
                             flowVol = fm.getFlowVolumeBetweenDates(
                                 startDate, endDate)
                             self.schematicGraphicsView.schematicFMUSTrace(
@@ -6883,6 +6349,8 @@ class FlowbotMainWindowGis(QtWidgets.QMainWindow, Ui_MainWindow):
             DatabaseManager._instance = None
             gc.collect()
         self.db_manager = DatabaseManager()
+        # The memoised DWF profiles hold on to the closed project's series
+        dwf_profiles.clear()
         self.aFDVGraph = GraphFDV(self.plotCanvasMain)
         self.aScattergraph = graphScatter(self.plotCanvasMain)
         self.aCumDepthGraph = graphCumulativeDepth(self.plotCanvasMain)
@@ -7443,6 +6911,8 @@ class FlowbotMainWindowGis(QtWidgets.QMainWindow, Ui_MainWindow):
         try:
 
             self.update_database(conn)
+            update_schema(conn)
+            conn.commit()
 
             if self.fsmProject is None:
 
@@ -7587,11 +7057,25 @@ class FlowbotMainWindowGis(QtWidgets.QMainWindow, Ui_MainWindow):
     #     return newList
 
     def saveProjectToDatabase(self):
+        """
+        Saves the open project as a single transaction.  Each writer only touches rows that were added,
+        changed or removed since the last save, so nothing is committed unless every writer succeeds.
+        """
 
         result = True
         conn = self.db_manager.get_connection()
+        cache_spill = None
 
         try:
+            if conn.in_transaction:
+                conn.commit()
+            # Series not yet loaded from the file are read through their own connections while the
+            # transaction is open.  WAL journaling lets them read alongside it; where the file cannot
+            # use WAL, holding the changes in memory until commit keeps them from being locked out.
+            # The connection is pooled, so the setting is put back once the save is over
+            cache_spill = conn.execute("PRAGMA cache_spill").fetchone()[0]
+            conn.execute("PRAGMA cache_spill=OFF")
+            conn.execute("BEGIN")
             conn.execute(
                 f"""CREATE TABLE IF NOT EXISTS {Tables.FB_VERSION} (current_version TEXT PRIMARY KEY)"""
             )
@@ -7623,16 +7107,33 @@ class FlowbotMainWindowGis(QtWidgets.QMainWindow, Ui_MainWindow):
                     result = False
             if not self.write_schematic_graphics_view_to_database(conn):
                 result = False
+            update_schema(conn)
+
+            if result:
+                conn.commit()
+                for saved in (self.fsmProject, self.openFlowMonitors, self.openRainGauges,
+                              self.identifiedSurveyEvents, self.openIcmTraces, self.openWQMonitors):
+                    if saved is not None:
+                        saved.mark_saved()
+            else:
+                conn.rollback()
 
             self.setWindowTitle(f'Flowbot v{strVersion}: {os.path.basename(self.db_manager.database)}')
 
         except Exception as e:
             result = False
+            if conn.in_transaction:
+                conn.rollback()
             msg = QMessageBox(self)
             msg.setWindowIcon(self.myIcon)
             msg.critical(self, 'Save Project',
                          f"Error saving project: {e}", QMessageBox.Ok)
         finally:
+            if cache_spill is not None:
+                try:
+                    conn.execute(f"PRAGMA cache_spill={int(cache_spill)}")
+                except sqlite3.Error:
+                    logger.error("saveProjectToDatabase: Could not restore cache_spill", exc_info=True)
             self.db_manager.return_connection(conn)
             return result
 
@@ -7665,32 +7166,15 @@ class FlowbotMainWindowGis(QtWidgets.QMainWindow, Ui_MainWindow):
         if not self.db_manager.is_connected():
             self.saveProjectAs()
         else:
-            # If already connected, save directly to the existing database
-            # Create a temporary file
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".fbsqlite")
-            temp_file.close()  # Close the file so it can be used by the database manager
-            currentFileSpec = self.db_manager.database
-            self.db_manager.close_all_connections()
-            logger.debug(f"FlowbotMainWindowGis.saveProject: Closed All Connections")
-            self.db_manager.initialize(temp_file.name, pool_size=5)
-            logger.debug(f"FlowbotMainWindowGis.saveProject: DB Manager Initialized")
-
+            # If already connected, save directly to the existing database.  The save is a single
+            # transaction, so a failure leaves the file as it was.
             if self.saveProjectToDatabase():
-                logger.debug(f"FlowbotMainWindowGis.saveProject: Test Save Successfull")
-                self.db_manager.close_all_connections()
-                logger.debug(f"FlowbotMainWindowGis.saveProject: Closed All Connections")
-                os.remove(temp_file.name)
-                logger.debug(f"FlowbotMainWindowGis.saveProject: Temp File Removed")
-                self.db_manager.initialize(currentFileSpec, pool_size=5)
-                logger.debug(f"FlowbotMainWindowGis.saveProject: DB Manager Initialized")
-                self.saveProjectToDatabase()
+                logger.debug(f"FlowbotMainWindowGis.saveProject: Save Successfull")
                 msg = QMessageBox(self)
                 msg.setWindowIcon(self.myIcon)
                 msg.information(self, 'Save Project', 'Project Saved Successfully', QMessageBox.Ok)
             else:
-                logger.debug(f"FlowbotMainWindowGis.saveProject: Test Save Unsuccessfull")
-                self.db_manager.initialize(currentFileSpec, pool_size=5)
-                logger.debug(f"FlowbotMainWindowGis.saveProject: DB Manager Initialized")
+                logger.debug(f"FlowbotMainWindowGis.saveProject: Save Unsuccessfull")
                 msg = QMessageBox(self)
                 msg.setWindowIcon(self.myIcon)
                 msg.critical(self, 'Save Project', 'Failed to save project', QMessageBox.Ok)
@@ -7789,7 +7273,6 @@ class FlowbotMainWindowGis(QtWidgets.QMainWindow, Ui_MainWindow):
                         conn.execute(f'''INSERT OR REPLACE INTO {Tables.SUMMED_FLOW_MONITOR} VALUES (?, ?, ?, ?)''',
                                 (sfm.sumFMName, i, fm.monitorName, mult))
                         i += 1
-                conn.commit()
                 result = True
             else:
                 result = True
@@ -7798,11 +7281,9 @@ class FlowbotMainWindowGis(QtWidgets.QMainWindow, Ui_MainWindow):
         except sqlite3.Error as e:
             logger.error(f"FlowbotMainwindowGis.write_summedFMs_to_database: Database error: {e}")
             # print(f"Database error: {e}")
-            conn.rollback()
         except Exception as e:
             logger.error(f"FlowbotMainwindowGis.write_summedFMs_to_database: Exception in _query: {e}")
             # print(f"Exception in _query: {e}")
-            conn.rollback()
         finally:
             return result                
 
@@ -7850,7 +7331,6 @@ class FlowbotMainWindowGis(QtWidgets.QMainWindow, Ui_MainWindow):
                             item._destinationPoint.x(), item._destinationPoint.y(),
                             serialize_list([{'x': point.x(), 'y': point.y()} for point in item.intermediateVertices])))
 
-                conn.commit()
                 result = True
             else:
                 result = True
@@ -7858,11 +7338,9 @@ class FlowbotMainWindowGis(QtWidgets.QMainWindow, Ui_MainWindow):
         except sqlite3.Error as e:
             logger.error(f"FlowbotMainWindowGis.write_schematic_graphics_view_to_database: Database error: {e}")
             # print(f"Database error: {e}")
-            conn.rollback()
         except Exception as e:
             logger.error(f"FlowbotMainWindowGis.write_schematic_graphics_view_to_database: Exception in _query: {e}")
             # print(f"Exception in _query: {e}")
-            conn.rollback()
         finally:
             return result        
 
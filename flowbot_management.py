@@ -1,10 +1,9 @@
 import os
 from collections import namedtuple
-from typing import Dict, Optional, List
+from typing import Callable, Dict, Optional, List, Tuple
 import sqlite3
 from datetime import datetime, timedelta
 import pandas as pd
-import pickle
 import matplotlib.pyplot as plt
 import numpy as np
 import math
@@ -12,19 +11,19 @@ from sklearn.utils.class_weight import compute_class_weight
 from scipy.stats import entropy, skew, kurtosis
 from scipy.signal import welch
 import joblib
-from flowbot_helper import resource_path, parse_file, parse_date, write_header, write_constants, write_fsm_rg_payload, write_fsm_fm_payload
+from flowbot_helper import resource_path, serialize_item, deserialize_item, parse_file, parse_date, get_payload_values, write_header, write_constants, write_fsm_rg_payload, write_fsm_fm_payload
 from sklearn.linear_model import LogisticRegression
 from sklearn.ensemble import RandomForestClassifier
 from catboost import CatBoostClassifier
 from scipy import interpolate
-from flowbot_database import Tables
+from flowbot_database import Tables, TrackedObject, write_changed_rows, deferredColumn, read_rows_deferring, column_loader, database_file
 from PyQt5.QtWidgets import QDialog, QMessageBox
 from flowbot_logging import get_logger
 
 logger = get_logger('flowbot_logger')
 
 
-class fsmMonitor(object):
+class fsmMonitor(TrackedObject):
 
     def __init__(self):
         self.monitor_asset_id: str = ''
@@ -32,6 +31,9 @@ class fsmMonitor(object):
         self.pmac_id: str = ''
         self.monitor_sub_type: str = "Detec"
 
+    def to_database_row(self) -> tuple:
+        return (self.monitor_asset_id, self.monitor_type, self.pmac_id, self.monitor_sub_type)
+
     def from_database_row_dict(self, row_dict: Dict):
         self.monitor_asset_id = row_dict.get('monitor_asset_id')
         self.monitor_type = row_dict.get('monitor_type', self.monitor_type)
@@ -39,7 +41,14 @@ class fsmMonitor(object):
         self.monitor_sub_type = row_dict.get('monitor_sub_type', self.monitor_sub_type)
 
 
-class fsmInstall(object):
+class fsmInstall(TrackedObject):
+
+    DEFERRED_COLUMNS = ('data', 'class_data_ml', 'class_data_user')
+    INDEXED_ATTRIBUTES = ('install_id', 'install_site_id', 'install_monitor_asset_id')
+
+    data = deferredColumn()
+    class_data_ml = deferredColumn()
+    class_data_user = deferredColumn()
 
     def __init__(self):
         self.install_id: str = "1"
@@ -72,6 +81,22 @@ class fsmInstall(object):
             "1972-05-12", "%Y-%m-%d"
         )
 
+    def to_database_row(self) -> tuple:
+        return (self.install_id,  self.install_site_id, self.install_monitor_asset_id, self.install_type,
+                self.client_ref, self.install_date.isoformat(
+                ), self.remove_date.isoformat(), self.fm_pipe_letter,
+                self.fm_pipe_shape, int(self.fm_pipe_height_mm), int(
+                    self.fm_pipe_width_mm),
+                int(self.fm_pipe_depth_to_invert_mm), int(
+                    self.fm_sensor_offset_mm), self.rg_position,
+                serialize_item(self.data), self.data_start.isoformat(
+                ), self.data_end.isoformat(),
+                self.data_interval, self.data_date_updated.isoformat(
+                ), self.install_sheet, self.install_sheet_filename,
+                serialize_item(
+                    self.class_data_ml), self.class_data_ml_date_updated.isoformat(),
+                serialize_item(self.class_data_user), self.class_data_user_date_updated.isoformat())
+
     def from_database_row_dict(self, row_dict: Dict):
         self.install_id = row_dict.get("install_id", self.install_id)
         self.install_site_id = row_dict.get("install_site_id", self.install_site_id)
@@ -102,7 +127,7 @@ class fsmInstall(object):
         self.rg_position = row_dict.get("rg_position", self.rg_position)
 
         if row_dict.get("data") is not None:
-            self.data = pickle.loads(row_dict["data"])
+            self.data = deserialize_item(row_dict["data"])
 
         if isinstance(row_dict.get("data_start"), str):
             self.data_start = datetime.fromisoformat(row_dict["data_start"])
@@ -127,7 +152,7 @@ class fsmInstall(object):
         )
 
         if row_dict.get("class_data_ml") is not None:
-            self.class_data_ml = pickle.loads(row_dict["class_data_ml"])
+            self.class_data_ml = deserialize_item(row_dict["class_data_ml"])
 
         if isinstance(row_dict.get("class_data_ml_date_updated"), str):
             self.class_data_ml_date_updated = datetime.fromisoformat(
@@ -135,7 +160,7 @@ class fsmInstall(object):
             )
 
         if row_dict.get("class_data_user") is not None:
-            self.class_data_user = pickle.loads(row_dict["class_data_user"])
+            self.class_data_user = deserialize_item(row_dict["class_data_user"])
 
         if isinstance(row_dict.get("class_data_user_date_updated"), str):
             self.class_data_user_date_updated = datetime.fromisoformat(
@@ -148,9 +173,7 @@ class fsmInstall(object):
         try:
             with open(fileSpec, 'r') as org_data:
 
-                file_data = parse_file(fileSpec)
-
-                all_units = [unit for record in file_data["payload"] for unit in record]
+                file_data = parse_file(fileSpec, as_arrays=True)
 
                 constants = file_data["constants"]
 
@@ -166,38 +189,11 @@ class fsmInstall(object):
                 dateRange: List[datetime] = np.arange(start_dt, end_dt + interval, interval).tolist()                    
 
                 no_of_records = int(duration_mins / interval_minutes) + 1
-                i_record = 0
-
-                flowDataRange: List[float] = []
-                depthDataRange: List[float] = []
-                velocityDataRange: List[float] = []
-                # for unit in all_units:
-                #     i_record += 1
-                #     if i_record <= no_of_records:
-                #         flowDataRange.append(float(unit["FLOW"]))
-                #         depthDataRange.append(float(unit["DEPTH"]))
-                #         velocityDataRange.append(float(unit["VELOCITY"]))
-
-                for unit in all_units:
-                    i_record += 1
-                    if i_record <= no_of_records:
-                        flow = unit.get("FLOW")
-                        if flow is not None:
-                            flowDataRange.append(float(flow))
-                        else:
-                            flowDataRange.append(0.0)
-
-                        depth = unit.get("DEPTH")
-                        if depth is not None:
-                            depthDataRange.append(float(depth))
-                        else:
-                            depthDataRange.append(0.0)
-
-                        velocity = unit.get("VELOCITY")
-                        if velocity is not None:
-                            velocityDataRange.append(float(velocity))
-                        else:
-                            velocityDataRange.append(0.0)                        
+                payload = file_data["payload"]
+
+                flowDataRange = get_payload_values(payload, "FLOW", no_of_records)
+                depthDataRange = get_payload_values(payload, "DEPTH", no_of_records)
+                velocityDataRange = get_payload_values(payload, "VELOCITY", no_of_records)
 
                 # Check that the number of dates matches the number of data units.
                 if len(dateRange) != len(flowDataRange):
@@ -230,9 +226,7 @@ class fsmInstall(object):
         try:
             with open(fileSpec, 'r', encoding="utf-8") as org_data:
 
-                file_data = parse_file(fileSpec)
-
-                all_units = [unit for record in file_data["payload"] for unit in record]
+                file_data = parse_file(fileSpec, as_arrays=True)
 
                 constants = file_data["constants"]
 
@@ -251,13 +245,8 @@ class fsmInstall(object):
                 dateRange: List[datetime] = np.arange(start_dt, end_dt + interval, interval).tolist()
 
                 no_of_records = int(duration_mins / interval_minutes) + 1
-                i_record = 0
 
-                intensityDataRange: List[float] = []
-                for unit in all_units:
-                    i_record += 1
-                    if i_record <= no_of_records:
-                        intensityDataRange.append(float(unit["INTENSITY"]))
+                intensityDataRange = get_payload_values(file_data["payload"], "INTENSITY", no_of_records)
 
                 # Check that the number of dates matches the number of data units.
                 if len(dateRange) != len(intensityDataRange):
@@ -351,6 +340,19 @@ class fsmInstall(object):
 
         return df_class_combined_filtered
 
+    def set_user_classification(self, date, class_code: str):
+        """Records class_code, with full confidence, as the user classification of date, replacing any earlier one."""
+        idx = self.class_data_user.index[self.class_data_user['Date'] == date].tolist()
+
+        if idx:  # if the date exists, update the existing entry
+            self.class_data_user.loc[idx[0], 'Classification'] = class_code
+            self.class_data_user.loc[idx[0], 'Confidence'] = 1.0
+            # Edited in place, so the install will not have flagged itself for saving
+            self.mark_dirty()
+        else:  # if the date does not exist, append the new entry
+            new_entry = pd.DataFrame({'Date': [date], 'Classification': [class_code], 'Confidence': [1.0]})
+            self.class_data_user = pd.concat([self.class_data_user, new_entry], ignore_index=True)
+
     def get_combined_classification(self) -> pd.DataFrame:
 
         if self.class_data_ml is not None and self.class_data_user is not None:
@@ -503,7 +505,18 @@ class fsmInstall(object):
                 for line in file_lines:
                     f.write(line + "\n")
 
-class fsmRawData(object):
+class fsmRawData(TrackedObject):
+
+    DEFERRED_COLUMNS = ('rg_data', 'dep_data', 'vel_data', 'bat_data', 'pl_data')
+    # The start and end recorded for a channel with no data
+    NO_DATA_DATE = datetime(2172, 5, 12)
+    INDEXED_ATTRIBUTES = ('install_id',)
+
+    rg_data = deferredColumn()
+    dep_data = deferredColumn()
+    vel_data = deferredColumn()
+    bat_data = deferredColumn()
+    pl_data = deferredColumn()
 
     def __init__(self):
         self.rawdata_id: int = 1
@@ -558,13 +571,53 @@ class fsmRawData(object):
         self.battery_file_format: str = '{ast_id}_08.dat'
         self.pumplogger_file_format: str = '{ast_id}.csv'
 
+    def to_database_row(self) -> tuple:
+        return (
+            int(self.rawdata_id),
+            self.install_id,
+            float(self.rg_tb_depth),
+            serialize_item(self.rg_data),
+            self.rg_data_start.isoformat(),
+            self.rg_data_end.isoformat(),
+            serialize_item(self.rg_timing_corr),
+            serialize_item(self.dep_data),
+            self.dep_data_start.isoformat(),
+            self.dep_data_end.isoformat(),
+            serialize_item(self.dep_corr),
+            serialize_item(self.vel_data),
+            self.vel_data_start.isoformat(),
+            self.vel_data_end.isoformat(),
+            serialize_item(self.vel_corr),
+            serialize_item(self.dv_timing_corr),
+            serialize_item(self.bat_data),
+            self.bat_data_start.isoformat(),
+            self.bat_data_end.isoformat(),
+            serialize_item(self.pl_data),
+            self.pl_data_start.isoformat(),
+            self.pl_data_end.isoformat(),
+            serialize_item(self.pl_timing_corr),
+            serialize_item(self.pl_added_onoffs),
+            self.pipe_shape,
+            int(self.pipe_width),
+            int(self.pipe_height),
+            serialize_item(self.pipe_shape_def),
+            serialize_item(self.silt_levels),
+            int(self.pipe_shape_intervals),
+            self.file_path,
+            self.rainfall_file_format,
+            self.depth_file_format,
+            self.velocity_file_format,
+            self.battery_file_format,
+            self.pumplogger_file_format,
+        )
+
     def from_database_row_dict(self, row_dict:Dict):
         self.rawdata_id = row_dict.get('rawdata_id')
         self.install_id = row_dict.get('install_id')
         self.rg_tb_depth = row_dict.get('rg_tb_depth')
 
         if row_dict.get('rg_data') is not None:
-            self.rg_data = pickle.loads(row_dict['rg_data'])
+            self.rg_data = deserialize_item(row_dict['rg_data'])
 
         if isinstance(row_dict.get('rg_data_start'), str):
             self.rg_data_start = datetime.fromisoformat(row_dict['rg_data_start'])
@@ -573,10 +626,10 @@ class fsmRawData(object):
             self.rg_data_end = datetime.fromisoformat(row_dict['rg_data_end'])
 
         if row_dict.get('rg_timing_corr') is not None:
-            self.rg_timing_corr = pickle.loads(row_dict['rg_timing_corr'])
+            self.rg_timing_corr = deserialize_item(row_dict['rg_timing_corr'])
 
         if row_dict.get('dep_data') is not None:
-            self.dep_data = pickle.loads(row_dict.get('dep_data'))
+            self.dep_data = deserialize_item(row_dict.get('dep_data'))
 
         if isinstance(row_dict.get('dep_data_start'), str):
             self.dep_data_start = datetime.fromisoformat(row_dict['dep_data_start'])
@@ -585,10 +638,10 @@ class fsmRawData(object):
             self.dep_data_end = datetime.fromisoformat(row_dict['dep_data_end'])
 
         if row_dict.get('dep_corr') is not None:
-            self.dep_corr = pickle.loads(row_dict.get('dep_corr'))
+            self.dep_corr = deserialize_item(row_dict.get('dep_corr'))
 
         if row_dict.get('vel_data') is not None:
-            self.vel_data = pickle.loads(row_dict.get('vel_data'))
+            self.vel_data = deserialize_item(row_dict.get('vel_data'))
 
         if isinstance(row_dict.get('vel_data_start'), str):
             self.vel_data_start = datetime.fromisoformat(row_dict['vel_data_start'])
@@ -597,13 +650,13 @@ class fsmRawData(object):
             self.vel_data_end = datetime.fromisoformat(row_dict['vel_data_end'])
 
         if row_dict.get('vel_corr') is not None:
-            self.vel_corr = pickle.loads(row_dict.get('vel_corr'))
+            self.vel_corr = deserialize_item(row_dict.get('vel_corr'))
 
         if row_dict.get('dv_timing_corr') is not None:
-            self.dv_timing_corr = pickle.loads(row_dict.get('dv_timing_corr'))
+            self.dv_timing_corr = deserialize_item(row_dict.get('dv_timing_corr'))
 
         if row_dict.get('bat_data') is not None:
-            self.bat_data = pickle.loads(row_dict.get('bat_data'))
+            self.bat_data = deserialize_item(row_dict.get('bat_data'))
 
         if isinstance(row_dict.get('bat_data_start'), str):
             self.bat_data_start = datetime.fromisoformat(row_dict['bat_data_start'])
@@ -612,7 +665,7 @@ class fsmRawData(object):
             self.bat_data_end = datetime.fromisoformat(row_dict['bat_data_end'])
 
         if row_dict.get('pl_data') is not None:
-            self.pl_data = pickle.loads(row_dict.get('pl_data'))
+            self.pl_data = deserialize_item(row_dict.get('pl_data'))
 
         if isinstance(row_dict.get('pl_data_start'), str):
             self.pl_data_start = datetime.fromisoformat(row_dict['pl_data_start'])
@@ -621,20 +674,20 @@ class fsmRawData(object):
             self.pl_data_end = datetime.fromisoformat(row_dict['pl_data_end'])
 
         if row_dict.get('pl_timing_corr') is not None:
-            self.pl_timing_corr = pickle.loads(row_dict.get('pl_timing_corr'))
+            self.pl_timing_corr = deserialize_item(row_dict.get('pl_timing_corr'))
 
         if row_dict.get('pl_added_onoffs') is not None:
-            self.pl_added_onoffs = pickle.loads(row_dict.get('pl_added_onoffs'))
+            self.pl_added_onoffs = deserialize_item(row_dict.get('pl_added_onoffs'))
 
         self.pipe_shape = row_dict.get('pipe_shape')
         self.pipe_width = row_dict.get('pipe_width')
         self.pipe_height = row_dict.get('pipe_height')
 
         if row_dict.get('pipe_shape_def') is not None:
-            self.pipe_shape_def = pickle.loads(row_dict.get('pipe_shape_def'))
+            self.pipe_shape_def = deserialize_item(row_dict.get('pipe_shape_def'))
 
         if row_dict.get("silt_levels") is not None:
-            self.silt_levels = pickle.loads(row_dict.get('silt_levels'))
+            self.silt_levels = deserialize_item(row_dict.get('silt_levels'))
 
         self.pipe_shape_intervals = row_dict.get('pipe_shape_intervals')
         self.file_path = row_dict.get('file_path')
@@ -644,8 +697,22 @@ class fsmRawData(object):
         self.battery_file_format = row_dict.get('battery_file_format')
         self.pumplogger_file_format = row_dict.get('pumplogger_file_format')
 
+    def channel_data_end(self, channel: str) -> Optional[datetime]:
+        """
+        The end of the data held for channel ('rg_data', 'dep_data', ...), or None if it has none.  A series
+        still left in the project database is not read; its recorded end date says whether it has data.
+        """
+        if getattr(fsmRawData, channel).is_loaded(self):
+            data = getattr(self, channel)
+            if data is None or data.empty:
+                return None
+        end = getattr(self, f'{channel}_end')
+        if end is None or pd.isna(end) or end == self.NO_DATA_DATE:
+            return None
+        return end
 
-class fsmInspection(object):
+
+class fsmInspection(TrackedObject):
 
     def __init__(self):
         self.inspection_id: int = 1
@@ -656,6 +723,10 @@ class fsmInspection(object):
         self.inspection_sheet_filename: str = ''
         self.inspection_type: str = ''
 
+    def to_database_row(self) -> tuple:
+        return (int(self.inspection_id), self.install_id, self.inspection_date.isoformat(),
+                self.inspection_sheet, self.inspection_sheet_filename, self.inspection_type)
+
     def from_database_row_dict(self, row_dict:Dict):
 
         self.inspection_id = row_dict.get('inspection_id')
@@ -669,7 +740,7 @@ class fsmInspection(object):
         self.inspection_sheet_filename = row_dict.get('inspection_sheet_filename')
         self.inspection_type = row_dict.get('inspection_type')
 
-class fsmSite(object):
+class fsmSite(TrackedObject):
 
     def __init__(self):
         self.siteID: str = ''
@@ -680,6 +751,9 @@ class fsmSite(object):
         self.easting: float = 0.0
         self.northing: float = 0.0
 
+    def to_database_row(self) -> tuple:
+        return (self.siteID, self.siteType, self.address, self.mh_ref, self.w3w, self.easting, self.northing)
+
     def from_database_row_dict(self, row_dict:Dict):
         self.siteID = row_dict.get('siteID')
         self.siteType = row_dict.get('siteType')
@@ -690,7 +764,7 @@ class fsmSite(object):
         self.northing = row_dict.get('northing')
 
 
-class fsmInterim(object):
+class fsmInterim(TrackedObject):
 
     def __init__(self):
         self.interim_id: int = 1
@@ -708,6 +782,16 @@ class fsmInterim(object):
         self.identify_events_complete: bool = False
         self.interim_summary_text: str = ''
 
+    def to_database_row(self) -> tuple:
+        return (self.interim_id, self.interim_start_date.isoformat(), self.interim_end_date.isoformat(),
+                int(self.data_import_complete), int(
+                    self.site_inspection_review_complete),
+                int(self.fm_data_review_complete), int(
+                    self.rg_data_review_complete), int(self.pl_data_review_complete),
+                int(self.data_classification_complete), int(
+                    self.report_complete), int(self.identify_events_complete),
+                self.interim_summary_text)
+
     def from_database_row_dict(self, row_dict:Dict):
 
         self.interim_id = row_dict.get('interim_id')
@@ -726,7 +810,9 @@ class fsmInterim(object):
         self.interim_summary_text = row_dict.get('interim_summary_text')
 
 
-class fsmInterimReview(object):
+class fsmInterimReview(TrackedObject):
+
+    INDEXED_ATTRIBUTES = ('interim_id', 'install_id')
 
     def __init__(self):
         self.interim_review_id: int = 1
@@ -747,6 +833,17 @@ class fsmInterimReview(object):
         self.pl_complete: bool = False
         self.pl_comment: str = ''        
 
+    def to_database_row(self) -> tuple:
+        return (int(self.interim_review_id), int(self.interim_id), self.install_id,
+                int(self.dr_data_covered), int(
+                    self.dr_ignore_missing), self.dr_reason_missing,
+                self.dr_identifier, int(
+                    self.cr_complete), self.cr_comment,
+                int(self.ser_complete), self.ser_comment,
+                int(self.fm_complete), self.fm_comment,
+                int(self.rg_complete), self.rg_comment,
+                int(self.pl_complete), self.pl_comment)
+
     def from_database_row_dict(self, row_dict:Dict):
 
         self.interim_review_id = row_dict.get('interim_review_id')
@@ -768,7 +865,7 @@ class fsmInterimReview(object):
         self.pl_comment = row_dict.get('pl_comment')
 
 
-class fsmInstallPictures(object):
+class fsmInstallPictures(TrackedObject):
 
     def __init__(self):
         self.picture_id: int
@@ -779,6 +876,10 @@ class fsmInstallPictures(object):
         self.picture_comment: str = ''
         self.picture: Optional[bytes] = None
 
+    def to_database_row(self) -> tuple:
+        return (int(self.picture_id), self.install_id, self.picture_taken_date.isoformat(),
+                self.picture_type, self.picture_comment, self.picture)
+
     def from_database_row_dict(self, row_dict:Dict):
 
         self.picture_id = row_dict.get('picture_id')
@@ -794,13 +895,16 @@ class fsmInstallPictures(object):
             self.picture = row_dict["picture"]
 
 
-class fsmStormEvent(object):
+class fsmStormEvent(TrackedObject):
 
     def __init__(self):
         self.storm_event_id: str = ''
         self.se_start: datetime = datetime.strptime('2172-05-12', '%Y-%m-%d')
         self.se_end: datetime = datetime.strptime('2172-05-12', '%Y-%m-%d')
 
+    def to_database_row(self) -> tuple:
+        return (self.storm_event_id, self.se_start.isoformat(), self.se_end.isoformat())
+
     def from_database_row_dict(self, row_dict:Dict):
 
         self.storm_event_id = row_dict.get('storm_event_id')
@@ -829,8 +933,17 @@ class fsmProject(object):
         self.dict_fsm_interim_reviews: Dict[int, fsmInterimReview] = {}
         self.dict_fsm_stormevents: Dict[str, fsmStormEvent] = {}
         self.dict_fsm_install_pictures: Dict[int, fsmInstallPictures] = {}
+        # Secondary indexes over the installs, raw data and interim reviews, built on first use.  Code that
+        # writes to those dicts other than through the add and delete methods must call invalidate_indexes().
+        self._indexes_valid: bool = False
+        self._installs_by_site: Dict[str, List[fsmInstall]] = {}
+        self._installs_by_monitor: Dict[str, List[fsmInstall]] = {}
+        self._rawdata_by_install: Dict[str, fsmRawData] = {}
+        self._reviews_by_interim: Dict[int, Dict[int, fsmInterimReview]] = {}
+        self._review_by_interim_install: Dict[Tuple[int, str], fsmInterimReview] = {}
 
     def read_from_database(self, conn: sqlite3.Connection):
+        self.invalidate_indexes()
         c = conn.cursor()
         try:
             c.execute(f"SELECT * FROM {Tables.FSM_PROJECT}")
@@ -857,6 +970,7 @@ class fsmProject(object):
             row_dict = dict(zip(column_names, row))            
             site = fsmSite()
             site.from_database_row_dict(row_dict)
+            site.mark_clean()
             self.dict_fsm_sites[site.siteID] = site
 
         try:
@@ -871,34 +985,39 @@ class fsmProject(object):
             row_dict = dict(zip(column_names, row))                
             mon = fsmMonitor()
             mon.from_database_row_dict(row_dict)
+            mon.mark_clean()
             self.dict_fsm_monitors[mon.monitor_asset_id] = mon
 
+        # Install and raw data payloads stay in the database until they are first used
+        database = database_file(conn)
         try:
-            c.execute(f"SELECT * FROM {Tables.FSM_INSTALL}")
+            rows, deferred = read_rows_deferring(conn, Tables.FSM_INSTALL, fsmInstall.DEFERRED_COLUMNS)
         except sqlite3.OperationalError as e:
             print(f"Table '{Tables.FSM_INSTALL}' does not exist.")
             return  # Return without attempting to fetch rows
 
-        rows = c.fetchall()
-        for row in rows:
-            column_names = [description[0] for description in c.description]
-            row_dict = dict(zip(column_names, row))
+        for row_dict in rows:
             inst = fsmInstall()
             inst.from_database_row_dict(row_dict)
+            for column in deferred:
+                getattr(fsmInstall, column).set_loader(inst, column_loader(
+                    database, Tables.FSM_INSTALL, 'install_id', inst.install_id, column, deserialize_item))
+            inst.mark_clean()
             self.dict_fsm_installs[inst.install_id] = inst
 
         try:
-            c.execute(f"SELECT * FROM {Tables.FSM_RAWDATA}")
+            rows, deferred = read_rows_deferring(conn, Tables.FSM_RAWDATA, fsmRawData.DEFERRED_COLUMNS)
         except sqlite3.OperationalError as e:
             print(f"Table '{Tables.FSM_RAWDATA}' does not exist.")
             return  # Return without attempting to fetch rows
 
-        rows = c.fetchall()
-        for row in rows:
-            column_names = [description[0] for description in c.description]
-            row_dict = dict(zip(column_names, row))
+        for row_dict in rows:
             rawdata = fsmRawData()
             rawdata.from_database_row_dict(row_dict)
+            for column in deferred:
+                getattr(fsmRawData, column).set_loader(rawdata, column_loader(
+                    database, Tables.FSM_RAWDATA, 'rawdata_id', rawdata.rawdata_id, column, deserialize_item))
+            rawdata.mark_clean()
             self.dict_fsm_rawdata[rawdata.rawdata_id] = rawdata
 
         try:
@@ -913,6 +1032,7 @@ class fsmProject(object):
             row_dict = dict(zip(column_names, row))                
             interim = fsmInterim()
             interim.from_database_row_dict(row_dict)
+            interim.mark_clean()
             self.dict_fsm_interims[interim.interim_id] = interim
 
         try:
@@ -927,6 +1047,7 @@ class fsmProject(object):
             row_dict = dict(zip(column_names, row))               
             interim_rev = fsmInterimReview()
             interim_rev.from_database_row_dict(row_dict)
+            interim_rev.mark_clean()
             self.dict_fsm_interim_reviews[interim_rev.interim_review_id] = interim_rev
 
         try:
@@ -941,6 +1062,7 @@ class fsmProject(object):
             row_dict = dict(zip(column_names, row))                
             storm_event = fsmStormEvent()
             storm_event.from_database_row_dict(row_dict)
+            storm_event.mark_clean()
             self.dict_fsm_stormevents[storm_event.storm_event_id] = storm_event
 
         try:
@@ -955,6 +1077,7 @@ class fsmProject(object):
             row_dict = dict(zip(column_names, row))            
             insp = fsmInspection()
             insp.from_database_row_dict(row_dict)
+            insp.mark_clean()
             self.dict_fsm_inspections[insp.inspection_id] = insp
 
         try:
@@ -969,6 +1092,7 @@ class fsmProject(object):
             row_dict = dict(zip(column_names, row))
             inst_pic = fsmInstallPictures()
             inst_pic.from_database_row_dict(row_dict)
+            inst_pic.mark_clean()
             self.dict_fsm_install_pictures[inst_pic.picture_id] = inst_pic
 
     def from_database_row_dict(self, row_dict:Dict):
@@ -983,23 +1107,16 @@ class fsmProject(object):
             self.survey_end_date = datetime.fromisoformat(row_dict['survey_end_date'])
         self.survey_complete = bool(row_dict.get('survey_complete'))
 
+    def to_database_row(self) -> tuple:
+        return (self.job_number, self.job_name, self.client, self.client_job_ref,
+                self.survey_start_date.isoformat(), self.survey_end_date.isoformat(), self.survey_complete)
+
     def write_to_database(self, conn: sqlite3.Connection) -> bool:
+        """Writes added and changed project records and deletes removed ones, within the caller's transaction."""
         result = False
 
         try:
-            # Drop existing tables to clear old data
-            conn.execute(f"DROP TABLE IF EXISTS {Tables.FSM_PROJECT}")
-            conn.execute(f"DROP TABLE IF EXISTS {Tables.FSM_SITE}")
-            conn.execute(f"DROP TABLE IF EXISTS {Tables.FSM_MONITOR}")
-            conn.execute(f"DROP TABLE IF EXISTS {Tables.FSM_INSTALL}")
-            conn.execute(f"DROP TABLE IF EXISTS {Tables.FSM_INTERIM}")
-            conn.execute(f"DROP TABLE IF EXISTS {Tables.FSM_INTERIM_REVIEW}")
-            conn.execute(f"DROP TABLE IF EXISTS {Tables.FSM_STORMEVENTS}")
-            conn.execute(f"DROP TABLE IF EXISTS {Tables.FSM_INSPECTIONS}")
-            conn.execute(f"DROP TABLE IF EXISTS {Tables.FSM_INSTALLPICTURES}")
-            conn.execute(f"DROP TABLE IF EXISTS {Tables.FSM_RAWDATA}")
-
-            conn.execute(f'''CREATE TABLE IF NOT EXISTS {Tables.FSM_PROJECT} (
+            write_changed_rows(conn, Tables.FSM_PROJECT, f'''CREATE TABLE IF NOT EXISTS {Tables.FSM_PROJECT} (
                             job_number TEXT PRIMARY KEY,
                             job_name TEXT,
                             client TEXT,
@@ -1007,12 +1124,12 @@ class fsmProject(object):
                             survey_start_date TEXT,
                             survey_end_date TEXT,
                             survey_complete INTEGER
-                        )''')
-            conn.execute(f'''INSERT OR REPLACE INTO {Tables.FSM_PROJECT} VALUES (?, ?, ?, ?, ?, ?, ?)''',
-                         (self.job_number, self.job_name, self.client, self.client_job_ref,
-                          self.survey_start_date.isoformat(), self.survey_end_date.isoformat(), self.survey_complete))
-            
-            conn.execute(f'''CREATE TABLE IF NOT EXISTS {Tables.FSM_SITE} (
+                        )''',
+                               [self],
+                               lambda project: (project.job_number,),
+                               fsmProject.to_database_row)
+
+            write_changed_rows(conn, Tables.FSM_SITE, f'''CREATE TABLE IF NOT EXISTS {Tables.FSM_SITE} (
                             siteID TEXT PRIMARY KEY,
                             siteType TEXT,
                             address TEXT,
@@ -1020,22 +1137,22 @@ class fsmProject(object):
                             w3w TEXT,
                             easting REAL,
                             northing REAL
-                        )''')
-            for site in self.dict_fsm_sites.values():
-                conn.execute(f'''INSERT OR REPLACE INTO {Tables.FSM_SITE} VALUES (?, ?, ?, ?, ?, ?, ?)''',
-                             (site.siteID, site.siteType, site.address, site.mh_ref, site.w3w, site.easting, site.northing))
+                        )''',
+                               self.dict_fsm_sites.values(),
+                               lambda site: (site.siteID,),
+                               fsmSite.to_database_row)
 
-            conn.execute(f'''CREATE TABLE IF NOT EXISTS {Tables.FSM_MONITOR} (
+            write_changed_rows(conn, Tables.FSM_MONITOR, f'''CREATE TABLE IF NOT EXISTS {Tables.FSM_MONITOR} (
                             monitor_asset_id TEXT PRIMARY KEY,
                             monitor_type TEXT,
                             pmac_id TEXT,
                             monitor_sub_type TEXT
-                        )''')
-            for mon in self.dict_fsm_monitors.values():
-                conn.execute(f'''INSERT OR REPLACE INTO {Tables.FSM_MONITOR} VALUES (?, ?, ?, ?)''',
-                             (mon.monitor_asset_id, mon.monitor_type, mon.pmac_id, mon.monitor_sub_type))
+                        )''',
+                               self.dict_fsm_monitors.values(),
+                               lambda mon: (mon.monitor_asset_id,),
+                               fsmMonitor.to_database_row)
 
-            conn.execute(f'''CREATE TABLE IF NOT EXISTS {Tables.FSM_INSTALL} (
+            write_changed_rows(conn, Tables.FSM_INSTALL, f'''CREATE TABLE IF NOT EXISTS {Tables.FSM_INSTALL} (
                             install_id TEXT PRIMARY KEY,
                             install_site_id TEXT,
                             install_monitor_asset_id TEXT,
@@ -1061,25 +1178,12 @@ class fsmProject(object):
                             class_data_ml_date_updated TEXT,
                             class_data_user BLOB,
                             class_data_user_date_updated TEXT
-                        )''')
-            for inst in self.dict_fsm_installs.values():
-                conn.execute(f'''INSERT OR REPLACE INTO {Tables.FSM_INSTALL} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                             (inst.install_id,  inst.install_site_id, inst.install_monitor_asset_id, inst.install_type,
-                              inst.client_ref, inst.install_date.isoformat(
-                              ), inst.remove_date.isoformat(), inst.fm_pipe_letter,
-                              inst.fm_pipe_shape, int(inst.fm_pipe_height_mm), int(
-                                  inst.fm_pipe_width_mm),
-                              int(inst.fm_pipe_depth_to_invert_mm), int(
-                                  inst.fm_sensor_offset_mm), inst.rg_position,
-                              pickle.dumps(inst.data), inst.data_start.isoformat(
-                              ), inst.data_end.isoformat(),
-                              inst.data_interval, inst.data_date_updated.isoformat(
-                              ), inst.install_sheet, inst.install_sheet_filename,
-                              pickle.dumps(
-                                  inst.class_data_ml), inst.class_data_ml_date_updated.isoformat(),
-                              pickle.dumps(inst.class_data_user), inst.class_data_user_date_updated.isoformat()))
-
-            conn.execute(f'''CREATE TABLE IF NOT EXISTS {Tables.FSM_INTERIM} (
+                        )''',
+                               self.dict_fsm_installs.values(),
+                               lambda inst: (inst.install_id,),
+                               fsmInstall.to_database_row)
+
+            write_changed_rows(conn, Tables.FSM_INTERIM, f'''CREATE TABLE IF NOT EXISTS {Tables.FSM_INTERIM} (
                             interim_id INTEGER PRIMARY KEY,
                             interim_start_date TEXT,
                             interim_end_date TEXT,
@@ -1092,19 +1196,12 @@ class fsmProject(object):
                             report_complete INTEGER,
                             identify_events_complete INTEGER,
                             interim_summary_text TEXT
-                        )''')
-            for a_int in self.dict_fsm_interims.values():
-                conn.execute(f'''INSERT OR REPLACE INTO {Tables.FSM_INTERIM} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                             (a_int.interim_id, a_int.interim_start_date.isoformat(), a_int.interim_end_date.isoformat(),
-                              int(a_int.data_import_complete), int(
-                                  a_int.site_inspection_review_complete),
-                              int(a_int.fm_data_review_complete), int(
-                                  a_int.rg_data_review_complete), int(a_int.pl_data_review_complete),
-                              int(a_int.data_classification_complete), int(
-                                  a_int.report_complete), int(a_int.identify_events_complete),
-                              a_int.interim_summary_text))
-
-            conn.execute(f'''CREATE TABLE IF NOT EXISTS {Tables.FSM_INTERIM_REVIEW} (
+                        )''',
+                               self.dict_fsm_interims.values(),
+                               lambda a_int: (a_int.interim_id,),
+                               fsmInterim.to_database_row)
+
+            write_changed_rows(conn, Tables.FSM_INTERIM_REVIEW, f'''CREATE TABLE IF NOT EXISTS {Tables.FSM_INTERIM_REVIEW} (
                             interim_review_id INTEGER PRIMARY KEY,
                             interim_id INTEGER,
                             install_id TEXT,
@@ -1122,57 +1219,45 @@ class fsmProject(object):
                             rg_comment TEXT,
                             pl_complete INTEGER,
                             pl_comment TEXT                         
-                         )''')
-            for a_int_rev in self.dict_fsm_interim_reviews.values():
-                conn.execute(f'''INSERT OR REPLACE INTO {Tables.FSM_INTERIM_REVIEW} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                             (int(a_int_rev.interim_review_id), int(a_int_rev.interim_id), a_int_rev.install_id,
-                              int(a_int_rev.dr_data_covered), int(
-                                  a_int_rev.dr_ignore_missing), a_int_rev.dr_reason_missing,
-                              a_int_rev.dr_identifier, int(
-                                  a_int_rev.cr_complete), a_int_rev.cr_comment,
-                              int(a_int_rev.ser_complete), a_int_rev.ser_comment,
-                              int(a_int_rev.fm_complete), a_int_rev.fm_comment,
-                              int(a_int_rev.rg_complete), a_int_rev.rg_comment,
-                              int(a_int_rev.pl_complete), a_int_rev.pl_comment))
-
-            conn.execute(f'''CREATE TABLE IF NOT EXISTS {Tables.FSM_STORMEVENTS} (
+                         )''',
+                               self.dict_fsm_interim_reviews.values(),
+                               lambda a_int_rev: (int(a_int_rev.interim_review_id),),
+                               fsmInterimReview.to_database_row)
+
+            write_changed_rows(conn, Tables.FSM_STORMEVENTS, f'''CREATE TABLE IF NOT EXISTS {Tables.FSM_STORMEVENTS} (
                             storm_event_id TEXT PRIMARY KEY,
                             se_start TEXT,
                             se_end TEXT
-                         )''')
-            for a_se in self.dict_fsm_stormevents.values():
-                conn.execute(f'''INSERT OR REPLACE INTO {Tables.FSM_STORMEVENTS} VALUES (?, ?, ?)''',
-                             (a_se.storm_event_id, a_se.se_start.isoformat(), a_se.se_end.isoformat()))
+                         )''',
+                               self.dict_fsm_stormevents.values(),
+                               lambda a_se: (a_se.storm_event_id,),
+                               fsmStormEvent.to_database_row)
 
-            conn.execute(f'''CREATE TABLE IF NOT EXISTS {Tables.FSM_INSPECTIONS} (
+            write_changed_rows(conn, Tables.FSM_INSPECTIONS, f'''CREATE TABLE IF NOT EXISTS {Tables.FSM_INSPECTIONS} (
                             inspection_id INTEGER PRIMARY KEY,
                             install_id TEXT,
                             inspection_date TEXT,
                             inspection_sheet BLOB,
                             inspection_sheet_filename TEXT,
                             inspection_type TEXT
-                        )''')
-
-            for insp in self.dict_fsm_inspections.values():
-                conn.execute(f'''INSERT OR REPLACE INTO {Tables.FSM_INSPECTIONS} VALUES (?, ?, ?, ?, ?, ?)''',
-                             (int(insp.inspection_id), insp.install_id, insp.inspection_date.isoformat(),
-                              insp.inspection_sheet, insp.inspection_sheet_filename, insp.inspection_type))
+                        )''',
+                               self.dict_fsm_inspections.values(),
+                               lambda insp: (int(insp.inspection_id),),
+                               fsmInspection.to_database_row)
 
-            conn.execute(f'''CREATE TABLE IF NOT EXISTS {Tables.FSM_INSTALLPICTURES} (
+            write_changed_rows(conn, Tables.FSM_INSTALLPICTURES, f'''CREATE TABLE IF NOT EXISTS {Tables.FSM_INSTALLPICTURES} (
                             picture_id INTEGER PRIMARY KEY,
                             install_id TEXT,
                             picture_taken_date TEXT,
                             picture_type TEXT,
                             picture_comment TEXT,
                             picture BLOB
-                        )''')
-            for in_pic in self.dict_fsm_install_pictures.values():
-                conn.execute(f'''INSERT OR REPLACE INTO {Tables.FSM_INSTALLPICTURES} VALUES (?, ?, ?, ?, ?, ?)''',
-                             (int(in_pic.picture_id), in_pic.install_id, in_pic.picture_taken_date.isoformat(),
-                              in_pic.picture_type, in_pic.picture_comment, in_pic.picture))
-
-            conn.execute(
-                f"""CREATE TABLE IF NOT EXISTS {Tables.FSM_RAWDATA} (
+                        )''',
+                               self.dict_fsm_install_pictures.values(),
+                               lambda in_pic: (int(in_pic.picture_id),),
+                               fsmInstallPictures.to_database_row)
+
+            write_changed_rows(conn, Tables.FSM_RAWDATA, f"""CREATE TABLE IF NOT EXISTS {Tables.FSM_RAWDATA} (
                             rawdata_id INTEGER PRIMARY KEY,
                             install_id TEXT,
                             rg_tb_depth REAL,
@@ -1209,52 +1294,10 @@ class fsmProject(object):
                             velocity_file_format TEXT,
                             battery_file_format TEXT,
                             pumplogger_file_format TEXT
-                        )"""
-            )
-
-            for rawdata in self.dict_fsm_rawdata.values():
-                conn.execute(
-                    f"""INSERT OR REPLACE INTO {Tables.FSM_RAWDATA} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                    (
-                        int(rawdata.rawdata_id),
-                        rawdata.install_id,
-                        float(rawdata.rg_tb_depth),
-                        pickle.dumps(rawdata.rg_data),
-                        rawdata.rg_data_start.isoformat(),
-                        rawdata.rg_data_end.isoformat(),
-                        pickle.dumps(rawdata.rg_timing_corr),
-                        pickle.dumps(rawdata.dep_data),
-                        rawdata.dep_data_start.isoformat(),
-                        rawdata.dep_data_end.isoformat(),
-                        pickle.dumps(rawdata.dep_corr),
-                        pickle.dumps(rawdata.vel_data),
-                        rawdata.vel_data_start.isoformat(),
-                        rawdata.vel_data_end.isoformat(),
-                        pickle.dumps(rawdata.vel_corr),
-                        pickle.dumps(rawdata.dv_timing_corr),
-                        pickle.dumps(rawdata.bat_data),
-                        rawdata.bat_data_start.isoformat(),
-                        rawdata.bat_data_end.isoformat(),
-                        pickle.dumps(rawdata.pl_data),
-                        rawdata.pl_data_start.isoformat(),
-                        rawdata.pl_data_end.isoformat(),
-                        pickle.dumps(rawdata.pl_timing_corr),
-                        pickle.dumps(rawdata.pl_added_onoffs),
-                        rawdata.pipe_shape,
-                        int(rawdata.pipe_width),
-                        int(rawdata.pipe_height),
-                        pickle.dumps(rawdata.pipe_shape_def),
-                        pickle.dumps(rawdata.silt_levels),
-                        int(rawdata.pipe_shape_intervals),
-                        rawdata.file_path,
-                        rawdata.rainfall_file_format,
-                        rawdata.depth_file_format,
-                        rawdata.velocity_file_format,
-                        rawdata.battery_file_format,
-                        rawdata.pumplogger_file_format,
-                    ),
-                )
-            conn.commit()
+                        )""",
+                               self.dict_fsm_rawdata.values(),
+                               lambda rawdata: (int(rawdata.rawdata_id),),
+                               fsmRawData.to_database_row)
 
             result = True
             logger.debug("fsmProject.write_to_database Completed")
@@ -1264,16 +1307,77 @@ class fsmProject(object):
             msg = QMessageBox()
             msg.critical(None, 'Save Project',
                          f"Database error: {e}", QMessageBox.Ok)
-            conn.rollback()
         except Exception as e:
             msg = QMessageBox()
             msg.critical(None, 'Save Project',
                          f"Exception in _query: {e}", QMessageBox.Ok)
             print(f"Exception in _query: {e}")
-            conn.rollback()
         finally:
             return result
 
+    def mark_saved(self):
+        for records in (self.dict_fsm_sites, self.dict_fsm_monitors, self.dict_fsm_installs, self.dict_fsm_rawdata,
+                        self.dict_fsm_inspections, self.dict_fsm_interims, self.dict_fsm_interim_reviews,
+                        self.dict_fsm_stormevents, self.dict_fsm_install_pictures):
+            for record in records.values():
+                record.mark_clean()
+
+    def __getstate__(self):
+        # Unpickled installs, raw data and reviews do not know their project, so a copy rebuilds its indexes
+        state = self.__dict__.copy()
+        state['_indexes_valid'] = False
+        return state
+
+    def invalidate_indexes(self):
+        self._indexes_valid = False
+
+    def _ensure_indexes(self):
+        """
+        Rebuilds the secondary indexes if they may be out of date.  The add and delete methods keep
+        them current; indexed objects invalidate them when a key attribute is reassigned.
+        """
+        if self._indexes_valid:
+            return
+
+        self._installs_by_site = {}
+        self._installs_by_monitor = {}
+        self._rawdata_by_install = {}
+        self._reviews_by_interim = {}
+        self._review_by_interim_install = {}
+        for inst in self.dict_fsm_installs.values():
+            self._index_install(inst)
+        for raw in self.dict_fsm_rawdata.values():
+            self._index_rawdata(raw)
+        for int_rev in self.dict_fsm_interim_reviews.values():
+            self._index_interim_review(int_rev)
+        self._indexes_valid = True
+
+    def _index_install(self, inst: fsmInstall):
+        # Appended in dict_fsm_installs order, so lookups return the same install as a scan of the dict
+        inst.set_index_owner(self)
+        for index, key in ((self._installs_by_site, inst.install_site_id),
+                           (self._installs_by_monitor, inst.install_monitor_asset_id)):
+            index.setdefault(key, []).append(inst)
+
+    def _index_rawdata(self, raw: fsmRawData):
+        raw.set_index_owner(self)
+        self._rawdata_by_install.setdefault(raw.install_id, raw)
+
+    def _index_interim_review(self, int_rev: fsmInterimReview):
+        int_rev.set_index_owner(self)
+        self._reviews_by_interim.setdefault(int_rev.interim_id, {})[int_rev.interim_review_id] = int_rev
+        self._review_by_interim_install.setdefault((int_rev.interim_id, int_rev.install_id), int_rev)
+
+    def installs_by_site(self, site_id: str) -> List[fsmInstall]:
+        """Returns the installs at site_id, in the order they were added to the project."""
+        self._ensure_indexes()
+        return list(self._installs_by_site.get(site_id, []))
+
+    def installs_by_monitor(self, monitor_id: str) -> List[fsmInstall]:
+        """Returns the installs of monitor_id, in the order they were added to the project."""
+        self._ensure_indexes()
+        return list(self._installs_by_monitor.get(monitor_id, []))
+
     def add_site(self, objSite: fsmSite) -> bool:
 
         if objSite.siteID not in self.dict_fsm_sites:
@@ -1312,6 +1416,8 @@ class fsmProject(object):
 
         if objInstall.install_id not in self.dict_fsm_installs:
             self.dict_fsm_installs[objInstall.install_id] = objInstall
+            if self._indexes_valid:
+                self._index_install(objInstall)
             return True
         return False
 
@@ -1327,6 +1433,7 @@ class fsmProject(object):
             self.delete_install_pictures_by_install_id(install_id)
             self.delete_interim_reviews_by_install_id(install_id)
             del self.dict_fsm_installs[install_id]
+            self.invalidate_indexes()
             return True
         return False
 
@@ -1362,16 +1469,15 @@ class fsmProject(object):
         # Delete collected keys
         for key in keys_to_delete:
             del self.dict_fsm_interim_reviews[key]
+        self.invalidate_indexes()
 
     def delete_interim_reviews_by_interim_id(self, interim_id: str):
         # Collect keys to delete
-        keys_to_delete = []
-        for interim_review_id, interim_review in self.dict_fsm_interim_reviews.items():
-            if interim_review.interim_id == interim_id:
-                keys_to_delete.append(interim_review_id)
+        keys_to_delete = list(self.filter_interim_reviews_by_interim_id(interim_id))
         # Delete collected keys
         for key in keys_to_delete:
             del self.dict_fsm_interim_reviews[key]
+        self.invalidate_indexes()
 
     def delete_interim(self, interim_id: str) -> bool:
         """Remove an interim record by its ID."""
@@ -1403,27 +1509,25 @@ class fsmProject(object):
             return 1
 
     def get_install_by_monitor(self, monitor_id: str) -> Optional[fsmInstall]:
-        for install in self.dict_fsm_installs.values():
-            if install.install_monitor_asset_id == monitor_id:
-                return install
+        installs = self.installs_by_monitor(monitor_id)
+        if installs:
+            return installs[0]
 
     def get_current_install_by_monitor(self, monitor_id: str) -> Optional[fsmInstall]:
-        for install in self.dict_fsm_installs.values():
-            if install.install_monitor_asset_id == monitor_id:
-                if install.install_date > install.remove_date:
-                    return installl
+        for install in self.installs_by_monitor(monitor_id):
+            if install.install_date > install.remove_date:
+                return install
 
     def get_install_by_site(self, site_id: str) -> Optional[fsmInstall]:
-        for install in self.dict_fsm_installs.values():
-            if install.install_site_id == site_id:
-                return install
+        installs = self.installs_by_site(site_id)
+        if installs:
+            return installs[0]
 
     def get_current_install_by_site(self, site_id: str) -> Optional[fsmInstall]:
 
-        for install in self.dict_fsm_installs.values():
-            if install.install_site_id == site_id:
-                if install.install_date > install.remove_date:
-                    return install
+        for install in self.installs_by_site(site_id):
+            if install.install_date > install.remove_date:
+                return install
 
     def add_interim(self, objInt: fsmInterim) -> bool:
 
@@ -1461,9 +1565,8 @@ class fsmProject(object):
             return self.dict_fsm_interim_reviews.get(interim_review_id)
         elif interim_id is not None and install_id is not None:
             # Case 2: interim_id and site_id are provided
-            for a_int_rev in self.dict_fsm_interim_reviews.values():
-                if a_int_rev.interim_id == interim_id and a_int_rev.install_id == install_id:
-                    return a_int_rev
+            self._ensure_indexes()
+            return self._review_by_interim_install.get((interim_id, install_id))
         return None
 
     def get_next_interim_review_id(self):
@@ -1537,24 +1640,25 @@ class fsmProject(object):
         class_list = []
         a_int = self.dict_fsm_interims[interim_id]
         a_inst = self.dict_fsm_installs[install_id]
+
+        def classifications_by_day(class_data: Optional[pd.DataFrame]) -> dict:
+            if class_data is None:
+                return {}
+            # Reversed so the first classification on each day is the one kept
+            return dict(zip(reversed(class_data['Date'].dt.date.tolist()),
+                            reversed(class_data['Classification'].tolist())))
+
+        user_classes = classifications_by_day(a_inst.class_data_user)
+        ml_classes = classifications_by_day(a_inst.class_data_ml)
         current_date = a_int.interim_start_date
         while current_date < a_int.interim_end_date:
-            if a_inst.class_data_user is not None:
-                df_class = a_inst.class_data_user.loc[a_inst.class_data_user['Date'].dt.date == current_date.date(
-                ), 'Classification']
-            else:
-                df_class = pd.DataFrame(
-                    columns=['Date', 'Classification', 'Confidence'])
-            if not df_class.empty:
-                class_list.append(df_class.values[0])
+            current_day = current_date.date()
+            if current_day in user_classes:
+                class_list.append(user_classes[current_day])
+            elif current_day in ml_classes:
+                class_list.append(ml_classes[current_day])
             else:
-                if a_inst.class_data_ml is not None:
-                    df_class = a_inst.class_data_ml.loc[a_inst.class_data_ml['Date'].dt.date == current_date.date(
-                    ), 'Classification']
-                if not df_class.empty:
-                    class_list.append(df_class.values[0])
-                else:
-                    class_list.append('')
+                class_list.append('')
             current_date += timedelta(days=1)
 
         return class_list
@@ -1610,12 +1714,12 @@ class fsmProject(object):
 
     def get_interim_monitor_comment(self, interim_id: int, install_id: str, mon_type: str = 'Flow Monitor') -> str:
 
-        for ir in self.dict_fsm_interim_reviews.values():
-            if ir.interim_id == interim_id and ir.install_id == install_id:
-                if mon_type == 'Rain Gauge':
-                    return ir.rg_comment
-                else:
-                    return ir.fm_comment
+        ir = self.get_interim_review(interim_id=interim_id, install_id=install_id)
+        if ir is not None:
+            if mon_type == 'Rain Gauge':
+                return ir.rg_comment
+            else:
+                return ir.fm_comment
 
     def get_next_install_picture_id(self) -> int:
         if self.dict_fsm_install_pictures:
@@ -1624,29 +1728,30 @@ class fsmProject(object):
             return 1
 
     def filter_interim_reviews_by_interim_id(self, interim_id: int) -> Dict[int, fsmInterimReview]:
-        return {key: review for key, review in self.dict_fsm_interim_reviews.items() if review.interim_id == interim_id}
+        self._ensure_indexes()
+        return dict(self._reviews_by_interim.get(interim_id, {}))
 
     def add_interim_review(self, objIntRev: fsmInterimReview) -> bool:
 
         if objIntRev.interim_review_id not in self.dict_fsm_interim_reviews:
             self.dict_fsm_interim_reviews[objIntRev.interim_review_id] = objIntRev
+            if self._indexes_valid:
+                self._index_interim_review(objIntRev)
             return True
         return False
 
     def site_has_install(self, site_id: str) -> bool:
 
-        for key, inst in self.dict_fsm_installs.items():
-            if inst.install_site_id == site_id:
-                if inst.remove_date < inst.install_date:
-                    return True
+        for inst in self.installs_by_site(site_id):
+            if inst.remove_date < inst.install_date:
+                return True
         return False
 
     def monitor_is_installed(self, mon_id: str) -> bool:
 
-        for key, inst in self.dict_fsm_installs.items():
-            if inst.install_monitor_asset_id == mon_id:
-                if inst.remove_date < inst.install_date:
-                    return True
+        for inst in self.installs_by_monitor(mon_id):
+            if inst.remove_date < inst.install_date:
+                return True
         return False
 
     def uninstalled(self, inst_id: str) -> bool:
@@ -1655,9 +1760,8 @@ class fsmProject(object):
 
     def get_raw_data_by_install(self, inst_id: str) -> Optional[fsmRawData]:
 
-        for raw in self.dict_fsm_rawdata.values():
-            if raw.install_id == inst_id:
-                return raw
+        self._ensure_indexes()
+        return self._rawdata_by_install.get(inst_id)
 
     def get_next_rawdata_id(self) -> int:
         if self.dict_fsm_rawdata:
@@ -1669,10 +1773,35 @@ class fsmProject(object):
 
         if objRaw.rawdata_id not in self.dict_fsm_rawdata:
             self.dict_fsm_rawdata[objRaw.rawdata_id] = objRaw
+            if self._indexes_valid:
+                self._index_rawdata(objRaw)
             return True
         return False
 
 
+classifier_model_cache: Dict[tuple, object] = {}
+
+
+def load_classifier_model(model_path: str):
+    """
+    Loads a classifier model once per process, keyed by path and modification time so that a
+    replaced model file is picked up.  CatBoost models (.cbm) are loaded with CatBoostClassifier,
+    all others with joblib.
+    """
+    cache_key = (model_path, os.path.getmtime(model_path))
+    model = classifier_model_cache.get(cache_key)
+    if model is None:
+        if model_path.endswith('.cbm'):
+            model = CatBoostClassifier()
+            model.load_model(model_path)
+        else:
+            model = joblib.load(model_path)
+        for stale_key in [key for key in classifier_model_cache if key[0] == model_path]:
+            del classifier_model_cache[stale_key]
+        classifier_model_cache[cache_key] = model
+    return model
+
+
 class fsmDataClassification(object):
 
     # INPUTS: provide data for one sensor
@@ -1685,161 +1814,191 @@ class fsmDataClassification(object):
         self.FM_MODEL_PATH = resource_path(
             "resources\\classifier\\models\\FM_model.cbm")
 
-    def run_classification(self, aInst: fsmInstall):
-
-        results_list = []
-
-        current_date = aInst.data_start
-        while current_date <= aInst.data_end:
-            features = pd.DataFrame()
-            data = aInst.data[(aInst.data['Date'] >= current_date) & (
-                aInst.data['Date'] < current_date + timedelta(days=1))]
-
-            if aInst.install_type == 'Depth Monitor':
-
-                # data = self.read_data(self.RAW_DATA_PATH, self.DATE)
-
-                features = pd.DataFrame(columns=['depth_entropy'])
-                features.loc[0, f'depth_entropy'] = entropy(data['DepthData'])
-                with pd.option_context("future.no_silent_downcasting", True):
-                    features.fillna(0, inplace=True)
-                with pd.option_context("future.no_silent_downcasting", True):
-                    features.replace([np.inf, -np.inf], 1000000, inplace=True)
-
-                model = joblib.load(self.DM_MODEL_PATH)
+    def get_day_index(self, aInst: fsmInstall) -> Tuple[pd.DataFrame, pd.Series, int]:
+        """
+        Numbers the consecutive 24 hour windows starting at data_start, one per day up to data_end.
+        Returns the install data that falls in a window, the window number of each of its rows and
+        the number of windows.
+        """
+        data_start = pd.Timestamp(aInst.data_start)
+        no_of_days = max((pd.Timestamp(aInst.data_end) - data_start) // pd.Timedelta(days=1) + 1, 0)
 
-            elif aInst.install_type == "Flow Monitor":
+        day_index = (aInst.data['Date'] - data_start) // pd.Timedelta(days=1)
+        in_range = (day_index >= 0) & (day_index < no_of_days)
+        return aInst.data[in_range], day_index[in_range], no_of_days
 
-                features = pd.DataFrame(columns=['month'])
-                features.loc[0, 'month'] = current_date.month
+    def get_daily_data(self, aInst: fsmInstall) -> List[pd.DataFrame]:
+        """Splits the install data into its 24 hour windows (see get_day_index).  Days without data are empty."""
+        data, day_index, no_of_days = self.get_day_index(aInst)
+        day_groups = dict(tuple(data.groupby(day_index)))
+        empty_day = aInst.data.iloc[:0]
 
-                try:
-                    area = int(aInst.fm_pipe_height_mm) * \
-                        int(aInst.fm_pipe_width_mm)
-                except:
-                    area = np.NaN
+        return [day_groups.get(i, empty_day) for i in range(no_of_days)]
 
-                features.loc[0, "area"] = area
-
-                features.loc[0, 'flow_entropy'] = entropy(data['FlowData'])
-                features.loc[0, 'depth_range'] = data['DepthData'].max(
-                ) - data['DepthData'].min()
-                features.loc[0, 'depth_skewness'] = data['DepthData'].skew()
-                features.loc[0, 'depth_entropy'] = entropy(data['DepthData'])
-                features.loc[0, 'velocity_iqr'] = data['VelocityData'].quantile(
-                    0.75) - data['VelocityData'].quantile(0.25)
-                features.loc[0, 'velocity_entropy'] = entropy(
-                    data['VelocityData'])
+    def daily_statistics(self, data: pd.DataFrame, day_index: pd.Series, no_of_days: int, column: str) -> pd.DataFrame:
+        """
+        Returns the min, max, mean, median, skew and 25th/75th percentiles of column for every day in one
+        groupby pass, one row per day.  Days without data are NaN.
+        """
+        grouped = data[column].groupby(day_index)
+        stats = grouped.agg(['min', 'max', 'mean', 'median', 'skew'])
+        quantiles = grouped.quantile([0.25, 0.75]).unstack()
+        stats['q25'] = quantiles[0.25]
+        stats['q75'] = quantiles[0.75]
+        return stats.reindex(pd.RangeIndex(no_of_days))
+
+    def daily_entropy(self, daily_data: List[pd.DataFrame], column: str) -> np.ndarray:
+        """
+        Returns the entropy of column for each day.  Days with the same number of samples share a single
+        entropy call over a (days x samples) array, as daily_frequencies does for the Welch PSD.
+        """
+        results = np.empty(len(daily_data))
+        days_by_length: Dict[int, List[int]] = {}
+        for i, data in enumerate(daily_data):
+            days_by_length.setdefault(data.shape[0], []).append(i)
 
-                try:
-                    frequencies, psd, psd_normalized, low_freq_power, medium_freq_power, high_freq_power, total_power = self.frequencies(
-                        data, 'FlowData')
-                    features.loc[0, 'flow_power_low_freq_ratio'] = low_freq_power / total_power
-                    features.loc[0, 'flow_power_medium_freq_ratio'] = medium_freq_power / total_power
-                except:
-                    features.loc[0, 'flow_power_low_freq_ratio'] = np.NaN
-                    features.loc[0, 'flow_power_medium_freq_ratio'] = np.NaN
+        for no_of_samples, days in days_by_length.items():
+            daily_values = np.stack([daily_data[i][column].to_numpy(dtype=float) for i in days]) \
+                if no_of_samples > 0 else np.zeros((len(days), 0))
+            results[days] = entropy(daily_values, axis=1)
 
-                try:
-                    frequencies, psd, psd_normalized, low_freq_power, medium_freq_power, high_freq_power, total_power = self.frequencies(
-                        data, 'DepthData')
-                    features.loc[0, 'depth_power_skewness'] = skew(psd)
-                    features.loc[0, 'depth_power_low_freq_ratio'] = low_freq_power / total_power
-                    features.loc[0, 'depth_power_high_freq_ratio'] = high_freq_power / total_power
-                except:
-                    features.loc[0, 'depth_power_skewness'] = np.NaN
-                    features.loc[0, 'depth_power_low_freq_ratio'] = np.NaN
-                    features.loc[0, 'depth_power_high_freq_ratio'] = np.NaN
+        return results
 
-                try:
-                    frequencies, psd, psd_normalized, low_freq_power, medium_freq_power, high_freq_power, total_power = self.frequencies(
-                        data, 'VelocityData')
-                    features.loc[0, 'velocity_dom_freq'] = frequencies[np.argmax(
-                        psd)]
-                    features.loc[0, 'velocity_shannon_entropy'] = - \
-                        np.sum(psd_normalized * np.log2(psd_normalized))
-                except:
-                    features.loc[0, 'velocity_dom_freq'] = np.NaN
-                    features.loc[0, 'velocity_shannon_entropy'] = np.NaN
-
-                features.loc[0, 'velocity_to_flow'] = data.VelocityData.mean(
-                ) / data.FlowData.mean()
-                features.loc[0, 'depth_to_flow'] = data.DepthData.mean(
-                ) / data.FlowData.mean()
-                features.loc[0, 'velocity_to_depth'] = data.VelocityData.mean(
-                ) / data.DepthData.mean()
-                features.loc[0, 'depth_to_depth'] = data.DepthData.mean(
-                ) / aInst.fm_pipe_depth_to_invert_mm
-                features.loc[0, 'depth_max_to_depth'] = data.DepthData.max(
-                ) / aInst.fm_pipe_depth_to_invert_mm
-                features.loc[0, 'depth_to_area'] = data.DepthData.mean() / area
-                features.loc[0, 'velocity_to_area'] = data.VelocityData.mean() / \
-                    area
-
-                features.loc[0, 'pipe_B'] = aInst.fm_pipe_letter == "B"
-                features.loc[0, 'pipe_D'] = aInst.fm_pipe_letter == "D"
-                features.loc[0, 'pipe_E'] = aInst.fm_pipe_letter == "E"
-                features.loc[0, 'pipe_Y'] = aInst.fm_pipe_letter == "Y"
-                features.loc[0, 'pipe_Z'] = aInst.fm_pipe_letter == "Z"
-
-                features.loc[0, 'shape_C'] = aInst.fm_pipe_shape == "Circular"
-
-                with pd.option_context("future.no_silent_downcasting", True):
-                    features.replace([np.inf, -np.inf], 1000000, inplace=True)
-
-                model = CatBoostClassifier()
-                model.load_model(self.FM_MODEL_PATH)
-
-            elif aInst.install_type == 'Rain Gauge':
-
-                features = pd.DataFrame(columns=['month'])
-                features.loc[0, 'month'] = current_date.month
-                features.loc[0, 'rain_median'] = data['IntensityData'].median()
-                features.loc[0, 'rain_skewness'] = data['IntensityData'].skew()
-                features.loc[0, 'rain_percentile_25'] = data['IntensityData'].quantile(
-                    0.25)
-                features.loc[0, 'rain_percentile_75'] = data['IntensityData'].quantile(
-                    0.75)
-                features.loc[0, 'rain_entropy'] = entropy(
-                    data['IntensityData'])
-                try:
-                    frequencies, psd, psd_normalized, low_freq_power, medium_freq_power, high_freq_power, \
-                        total_power = self.frequencies(data, 'IntensityData')
-
-                    features.loc[0,
-                                 'rain_dom_freq'] = frequencies[np.argmax(psd)]
-                    features.loc[0, 'rain_power_peak'] = np.max(psd)
-                    features.loc[0, 'rain_power_skewness'] = skew(psd)
-                    features.loc[0, 'rain_power_kurtosis'] = kurtosis(psd)
-                    features.loc[0, 'rain_power_low_freq_ratio'] = low_freq_power / total_power
-                    features.loc[0, 'rain_power_high_freq_ratio'] = high_freq_power / total_power
-                except:
-                    features.loc[0, 'rain_dom_freq'] = np.NaN
-                    features.loc[0, 'rain_power_peak'] = np.NaN
-                    features.loc[0, 'rain_power_skewness'] = np.NaN
-                    features.loc[0, 'rain_power_kurtosis'] = np.NaN
-                    features.loc[0, 'rain_power_low_freq_ratio'] = np.NaN
-                    features.loc[0, 'rain_power_high_freq_ratio'] = np.NaN
+    def psd_features(self, daily_psds: List[Optional[tuple]], features: Dict[str, Callable]) -> Dict[str, np.ndarray]:
+        """
+        Evaluates each feature(frequencies, psd, psd_normalized, low, medium, high, total power) on the
+        power bands of each day, giving NaN for every feature of a day whose bands could not be calculated.
+        """
+        results = {name: np.full(len(daily_psds), np.nan) for name in features}
+        for i, bands in enumerate(daily_psds):
+            try:
+                values = [feature(*bands) for feature in features.values()]
+            except:
+                continue
+            for name, value in zip(features, values):
+                results[name][i] = value
+        return results
 
-                with pd.option_context("future.no_silent_downcasting", True):
-                    features.replace([np.inf, -np.inf], 1000000, inplace=True)
+    def run_classification(self, aInst: fsmInstall):
 
-                model = joblib.load(self.RG_MODEL_PATH)
+        data, day_index, no_of_days = self.get_day_index(aInst)
+        daily_data = self.get_daily_data(aInst)
+        day_starts = [aInst.data_start + timedelta(days=i) for i in range(no_of_days)]
+        months = [current_date.month for current_date in day_starts]
+        features = None
+
+        if aInst.install_type == 'Depth Monitor':
+
+            features = pd.DataFrame({'depth_entropy': self.daily_entropy(daily_data, 'DepthData')})
+            with pd.option_context("future.no_silent_downcasting", True):
+                features.fillna(0, inplace=True)
+            with pd.option_context("future.no_silent_downcasting", True):
+                features.replace([np.inf, -np.inf], 1000000, inplace=True)
+
+            model = load_classifier_model(self.DM_MODEL_PATH)
+
+        elif aInst.install_type == "Flow Monitor":
+
+            try:
+                area = int(aInst.fm_pipe_height_mm) * \
+                    int(aInst.fm_pipe_width_mm)
+            except:
+                area = np.nan
+
+            flow = self.daily_statistics(data, day_index, no_of_days, 'FlowData')
+            depth = self.daily_statistics(data, day_index, no_of_days, 'DepthData')
+            velocity = self.daily_statistics(data, day_index, no_of_days, 'VelocityData')
+
+            flow_power = self.psd_features(self.daily_frequencies(daily_data, 'FlowData'), {
+                'flow_power_low_freq_ratio': lambda f, psd, psd_n, low, medium, high, total: low / total,
+                'flow_power_medium_freq_ratio': lambda f, psd, psd_n, low, medium, high, total: medium / total})
+            depth_power = self.psd_features(self.daily_frequencies(daily_data, 'DepthData'), {
+                'depth_power_skewness': lambda f, psd, psd_n, low, medium, high, total: skew(psd),
+                'depth_power_low_freq_ratio': lambda f, psd, psd_n, low, medium, high, total: low / total,
+                'depth_power_high_freq_ratio': lambda f, psd, psd_n, low, medium, high, total: high / total})
+            velocity_power = self.psd_features(self.daily_frequencies(daily_data, 'VelocityData'), {
+                'velocity_dom_freq': lambda f, psd, psd_n, low, medium, high, total: f[np.argmax(psd)],
+                'velocity_shannon_entropy': lambda f, psd, psd_n, low, medium, high, total:
+                    - np.sum(psd_n * np.log2(psd_n))})
+
+            columns = {'month': months, 'area': area}
+            columns['flow_entropy'] = self.daily_entropy(daily_data, 'FlowData')
+            columns['depth_range'] = (depth['max'] - depth['min']).to_numpy()
+            columns['depth_skewness'] = depth['skew'].to_numpy()
+            columns['depth_entropy'] = self.daily_entropy(daily_data, 'DepthData')
+            columns['velocity_iqr'] = (velocity['q75'] - velocity['q25']).to_numpy()
+            columns['velocity_entropy'] = self.daily_entropy(daily_data, 'VelocityData')
+            columns.update(flow_power)
+            columns.update(depth_power)
+            columns.update(velocity_power)
+
+            columns['velocity_to_flow'] = (velocity['mean'] / flow['mean']).to_numpy()
+            columns['depth_to_flow'] = (depth['mean'] / flow['mean']).to_numpy()
+            columns['velocity_to_depth'] = (velocity['mean'] / depth['mean']).to_numpy()
+            columns['depth_to_depth'] = (depth['mean'] / aInst.fm_pipe_depth_to_invert_mm).to_numpy()
+            columns['depth_max_to_depth'] = (depth['max'] / aInst.fm_pipe_depth_to_invert_mm).to_numpy()
+            columns['depth_to_area'] = (depth['mean'] / area).to_numpy()
+            columns['velocity_to_area'] = (velocity['mean'] / area).to_numpy()
+
+            columns['pipe_B'] = aInst.fm_pipe_letter == "B"
+            columns['pipe_D'] = aInst.fm_pipe_letter == "D"
+            columns['pipe_E'] = aInst.fm_pipe_letter == "E"
+            columns['pipe_Y'] = aInst.fm_pipe_letter == "Y"
+            columns['pipe_Z'] = aInst.fm_pipe_letter == "Z"
+
+            columns['shape_C'] = aInst.fm_pipe_shape == "Circular"
+
+            features = pd.DataFrame(columns, index=pd.RangeIndex(no_of_days))
+            with pd.option_context("future.no_silent_downcasting", True):
+                features.replace([np.inf, -np.inf], 1000000, inplace=True)
+
+            model = load_classifier_model(self.FM_MODEL_PATH)
+
+        elif aInst.install_type == 'Rain Gauge':
+
+            rain = self.daily_statistics(data, day_index, no_of_days, 'IntensityData')
+            rain_power = self.psd_features(self.daily_frequencies(daily_data, 'IntensityData'), {
+                'rain_dom_freq': lambda f, psd, psd_n, low, medium, high, total: f[np.argmax(psd)],
+                'rain_power_peak': lambda f, psd, psd_n, low, medium, high, total: np.max(psd),
+                'rain_power_skewness': lambda f, psd, psd_n, low, medium, high, total: skew(psd),
+                'rain_power_kurtosis': lambda f, psd, psd_n, low, medium, high, total: kurtosis(psd),
+                'rain_power_low_freq_ratio': lambda f, psd, psd_n, low, medium, high, total: low / total,
+                'rain_power_high_freq_ratio': lambda f, psd, psd_n, low, medium, high, total: high / total})
+
+            columns = {'month': months}
+            columns['rain_median'] = rain['median'].to_numpy()
+            columns['rain_skewness'] = rain['skew'].to_numpy()
+            columns['rain_percentile_25'] = rain['q25'].to_numpy()
+            columns['rain_percentile_75'] = rain['q75'].to_numpy()
+            columns['rain_entropy'] = self.daily_entropy(daily_data, 'IntensityData')
+            columns.update(rain_power)
+
+            features = pd.DataFrame(columns, index=pd.RangeIndex(no_of_days))
+            with pd.option_context("future.no_silent_downcasting", True):
+                features.replace([np.inf, -np.inf], 1000000, inplace=True)
+
+            model = load_classifier_model(self.RG_MODEL_PATH)
+
+        if features is None or no_of_days == 0:
+            return pd.DataFrame(columns=['Date', 'Classification', 'Confidence'])
+
+        # make predictions for every day in one call
+        predictions = model.predict(features)
+        probabilities = model.predict_proba(features)
+        classes = list(model.classes_)
 
-            # make predictions
+        results_list = []
+        for i, current_date in enumerate(day_starts):
             # prints only string without numpy arrays
-            PREDICTION = model.predict(features)[0][0]
+            PREDICTION = predictions[i][0]
             # finds index of prediction of all possible classes
-            index = list(model.classes_).index(PREDICTION)
+            index = classes.index(PREDICTION)
             # gets confidence score of this class only. can remove [index] to get confidence for each class
-            CONFIDENCE = model.predict_proba(features)[0][index]
+            CONFIDENCE = probabilities[i][index]
 
             # Store results in a list
             results_list.append({'date': datetime(current_date.year, current_date.month, current_date.day), 'prediction': PREDICTION, 'confidence': CONFIDENCE})
 
-            # Move to the next day
-            current_date += timedelta(days=1)
-
         # Convert results list to DataFrame
         results = pd.DataFrame(results_list)
         results = results.rename(columns={
@@ -1852,6 +2011,42 @@ class fsmDataClassification(object):
         sr = 60 / data.Date.diff().mean().total_seconds()
         nperseg = 2 * data.shape[0] * sr / segments
         frequencies, psd = welch(data[column], fs=sr, nperseg=nperseg)
+
+        return self.power_bands(frequencies, psd)
+
+    def daily_frequencies(self, daily_data: List[pd.DataFrame], column: str) -> List[Optional[tuple]]:
+        """
+        Returns frequencies() for each day, or None where it cannot be calculated.  Days with the same
+        number of samples and sample rate share a single Welch PSD call over a (days x samples) array.
+        """
+        segments = 10
+        results: List[Optional[tuple]] = [None] * len(daily_data)
+
+        days_by_shape: Dict[tuple, List[int]] = {}
+        for i, data in enumerate(daily_data):
+            try:
+                sr = 60 / data.Date.diff().mean().total_seconds()
+            except:
+                continue
+            if not np.isnan(sr):
+                days_by_shape.setdefault((data.shape[0], sr), []).append(i)
+
+        for (no_of_samples, sr), days in days_by_shape.items():
+            nperseg = 2 * no_of_samples * sr / segments
+            daily_values = np.stack([daily_data[i][column].to_numpy() for i in days])
+            try:
+                frequencies, daily_psd = welch(daily_values, fs=sr, nperseg=nperseg, axis=-1)
+            except:
+                continue
+            for i, psd in zip(days, daily_psd):
+                try:
+                    results[i] = self.power_bands(frequencies, psd)
+                except:
+                    pass
+
+        return results
+
+    def power_bands(self, frequencies: np.ndarray, psd: np.ndarray):
         psd_normalized = psd / np.sum(psd)
         freq_range = frequencies[-1] - frequencies[0]
         low_band = frequencies[0] + freq_range / 3
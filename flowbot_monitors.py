@@ -1,15 +1,16 @@
 import os
 # from datetime import datetime
-from typing import List, Optional, Dict, Tuple, Any
+from typing import Callable, List, Optional, Dict, Tuple, Any
 import time
 import calendar
 from datetime import datetime, timedelta, timezone
 from statistics import mean
 import numpy as np
-# import pandas as pd
+import pandas as pd
 import sqlite3
 import math
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
+import hashlib
 
 from PyQt5 import QtGui
 from PyQt5.QtWidgets import (QMessageBox)
@@ -18,20 +19,207 @@ from PyQt5.QtGui import QColor, QFont
 
 from flowbot_schematic import rgGraphicsItem, fmGraphicsItem
 from flowbot_verification import icmTraceLocation
-from flowbot_helper import serialize_list, deserialize_list, serialize_item, deserialize_item, parse_file, parse_date, write_header, write_constants, write_rg_payload, write_fm_payload
-from flowbot_database import Tables
+from flowbot_helper import serialize_list, deserialize_list, deserialize_array, serialize_item, deserialize_item, parse_file, parse_date, get_payload_values, write_header, write_constants, write_rg_payload, write_fm_payload
+from flowbot_database import Tables, TrackedObject, write_changed_rows, read_rows_deferring, column_loader, database_file
 from flowbot_survey_events import surveyEvent
 # from contextlib import closing
-from qgis.core import (QgsCoordinateReferenceSystem, QgsVectorLayer, QgsField, QgsFeature, QgsGeometry, QgsPointXY, QgsRectangle, QgsFeatureRequest, QgsMarkerSymbol, QgsRasterLayer, QgsRasterFileWriter, QgsWkbTypes, Qgis, QgsRasterBlock, QgsColorRampShader, QgsSingleBandPseudoColorRenderer, QgsRasterShader, QgsPalLayerSettings, QgsVectorLayerSimpleLabeling, QgsTextFormat, QgsTextBufferSettings)
+from qgis.core import (QgsCoordinateReferenceSystem, QgsVectorLayer, QgsField, QgsFeature, QgsGeometry, QgsPointXY, QgsRectangle, QgsFeatureRequest, QgsMarkerSymbol, QgsRasterLayer, QgsWkbTypes, Qgis, QgsColorRampShader, QgsSingleBandPseudoColorRenderer, QgsRasterShader, QgsPalLayerSettings, QgsVectorLayerSimpleLabeling, QgsTextFormat, QgsTextBufferSettings)
 # from qgis import processing
+from osgeo import gdal, osr
 import tempfile
 from scipy.spatial import cKDTree
+from scipy import sparse
 from bisect import bisect_left, bisect_right
 
 from flowbot_logging import get_logger
 logger = get_logger('flowbot_logger')
 
-class flowMonitor(object):
+def to_series_array(values, dtype: str) -> np.ndarray:
+    """Converts a sequence of dates or values into a contiguous numpy array of dtype."""
+    if isinstance(values, np.ndarray) and values.dtype == dtype:
+        return np.ascontiguousarray(values)
+    if dtype == 'datetime64[ns]':
+        dates = pd.DatetimeIndex(pd.to_datetime(list(values) if not isinstance(values, np.ndarray) else values))
+        if dates.tz is not None:
+            dates = dates.tz_convert('UTC').tz_localize(None)
+        return np.ascontiguousarray(dates.values.astype('datetime64[ns]'))
+    return np.ascontiguousarray(np.asarray(values, dtype=dtype))
+
+
+class timeSeriesArray():
+    """
+    Descriptor holding a monitor's time series as a contiguous numpy array.
+    Reading the attribute returns a new list of datetimes/floats for existing callers; the
+    list is not kept, so code reading the series more than once should hold on to it, or use
+    the array. The array itself is returned by get_array, a single value by get_value, and a
+    rangeStatsIndex over it by get_range_stats. A series left in the project database by
+    set_loader is read on first access; if the read fails the loader is kept and the error
+    propagates.
+    """
+
+    def __init__(self, dtype: str):
+        self.dtype = dtype
+
+    def __set_name__(self, owner, name):
+        self.array_attr = f'_{name}_array'
+        self.range_stats_attr = f'_{name}_range_stats'
+        self.loader_attr = f'_{name}_loader'
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return self._to_list(self.get_array(obj))
+
+    def __set__(self, obj, values):
+        obj.__dict__.pop(self.loader_attr, None)
+        obj.__dict__[self.array_attr] = to_series_array(values, self.dtype)
+        obj.__dict__[self.range_stats_attr] = None
+
+    def set_loader(self, obj, loader: Callable[[], object]):
+        obj.__dict__[self.loader_attr] = loader
+        obj.__dict__[self.array_attr] = None
+        obj.__dict__[self.range_stats_attr] = None
+
+    def get_array(self, obj) -> np.ndarray:
+        array = obj.__dict__.get(self.array_attr)
+        if array is None:
+            loader = obj.__dict__.get(self.loader_attr)
+            values = loader() if loader is not None else None
+            if values is None:
+                array = np.empty(0, dtype=self.dtype)
+            else:
+                array = to_series_array(values, self.dtype)
+            obj.__dict__[self.array_attr] = array
+            obj.__dict__.pop(self.loader_attr, None)
+        return array
+
+    def get_value(self, obj, index: int):
+        """Returns the value at index as a datetime/float, without converting the rest of the series."""
+        return self._to_list(self.get_array(obj)[[index]])[0]
+
+    def _to_list(self, array: np.ndarray) -> list:
+        if self.dtype == 'datetime64[ns]':
+            return array.astype('datetime64[us]').tolist()
+        return array.tolist()
+
+    def get_range_stats(self, obj) -> 'rangeStatsIndex':
+        """Returns the range statistics index for the series, built once per assignment."""
+        stats = obj.__dict__.get(self.range_stats_attr)
+        if stats is None:
+            stats = rangeStatsIndex(self.get_array(obj))
+            obj.__dict__[self.range_stats_attr] = stats
+        return stats
+
+
+class rangeStatsIndex():
+    """
+    Answers sum, mean, min and max queries over any [i, j) window of a series without
+    rescanning it. Sums and means come from prefix sums in O(1); min and max come from a
+    sparse table over fixed-size blocks, scanning at most two partial blocks directly.
+    NaN values are ignored.
+    """
+
+    BLOCK_SIZE = 64
+
+    def __init__(self, values: np.ndarray):
+        values = np.asarray(values, dtype=np.float64)
+        valid = ~np.isnan(values)
+        self._values = values
+        self._prefixSum = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0))))
+        self._prefixCount = np.concatenate(([0], np.cumsum(valid)))
+
+        block_count = len(values) // self.BLOCK_SIZE
+        blocks = values[:block_count * self.BLOCK_SIZE].reshape(block_count, self.BLOCK_SIZE)
+        self._minTable = [np.fmin.reduce(blocks, axis=1)] if block_count else []
+        self._maxTable = [np.fmax.reduce(blocks, axis=1)] if block_count else []
+        span = 1
+        while span * 2 <= block_count:
+            self._minTable.append(np.fmin(self._minTable[-1][:-span], self._minTable[-1][span:]))
+            self._maxTable.append(np.fmax(self._maxTable[-1][:-span], self._maxTable[-1][span:]))
+            span *= 2
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def sum(self, i: int, j: int) -> float:
+        i, j = self._clip(i, j)
+        return float(self._prefixSum[j] - self._prefixSum[i])
+
+    def count(self, i: int, j: int) -> int:
+        i, j = self._clip(i, j)
+        return int(self._prefixCount[j] - self._prefixCount[i])
+
+    def mean(self, i: int, j: int) -> float:
+        count = self.count(i, j)
+        return self.sum(i, j) / count if count > 0 else np.nan
+
+    def min(self, i: int, j: int) -> float:
+        return self._reduce(i, j, np.fmin, self._minTable)
+
+    def max(self, i: int, j: int) -> float:
+        return self._reduce(i, j, np.fmax, self._maxTable)
+
+    def _clip(self, i: int, j: int) -> Tuple[int, int]:
+        n = len(self._values)
+        i = min(max(i, 0), n)
+        j = min(max(j, i), n)
+        return i, j
+
+    def _reduce(self, i: int, j: int, ufunc, table) -> float:
+        i, j = self._clip(i, j)
+        if i == j:
+            return np.nan
+        first_block = -(-i // self.BLOCK_SIZE)
+        last_block = j // self.BLOCK_SIZE
+        if first_block >= last_block:
+            return float(ufunc.reduce(self._values[i:j]))
+
+        level = (last_block - first_block).bit_length() - 1
+        result = ufunc(table[level][first_block], table[level][last_block - (1 << level)])
+        if i < first_block * self.BLOCK_SIZE:
+            result = ufunc(result, ufunc.reduce(self._values[i:first_block * self.BLOCK_SIZE]))
+        if last_block * self.BLOCK_SIZE < j:
+            result = ufunc(result, ufunc.reduce(self._values[last_block * self.BLOCK_SIZE:j]))
+        return float(result)
+
+
+def get_rows_between_dates(dates: np.ndarray, fromDate: datetime, toDate: datetime) -> Tuple[int, int]:
+    """
+    Returns (min_row, max_row) slice bounds into dates for the period fromDate to toDate.
+    A bound falling outside the data leaves that end of the series unclipped.
+    """
+    from_time = to_datetime64(fromDate)
+    to_time = to_datetime64(toDate)
+
+    if dates[0] < from_time < dates[-1]:
+        min_row = int(np.searchsorted(dates, from_time, side='right')) - 1
+    else:
+        min_row = 0
+
+    if dates[0] < to_time < dates[-1]:
+        max_row = int(np.searchsorted(dates, to_time, side='right')) - 1
+    else:
+        max_row = len(dates)
+
+    return min_row, max_row
+
+
+def to_datetime64(dt) -> np.datetime64:
+    """Converts a datetime to a naive UTC datetime64[ns] for comparison with series arrays."""
+    ts = pd.Timestamp(dt)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert('UTC').tz_localize(None)
+    return ts.to_datetime64().astype('datetime64[ns]')
+
+
+class flowMonitor(TrackedObject):
+
+    DEFERRED_SERIES = ('dateRange', 'flowDataRange', 'depthDataRange', 'velocityDataRange')
+
+    dateRange = timeSeriesArray('datetime64[ns]')
+    flowDataRange = timeSeriesArray('float64')
+    depthDataRange = timeSeriesArray('float64')
+    velocityDataRange = timeSeriesArray('float64')
 
     def __init__(self):
         self.fdvFileSpec: str = ''
@@ -41,10 +229,10 @@ class flowMonitor(object):
         self.velocityUnits: str = ''
         self.rainGaugeName: str = ''
         self.fmTimestep: float = 0.0
-        self.dateRange: List[datetime] = []
-        self.flowDataRange: List[float] = []
-        self.depthDataRange: List[float] = []
-        self.velocityDataRange: List[float] = []
+        self.dateRange = []
+        self.flowDataRange = []
+        self.depthDataRange = []
+        self.velocityDataRange = []
         self.minFlow: float = 0
         self.maxFlow: float = 0
         self.totalVolume: float = 0
@@ -75,10 +263,9 @@ class flowMonitor(object):
         self.velocityUnits = row_dict.get("velocityUnits", self.velocityUnits)
         self.rainGaugeName = row_dict.get("rainGaugeName", self.rainGaugeName)
         self.fmTimestep = row_dict.get("fmTimestep", self.fmTimestep)
-        self.dateRange = deserialize_list(row_dict.get("dateRange", self.dateRange))
-        self.flowDataRange = deserialize_list(row_dict.get("flowDataRange", self.flowDataRange))
-        self.depthDataRange = deserialize_list(row_dict.get("depthDataRange", self.depthDataRange))
-        self.velocityDataRange = deserialize_list(row_dict.get("velocityDataRange", self.velocityDataRange))
+        for series in flowMonitor.DEFERRED_SERIES:
+            if row_dict.get(series) is not None:
+                setattr(self, series, deserialize_array(row_dict[series]))
         self.minFlow = row_dict.get("minFlow", self.minFlow)
         self.maxFlow = row_dict.get("maxFlow", self.maxFlow)
         self.totalVolume = row_dict.get("totalVolume", self.totalVolume)
@@ -100,34 +287,68 @@ class flowMonitor(object):
         self.x = row_dict.get("x", self.x)
         self.y = row_dict.get("y", self.y)
 
-    def getFlowVolumeBetweenDates(self, fromDate: datetime, toDate: datetime) -> int:
-        start_time = calendar.timegm(self.dateRange[0].timetuple())
-        end_time = calendar.timegm(self.dateRange[-1].timetuple())
-        from_time = calendar.timegm(fromDate.timetuple())
-        to_time = calendar.timegm(toDate.timetuple())
+    def to_database_row(self) -> tuple:
+        return (self.fdvFileSpec, self.monitorName, self.flowUnits, self.depthUnits,
+                self.velocityUnits, self.rainGaugeName, self.fmTimestep,
+                serialize_list(self.dateArray), serialize_list(
+                    self.flowArray),
+                serialize_list(self.depthArray), serialize_list(
+                    self.velocityArray),
+                self.minFlow, self.maxFlow, self.totalVolume, self.minDepth, self.maxDepth,
+                self.minVelocity, self.maxVelocity, int(
+                    self.hasModelData), self.modelDataPipeRef,
+                self.modelDataRG, self.modelDataPipeLength, self.modelDataPipeShape,
+                self.modelDataPipeDia, self.modelDataPipeHeight, self.modelDataPipeRoughness,
+                self.modelDataPipeUSInvert, self.modelDataPipeDSInvert, self.modelDataPipeSystemType, self.x, self.y)
 
-        if (start_time < from_time) and (from_time < end_time):
-            unix_rounded_xmin_python_datetime = calendar.timegm(
-                self.dateRange[0].timetuple())
-            unix_rounded_xmax_python_datetime = calendar.timegm(
-                fromDate.timetuple())
-            unix_diff_mins = (
-                (unix_rounded_xmax_python_datetime - unix_rounded_xmin_python_datetime)/60)
-            min_row = int(unix_diff_mins / self.fmTimestep)
-        else:
-            min_row = 0
+    @property
+    def dateArray(self) -> np.ndarray:
+        return flowMonitor.dateRange.get_array(self)
 
-        if (start_time < to_time) and (to_time < end_time):
-            unix_rounded_xmin_python_datetime = calendar.timegm(
-                self.dateRange[0].timetuple())
-            unix_rounded_xmax_python_datetime = to_time
-            unix_diff_mins = (
-                (unix_rounded_xmax_python_datetime - unix_rounded_xmin_python_datetime)/60)
-            max_row = int(unix_diff_mins / self.fmTimestep)
-        else:
-            max_row = len(self.flowDataRange)
+    @property
+    def firstDate(self) -> datetime:
+        return flowMonitor.dateRange.get_value(self, 0)
+
+    @property
+    def lastDate(self) -> datetime:
+        return flowMonitor.dateRange.get_value(self, -1)
+
+    @property
+    def flowArray(self) -> np.ndarray:
+        return flowMonitor.flowDataRange.get_array(self)
+
+    @property
+    def depthArray(self) -> np.ndarray:
+        return flowMonitor.depthDataRange.get_array(self)
+
+    @property
+    def velocityArray(self) -> np.ndarray:
+        return flowMonitor.velocityDataRange.get_array(self)
+
+    @property
+    def flowRangeStats(self) -> rangeStatsIndex:
+        return flowMonitor.flowDataRange.get_range_stats(self)
+
+    @property
+    def depthRangeStats(self) -> rangeStatsIndex:
+        return flowMonitor.depthDataRange.get_range_stats(self)
+
+    @property
+    def velocityRangeStats(self) -> rangeStatsIndex:
+        return flowMonitor.velocityDataRange.get_range_stats(self)
 
-        return round(((sum(self.flowDataRange[min_row:max_row]))/1000) * int(self.fmTimestep) * 60, 1)
+    def getRowsBetweenDates(self, fromDate: datetime, toDate: datetime) -> Tuple[int, int]:
+        """
+        Returns (min_row, max_row) slice bounds for the period fromDate to toDate.
+        A bound falling outside the data leaves that end of the series unclipped.
+        """
+        min_row, max_row = get_rows_between_dates(self.dateArray, fromDate, toDate)
+        return min_row, min(max_row, len(self.flowArray))
+
+    def getFlowVolumeBetweenDates(self, fromDate: datetime, toDate: datetime) -> int:
+        min_row, max_row = self.getRowsBetweenDates(fromDate, toDate)
+
+        return round((float(self.flowArray[min_row:max_row].sum())/1000) * int(self.fmTimestep) * 60, 1)
 
 class flowMonitors():
 
@@ -137,27 +358,28 @@ class flowMonitors():
         self.dictFlowMonitors = {}
 
     def read_from_database(self, conn: sqlite3.Connection):
-        c = conn.cursor()
         try:
-            c.execute(f"SELECT * FROM {Tables.FLOW_MONITOR}")
+            rows, deferred = read_rows_deferring(conn, Tables.FLOW_MONITOR, flowMonitor.DEFERRED_SERIES)
         except sqlite3.OperationalError as e:
             print(f"Table '{Tables.FLOW_MONITOR}' does not exist.")
             return  # Return without attempting to fetch rows
 
-        rows = c.fetchall()
-        column_names = [description[0] for description in c.description]
-        for row in rows:
-            row_dict = dict(zip(column_names, row))
+        # Series stay in the database until a monitor is first plotted or analysed
+        database = database_file(conn)
+        for row_dict in rows:
             monitor = flowMonitor()
             monitor.from_database_row_dict(row_dict)
+            for series in deferred:
+                getattr(flowMonitor, series).set_loader(monitor, column_loader(
+                    database, Tables.FLOW_MONITOR, 'monitorName', monitor.monitorName, series, deserialize_array))
+            monitor.mark_clean()
             self.dictFlowMonitors[monitor.monitorName] = monitor
 
     def write_to_database(self, conn: sqlite3.Connection) -> bool:
+        """Writes added and changed flow monitors and deletes removed ones, within the caller's transaction."""
         result = False
         try:
-            # with closing(conn.cursor()) as c:
-            conn.execute(f'''DROP TABLE IF EXISTS {Tables.FLOW_MONITOR}''')
-            conn.execute(f'''CREATE TABLE IF NOT EXISTS {Tables.FLOW_MONITOR} (
+            write_changed_rows(conn, Tables.FLOW_MONITOR, f'''CREATE TABLE IF NOT EXISTS {Tables.FLOW_MONITOR} (
                             fdvFileSpec TEXT,
                             monitorName TEXT PRIMARY KEY,
                             flowUnits TEXT,
@@ -189,35 +411,25 @@ class flowMonitors():
                             modelDataPipeSystemType TEXT,
                             x REAL,
                             y REAL                         
-                        )''')
-            for monitor in self.dictFlowMonitors.values():
-                conn.execute(f'''INSERT OR REPLACE INTO {Tables.FLOW_MONITOR} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                             (monitor.fdvFileSpec, monitor.monitorName, monitor.flowUnits, monitor.depthUnits,
-                              monitor.velocityUnits, monitor.rainGaugeName, monitor.fmTimestep,
-                              serialize_list(monitor.dateRange), serialize_list(
-                                  monitor.flowDataRange),
-                              serialize_list(monitor.depthDataRange), serialize_list(
-                                  monitor.velocityDataRange),
-                              monitor.minFlow, monitor.maxFlow, monitor.totalVolume, monitor.minDepth, monitor.maxDepth,
-                              monitor.minVelocity, monitor.maxVelocity, int(
-                                  monitor.hasModelData), monitor.modelDataPipeRef,
-                              monitor.modelDataRG, monitor.modelDataPipeLength, monitor.modelDataPipeShape,
-                              monitor.modelDataPipeDia, monitor.modelDataPipeHeight, monitor.modelDataPipeRoughness,
-                              monitor.modelDataPipeUSInvert, monitor.modelDataPipeDSInvert, monitor.modelDataPipeSystemType, monitor.x, monitor.y))
-            conn.commit()
+                        )''',
+                               self.dictFlowMonitors.values(),
+                               lambda monitor: (monitor.monitorName,),
+                               flowMonitor.to_database_row)
             result = True
             logger.debug("flowMonitors.write_to_database Completed")
 
         except sqlite3.Error as e:
             print(f"Database error: {e}")
-            conn.rollback()
         except Exception as e:
             print(f"Exception in _query: {e}")
-            conn.rollback()
         finally:
             return result
         #     conn.close()
 
+    def mark_saved(self):
+        for monitor in self.dictFlowMonitors.values():
+            monitor.mark_clean()
+
     def addFlowMonitor(self, fileSpec: str):
         if not self.alreadyOpen(fileSpec):
             objFM = self.getFlowMonitorFromFDVFile(fileSpec)
@@ -508,9 +720,7 @@ class flowMonitors():
         try:
             with open(fileSpec, 'r') as org_data:
 
-                file_data = parse_file(fileSpec)
-
-                all_units = [unit for record in file_data["payload"] for unit in record]
+                file_data = parse_file(fileSpec, as_arrays=True)
 
                 myFM = flowMonitor()
                 myFM.fdvFileSpec = fileSpec
@@ -528,41 +738,17 @@ class flowMonitors():
                 interval = timedelta(minutes=interval_minutes)
 
                 # Generate the date range.
-                myFM.dateRange = []
-                current_dt = start_dt
-                while current_dt <= end_dt:
-                    myFM.dateRange.append(current_dt)
-                    current_dt += interval
+                myFM.dateRange = np.arange(np.datetime64(start_dt, 'ns'), np.datetime64(end_dt + interval, 'ns'),
+                                           np.timedelta64(interval_minutes, 'm'))
 
                 no_of_records = int(duration_mins / interval_minutes) + 1
-                i_record = 0
-
-                myFM.flowDataRange = []
-                myFM.depthDataRange = []
-                myFM.velocityDataRange = []
-
-                for unit in all_units:
-                    i_record += 1                    
-                    if i_record <= no_of_records:
-                        flow = unit.get("FLOW")
-                        if flow is not None:
-                            myFM.flowDataRange.append(float(flow))
-                        else:
-                            myFM.flowDataRange.append(0.0)
-
-                        depth = unit.get("DEPTH")
-                        if depth is not None:
-                            myFM.depthDataRange.append(float(depth))
-                        else:
-                            myFM.depthDataRange.append(0.0)
-
-                        velocity = unit.get("VELOCITY")
-                        if velocity is not None:
-                            myFM.velocityDataRange.append(float(velocity))
-                        else:
-                            myFM.velocityDataRange.append(0.0)
+                payload = file_data["payload"]
+
+                myFM.flowDataRange = get_payload_values(payload, "FLOW", no_of_records)
+                myFM.depthDataRange = get_payload_values(payload, "DEPTH", no_of_records)
+                myFM.velocityDataRange = get_payload_values(payload, "VELOCITY", no_of_records)
                 # (Optional) Check that the number of dates matches the number of data units.
-                if len(myFM.dateRange) != len(myFM.flowDataRange):
+                if len(myFM.dateArray) != len(myFM.flowArray):
                     print("Warning: Mismatch in number of timestamps and data points!")
 
                 record_line = file_data['header'].get('IDENTIFIER', '')
@@ -582,13 +768,13 @@ class flowMonitors():
                 if 'RAINGAUGE' in constants:
                     myFM.rainGaugeName = constants['RAINGAUGE']
 
-                myFM.minFlow = (min(myFM.flowDataRange))
-                myFM.maxFlow = (max(myFM.flowDataRange))
-                myFM.totalVolume = round(((sum(myFM.flowDataRange))/1000)*myFM.fmTimestep*60, 1)
-                myFM.minDepth = (min(myFM.depthDataRange))
-                myFM.maxDepth = (max(myFM.depthDataRange))
-                myFM.minVelocity = (min(myFM.velocityDataRange))
-                myFM.maxVelocity = (max(myFM.velocityDataRange))
+                myFM.minFlow = float(myFM.flowArray.min())
+                myFM.maxFlow = float(myFM.flowArray.max())
+                myFM.totalVolume = round((float(myFM.flowArray.sum())/1000)*myFM.fmTimestep*60, 1)
+                myFM.minDepth = float(myFM.depthArray.min())
+                myFM.maxDepth = float(myFM.depthArray.max())
+                myFM.minVelocity = float(myFM.velocityArray.min())
+                myFM.maxVelocity = float(myFM.velocityArray.max())
          
                 return myFM
         except Exception as e:  # Capture the exception details
@@ -633,8 +819,8 @@ class flowMonitors():
                 Constant('HEIGHT', 'MM', fm.modelDataPipeHeight),  #Need some code here to convert the x,y to a national grid reference 
                 Constant('MIN_VEL', 'M/S', min(fm.velocityDataRange)),
                 Constant('MANHOLE_NO', '', ''),
-                Constant('START', 'GMT', fm.dateRange[0]),
-                Constant('END', 'GMT', fm.dateRange[-1]),
+                Constant('START', 'GMT', fm.firstDate),
+                Constant('END', 'GMT', fm.lastDate),
                 Constant('INTERVAL', 'MIN', fm.fmTimestep)
             ]
 
@@ -765,58 +951,40 @@ class plottedFlowMonitors():
         self.plotTotalVolume = 0
 
     def update_earliest_start(self, fm):
-        self.plotEarliestStart = min(self.plotEarliestStart, fm.dateRange[0])
+        self.plotEarliestStart = min(self.plotEarliestStart, fm.firstDate)
 
     def update_latest_end(self, fm):
-        self.plotLatestEnd = max(self.plotLatestEnd, fm.dateRange[-1])
+        self.plotLatestEnd = max(self.plotLatestEnd, fm.lastDate)
 
     def calculate_min_max_rows(self, fm):
-        min_row, max_row = 0, len(fm.flowDataRange)
-
-        if self.should_update_row(fm.dateRange[0], self.getPlotCurrentStart(), fm.dateRange[-1]):
-            min_row = self.calculate_row(
-                fm.dateRange[0], self.getPlotCurrentStart(), fm.fmTimestep)
-        if self.should_update_row(fm.dateRange[0], self.getPlotCurrentEnd(), fm.dateRange[-1]):
-            max_row = self.calculate_row(
-                fm.dateRange[0], self.getPlotCurrentEnd(), fm.fmTimestep)
-
-        return min_row, max_row
-
-    def should_update_row(self, start_date, plot_date, end_date):
-        return calendar.timegm(start_date.timetuple()) < calendar.timegm(plot_date.timetuple()) < calendar.timegm(end_date.timetuple())
-
-    def calculate_row(self, start_date, plot_date, fm_timestep):
-        return int((calendar.timegm(plot_date.timetuple()) - calendar.timegm(start_date.timetuple())) / 60 / fm_timestep)
+        return fm.getRowsBetweenDates(self.getPlotCurrentStart(), self.getPlotCurrentEnd())
 
     def update_flow_values(self, fm, min_row, max_row, fmCount):
-        flow_data_mean = mean(fm.flowDataRange[min_row:max_row])
-        self.plotMaxFlow = max(self.plotMaxFlow, max(
-            fm.flowDataRange[min_row:max_row]))
+        stats = fm.flowRangeStats
+        flow_data_mean = stats.mean(min_row, max_row)
+        self.plotMaxFlow = max(self.plotMaxFlow, stats.max(min_row, max_row))
         self.plotAvgFlow = mean(
             [self.plotAvgFlow, flow_data_mean]) if fmCount > 0 else flow_data_mean
-        self.plotMinFlow = min(self.plotMinFlow, min(
-            fm.flowDataRange[min_row:max_row]))
+        self.plotMinFlow = min(self.plotMinFlow, stats.min(min_row, max_row))
         volume = round(
-            ((sum(fm.flowDataRange[min_row:max_row])) / 1000) * int(fm.fmTimestep) * 60, 1)
+            (stats.sum(min_row, max_row) / 1000) * int(fm.fmTimestep) * 60, 1)
         self.plotTotalVolume += volume
 
     def update_depth_values(self, fm, min_row, max_row, fmCount):
-        depth_data_mean = mean(fm.depthDataRange[min_row:max_row])
-        self.plotMaxDepth = max(self.plotMaxDepth, max(
-            fm.depthDataRange[min_row:max_row]))
+        stats = fm.depthRangeStats
+        depth_data_mean = stats.mean(min_row, max_row)
+        self.plotMaxDepth = max(self.plotMaxDepth, stats.max(min_row, max_row))
         self.plotAvgDepth = mean(
             [self.plotAvgDepth, depth_data_mean]) if fmCount > 0 else depth_data_mean
-        self.plotMinDepth = min(self.plotMinDepth, min(
-            fm.depthDataRange[min_row:max_row]))
+        self.plotMinDepth = min(self.plotMinDepth, stats.min(min_row, max_row))
 
     def update_velocity_values(self, fm, min_row, max_row, fmCount):
-        vel_data_mean = mean(fm.velocityDataRange[min_row:max_row])
-        self.plotMaxVelocity = max(self.plotMaxVelocity, max(
-            fm.velocityDataRange[min_row:max_row]))
+        stats = fm.velocityRangeStats
+        vel_data_mean = stats.mean(min_row, max_row)
+        self.plotMaxVelocity = max(self.plotMaxVelocity, stats.max(min_row, max_row))
         self.plotAvgVelocity = mean(
             [self.plotAvgVelocity, vel_data_mean]) if fmCount > 0 else vel_data_mean
-        self.plotMinVelocity = min(self.plotMinVelocity, min(
-            fm.velocityDataRange[min_row:max_row]))
+        self.plotMinVelocity = min(self.plotMinVelocity, stats.min(min_row, max_row))
 
     # def updatePlottedFMsMinMaxValues(self):
 
@@ -961,57 +1129,27 @@ class classifiedFlowMonitors():
 
         for fm in self.classFMs.values():
 
-            if self.classEarliestStart > fm.dateRange[0]:
-                self.classEarliestStart = fm.dateRange[0]
-            if self.classLatestEnd < fm.dateRange[len(fm.dateRange)-1]:
-                self.classLatestEnd = fm.dateRange[len(fm.dateRange)-1]
-
-            start_time = calendar.timegm(fm.dateRange[0].timetuple())
-            end_time = calendar.timegm(fm.dateRange[-1].timetuple())
-            class_start_time = calendar.timegm(
-                self.getClassCurrentStart().timetuple())
-            class_end_time = calendar.timegm(
-                self.getClassCurrentEnd().timetuple())
-
-            if (start_time < class_start_time) and (class_start_time < end_time):
-                unix_rounded_xmin_python_datetime = calendar.timegm(
-                    fm.dateRange[0].timetuple())
-                unix_rounded_xmax_python_datetime = calendar.timegm(
-                    self.getClassCurrentStart().timetuple())
-                unix_diff_mins = (
-                    (unix_rounded_xmax_python_datetime - unix_rounded_xmin_python_datetime)/60)
-                min_row = int(unix_diff_mins / fm.fmTimestep)
-            else:
-                min_row = 0
-
-            if (start_time < class_end_time) and (class_end_time < end_time):
-                unix_rounded_xmin_python_datetime = calendar.timegm(
-                    fm.dateRange[0].timetuple())
-                unix_rounded_xmax_python_datetime = calendar.timegm(
-                    self.getClassCurrentEnd().timetuple())
-                unix_diff_mins = (
-                    (unix_rounded_xmax_python_datetime - unix_rounded_xmin_python_datetime)/60)
-                max_row = int(unix_diff_mins / fm.fmTimestep)
-            else:
-                max_row = len(fm.flowDataRange)
+            if self.classEarliestStart > fm.firstDate:
+                self.classEarliestStart = fm.firstDate
+            if self.classLatestEnd < fm.lastDate:
+                self.classLatestEnd = fm.lastDate
+
+            min_row, max_row = fm.getRowsBetweenDates(self.getClassCurrentStart(), self.getClassCurrentEnd())
 
-            self.classMaxFlow = max(self.classMaxFlow, max(
-                fm.flowDataRange[min_row:max_row]))
-            self.classMinFlow = min(self.classMinFlow, min(
-                fm.flowDataRange[min_row:max_row]))
+            flows = fm.flowArray[min_row:max_row]
+            self.classMaxFlow = max(self.classMaxFlow, float(flows.max()))
+            self.classMinFlow = min(self.classMinFlow, float(flows.min()))
             volume = round(
-                ((sum(fm.flowDataRange[min_row:max_row]))/1000) * int(fm.fmTimestep) * 60, 1)
+                (float(flows.sum())/1000) * int(fm.fmTimestep) * 60, 1)
             self.classTotalVolume = self.classTotalVolume + volume
 
-            self.classMaxDepth = max(self.classMaxDepth, max(
-                fm.depthDataRange[min_row:max_row]))
-            self.classMinDepth = min(self.classMinDepth, min(
-                fm.depthDataRange[min_row:max_row]))
+            depths = fm.depthArray[min_row:max_row]
+            self.classMaxDepth = max(self.classMaxDepth, float(depths.max()))
+            self.classMinDepth = min(self.classMinDepth, float(depths.min()))
 
-            self.classMaxVelocity = max(self.classMaxVelocity, max(
-                fm.velocityDataRange[min_row:max_row]))
-            self.classMinVelocity = min(self.classMinVelocity, min(
-                fm.velocityDataRange[min_row:max_row]))
+            velocities = fm.velocityArray[min_row:max_row]
+            self.classMaxVelocity = max(self.classMaxVelocity, float(velocities.max()))
+            self.classMinVelocity = min(self.classMinVelocity, float(velocities.min()))
 
 class summedFlowMonitor():
 
@@ -1074,15 +1212,16 @@ class summedFlowMonitor():
 
         for fm, mult in self.fmCollection.values():
 
-            if latestStart < fm.dateRange[0]:
-                latestStart = fm.dateRange[0]
-            if earliestEnd > fm.dateRange[len(fm.dateRange)-1]:
-                earliestEnd = fm.dateRange[len(fm.dateRange)-1]
+            if latestStart < fm.firstDate:
+                latestStart = fm.firstDate
+            if earliestEnd > fm.lastDate:
+                earliestEnd = fm.lastDate
 
         for fm, mult in self.fmCollection.values():
 
-            indStart = fm.dateRange.index(latestStart)
-            indEnd = fm.dateRange.index(earliestEnd)
+            dates = fm.dateRange
+            indStart = dates.index(latestStart)
+            indEnd = dates.index(earliestEnd)
 
             if monitorCount == 1:
 
@@ -1092,19 +1231,15 @@ class summedFlowMonitor():
                 self.equivalentFM.velocityUnits = fm.velocityUnits
                 self.equivalentFM.rainGaugeName = ''
                 self.equivalentFM.fmTimestep = fm.fmTimestep
-                self.equivalentFM.dateRange = fm.dateRange[indStart:indEnd]
+                self.equivalentFM.dateRange = dates[indStart:indEnd]
 
-                flowDataRange = np.array(
-                    fm.flowDataRange[indStart:indEnd]) * mult
-                velocityDataRange = np.array(
-                    fm.flowDataRange[indStart:indEnd]) * 0
-                depthDataRange = np.array(
-                    fm.flowDataRange[indStart:indEnd]) * 0
+                flowDataRange = fm.flowArray[indStart:indEnd] * mult
+                velocityDataRange = fm.flowArray[indStart:indEnd] * 0
+                depthDataRange = fm.flowArray[indStart:indEnd] * 0
 
             else:
 
-                flowDataRange = np.add(flowDataRange, np.array(
-                    fm.flowDataRange[indStart:indEnd]) * mult)
+                flowDataRange = np.add(flowDataRange, fm.flowArray[indStart:indEnd] * mult)
 
             monitorCount += 1
 
@@ -1147,7 +1282,12 @@ class dummyFlowMonitor():
             i * 1000 for i in aLoc.rawData[aLoc.iPredDepth].copy()]
         self.equivalentFM.modelDataPipeRef = aLoc.predLocation
 
-class rainGauge():
+class rainGauge(TrackedObject):
+
+    DEFERRED_SERIES = ('dateRange', 'rainfallDataRange')
+
+    dateRange = timeSeriesArray('datetime64[ns]')
+    rainfallDataRange = timeSeriesArray('float64')
 
     def __init__(self):
         # self.rDataframe = pd.DataFrame()
@@ -1163,13 +1303,16 @@ class rainGauge():
         self._schematicGraphicItem = None
         self.x: float = 0.0
         self.y: float = 0.0
+        self._epochIndex: Optional[np.ndarray] = None
+        self._epochIndexSource: Optional[np.ndarray] = None
 
     def from_database_row_dict(self, row_dict: Dict):
 
         self.gaugeName = row_dict.get("gaugeName", self.gaugeName)
         self.rFileSpec = row_dict.get("rFileSpec", self.rFileSpec)
-        self.dateRange = deserialize_list(row_dict.get("dateRange", self.dateRange))
-        self.rainfallDataRange = deserialize_list(row_dict.get("rainfallDataRange", self.rainfallDataRange))
+        for series in rainGauge.DEFERRED_SERIES:
+            if row_dict.get(series) is not None:
+                setattr(self, series, deserialize_array(row_dict[series]))
         self.rgTimestep = row_dict.get("rgTimestep", self.rgTimestep)
         self.minIntensity = row_dict.get("minIntensity", self.minIntensity)
         self.maxIntensity = row_dict.get("maxIntensity", self.maxIntensity)
@@ -1300,10 +1443,44 @@ class rainGauge():
 # from datetime import datetime
 # from typing import Optional, Tuple, Dict, Any
 
+    def to_database_row(self) -> tuple:
+        return (self.gaugeName, self.rFileSpec, serialize_list(self.dateArray),
+                serialize_list(
+                    self.rainfallArray), self.rgTimestep, self.minIntensity,
+                self.maxIntensity, self.totalDepth, self.returnPeriod, self.x, self.y)
+
+    @property
+    def dateArray(self) -> np.ndarray:
+        return rainGauge.dateRange.get_array(self)
+
+    @property
+    def firstDate(self) -> datetime:
+        return rainGauge.dateRange.get_value(self, 0)
+
+    @property
+    def lastDate(self) -> datetime:
+        return rainGauge.dateRange.get_value(self, -1)
+
+    @property
+    def rainfallArray(self) -> np.ndarray:
+        return rainGauge.rainfallDataRange.get_array(self)
+
+    @property
+    def rainfallRangeStats(self) -> rangeStatsIndex:
+        return rainGauge.rainfallDataRange.get_range_stats(self)
+
+    def getRowsBetweenDates(self, fromDate: datetime, toDate: datetime) -> Tuple[int, int]:
+        """
+        Returns (min_row, max_row) slice bounds for the period fromDate to toDate.
+        A bound falling outside the data leaves that end of the series unclipped.
+        """
+        min_row, max_row = get_rows_between_dates(self.dateArray, fromDate, toDate)
+        return min_row, min(max_row, len(self.rainfallArray))
+
     def _validate_parallel_series(self) -> None:
-        if not getattr(self, "dateRange", None) or not getattr(self, "rainfallDataRange", None):
+        if len(self.dateArray) == 0 or len(self.rainfallArray) == 0:
             raise ValueError("dateRange and rainfallDataRange must be populated.")
-        if len(self.dateRange) != len(self.rainfallDataRange):
+        if len(self.dateArray) != len(self.rainfallArray):
             raise ValueError("dateRange and rainfallDataRange must be the same length.")
         # assume self.dateRange is sorted ascending
 
@@ -1360,17 +1537,12 @@ class rainGauge():
         """
         self._validate_parallel_series()
 
-        # helper to make sure any datetime is UTC aware
-        def to_utc(dt: datetime) -> datetime:
-            if dt.tzinfo is None:
-                return dt.replace(tzinfo=timezone.utc)
-            return dt.astimezone(timezone.utc)
-
-        dr = [to_utc(d) for d in self.dateRange]
+        dr = self.getEpochIndex()
         data_start, data_end = dr[0], dr[-1]
 
-        a = to_utc(startDate) if startDate else data_start
-        b = to_utc(endDate)   if endDate   else data_end
+        # Naive datetimes are taken as UTC, aware ones are converted to UTC
+        a = to_datetime64(startDate).view(np.int64) if startDate else data_start
+        b = to_datetime64(endDate).view(np.int64) if endDate else data_end
 
         if b < a:
             a, b = b, a
@@ -1381,13 +1553,24 @@ class rainGauge():
         a = max(a, data_start)
         b = min(b, data_end)
 
-        i = bisect_left(dr, a)
-        j = bisect_right(dr, b)
+        i = int(np.searchsorted(dr, a, side='left'))
+        j = int(np.searchsorted(dr, b, side='right'))
 
         if i >= j:
             return (-1, -1)
         return (i, j)
 
+    def getEpochIndex(self) -> np.ndarray:
+        """
+        Returns the gauge timestamps as UTC epoch nanoseconds for binary searching.
+        The index is built once and rebuilt only when dateRange is reassigned.
+        """
+        dates = self.dateArray
+        if self._epochIndexSource is not dates:
+            self._epochIndex = dates.view(np.int64)
+            self._epochIndexSource = dates
+        return self._epochIndex
+
     def statsBetweenDates(
         self,
         startDate: Optional[datetime],
@@ -1404,21 +1587,20 @@ class rainGauge():
         if (min_i, max_j) == (-1, -1):
             return {'minInt': None, 'maxInt': None, 'totDepth': 0.0, 'retPer': None}
 
-        slice_vals = self.rainfallDataRange[min_i:max_j]
-        if not slice_vals:
+        slice_vals = self.rainfallArray[min_i:max_j]
+        if len(slice_vals) == 0:
             return {'minInt': None, 'maxInt': None, 'totDepth': 0.0, 'retPer': None}
 
         # Intensities are mm/hr; depth over the window is sum(intensity)*dt(hours)
         dt_hours = self.rgTimestep / 60.0
-        totalDepth = round(sum(slice_vals) * dt_hours, 1)
+        totalDepth = round(float(slice_vals.sum()) * dt_hours, 1)
 
-        minIntensity = min(slice_vals)
-        maxIntensity = max(slice_vals)
+        minIntensity = float(slice_vals.min())
+        maxIntensity = float(slice_vals.max())
 
         # Duration in hours based on the requested (clamped) timestamps, not just count*dt
-        a = self.dateRange[min_i]
-        b = self.dateRange[max_j - 1]
-        duration_hrs = max((b - a).total_seconds() / 3600.0, 0.0)
+        dates = self.dateArray
+        duration_hrs = max(float((dates[max_j - 1] - dates[min_i]) / np.timedelta64(1, 's')) / 3600.0, 0.0)
 
         # Your empirical return period formula (guard against zero divisions)
         # RP = 10/(1.25*duration_hrs*(((0.0394*totalDepth)+0.1)**-3.55))
@@ -1448,28 +1630,26 @@ class rainGauge():
         if (min_i, max_j) == (-1, -1):
             return (rgName, '', 0, 0.0, 0.0, 0)
 
-        vals = self.rainfallDataRange[min_i:max_j]
-        times = self.dateRange[min_i:max_j]
+        vals = self.rainfallArray[min_i:max_j]
 
-        if not vals:
+        if len(vals) == 0:
             return (rgName, '', 0, 0.0, 0.0, 0)
 
         # First non-zero start time
         startTime = ''
-        for v, t in zip(vals, times):
-            if v != 0:
-                startTime = datetime.strftime(t, "%H:%M")
-                break
+        nonzero = np.flatnonzero(vals != 0)
+        if len(nonzero) > 0:
+            startTime = pd.Timestamp(self.dateArray[min_i + nonzero[0]]).strftime("%H:%M")
 
         # Duration with non-zero intensity
-        duration_minutes = int(self.rgTimestep * sum(v > 0 for v in vals))
+        duration_minutes = int(self.rgTimestep * np.count_nonzero(vals > 0))
 
         # Depth over the window (mm)
         dt_hours = self.rgTimestep / 60.0
-        totalDepth = round(sum(vals) * dt_hours, 1)
+        totalDepth = round(float(vals.sum()) * dt_hours, 1)
 
-        peakIntensity = max(vals)
-        period_ge_6 = int(self.rgTimestep * sum(v >= 6 for v in vals))
+        peakIntensity = float(vals.max())
+        period_ge_6 = int(self.rgTimestep * np.count_nonzero(vals >= 6))
 
         return (rgName, startTime, duration_minutes, totalDepth, peakIntensity, period_ge_6)
                 
@@ -1485,19 +1665,21 @@ class rainGauges:
         self.rgsLatestEnd = datetime.strptime('1972-05-12', '%Y-%m-%d')
 
     def read_from_database(self, conn: sqlite3.Connection):
-        c = conn.cursor()
         try:
-            c.execute(f"SELECT * FROM {Tables.RAIN_GAUGE}")
+            rows, deferred = read_rows_deferring(conn, Tables.RAIN_GAUGE, rainGauge.DEFERRED_SERIES)
         except sqlite3.OperationalError as e:
             print(f"Table '{Tables.RAIN_GAUGE}' does not exist.")
             return  # Return without attempting to fetch rows
 
-        rows = c.fetchall()
-        column_names = [description[0] for description in c.description]
-        for row in rows:
-            row_dict = dict(zip(column_names, row))
+        # Series stay in the database until a gauge is first plotted or analysed
+        database = database_file(conn)
+        for row_dict in rows:
             gauge = rainGauge()
             gauge.from_database_row_dict(row_dict)
+            for series in deferred:
+                getattr(rainGauge, series).set_loader(gauge, column_loader(
+                    database, Tables.RAIN_GAUGE, 'gaugeName', gauge.gaugeName, series, deserialize_array))
+            gauge.mark_clean()
             self.dictRainGauges[gauge.gaugeName] = gauge
 
         # rows = c.fetchall()
@@ -1507,10 +1689,10 @@ class rainGauges:
         #     self.dictRainGauges[gauge.gaugeName] = gauge
 
     def write_to_database(self, conn: sqlite3.Connection) -> bool:
+        """Writes added and changed rain gauges and deletes removed ones, within the caller's transaction."""
         result = False
         try:
-            conn.execute(f'''DROP TABLE IF EXISTS {Tables.RAIN_GAUGE}''')
-            conn.execute(f'''CREATE TABLE IF NOT EXISTS {Tables.RAIN_GAUGE} (
+            write_changed_rows(conn, Tables.RAIN_GAUGE, f'''CREATE TABLE IF NOT EXISTS {Tables.RAIN_GAUGE} (
                             gaugeName TEXT PRIMARY KEY,
                             rFileSpec TEXT,
                             dateRange TEXT,
@@ -1522,27 +1704,25 @@ class rainGauges:
                             returnPeriod REAL,
                             x REAL,
                             y REAL
-                        )''')
-            for gauge in self.dictRainGauges.values():
-                conn.execute(f'''INSERT OR REPLACE INTO {Tables.RAIN_GAUGE} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                             (gauge.gaugeName, gauge.rFileSpec, serialize_list(gauge.dateRange),
-                              serialize_list(
-                                  gauge.rainfallDataRange), gauge.rgTimestep, gauge.minIntensity,
-                              gauge.maxIntensity, gauge.totalDepth, gauge.returnPeriod, gauge.x, gauge.y))
-            conn.commit()
+                        )''',
+                               self.dictRainGauges.values(),
+                               lambda gauge: (gauge.gaugeName,),
+                               rainGauge.to_database_row)
             result = True
             logger.debug("rainGauges.write_to_database Completed")
 
         except sqlite3.Error as e:
             print(f"Database error: {e}")
-            conn.rollback()
         except Exception as e:
             print(f"Exception in _query: {e}")
-            conn.rollback()
         finally:
             return result
         #     conn.close()
 
+    def mark_saved(self):
+        for gauge in self.dictRainGauges.values():
+            gauge.mark_clean()
+
     # def addRainGauge(self, fileSpec: str):
 
     #     try:
@@ -1616,10 +1796,10 @@ class rainGauges:
 
         for rg in self.dictRainGauges.values():
 
-            if self.rgsEarliestStart > rg.dateRange[0]:
-                self.rgsEarliestStart = rg.dateRange[0]
-            if self.rgsLatestEnd < rg.dateRange[len(rg.dateRange)-1]:
-                self.rgsLatestEnd = rg.dateRange[len(rg.dateRange)-1]
+            if self.rgsEarliestStart > rg.firstDate:
+                self.rgsEarliestStart = rg.firstDate
+            if self.rgsLatestEnd < rg.lastDate:
+                self.rgsLatestEnd = rg.lastDate
 
     def getRainGauge(self, nameRG: str):
 
@@ -1926,9 +2106,7 @@ class rainGauges:
 
         with open(fileSpec, 'r', encoding="utf-8") as org_data:
 
-            file_data = parse_file(fileSpec)
-
-            all_units = [unit for record in file_data["payload"] for unit in record]
+            file_data = parse_file(fileSpec, as_arrays=True)
 
             myRG = rainGauge()
             myRG.rFileSpec = fileSpec
@@ -1947,23 +2125,15 @@ class rainGauges:
             interval = timedelta(minutes=interval_minutes)
 
             # Generate the date range.
-            myRG.dateRange = np.arange(start_dt, end_dt + interval, interval).tolist()
+            myRG.dateRange = np.arange(np.datetime64(start_dt, 'ns'), np.datetime64(end_dt + interval, 'ns'),
+                                       np.timedelta64(interval_minutes, 'm'))
 
             no_of_records = int(duration_mins / interval_minutes) + 1
-            i_record = 0
-
-            myRG.rainfallDataRange = []
-            for unit in all_units:
-                i_record += 1
-                if i_record <= no_of_records:
-                    intensity = unit.get("INTENSITY")
-                    if intensity is not None:
-                        myRG.rainfallDataRange.append(float(intensity))
-                    else:
-                        myRG.rainfallDataRange.append(0.0)
+
+            myRG.rainfallDataRange = get_payload_values(file_data["payload"], "INTENSITY", no_of_records)
 
             # Check that the number of dates matches the number of data units.
-            if len(myRG.dateRange) != len(myRG.rainfallDataRange):
+            if len(myRG.dateArray) != len(myRG.rainfallArray):
                 print("Warning: Mismatch in number of timestamps and data points!")
 
             record_line = file_data['header'].get('IDENTIFIER', '')
@@ -1972,8 +2142,8 @@ class rainGauges:
                 if len(parts) >= 2:
                     myRG.gaugeName = parts[1]
 
-            myRG.maxIntensity = (max(myRG.rainfallDataRange))
-            myRG.totalDepth = round((sum(myRG.rainfallDataRange))/(60/myRG.rgTimestep), 1)
+            myRG.maxIntensity = float(myRG.rainfallArray.max())
+            myRG.totalDepth = round(float(myRG.rainfallArray.sum())/(60/myRG.rgTimestep), 1)
             myRG.returnPeriod = round(10/(1.25*duration_hrs*(((0.0394*myRG.totalDepth)+0.1)**-3.55)), 2)
 
             return myRG
@@ -2041,9 +2211,9 @@ class rainGauges:
                 Constant('28_ANT_RAIN', 'MM', -1),
                 Constant('29_ANT_RAIN', 'MM', -1),
                 Constant('30_ANT_RAIN', 'MM', -1),
-                Constant('START', 'GMT', rg.dateRange[0]),
+                Constant('START', 'GMT', rg.firstDate),
                 # Constant('END', 'GMT', rg.dateRange[-1] + timedelta(minutes=rg.rgTimestep)),
-                Constant('END', 'GMT', rg.dateRange[-1]),
+                Constant('END', 'GMT', rg.lastDate),
                 Constant('INTERVAL', 'MIN', rg.rgTimestep)
             ]
 
@@ -2152,42 +2322,18 @@ class plottedRainGauges():
 
         for rg in self.plotRGs.values():
 
-            if self.plotEarliestStart > rg.dateRange[0]:
-                self.plotEarliestStart = rg.dateRange[0]
-            if self.plotLatestEnd < rg.dateRange[len(rg.dateRange)-1]:
-                self.plotLatestEnd = rg.dateRange[len(rg.dateRange)-1]
-
-            rg_start_time = calendar.timegm(rg.dateRange[0].timetuple())
-            rg_end_time = calendar.timegm(rg.dateRange[-1].timetuple())
-            start_time = calendar.timegm(
-                self.getPlotCurrentStart().timetuple())
-            end_time = calendar.timegm(self.getPlotCurrentEnd().timetuple())
-
-            if (rg_start_time < start_time) and (start_time < rg_end_time):
-                unix_rounded_xmin_python_datetime = calendar.timegm(
-                    rg.dateRange[0].timetuple())
-                unix_rounded_xmax_python_datetime = calendar.timegm(
-                    self.getPlotCurrentStart().timetuple())
-                unix_diff_mins = (
-                    (unix_rounded_xmax_python_datetime - unix_rounded_xmin_python_datetime)/60)
-                min_row = int(unix_diff_mins / rg.rgTimestep)
-            else:
-                min_row = 0
-
-            if (rg_start_time < end_time) and (end_time < rg_end_time):
-                unix_rounded_xmin_python_datetime = calendar.timegm(
-                    rg.dateRange[0].timetuple())
-                unix_rounded_xmax_python_datetime = end_time
-                unix_diff_mins = (
-                    (unix_rounded_xmax_python_datetime - unix_rounded_xmin_python_datetime)/60)
-                max_row = int(unix_diff_mins / rg.rgTimestep)
-            else:
-                max_row = len(rg.rainfallDataRange)
+            if self.plotEarliestStart > rg.firstDate:
+                self.plotEarliestStart = rg.firstDate
+            if self.plotLatestEnd < rg.lastDate:
+                self.plotLatestEnd = rg.lastDate
 
-            self.plotMaxIntensity = max(rg.rainfallDataRange[min_row:max_row])
-            self.plotMinIntensity = min(rg.rainfallDataRange[min_row:max_row])
+            min_row, max_row = rg.getRowsBetweenDates(self.getPlotCurrentStart(), self.getPlotCurrentEnd())
+
+            stats = rg.rainfallRangeStats
+            self.plotMaxIntensity = stats.max(min_row, max_row)
+            self.plotMinIntensity = stats.min(min_row, max_row)
             totalDepth = round(
-                (sum(rg.rainfallDataRange[min_row:max_row]))/(60/rg.rgTimestep), 1)
+                stats.sum(min_row, max_row)/(60/rg.rgTimestep), 1)
             self.plotTotalDepth = self.plotTotalDepth + totalDepth
 
             unix_rounded_xmin_python_datetime = calendar.timegm(
@@ -2363,11 +2509,83 @@ class plottedRainGauges():
 #         if fmName in self.dictMappedFlowMonitors:
 #             return [self.dictMappedFlowMonitors[fmName].x, self.dictMappedFlowMonitors[fmName].y]
 
+class mapPointIndex():
+    """
+    Spatial index over named points on the map (flow monitors or rain gauges), answering radius,
+    nearest and bounding box queries through a cKDTree over their projected x/y. Points are added,
+    moved and removed one at a time; the tree is rebuilt on the first query after a change.
+    """
+
+    def __init__(self):
+        self._locations: Dict[str, Tuple[float, float]] = {}
+        self._names: List[str] = []
+        self._tree: Optional[cKDTree] = None
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._locations
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def set_location(self, name: str, x: float, y: float):
+        self._locations[name] = (float(x), float(y))
+        self._tree = None
+
+    def remove(self, name: str):
+        if self._locations.pop(name, None) is not None:
+            self._tree = None
+
+    def clear(self):
+        self._locations.clear()
+        self._tree = None
+
+    def location(self, name: str) -> Optional[Tuple[float, float]]:
+        return self._locations.get(name)
+
+    def _get_tree(self) -> Optional[cKDTree]:
+        if self._tree is None and self._locations:
+            self._names = list(self._locations)
+            self._tree = cKDTree(np.array([self._locations[name] for name in self._names]))
+        return self._tree
+
+    def within_distance(self, x: float, y: float, distance: float) -> List[str]:
+        """Returns the names of the points within distance of (x, y), nearest first."""
+        tree = self._get_tree()
+        if tree is None:
+            return []
+        rows = tree.query_ball_point([x, y], r=distance)
+        dists = np.hypot(tree.data[rows, 0] - x, tree.data[rows, 1] - y)
+        return [self._names[rows[i]] for i in np.argsort(dists, kind='stable')]
+
+    def nearest(self, x: float, y: float, k: int = 1, max_distance: Optional[float] = None) -> List[str]:
+        """Returns the names of up to k points nearest to (x, y), nearest first."""
+        tree = self._get_tree()
+        if tree is None or k < 1:
+            return []
+        k = min(k, len(self._names))
+        dist, rows = tree.query([x, y], k=k, distance_upper_bound=np.inf if max_distance is None else max_distance)
+        dist = np.atleast_1d(dist)
+        rows = np.atleast_1d(rows)
+        return [self._names[row] for d, row in zip(dist, rows) if np.isfinite(d)]
+
+    def in_bounding_box(self, xMin: float, yMin: float, xMax: float, yMax: float) -> List[str]:
+        tree = self._get_tree()
+        if tree is None:
+            return []
+        half_diagonal = math.hypot(xMax - xMin, yMax - yMin) / 2
+        rows = tree.query_ball_point([(xMin + xMax) / 2, (yMin + yMax) / 2], r=half_diagonal)
+        return [self._names[row] for row in sorted(rows)
+                if xMin <= tree.data[row, 0] <= xMax and yMin <= tree.data[row, 1] <= yMax]
+
+
 class mappedFlowMonitors():
     def __init__(self, qgs_app):
         self._thisQgsApp = qgs_app
         self.dictMappedFlowMonitors: Dict[str, flowMonitor] = {}
         self.vl_flow_monitors: QgsVectorLayer = None
+        # Locations of the monitors in the layer, and their feature ids, kept in step with the layer
+        self.spatial_index: mapPointIndex = mapPointIndex()
+        self._feature_ids: Dict[str, int] = {}
         self.initialize_vector_layer()
 
     def initialize_vector_layer(self):
@@ -2375,6 +2593,8 @@ class mappedFlowMonitors():
         crs = QgsCoordinateReferenceSystem("EPSG:27700")  # Set to BNG (EPSG:27700)
 
         """Initialize the QgsVectorLayer with appropriate fields for flow monitor data."""
+        self.spatial_index.clear()
+        self._feature_ids.clear()
         self.vl_flow_monitors = QgsVectorLayer(
             "Point?crs=EPSG:27700",  # Specify the CRS here
             "Flow Monitors",
@@ -2431,34 +2651,26 @@ class mappedFlowMonitors():
         """Helper method to add a single monitor to the vector layer."""
         if self.vl_flow_monitors is None:
             self.initialize_vector_layer()
-            
-        provider = self.vl_flow_monitors.dataProvider()
-        
-        # Create a new feature
-        feature = QgsFeature()
-        
-        # Set geometry from x and y coordinates
-        point = QgsPointXY(monitor.x, monitor.y)
-        feature.setGeometry(QgsGeometry.fromPointXY(point))
-        
-        # # Set attributes
-        # feature.setAttributes([
-        #     monitor.monitorName,
-        #     monitor.flowUnits,
-        #     monitor.depthUnits,
-        #     monitor.velocityUnits,
-        #     monitor.fmTimestep,
-        #     monitor.fdvFileSpec
-        # ])
-        
-        # Set attributes
-        feature.setAttributes([monitor.monitorName])
-        
-        # Add the feature to the layer
-        provider.addFeature(feature)
+
+        self._add_features([monitor])
         self.vl_flow_monitors.updateExtents()
         self.vl_flow_monitors.triggerRepaint()
 
+    def _add_features(self, monitors: List[flowMonitor]):
+        """Adds a feature for each monitor to the layer, recording its id and location."""
+        features = []
+        for monitor in monitors:
+            feature = QgsFeature()
+            feature.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(monitor.x, monitor.y)))
+            feature.setAttributes([monitor.monitorName])
+            features.append(feature)
+
+        ok, added = self.vl_flow_monitors.dataProvider().addFeatures(features)
+        if ok:
+            for monitor, feature in zip(monitors, added):
+                self._feature_ids[monitor.monitorName] = feature.id()
+                self.spatial_index.set_location(monitor.monitorName, monitor.x, monitor.y)
+
     def updateFlowMonitorLocation(self, fmName: str, x: float, y: float):
         """Update the location of a flow monitor in both the dictionary and vector layer."""
         if fmName in self.dictMappedFlowMonitors:
@@ -2473,38 +2685,15 @@ class mappedFlowMonitors():
 
     def _update_monitor_in_layer(self, fmName: str):
         """Helper method to update a monitor in the vector layer."""
-        if self.vl_flow_monitors is None:
+        if self.vl_flow_monitors is None or fmName not in self._feature_ids:
             return
-            
-        # Find the feature with the given monitor name
-        features = self.vl_flow_monitors.getFeatures(f"monitor_name = '{fmName}'")
-        
-        for feature in features:
-            # Get monitor from dictionary
-            monitor = self.dictMappedFlowMonitors[fmName]
-            
-            # Update geometry
-            point = QgsPointXY(monitor.x, monitor.y)
-            
-            # Update the feature's geometry
-            self.vl_flow_monitors.dataProvider().changeGeometryValues({
-                feature.id(): QgsGeometry.fromPointXY(point)
-            })
-            
-            # # Update attributes if needed
-            # attrs = {
-            #     0: monitor.monitorName,
-            #     1: monitor.flowUnits,
-            #     2: monitor.depthUnits,
-            #     3: monitor.velocityUnits,
-            #     4: monitor.fmTimestep,
-            #     5: monitor.fdvFileSpec
-            # }
-            
-            # self.vl_flow_monitors.dataProvider().changeAttributeValues({
-            #     feature.id(): attrs
-            # })
-            
+
+        monitor = self.dictMappedFlowMonitors[fmName]
+        self.vl_flow_monitors.dataProvider().changeGeometryValues({
+            self._feature_ids[fmName]: QgsGeometry.fromPointXY(QgsPointXY(monitor.x, monitor.y))
+        })
+        self.spatial_index.set_location(fmName, monitor.x, monitor.y)
+
         self.vl_flow_monitors.updateExtents()
         self.vl_flow_monitors.triggerRepaint()
 
@@ -2517,17 +2706,14 @@ class mappedFlowMonitors():
         if fmName in self.dictMappedFlowMonitors:
             # Remove from dictionary
             del self.dictMappedFlowMonitors[fmName]
-            
+
             # Remove from vector layer
-            if self.vl_flow_monitors is not None:
-                # Find and remove the feature with the given monitor name
-                features = self.vl_flow_monitors.getFeatures(f"monitor_name = '{fmName}'")
-                feature_ids = [feature.id() for feature in features]
-                
-                if feature_ids:
-                    self.vl_flow_monitors.dataProvider().deleteFeatures(feature_ids)
-                    self.vl_flow_monitors.updateExtents()
-                    self.vl_flow_monitors.triggerRepaint()
+            self.spatial_index.remove(fmName)
+            feature_id = self._feature_ids.pop(fmName, None)
+            if self.vl_flow_monitors is not None and feature_id is not None:
+                self.vl_flow_monitors.dataProvider().deleteFeatures([feature_id])
+                self.vl_flow_monitors.updateExtents()
+                self.vl_flow_monitors.triggerRepaint()
         else:
             print(f"Mapped flow monitor {fmName} not found.")
 
@@ -2542,59 +2728,45 @@ class mappedFlowMonitors():
         return None
         
     def syncVectorLayer(self):
-        """Rebuild the vector layer from the dictionary data (useful after bulk operations)."""
+        """Bring the vector layer into line with the dictionary, touching only the features that changed."""
         if self.vl_flow_monitors is None:
             self.initialize_vector_layer()
-            
-        # Clear existing features
-        self.vl_flow_monitors.dataProvider().truncate()
-        
-        # Add all monitors from dictionary
-        features = []
+
+        provider = self.vl_flow_monitors.dataProvider()
+
+        removed = [name for name in self._feature_ids if name not in self.dictMappedFlowMonitors]
+        if removed:
+            provider.deleteFeatures([self._feature_ids.pop(name) for name in removed])
+            for name in removed:
+                self.spatial_index.remove(name)
+
+        moved = {}
         for name, monitor in self.dictMappedFlowMonitors.items():
-            feature = QgsFeature()
-            point = QgsPointXY(monitor.x, monitor.y)
-            feature.setGeometry(QgsGeometry.fromPointXY(point))
-            
-            # feature.setAttributes([
-            #     monitor.monitorName,
-            #     monitor.flowUnits,
-            #     monitor.depthUnits,
-            #     monitor.velocityUnits,
-            #     monitor.fmTimestep,
-            #     monitor.fdvFileSpec
-            # ])
+            if name in self._feature_ids and self.spatial_index.location(name) != (monitor.x, monitor.y):
+                moved[self._feature_ids[name]] = QgsGeometry.fromPointXY(QgsPointXY(monitor.x, monitor.y))
+                self.spatial_index.set_location(name, monitor.x, monitor.y)
+        if moved:
+            provider.changeGeometryValues(moved)
 
-            feature.setAttributes([monitor.monitorName])            
+        added = [monitor for name, monitor in self.dictMappedFlowMonitors.items() if name not in self._feature_ids]
+        if added:
+            self._add_features(added)
 
-            features.append(feature)
-            
-        # Add all features at once
-        if features:
-            self.vl_flow_monitors.dataProvider().addFeatures(features)
+        if removed or moved or added:
             self.vl_flow_monitors.updateExtents()
             self.vl_flow_monitors.triggerRepaint()
-            
+
     def getFlowMonitorsInBoundingBox(self, xMin: float, yMin: float, xMax: float, yMax: float) -> List[str]:
         """Get names of flow monitors within a bounding box (spatial query)."""
-        if self.vl_flow_monitors is None:
-            return []
-            
-        # Create a bounding box geometry
-        bbox = QgsGeometry.fromRect(QgsRectangle(xMin, yMin, xMax, yMax))
-        
-        # Query features within the bounding box
-        request = QgsFeatureRequest().setFilterRect(bbox.boundingBox())
-        features = self.vl_flow_monitors.getFeatures(request)
-        
-        # Extract monitor names
-        result = []
-        for feature in features:
-            monitor_name = feature["monitor_name"]
-            if monitor_name:
-                result.append(monitor_name)
-                
-        return result
+        return self.spatial_index.in_bounding_box(xMin, yMin, xMax, yMax)
+
+    def getFlowMonitorsWithinDistance(self, x: float, y: float, distance: float) -> List[str]:
+        """Get names of flow monitors within a specified distance of a point, nearest first."""
+        return self.spatial_index.within_distance(x, y, distance)
+
+    def getNearestFlowMonitors(self, x: float, y: float, k: int = 1, max_distance: Optional[float] = None) -> List[str]:
+        """Get names of the k flow monitors nearest to a point, nearest first."""
+        return self.spatial_index.nearest(x, y, k, max_distance)
           
 # class mappedRainGauges():
 #     def __init__(self):
@@ -2634,12 +2806,155 @@ class mappedFlowMonitors():
 # from PyQt5.QtCore import QVariant
 
 
+def gauge_timestep_minutes(rg: rainGauge) -> float:
+    """Returns the gauge's timestep in minutes, from rgTimestep or else its most common date step."""
+    if rg.rgTimestep and rg.rgTimestep > 0:
+        return float(rg.rgTimestep)
+    steps = np.diff(rg.dateArray)
+    if len(steps) == 0:
+        raise ValueError(f"Cannot determine the timestep of rain gauge {rg.gaugeName}.")
+    values, counts = np.unique(steps, return_counts=True)
+    return values[np.argmax(counts)] / np.timedelta64(1, 'm')
+
+
+def align_rain_gauges(gauges: List[rainGauge]) -> Tuple[np.ndarray, float, np.ndarray]:
+    """
+    Aligns the gauges' intensity series onto one regular time grid over the period they all cover,
+    at the finest of their timesteps. Returns the grid dates, the timestep in minutes and a
+    gauges x dates intensity matrix.
+
+    Each grid time takes the intensity of the gauge's latest reading at or before it, so a coarser
+    gauge's intensity holds over its whole timestep, preserving its depth. Where that reading is a
+    full timestep or more older than the grid time (a gap in the data) the intensity is 0.
+    """
+    if not all(len(rg.dateArray) and len(rg.rainfallArray) for rg in gauges):
+        raise ValueError("Some rain gauges lack time series data.")
+
+    timesteps = [gauge_timestep_minutes(rg) for rg in gauges]
+    timestep = min(timesteps)
+    step = np.timedelta64(int(round(timestep * 60 * 1e9)), 'ns')
+
+    # Common available date range across all rain gauges
+    common_start = max(rg.dateArray[0] for rg in gauges)
+    common_end = min(rg.dateArray[-1] for rg in gauges)
+    if common_end < common_start:
+        raise ValueError("The rain gauges have no period of data in common.")
+    date_range = common_start + np.arange((common_end - common_start) // step + 1) * step
+
+    rainfall_matrix = np.zeros((len(gauges), len(date_range)))
+    for row, (rg, gauge_timestep) in enumerate(zip(gauges, timesteps)):
+        dates = rg.dateArray
+        rainfall = rg.rainfallArray
+        idx = np.searchsorted(dates, date_range, side='right') - 1
+        current = (idx >= 0) & (idx < len(rainfall))
+        current[current] = (date_range[current] - dates[idx[current]]) < np.timedelta64(
+            int(round(gauge_timestep * 60 * 1e9)), 'ns')
+        rainfall_matrix[row, current] = rainfall[idx[current]]
+
+    return date_range, timestep, rainfall_matrix
+
+
+class idwInterpolator():
+    """
+    Inverse distance weighted interpolation from scattered points (the gauges) onto target points
+    (usually the cells of a raster grid). By default every point contributes to every target; setting
+    max_neighbours and/or search_radius limits each target to that many of its nearest points within
+    that distance, which changes the result. A target with no point in range interpolates to NaN.
+
+    The weights depend only on the point and target locations, so they are built once, as a sparse
+    targets x points matrix, and cached; interpolating another set of values at the same locations
+    is then a single matrix x vector product. Targets are processed in chunks of chunk_size to bound
+    the memory used by the neighbour queries.
+    """
+
+    def __init__(self, max_neighbours: Optional[int] = None, search_radius: Optional[float] = None,
+                 chunk_size: int = 65536, max_cached: int = 4):
+        self.max_neighbours: Optional[int] = max_neighbours
+        self.search_radius: Optional[float] = search_radius
+        self.chunk_size: int = chunk_size
+        self.max_cached: int = max_cached
+        self._weights: OrderedDict = OrderedDict()
+
+    def clear(self):
+        self._weights.clear()
+
+    def interpolate(self, x, y, z, xi, yi, power=2, grid_key=None) -> np.ndarray:
+        """
+        Interpolates the values z at points (x, y) onto the targets (xi, yi). grid_key, if given,
+        identifies the targets for caching (e.g. the grid extent and shape) in place of their digest.
+        """
+        weights, has_neighbours = self.get_weights(x, y, xi, yi, power, grid_key)
+        zi = weights @ np.asarray(z, dtype=float)
+        zi[~has_neighbours] = np.nan
+        return zi
+
+    def get_weights(self, x, y, xi, yi, power=2, grid_key=None) -> Tuple[sparse.csr_matrix, np.ndarray]:
+        """Returns the targets x points weight matrix, and whether each target has a point in range."""
+        points = np.c_[np.asarray(x, dtype=float), np.asarray(y, dtype=float)]
+        targets = np.c_[np.asarray(xi, dtype=float).ravel(), np.asarray(yi, dtype=float).ravel()]
+        if grid_key is None:
+            grid_key = hashlib.blake2b(targets.tobytes(), digest_size=16).hexdigest()
+        key = (points.tobytes(), grid_key, power, self.max_neighbours, self.search_radius)
+
+        cached = self._weights.get(key)
+        if cached is not None:
+            self._weights.move_to_end(key)
+            return cached
+
+        cached = self._build_weights(points, targets, power)
+        self._weights[key] = cached
+        while len(self._weights) > self.max_cached:
+            self._weights.popitem(last=False)
+        return cached
+
+    def _build_weights(self, points: np.ndarray, targets: np.ndarray, power) -> Tuple[sparse.csr_matrix, np.ndarray]:
+        tree = cKDTree(points)
+        k = len(points) if self.max_neighbours is None else min(self.max_neighbours, len(points))
+        upper_bound = np.inf if self.search_radius is None else self.search_radius
+
+        data, indices, counts = [np.zeros(0)], [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)]
+        for start in range(0, len(targets), self.chunk_size):
+            dist, idx = tree.query(targets[start:start + self.chunk_size], k=k, distance_upper_bound=upper_bound)
+            dist = dist.reshape(-1, k)
+            idx = idx.reshape(-1, k)
+            in_range = np.isfinite(dist)
+
+            # Prevent division by zero
+            weights = 1 / (np.maximum(dist, 1e-10) ** power)
+            weights[~in_range] = 0
+            totals = weights.sum(axis=1, keepdims=True)
+            weights = np.divide(weights, totals, out=np.zeros_like(weights), where=totals > 0)
+
+            data.append(weights[in_range])
+            indices.append(idx[in_range])
+            counts.append(in_range.sum(axis=1))
+
+        counts = np.concatenate(counts)
+        indptr = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        weights = sparse.csr_matrix((np.concatenate(data), np.concatenate(indices), indptr),
+                                    shape=(len(targets), len(points)))
+
+        return weights, counts > 0
+
+
 class mappedRainGauges():
     def __init__(self, qgs_app):
         self._thisQgsApp = qgs_app
         self.dictMappedRainGauges: Dict[str, rainGauge] = {}
         self.vl_rain_gauges: Optional[QgsVectorLayer] = None
+        # Locations and total depths of the gauges in the layer, and their feature ids, kept in step with the layer
+        self.spatial_index: mapPointIndex = mapPointIndex()
+        self._feature_ids: Dict[str, int] = {}
+        self._feature_depths: Dict[str, float] = {}
         self.rl_total_depth: Optional[QgsRasterLayer] = None
+        # Total depth raster output: pixel size in CRS units (metres for EPSG:27700), GTiff layout
+        self.raster_pixel_size: float = 50
+        self.raster_tiled: bool = True
+        self.raster_compression: Optional[str] = 'DEFLATE'
+        self.idw_interpolator: idwInterpolator = idwInterpolator()
+        # The last align_rain_gauges result, with the gauge series it was built from
+        self._alignment: Optional[Tuple[list, list, Tuple[np.ndarray, float, np.ndarray]]] = None
         self._current_event: Optional[surveyEvent] = None
         self.initialize_vector_layer()
 
@@ -2660,38 +2975,44 @@ class mappedRainGauges():
             print("Vector layer is not valid or not set.")
             return
 
-        self.vl_rain_gauges.startEditing()  # Enable editing mode
-
-        for rg in self.dictMappedRainGauges.values():
-            # Get all features and find the matching one
-            for feature in self.vl_rain_gauges.getFeatures():
-                if feature["gauge_name"] == rg.gaugeName:
-                    
-                    if self.current_event is not None:
-                        stats = rg.statsBetweenDates(self.current_event.eventStart, self.current_event.eventEnd)
-                        totDepth = stats['totDepth']
-                    else:
-                        totDepth = rg.totalDepth
-
-                    # Update feature attributes
-                    # feature.setAttribute("gauge_name", rg.gaugeName)  # Ensure this is correct
-                    feature.setAttribute("total_depth", totDepth)  # Ensure the field name matches
-                    
-                    # Commit changes
-                    self.vl_rain_gauges.updateFeature(feature)
-
-        self.vl_rain_gauges.commitChanges()  # Save changes
-        # self.vl_rain_gauges.triggerRepaint()  # Refresh the layer
+        self._update_feature_depths(self.dictMappedRainGauges.values())
 
         if self.rl_total_depth is not None:
             new_extent = self.get_maximum_of_extents(self.rl_total_depth.extent(), self.vl_rain_gauges.extent())
             self.update_total_depth_raster_layer(new_extent)        
 
+    def gauge_total_depth(self, rg: rainGauge) -> float:
+        """The depth shown for a gauge: over the current event if there is one, else its total."""
+        if self.current_event is not None:
+            stats = rg.statsBetweenDates(self.current_event.eventStart, self.current_event.eventEnd)
+            return stats['totDepth']
+        return rg.totalDepth
+
+    def _update_feature_depths(self, gauges) -> bool:
+        """Writes the total depth of each gauge whose depth has changed to its feature."""
+        depth_field = self.vl_rain_gauges.fields().indexOf("total_depth")
+        changes = {}
+        for rg in gauges:
+            if rg.gaugeName not in self._feature_ids:
+                continue
+            totDepth = self.gauge_total_depth(rg)
+            if self._feature_depths.get(rg.gaugeName) != totDepth:
+                changes[self._feature_ids[rg.gaugeName]] = {depth_field: totDepth}
+                self._feature_depths[rg.gaugeName] = totDepth
+        if changes:
+            self.vl_rain_gauges.dataProvider().changeAttributeValues(changes)
+            self.vl_rain_gauges.triggerRepaint()
+        return bool(changes)
+
     def initialize_vector_layer(self):
         """Initialize the QgsVectorLayer with appropriate fields for rain gauge data."""
         
         crs = QgsCoordinateReferenceSystem("EPSG:27700")  # Set to BNG (EPSG:27700)
-        
+
+        self.spatial_index.clear()
+        self._feature_ids.clear()
+        self._feature_depths.clear()
+
         # Create the vector layer with the correct CRS
         self.vl_rain_gauges = QgsVectorLayer(
             "Point?crs=EPSG:27700",  # Specify the CRS here
@@ -2756,41 +3077,33 @@ class mappedRainGauges():
         """Helper method to add a single rain gauge to the vector layer."""
         if self.vl_rain_gauges is None:
             self.initialize_vector_layer()
-            
-        provider = self.vl_rain_gauges.dataProvider()
-        
-        # Create a new feature
-        feature = QgsFeature()
-        
-        # Set geometry from x and y coordinates
-        point = QgsPointXY(rg.x, rg.y)
-        feature.setGeometry(QgsGeometry.fromPointXY(point))
-        
-        # # Set attributes (adjust these based on your rainGauge class properties)
-        # feature.setAttributes([
-        #     rg.gaugeName,
-        #     rg.rainUnits,
-        #     rg.rgTimestep,
-        #     rg.rainfallFileSpec
-        # ])
-        
-        # Set attributes (adjust these based on your rainGauge class properties)
-        if self.current_event is not None:
-            stats = rg.statsBetweenDates(self.current_event.eventStart, self.current_event.eventEnd)
-            totDepth = stats['totDepth']
-        else:
-            totDepth = rg.totalDepth
-
-        feature.setAttributes([rg.gaugeName, totDepth])
 
-        # Add the feature to the layer
-        provider.addFeature(feature)
+        self._add_features([rg])
         self.vl_rain_gauges.updateExtents()
         # self.vl_rain_gauges.triggerRepaint()
         if self.rl_total_depth is not None:
             new_extent = self.get_maximum_of_extents(self.rl_total_depth.extent(), self.vl_rain_gauges.extent())
             self.update_total_depth_raster_layer(new_extent)
 
+    def _add_features(self, gauges: List[rainGauge]):
+        """Adds a feature for each gauge to the layer, recording its id, location and depth."""
+        features = []
+        depths = []
+        for rg in gauges:
+            feature = QgsFeature()
+            feature.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(rg.x, rg.y)))
+            totDepth = self.gauge_total_depth(rg)
+            feature.setAttributes([rg.gaugeName, totDepth])
+            features.append(feature)
+            depths.append(totDepth)
+
+        ok, added = self.vl_rain_gauges.dataProvider().addFeatures(features)
+        if ok:
+            for rg, feature, totDepth in zip(gauges, added, depths):
+                self._feature_ids[rg.gaugeName] = feature.id()
+                self._feature_depths[rg.gaugeName] = totDepth
+                self.spatial_index.set_location(rg.gaugeName, rg.x, rg.y)
+
     def updateRainGaugeLocation(self, rgName: str, x: float, y: float):
         """Update the location of a rain gauge in both the dictionary and vector layer."""
         if rgName in self.dictMappedRainGauges:
@@ -2806,24 +3119,15 @@ class mappedRainGauges():
 
     def _update_gauge_in_layer(self, rgName: str):
         """Helper method to update a rain gauge in the vector layer."""
-        if self.vl_rain_gauges is None:
+        if self.vl_rain_gauges is None or rgName not in self._feature_ids:
             return
-            
-        # Find the feature with the given gauge name
-        features = self.vl_rain_gauges.getFeatures(f"gauge_name = '{rgName}'")
-        
-        for feature in features:
-            # Get gauge from dictionary
-            rg = self.dictMappedRainGauges[rgName]
-            
-            # Update geometry
-            point = QgsPointXY(rg.x, rg.y)
-            
-            # Update the feature's geometry
-            self.vl_rain_gauges.dataProvider().changeGeometryValues({
-                feature.id(): QgsGeometry.fromPointXY(point)
-            })
-                                    
+
+        rg = self.dictMappedRainGauges[rgName]
+        self.vl_rain_gauges.dataProvider().changeGeometryValues({
+            self._feature_ids[rgName]: QgsGeometry.fromPointXY(QgsPointXY(rg.x, rg.y))
+        })
+        self.spatial_index.set_location(rgName, rg.x, rg.y)
+
         self.vl_rain_gauges.updateExtents()
 
         if self.rl_total_depth is not None:
@@ -2840,17 +3144,15 @@ class mappedRainGauges():
         if rgName in self.dictMappedRainGauges:
             # Remove from dictionary
             del self.dictMappedRainGauges[rgName]
-            
+
             # Remove from vector layer
-            if self.vl_rain_gauges is not None:
-                # Find and remove the feature with the given gauge name
-                features = self.vl_rain_gauges.getFeatures(f"gauge_name = '{rgName}'")
-                feature_ids = [feature.id() for feature in features]
-                
-                if feature_ids:
-                    self.vl_rain_gauges.dataProvider().deleteFeatures(feature_ids)
-                    self.vl_rain_gauges.updateExtents()
-                    self.vl_rain_gauges.triggerRepaint()
+            self.spatial_index.remove(rgName)
+            self._feature_depths.pop(rgName, None)
+            feature_id = self._feature_ids.pop(rgName, None)
+            if self.vl_rain_gauges is not None and feature_id is not None:
+                self.vl_rain_gauges.dataProvider().deleteFeatures([feature_id])
+                self.vl_rain_gauges.updateExtents()
+                self.vl_rain_gauges.triggerRepaint()
 
             if self.rl_total_depth is not None:
                 new_extent = self.get_maximum_of_extents(self.rl_total_depth.extent(), self.vl_rain_gauges.extent())
@@ -2870,142 +3172,90 @@ class mappedRainGauges():
         return None
         
     def syncVectorLayer(self):
-        """Rebuild the vector layer from the dictionary data (useful after bulk operations)."""
+        """Bring the vector layer into line with the dictionary, touching only the features that changed."""
         if self.vl_rain_gauges is None:
             self.initialize_vector_layer()
-            
-        # Clear existing features
-        self.vl_rain_gauges.dataProvider().truncate()
-        
-        # Add all gauges from dictionary
-        features = []
+
+        provider = self.vl_rain_gauges.dataProvider()
+
+        removed = [name for name in self._feature_ids if name not in self.dictMappedRainGauges]
+        if removed:
+            provider.deleteFeatures([self._feature_ids.pop(name) for name in removed])
+            for name in removed:
+                self.spatial_index.remove(name)
+                self._feature_depths.pop(name, None)
+
+        moved = {}
         for name, rg in self.dictMappedRainGauges.items():
-            feature = QgsFeature()
-            point = QgsPointXY(rg.x, rg.y)
-            feature.setGeometry(QgsGeometry.fromPointXY(point))
-            
-            # feature.setAttributes([
-            #     rg.gaugeName,
-            #     rg.rainUnits,
-            #     rg.rgTimestep,
-            #     rg.rainfallFileSpec
-            # ])
-
-            if self.current_event is not None:
-                stats = rg.statsBetweenDates(self.current_event.eventStart, self.current_event.eventEnd)
-                totDepth = stats['totDepth']
-            else:
-                totDepth = rg.totalDepth
+            if name in self._feature_ids and self.spatial_index.location(name) != (rg.x, rg.y):
+                moved[self._feature_ids[name]] = QgsGeometry.fromPointXY(QgsPointXY(rg.x, rg.y))
+                self.spatial_index.set_location(name, rg.x, rg.y)
+        if moved:
+            provider.changeGeometryValues(moved)
 
-            feature.setAttributes([rg.gaugeName, totDepth])
+        depths_changed = self._update_feature_depths(self.dictMappedRainGauges.values())
 
-            features.append(feature)
-            
-        # Add all features at once
-        if features:
-            self.vl_rain_gauges.dataProvider().addFeatures(features)
+        added = [rg for name, rg in self.dictMappedRainGauges.items() if name not in self._feature_ids]
+        if added:
+            self._add_features(added)
+
+        if removed or moved or depths_changed or added:
             self.vl_rain_gauges.updateExtents()
             self.vl_rain_gauges.triggerRepaint()
-            
+
     def getRainGaugesInBoundingBox(self, xMin: float, yMin: float, xMax: float, yMax: float) -> List[str]:
         """Get names of rain gauges within a bounding box (spatial query)."""
-        if self.vl_rain_gauges is None:
-            return []
-            
-        # Create a bounding box geometry
-        bbox = QgsRectangle(xMin, yMin, xMax, yMax)
-        
-        # Query features within the bounding box
-        request = QgsFeatureRequest().setFilterRect(bbox)
-        features = self.vl_rain_gauges.getFeatures(request)
-        
-        # Extract gauge names
-        result = []
-        for feature in features:
-            gauge_name = feature["gauge_name"]
-            if gauge_name:
-                result.append(gauge_name)
-                
-        return result
-        
+        return self.spatial_index.in_bounding_box(xMin, yMin, xMax, yMax)
+
     def getGaugesWithinDistance(self, x: float, y: float, distance: float) -> List[str]:
-        """Get names of rain gauges within a specified distance of a point."""
-        if self.vl_rain_gauges is None:
-            return []
-        
-        center_point = QgsPointXY(x, y)
-        center_geom = QgsGeometry.fromPointXY(center_point)
-        
-        # Get all gauges from the layer
-        features = self.vl_rain_gauges.getFeatures()
-        
-        # Filter by distance
-        result = []
-        for feature in features:
-            if feature.geometry().distance(center_geom) <= distance:
-                gauge_name = feature["gauge_name"]
-                if gauge_name:
-                    result.append(gauge_name)
-                    
-        return result
+        """Get names of rain gauges within a specified distance of a point, nearest first."""
+        return self.spatial_index.within_distance(x, y, distance)
+
+    def getNearestRainGauges(self, x: float, y: float, k: int = 1, max_distance: Optional[float] = None) -> List[str]:
+        """Get names of the k rain gauges nearest to a point, nearest first."""
+        return self.spatial_index.nearest(x, y, k, max_distance)
     
-    def idw_interpolation(self, x, y, z, xi, yi, power=2):
+    def idw_interpolation(self, x, y, z, xi, yi, power=2, grid_key=None):
         """
         Performs IDW interpolation on scattered points.
         - x, y, z: Input point coordinates and values
         - xi, yi: Grid points for interpolation
         - power: Inverse distance weighting exponent
+        - grid_key: Optional hashable identifying the grid points, for the interpolator's weight cache
         """
-        tree = cKDTree(np.c_[x, y])
-
-        # Ensure we don't request more neighbors than available
-        # max_k = min(6, len(x))  # Limit k to available data points
-        max_k = len(x)  # Limit k to available data points        
-
-        dist, idx = tree.query(np.c_[xi, yi], k=max_k)
+        return self.idw_interpolator.interpolate(x, y, z, xi, yi, power, grid_key)
 
-        # Prevent division by zero
-        dist = np.maximum(dist, 1e-10)
-
-        # Compute inverse distance weights
-        weights = 1 / (dist ** power)
-        weights /= weights.sum(axis=1, keepdims=True)  # Normalize weights
-
-        # Compute weighted sum
-        zi = np.sum(weights * z[idx], axis=1)
+    def save_numpy_as_qgis_raster(self, array, x_min, y_max, pixel_size, output_path, crs_epsg=27700,
+                                  tiled: bool = True, compression: Optional[str] = 'DEFLATE'):
+        """
+        Writes a 2D array, first row northmost, to a single band Float32 GeoTIFF in one block write.
+        - tiled: write 256 x 256 tiles rather than strips
+        - compression: a GTiff COMPRESS option, e.g. 'DEFLATE' or 'LZW', or None
+        """
 
-        return zi
+        rows, cols = array.shape
 
-    def save_numpy_as_qgis_raster(self, array, x_min, y_max, pixel_size, output_path, crs_epsg=27700):
+        creation_options = []
+        if tiled:
+            creation_options += ['TILED=YES', 'BLOCKXSIZE=256', 'BLOCKYSIZE=256']
+        if compression:
+            creation_options.append(f'COMPRESS={compression}')
+            if compression.upper() in ('DEFLATE', 'LZW', 'ZSTD'):
+                creation_options.append('PREDICTOR=3')  # Floating point predictor
+
+        dataset = gdal.GetDriverByName('GTiff').Create(
+            output_path, cols, rows, 1, gdal.GDT_Float32, options=creation_options)
+        dataset.SetGeoTransform((x_min, pixel_size, 0, y_max, 0, -pixel_size))
+        srs = osr.SpatialReference()
+        srs.ImportFromEPSG(crs_epsg)
+        dataset.SetProjection(srs.ExportToWkt())
+
+        band = dataset.GetRasterBand(1)
+        band.SetNoDataValue(float('nan'))  # Cells out of range of every gauge
+        band.WriteArray(np.asarray(array, dtype=np.float32))
+        band.FlushCache()
+        dataset = None  # Closing the dataset completes the file
 
-        rows, cols = array.shape
-        x_max = x_min + cols * pixel_size
-        y_min = y_max - rows * pixel_size
-
-        # Create raster layer with given extent
-        extent = QgsRectangle(x_min, y_min, x_max, y_max)
-        crs = QgsCoordinateReferenceSystem(crs_epsg)
-
-        # Create Raster File Writer
-        writer = QgsRasterFileWriter(output_path)
-        writer.setOutputFormat('GTiff')  # Save as GeoTIFF
-        # writer.setDestinationCrs(crs)
-
-        # Create Raster Data Provider
-        provider = writer.createOneBandRaster(Qgis.DataType.Float32, cols, rows, extent, crs)
-
-        # Convert NumPy array to QgsRasterBlock
-        raster_block = QgsRasterBlock(Qgis.DataType.Float32, cols, rows)
-        for row in range(rows):
-            for col in range(cols):
-                raster_block.setValue(row, col, float(array[row, col]))
-
-        # Write block to raster provider
-        provider.setEditable(True)
-        provider.writeBlock(raster_block, 1, 0, 0)
-        provider.setEditable(False)
-        # provider.dataChanged()
-        
         return output_path
 
     def update_total_depth_raster_layer(self, output_extent: QgsRectangle = None):
@@ -3031,7 +3281,7 @@ class mappedRainGauges():
             x_min, x_max = output_extent.xMinimum(), output_extent.xMaximum()
             y_min, y_max = output_extent.yMinimum(), output_extent.yMaximum()
 
-            pixel_size = 50  # Define pixel size in CRS units (e.g., meters)
+            pixel_size = self.raster_pixel_size
             
             # Compute number of rows and columns based on pixel size
             cols = int((x_max - x_min) / pixel_size)
@@ -3046,12 +3296,13 @@ class mappedRainGauges():
             # Perform IDW interpolation
             zi = self.idw_interpolation(
                 np.array(x_coords), np.array(y_coords), np.array(values),
-                xi.ravel(), yi.ravel()
+                xi.ravel(), yi.ravel(), grid_key=(x_min, x_max, y_min, y_max, cols, rows)
             ).reshape(xi.shape)
 
             # Save raster to a temporary file
             temp_raster = tempfile.NamedTemporaryFile(suffix=".tif", delete=False).name
-            self.save_numpy_as_qgis_raster(zi, x_min, y_max, pixel_size, temp_raster)
+            self.save_numpy_as_qgis_raster(zi, x_min, y_max, pixel_size, temp_raster,
+                                           tiled=self.raster_tiled, compression=self.raster_compression)
    
             if self.rl_total_depth:
                 self.rl_total_depth.setDataSource(temp_raster, "IDW_TotalDepth", "gdal")
@@ -3166,67 +3417,63 @@ class mappedRainGauges():
     def create_virtual_raingauge(self, x: float, y: float, gaugeName: str) -> rainGauge:
         """
         Creates a virtual rain gauge at the specified location using IDW interpolation
-        on the existing rain gauge data, using vectorized NumPy operations.
+        on the existing rain gauge data.
+        """
+        return self.create_virtual_raingauges([(x, y, gaugeName)])[0]
+
+    def aligned_rain_gauges(self, gauges: List[rainGauge]) -> Tuple[np.ndarray, float, np.ndarray]:
+        """
+        Returns align_rain_gauges(gauges), reusing the previous result while the gauges and their series
+        are the same objects. A gauge's series are replaced, never modified in place, when its data changes.
+        """
+        arrays = [array for rg in gauges for array in (rg.dateArray, rg.rainfallArray)]
+        timesteps = [rg.rgTimestep for rg in gauges]
+        if self._alignment is not None:
+            cached_arrays, cached_timesteps, alignment = self._alignment
+            if (cached_timesteps == timesteps and len(cached_arrays) == len(arrays)
+                    and all(a is b for a, b in zip(cached_arrays, arrays))):
+                return alignment
+
+        alignment = align_rain_gauges(gauges)
+        self._alignment = (arrays, timesteps, alignment)
+        return alignment
+
+    def create_virtual_raingauges(self, locations: List[Tuple[float, float, str]]) -> List[rainGauge]:
+        """
+        Creates a virtual rain gauge at each (x, y, gaugeName) location. The mapped gauges are aligned
+        onto one time grid (see aligned_rain_gauges), and every virtual gauge's intensity series comes
+        from a single IDW weight matrix x intensity matrix product.
         """
         if not self.dictMappedRainGauges:
             raise ValueError("No mapped rain gauges available for interpolation.")
 
-        # Extract coordinates and data
         gauges = list(self.dictMappedRainGauges.values())
         x_coords = np.array([rg.x for rg in gauges])
         y_coords = np.array([rg.y for rg in gauges])
 
-        # Ensure all rain gauges have time series data
-        if not all(rg.dateRange and rg.rainfallDataRange for rg in gauges):
-            raise ValueError("Some rain gauges lack time series data.")
-
-        # Determine common available date range across all rain gauges
-        start_dates = [rg.dateRange[0] for rg in gauges]
-        end_dates = [rg.dateRange[-1] for rg in gauges]
-
-        common_start = max(start_dates)  # Latest start date
-        common_end = min(end_dates)      # Earliest end date
-
-        # Generate the common date range
-        date_range = [date for date in gauges[0].dateRange if common_start <= date <= common_end]
-
-        # Convert rainfall data into a NumPy matrix, only keeping data within the common range
-        rainfall_matrix = np.array([
-            [rg.rainfallDataRange[i] for i, date in enumerate(rg.dateRange) if common_start <= date <= common_end]
-            for rg in gauges
-        ])        
-
-        # Build KDTree for nearest neighbors
-        tree = cKDTree(np.c_[x_coords, y_coords])
-
-        # Find nearest neighbors
-        # max_k = min(6, len(x_coords))  # Limit to available data points
-        max_k = len(x_coords)  # Limit to available data points
-        dist, idx = tree.query([[x, y]], k=max_k)
-
-        # Prevent division by zero
-        dist = np.maximum(dist, 1e-10)
-
-        # Compute IDW weights (shape: [max_k])
-        power = 2
-        weights = 1 / (dist ** power)
-        weights /= np.sum(weights)  # Normalize weights
-
-        # **Vectorized interpolation**: weighted sum of nearest rain gauge rainfall data
-        weighted_rainfall_series = np.dot(weights[0], rainfall_matrix[idx[0]])
-
-        # Create the virtual rain gauge
-        virtual_gauge = rainGauge()
-        virtual_gauge.gaugeName = gaugeName
-        virtual_gauge.x = x
-        virtual_gauge.y = y
-        virtual_gauge.dateRange = date_range
-        virtual_gauge.rainfallDataRange = weighted_rainfall_series.tolist()
-        virtual_gauge.rgTimestep = 2
-        # virtual_gauge.totalDepth = weighted_rainfall_series.sum()
-        virtual_gauge.maxIntensity = (max(virtual_gauge.rainfallDataRange))
-        virtual_gauge.totalDepth = round((sum(virtual_gauge.rainfallDataRange))/(60/virtual_gauge.rgTimestep), 1)
-        duration_hrs = (common_end - common_start).total_seconds() / 3600
-        virtual_gauge.returnPeriod = round(10/(1.25*duration_hrs*(((0.0394*virtual_gauge.totalDepth)+0.1)**-3.55)), 2)        
-
-        return virtual_gauge
+        date_range, timestep, rainfall_matrix = self.aligned_rain_gauges(gauges)
+
+        weights, has_neighbours = self.idw_interpolator.get_weights(
+            x_coords, y_coords, [loc[0] for loc in locations], [loc[1] for loc in locations], power=2)
+        if not has_neighbours.all():
+            raise ValueError("No rain gauges lie within the search radius of the virtual rain gauge.")
+
+        # One row of intensities per virtual gauge
+        weighted_rainfall = weights @ rainfall_matrix
+
+        duration_hrs = (date_range[-1] - date_range[0]) / np.timedelta64(1, 'h')
+        virtual_gauges = []
+        for (x, y, gaugeName), weighted_rainfall_series in zip(locations, weighted_rainfall):
+            virtual_gauge = rainGauge()
+            virtual_gauge.gaugeName = gaugeName
+            virtual_gauge.x = x
+            virtual_gauge.y = y
+            virtual_gauge.dateRange = date_range
+            virtual_gauge.rainfallDataRange = weighted_rainfall_series
+            virtual_gauge.rgTimestep = timestep
+            virtual_gauge.maxIntensity = float(weighted_rainfall_series.max())
+            virtual_gauge.totalDepth = round(float(weighted_rainfall_series.sum()) / (60 / timestep), 1)
+            virtual_gauge.returnPeriod = round(10/(1.25*duration_hrs*(((0.0394*virtual_gauge.totalDepth)+0.1)**-3.55)), 2)
+            virtual_gauges.append(virtual_gauge)
+
+        return virtual_gauges
@@ -0,0 +1,446 @@
+"""
+Raw data import and processing for flow survey installs.
+
+The readers and processors here work only on their arguments (file paths, DataFrames and fsmRawData
+objects) and never use the open project or create Qt objects, so that rawDataJobScheduler can run one
+install per job in a process pool. Results come back to the main thread, where they are merged into
+the project.
+
+Worker processes still import this module, and with it flowbot_management (for fsmRawData and the
+flow calculators), so each worker loads PyQt5, scikit-learn, CatBoost and matplotlib once when it starts. The
+pool is created once per bulk run, so that cost is paid per worker rather than per job.
+"""
+import os
+import csv
+import struct
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime, date, time, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from PyQt5.QtCore import QObject, Qt, pyqtSignal
+
+from flowbot_helper import bytes_to_text
+from flowbot_management import fsmInstall, fsmRawData, MonitorDataFlowCalculator, PumpLoggerDataCalculator
+from flowbot_logging import get_logger
+
+logger = get_logger('flowbot_logger')
+
+# Called as progress(position, total) while a file is read, and with position == total once done
+ProgressCallback = Optional[Callable[[int, int], None]]
+
+PROCESSED_INSTALL_TYPES = ('Rain Gauge', 'Flow Monitor', 'Depth Monitor', 'Pump Logger')
+
+
+def decode_hobo_csv_file(filespec, since=None, progress: ProgressCallback = None):
+    dt_timestamps = []
+    i_values = []
+
+    with open(filespec, mode='r', encoding='utf-8') as file:
+        reader = csv.reader(file)
+        rows = list(reader)  # Read all rows into a list
+        num_rows = len(rows)
+        file.seek(0)
+
+        row_num = 0
+
+        for row in reader:
+            row_num += 1
+            if progress is not None and row_num % 1000 == 0:
+                progress(row_num, num_rows)
+
+            if len(row[0]) == 0:
+                break
+
+            try:
+                value = float(row[2].strip())
+            except:
+                continue
+
+            a_datetime = datetime.strptime(row[1].strip(), "%m/%d/%y %I:%M:%S %p")
+
+            i_values.append(int(value))
+            dt_timestamps.append(a_datetime)
+
+        if progress is not None:
+            progress(num_rows, num_rows)
+
+        df = pd.DataFrame({'Timestamp': dt_timestamps, 'Value': i_values})
+
+        if since is not None:
+            df = df[df['Timestamp'] > since]
+        return df, 'on/off'
+
+
+def decode_flo_file(filespec, since=None, progress: ProgressCallback = None):
+    tip_timestamps = []
+
+    with open(filespec, "rb") as file:
+        file.seek(0, 2)  # Move the cursor to the end of the file
+        file_size = file.tell()
+
+        file.seek(133, 0)  # Move the cursor
+
+        i_year = struct.unpack('<B', file.read(1))[0]
+        full_year = 2000 + i_year
+
+        file.seek(136, 0)  # Move the cursor
+
+        i_day = struct.unpack('<B', file.read(1))[0]
+        i_month = struct.unpack('<B', file.read(1))[0]
+
+        start_date = date(full_year, i_month, i_day)
+        current_date = start_date
+
+        my_pos = 138
+        reported_pos = my_pos
+
+        while True:
+            if progress is not None and my_pos - reported_pos >= 65536:
+                progress(my_pos, file_size)
+                reported_pos = my_pos
+
+            i_hour = struct.unpack('<B', file.read(1))[0]
+            my_pos = my_pos + 1
+
+            if i_hour == 254:
+                current_date = current_date + timedelta(days=1)
+                if my_pos >= file_size:
+                    break
+                continue
+
+            i_minute = struct.unpack('<B', file.read(1))[0]
+            my_pos = my_pos + 1
+
+            tip_time = time(i_hour, i_minute)
+
+            tip_datetime = datetime.combine(current_date, tip_time)
+            tip_timestamps.append(tip_datetime)
+
+            if my_pos >= file_size:
+                break
+
+        if progress is not None:
+            progress(file_size, file_size)
+
+        df = pd.DataFrame({'Timestamp': tip_timestamps})
+
+        if since is not None:
+            df = df[df['Timestamp'] > since]
+        return df, ''
+
+
+def decode_dat_file(filespec, since=None, progress: ProgressCallback = None):
+
+    with open(filespec, "rb") as file:
+        file.seek(0, 2)  # Move the cursor to the end of the file
+        file_size = file.tell()
+
+        file.seek(0, 0)  # Move the cursor to the start of the file
+        s_header = bytes_to_text(file.read(30))
+        i_flag = struct.unpack('<B', file.read(1))[0]
+        i_year = struct.unpack('<H', file.read(2))[0]
+        i_month = struct.unpack('<H', file.read(2))[0]
+        i_day = struct.unpack('<H', file.read(2))[0]
+        i_hour = struct.unpack('<H', file.read(2))[0]
+        i_minute = struct.unpack('<H', file.read(2))[0]
+        i_second = struct.unpack('<H', file.read(2))[0]
+        i_interval = int((struct.unpack('<H', file.read(2))[0])/(10*60))
+        s_measurement_type = bytes_to_text(file.read(15))
+        s_units = bytes_to_text(file.read(10))
+        f_max_value = struct.unpack('<f', file.read(4))[0]
+        f_min_value = struct.unpack('<f', file.read(4))[0]
+        start_datetime = datetime(
+            i_year, i_month, i_day, i_hour, i_minute, i_second)
+        my_pos = 78
+
+        # Determine value type and max threshold based on flag
+        if i_flag == 2:
+            value_dtype = np.dtype('<u1')
+            max_threshold = 255
+        elif i_flag == 8:
+            value_dtype = np.dtype('<u2')
+            max_threshold = 32767
+        elif i_flag == 17:
+            value_dtype = np.dtype('<u4')
+            max_threshold = 1
+
+        # Read the payload in chunks so progress is only reported at coarse intervals
+        chunks = []
+        while True:
+            if progress is not None:
+                progress(my_pos, file_size)
+
+            chunk = file.read(1048576)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            my_pos = my_pos + len(chunk)
+
+        payload = b''.join(chunks)
+        # A trailing partial value cannot be unpacked and is dropped
+        no_of_values = len(payload) // value_dtype.itemsize
+        raw_values = np.frombuffer(
+            payload, dtype=value_dtype, count=no_of_values)
+
+        if progress is not None:
+            progress(file_size, file_size)
+
+        start_datetime64 = np.datetime64(start_datetime, 'us')
+
+        # Post-processing based on flag type
+        if i_flag == 17:
+            tip_seconds = raw_values[raw_values < 4294967295].astype(np.int64)
+            tip_timestamps = start_datetime64 + \
+                tip_seconds.astype('timedelta64[s]')
+            df = pd.DataFrame({'Timestamp': tip_timestamps})
+        else:
+            # Scale and round every possible raw value once, then look each value up.
+            # Rounding uses Python's round() so values match the per-value decoder exactly
+            value_lookup = np.full(
+                np.iinfo(value_dtype).max + 1, np.nan, dtype=np.float64)
+            for int_value in range(max_threshold):
+                value_lookup[int_value] = round(
+                    f_min_value + ((f_max_value - f_min_value) * (int_value / max_threshold)), 3)
+            i_values = value_lookup[raw_values]
+
+            # Timestamps are a fixed interval apart from the start date
+            interval_steps = np.cumsum(
+                np.full(no_of_values, i_interval, dtype=np.int64)) - i_interval
+            dt_timestamps = start_datetime64 + \
+                interval_steps.astype('timedelta64[m]')
+            df = pd.DataFrame({'Timestamp': dt_timestamps, 'Value': i_values})
+
+        if since is not None:
+            df = df[df['Timestamp'] > since]
+        return df, s_units
+
+
+def read_raw_data_file(channel: str, file_spec: str, since=None, progress: ProgressCallback = None) -> Optional[pd.DataFrame]:
+    """
+    Reads the data for one fsmRawData channel ('rg_data', 'dep_data', ...) from file_spec, keeping
+    only values after since. Rainfall may be a DAT or FLO file and pump logger data a HOBO CSV file;
+    everything else is a DAT file. Returns None for an unsupported rainfall file.
+    """
+    suffix = os.path.splitext(file_spec)[1].lower()
+    if channel == 'pl_data':
+        new_data, s_units = decode_hobo_csv_file(file_spec, since, progress)
+    elif channel == 'rg_data' and suffix == '.flo':
+        new_data, s_units = decode_flo_file(file_spec, since, progress)
+    elif channel == 'rg_data' and suffix != '.dat':
+        new_data = None
+    else:
+        new_data, s_units = decode_dat_file(file_spec, since, progress)
+    return new_data
+
+
+def import_raw_data_files(file_specs: Dict[str, Tuple[str, Optional[datetime]]]) -> Dict[str, pd.DataFrame]:
+    """Reads each channel's (file spec, since) pair, returning the new data by channel."""
+    new_data = {}
+    for channel, (file_spec, since) in file_specs.items():
+        channel_data = read_raw_data_file(channel, file_spec, since)
+        if channel_data is not None:
+            new_data[channel] = channel_data
+    return new_data
+
+
+def merged_raw_data(a_raw: fsmRawData, new_data: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    """Returns the data of each channel in new_data appended after the existing data of that channel."""
+    merged = {}
+    for channel, channel_data in new_data.items():
+        existing_df = getattr(a_raw, channel, None)
+        if existing_df is not None and not existing_df.empty:
+            last_time = existing_df['Timestamp'].max()
+            channel_data = channel_data[channel_data['Timestamp'] > last_time]
+            if not channel_data.empty:
+                channel_data = pd.concat([existing_df, channel_data], ignore_index=True)
+            else:
+                channel_data = existing_df
+        merged[channel] = channel_data
+    return merged
+
+
+def apply_imported_raw_data(a_raw: fsmRawData, merged: Dict[str, pd.DataFrame]):
+    """Replaces the data of each channel in merged and updates its date range."""
+    for channel, channel_data in merged.items():
+        setattr(a_raw, channel, channel_data)
+        setattr(a_raw, f'{channel}_start', channel_data['Timestamp'].min())
+        setattr(a_raw, f'{channel}_end', channel_data['Timestamp'].max())
+
+
+def merge_imported_raw_data(a_raw: fsmRawData, new_data: Dict[str, pd.DataFrame]):
+    """Appends newly read data after the existing data of each channel and updates its date range."""
+    apply_imported_raw_data(a_raw, merged_raw_data(a_raw, new_data))
+
+
+def import_raw_data(a_raw: fsmRawData, file_specs: Dict[str, Tuple[str, Optional[datetime]]]) -> Dict[str, pd.DataFrame]:
+    """
+    Reads each channel's new data and returns it merged with the existing data, for
+    apply_imported_raw_data. Run in a worker, so the existing series are read there rather than
+    on the main thread.
+    """
+    return merged_raw_data(a_raw, import_raw_data_files(file_specs))
+
+
+def rainfall_intensity_from_tips(a_raw: fsmRawData) -> Optional[pd.DataFrame]:
+
+    if a_raw.rg_data is None:
+        return None
+
+    tip_timestamps = a_raw.rg_data['Timestamp']
+
+    # Create full 2-minute interval range, starting at the 2-minute interval after the first tip
+    interval = pd.Timedelta(minutes=2)
+    first_interval_start = tip_timestamps.min().floor('2min') + interval
+    last_interval_start = tip_timestamps.max().floor('2min')
+    step = interval.value
+
+    # Group tips into the 2-minute intervals they fall in, labelled by interval end.
+    # Tips after the last full interval are not counted
+    tip_epochs = tip_timestamps.to_numpy().astype('datetime64[ns]').view(np.int64)
+    interval_keys = (np.floor_divide(tip_epochs, step) + 1) * step
+    interval_keys, tips_in_interval = np.unique(interval_keys, return_counts=True)
+    in_range = (interval_keys >= first_interval_start.value) & (
+        interval_keys <= last_interval_start.value)
+    interval_keys = interval_keys[in_range]
+    tips_in_interval = tips_in_interval[in_range]
+
+    # Averaging period is the time since the previous interval with tips, up to 10 minutes
+    time_since_prev = np.empty(len(interval_keys), dtype=np.float64)
+    time_since_prev[:1] = 10
+    time_since_prev[1:] = np.diff(interval_keys) / (60 * 1e9)
+    avg_period = np.minimum(time_since_prev, 10)
+    periods_in_avg = np.ceil(avg_period / 2).astype(np.int64)
+
+    # Calculate rainfall intensities for the tips kept in the interval and the tip distributed
+    # back over the averaging period
+    multiple_tips = tips_in_interval > 1
+    distributing = avg_period > 2
+    tips_current_timestamps = np.where(
+        multiple_tips & distributing, tips_in_interval - 1, np.where(multiple_tips, tips_in_interval, 1))
+    mm_per_hour_current_timestamps = tips_current_timestamps * \
+        np.where(multiple_tips, 60 / 2, 60 / avg_period) * a_raw.rg_tb_depth
+    with np.errstate(divide='ignore'):
+        mm_per_hour_to_distribute = np.where(
+            multiple_tips, 60 / (avg_period - 2), 60 / avg_period) * a_raw.rg_tb_depth
+
+    # Each interval fills the periods before it, the last of which takes the current intensity
+    owner = np.repeat(np.arange(len(interval_keys)), periods_in_avg)
+    period = np.arange(len(owner)) - \
+        np.repeat(np.cumsum(periods_in_avg) - periods_in_avg, periods_in_avg)
+    period_epochs = interval_keys[owner] - step * (periods_in_avg[owner] - period)
+    values_to_add = np.where(period == periods_in_avg[owner] - 1,
+                             mm_per_hour_current_timestamps[owner], mm_per_hour_to_distribute[owner])
+
+    # Periods before the first interval extend the range
+    range_start = first_interval_start.value
+    if len(period_epochs) > 0:
+        range_start = min(range_start, int(period_epochs.min()))
+    leading_intervals = (first_interval_start.value - range_start) // step
+    no_of_intervals = max(
+        (last_interval_start.value - range_start) // step + 1, 0)
+    full_timestamps = pd.date_range(
+        start=first_interval_start - interval * leading_intervals, periods=no_of_intervals, freq='2min')
+
+    df = pd.DataFrame({'Value': np.bincount((period_epochs - range_start) // step,
+                                            weights=values_to_add, minlength=no_of_intervals).astype(np.float64)},
+                      index=full_timestamps)
+
+    return df.reset_index().rename(columns={'index': 'Date', 'Value': 'IntensityData'})
+
+
+def process_raw_data(install_type: str, a_raw: fsmRawData) -> Optional[pd.DataFrame]:
+    """
+    Returns the processed install data for a_raw, or None if there is nothing to process. Series of
+    a_raw still left in the project database are read here, so a worker reads its own install's data.
+    """
+    if install_type == 'Rain Gauge':
+        return rainfall_intensity_from_tips(a_raw)
+    if install_type in ('Flow Monitor', 'Depth Monitor'):
+        return MonitorDataFlowCalculator(a_raw).calculate_flow()
+    if install_type == 'Pump Logger':
+        return PumpLoggerDataCalculator(a_raw).calculate_pumplog()
+    return None
+
+
+def apply_processed_raw_data(a_inst: fsmInstall, data: Optional[pd.DataFrame]):
+    if a_inst.install_type in PROCESSED_INSTALL_TYPES:
+        a_inst.data = data
+    if a_inst.data is not None:
+        a_inst.data_start = a_inst.data['Date'].min().to_pydatetime()
+        a_inst.data_end = a_inst.data['Date'].max().to_pydatetime()
+        time_diff = a_inst.data['Date'].diff()
+        time_diff_minutes = time_diff.dt.total_seconds() / 60
+        a_inst.data_interval = int(time_diff_minutes.dropna().iloc[0])
+        a_inst.data_date_updated = datetime.now()
+
+
+class rawDataJobScheduler(QObject):
+    """
+    Runs per-install jobs in a process pool so that bulk imports and processing use every core
+    and leave the UI responsive.
+
+    Jobs are (key, label, function, args) tuples. The function and its arguments are pickled to a
+    worker process, so the function must be a module level function that only works on its arguments.
+    Each result is delivered on the main thread through jobFinished(key, result) and is merged into the
+    project there. cancel() drops jobs that have not started; the results of jobs already running
+    are discarded.
+    """
+
+    progress = pyqtSignal(int, int, str)
+    jobFinished = pyqtSignal(object, object)
+    jobFailed = pyqtSignal(object, str)
+    finished = pyqtSignal(bool)
+    futureDone = pyqtSignal(object)
+
+    def __init__(self, parent: Optional[QObject] = None, max_workers: Optional[int] = None):
+        super().__init__(parent)
+        self.max_workers: int = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.futures: Dict[Future, Tuple[object, str]] = {}
+        self.total: int = 0
+        self.done: int = 0
+        # Futures complete on the executor's thread, so their results are queued to this object's thread
+        self.futureDone.connect(self.onFutureDone, Qt.QueuedConnection)
+
+    def start(self, jobs: List[Tuple[object, str, Callable, tuple]]):
+        self.total = len(jobs)
+        self.done = 0
+        if self.total == 0:
+            self.finished.emit(False)
+            return
+
+        self.executor = ProcessPoolExecutor(max_workers=min(self.max_workers, self.total))
+        for key, label, function, args in jobs:
+            future = self.executor.submit(function, *args)
+            self.futures[future] = (key, label)
+            future.add_done_callback(self.futureDone.emit)
+        self.progress.emit(0, self.total, '')
+
+    def cancel(self):
+        if self.executor is None:
+            return
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = None
+        self.futures.clear()
+        self.finished.emit(True)
+
+    def onFutureDone(self, future: Future):
+        if future not in self.futures:
+            return
+        key, label = self.futures.pop(future)
+        self.done += 1
+        try:
+            result = future.result()
+        except Exception as e:
+            logger.error(f'rawDataJobScheduler: Job for {label} failed', exc_info=True)
+            self.jobFailed.emit(key, str(e))
+        else:
+            self.jobFinished.emit(key, result)
+        self.progress.emit(self.done, self.total, label)
+
+        if not self.futures:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+            self.finished.emit(False)
@@ -0,0 +1,162 @@
+"""
+Interim report pages rendered in a process pool.
+
+Each figure page of an interim report is described by a reportPage: the graph_fsm_* class that draws it
+and that class's arguments, with installs referred to by id. render_report_pages sends each page to a
+worker process with a copy of the project that holds only the install series the page draws (see
+report_page_project), renders it there to a single page PDF, and returns the pages in the order they
+were given, so that write_report_pdf assembles the same document as drawing them one after another
+into a PdfPages.
+"""
+import copy
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime
+from io import BytesIO
+from typing import Callable, Dict, List, Optional, Tuple
+
+from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.figure import Figure
+from PyPDF2 import PdfReader, PdfWriter
+
+from flowbot_graphing import (graph_fsm_classification, graph_fsm_dwf_plot, graph_fsm_fdv_plot,
+                              graph_fsm_monitor_data_summary, graph_fsm_raingauge_plot, graph_fsm_scatter_plot)
+from flowbot_management import fsmInstall, fsmProject
+
+REPORT_FIGURE_WIDTH = 14.1
+REPORT_FIGURE_HEIGHT = (REPORT_FIGURE_WIDTH * 10) / 14.1
+REPORT_FIGURE_DPI = 100
+
+# Graphs drawn for one install over the interim period, and given the project as well as the install
+INSTALL_PERIOD_GRAPHS = (graph_fsm_fdv_plot, graph_fsm_dwf_plot, graph_fsm_scatter_plot)
+# Install period graphs that also plot the rainfall of every rain gauge install
+RAINFALL_GRAPHS = (graph_fsm_fdv_plot, graph_fsm_dwf_plot)
+
+CLASSIFICATION_COLUMNS = ('class_data_ml', 'class_data_user')
+
+
+@dataclass
+class reportPage:
+    graph: type
+    footer_text: str
+    interim_id: Optional[int] = None
+    install_id: Optional[str] = None
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+
+
+class reportPlotArea():
+    """
+    Stands in for a PlotWidget in a worker process, which has no Qt application to create widgets in.
+    The graph_fsm_* classes only draw on the plot widget's figure.
+    """
+
+    def __init__(self):
+        self.figure = Figure(figsize=(REPORT_FIGURE_WIDTH, REPORT_FIGURE_HEIGHT), dpi=REPORT_FIGURE_DPI)
+
+
+def page_install_columns(a_project: fsmProject, page: reportPage) -> Dict[str, Tuple[str, ...]]:
+    """Returns the deferred install columns (see fsmInstall.DEFERRED_COLUMNS) that page draws, by install id."""
+    if page.graph is graph_fsm_classification:
+        return {install_id: CLASSIFICATION_COLUMNS for install_id in a_project.dict_fsm_installs}
+    if page.graph is graph_fsm_monitor_data_summary:
+        return {page.install_id: CLASSIFICATION_COLUMNS}
+    if page.graph is graph_fsm_raingauge_plot or page.graph in INSTALL_PERIOD_GRAPHS:
+        columns = {}
+        if page.graph in RAINFALL_GRAPHS:
+            columns = {a_inst.install_id: ('data',) for a_inst in a_project.dict_fsm_installs.values()
+                       if a_inst.install_type == 'Rain Gauge'}
+        columns[page.install_id] = ('data',)
+        return columns
+    return {}
+
+
+def report_install(a_inst: fsmInstall, columns: Tuple[str, ...]) -> fsmInstall:
+    """A copy of a_inst without its install sheet or any deferred column other than columns."""
+    page_inst = copy.copy(a_inst)
+    page_inst.install_sheet = None
+    for column in fsmInstall.DEFERRED_COLUMNS:
+        if column not in columns:
+            setattr(page_inst, column, None)
+    return page_inst
+
+
+def report_page_project(a_project: fsmProject, page: reportPage) -> fsmProject:
+    """
+    A copy of a_project to send with page to a worker. It has the project's sites, monitors, installs,
+    interims, reviews and storm events, but only the install series the page draws, and none of the
+    raw data, inspections, pictures or install sheets. Series still in the project database go as
+    loaders, which the worker reads itself.
+    """
+    page_project = fsmProject()
+    page_project.__dict__.update({name: value for name, value in a_project.__dict__.items()
+                                  if not name.startswith('_')})
+    columns = page_install_columns(a_project, page)
+    page_project.dict_fsm_installs = {install_id: report_install(a_inst, columns.get(install_id, ()))
+                                      for install_id, a_inst in a_project.dict_fsm_installs.items()}
+    page_project.dict_fsm_rawdata = {}
+    page_project.dict_fsm_inspections = {}
+    page_project.dict_fsm_install_pictures = {}
+    return page_project
+
+
+def create_report_graph(page: reportPage, a_plot_area, a_project: fsmProject):
+    a_inst = a_project.dict_fsm_installs[page.install_id] if page.install_id is not None else None
+    if page.graph is graph_fsm_monitor_data_summary:
+        return page.graph(a_plot_area, a_project, page.interim_id, a_inst, page.footer_text)
+    if page.graph is graph_fsm_raingauge_plot:
+        return page.graph(a_plot_area, a_inst, page.start_date, page.end_date, page.footer_text)
+    if page.graph in INSTALL_PERIOD_GRAPHS:
+        return page.graph(a_plot_area, a_inst, a_project, page.start_date, page.end_date, page.footer_text)
+    return page.graph(a_plot_area, a_project, page.interim_id, page.footer_text)
+
+
+def render_report_page(page: reportPage, a_project: fsmProject) -> bytes:
+    """Draws one page in a worker process and returns it as a single page PDF."""
+    a_plot_area = reportPlotArea()
+    a_graph = create_report_graph(page, a_plot_area, a_project)
+    a_graph.update_plot()
+
+    buffer = BytesIO()
+    with PdfPages(buffer) as pdf:
+        pdf.savefig(a_plot_area.figure)
+    return buffer.getvalue()
+
+
+def render_report_pages(a_project: fsmProject, pages: List[reportPage],
+                        progress: Optional[Callable[[int, int], None]] = None,
+                        max_workers: Optional[int] = None) -> List[bytes]:
+    """
+    Renders pages in a process pool and returns them in the same order. progress(done, total) is
+    called on the calling thread as each page completes. The first page to fail raises its exception
+    here, after the pages not yet started are cancelled.
+    """
+    if not pages:
+        return []
+
+    max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+    rendered: List[Optional[bytes]] = [None] * len(pages)
+    executor = ProcessPoolExecutor(max_workers=min(max_workers, len(pages)))
+    try:
+        futures = {executor.submit(render_report_page, page, report_page_project(a_project, page)): i
+                   for i, page in enumerate(pages)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            rendered[futures[future]] = future.result()
+            if progress is not None:
+                progress(done, len(pages))
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    return rendered
+
+
+def write_report_pdf(pages: List[bytes], output_pdf: str):
+    """Writes the rendered pages, in order, to output_pdf."""
+    pdf_writer = PdfWriter()
+    for page in pages:
+        pdf_reader = PdfReader(BytesIO(page))
+        for page_num in range(len(pdf_reader.pages)):
+            pdf_writer.add_page(pdf_reader.pages[page_num])
+
+    with open(output_pdf, 'wb') as out_pdf_file:
+        pdf_writer.write(out_pdf_file)
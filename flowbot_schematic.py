@@ -1219,8 +1219,8 @@ class SchematicGraphicsView(QGraphicsView):
         fm = self._thisApp.activeWindow().openFlowMonitors.getFlowMonitor(
             self._currentContextItem._text)
 
-        startDate = fm.dateRange[0]
-        endDate = fm.dateRange[len(fm.dateRange)-1]
+        startDate = fm.firstDate
+        endDate = fm.lastDate
 
         if self._currentEvent is not None:
             startDate = self._currentEvent.eventStart
@@ -2,12 +2,12 @@ from datetime import datetime
 import math
 from typing import Dict
 import sqlite3
-from flowbot_database import Tables
+from flowbot_database import Tables, TrackedObject, write_changed_rows
 # from contextlib import closing
 from flowbot_logging import get_logger
 logger = get_logger('flowbot_logger')
 
-class surveyEvent():
+class surveyEvent(TrackedObject):
 
     eventName = ''
     eventType = 'Unknown'
@@ -26,6 +26,9 @@ class surveyEvent():
         self.eventStart = datetime.fromisoformat(row[2])
         self.eventEnd = datetime.fromisoformat(row[3])
 
+    def to_database_row(self) -> tuple:
+        return (self.eventName, self.eventType, self.eventStart.isoformat(), self.eventEnd.isoformat())
+
     def duration(self):
         return self.eventEnd - self.eventStart
 
@@ -64,38 +67,39 @@ class surveyEvents():
         for row in rows:
             event = surveyEvent()
             event.from_database_row(row)
+            event.mark_clean()
             self.survEvents[event.eventName] = event
 
     def write_to_database(self, conn: sqlite3.Connection) -> bool:
-
+        """Writes added and changed survey events and deletes removed ones, within the caller's transaction."""
         result = False
         try:
-            conn.execute(f'''DROP TABLE IF EXISTS {Tables.SURVEY_EVENT}''')
-            conn.execute(f'''CREATE TABLE IF NOT EXISTS {Tables.SURVEY_EVENT} (
+            write_changed_rows(conn, Tables.SURVEY_EVENT, f'''CREATE TABLE IF NOT EXISTS {Tables.SURVEY_EVENT} (
                             eventName TEXT PRIMARY KEY,
                             eventType TEXT,
                             eventStart TEXT,
                             eventEnd TEXT
-                        )''')
-            for event in self.survEvents.values():
-                conn.execute(f'''INSERT OR REPLACE INTO {Tables.SURVEY_EVENT} VALUES (?, ?, ?, ?)''',
-                        (event.eventName, event.eventType, event.eventStart.isoformat(), event.eventEnd.isoformat()))
-            conn.commit()
+                        )''',
+                               self.survEvents.values(),
+                               lambda event: (event.eventName,),
+                               surveyEvent.to_database_row)
             result = True
             logger.debug("surveyEvents.write_to_database Completed")
 
         except sqlite3.Error as e:
             logger.error(f"surveyEvents.write_to_database: Database error: {e}")
             # print(f"Database error: {e}")
-            conn.rollback()
         except Exception as e:
             logger.error(f"surveyEvents.write_to_database: Exception in _query: {e}")
             # print(f"Exception in _query: {e}")
-            conn.rollback()
         finally:
             return result
         #     conn.close()
 
+    def mark_saved(self):
+        for event in self.survEvents.values():
+            event.mark_clean()
+
     def getEaliestStart(self):
         return self.__seEarliestStart
 
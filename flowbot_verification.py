@@ -14,11 +14,52 @@ import time
 import sqlite3
 from flowbot_helper import (getNashSutcliffe, serialize_list, deserialize_list, serialize_timestamp_list,
                             deserialize_timestamp_list)
-from flowbot_database import Tables
+from flowbot_database import Tables, TrackedObject, write_changed_rows
 # from contextlib import closing
 from flowbot_logging import get_logger
 logger = get_logger('flowbot_logger')
 
+NS_PER_HOUR = 3_600_000_000_000
+
+
+def epoch_array(dates) -> np.ndarray:
+    """Returns the dates as int64 nanoseconds since the epoch."""
+    return np.asarray(dates, dtype='datetime64[ns]').astype(np.int64)
+
+
+def nearest_indices(times: np.ndarray, reference: np.ndarray) -> np.ndarray:
+    """
+    Returns, for each of times, the index in reference (which must not be empty) of the closest reference
+    time.  Where two are equally close the later one is taken, and a reference time that is repeated
+    gives the index of its first occurrence, as list.index does.
+    """
+    order = np.argsort(reference, kind='stable')
+    ordered = reference[order]
+    right = np.clip(np.searchsorted(ordered, times, side='left'), 0, len(ordered) - 1)
+    left = np.clip(right - 1, 0, len(ordered) - 1)
+    take_left = (times - ordered[left]) < (ordered[right] - times)
+    closest = np.where(take_left, left, right)
+    # The sort is stable, so the first of a run of equal times is also the first in reference
+    return order[np.searchsorted(ordered, ordered[closest], side='left')]
+
+
+def peak_pcnt_differences(diffVal: np.ndarray, baseVal: np.ndarray) -> np.ndarray:
+    """diffVal as a percentage of baseVal, or 99999 where baseVal is zero."""
+    pcnt = np.full(len(diffVal), 99999.0)
+    nonZero = baseVal != 0
+    pcnt[nonZero] = (diffVal[nonZero] / baseVal[nonZero]) * 100
+    return pcnt
+
+
+def largest_difference(diffs: np.ndarray) -> float:
+    """The first of diffs with the largest magnitude, or 0 if none is non-zero (NaNs are ignored)."""
+    if len(diffs) == 0:
+        return 0
+    magnitudes = np.nan_to_num(np.abs(diffs), nan=0.0)
+    i = int(np.argmax(magnitudes))
+    return float(diffs[i]) if magnitudes[i] > 0 else 0
+
+
 class icmTraceLocation(object):
 
     # index: int = -1
@@ -106,6 +147,18 @@ class icmTraceLocation(object):
         self.verificationFlowComment = ''
         self.verificationOverallComment = ''
 
+    def to_database_row(self, traceID: str) -> tuple:
+        return (self.index, traceID, self.pageTitle, self.shortTitle, self.obsLocation, self.predLocation,
+                int(self.upstreamEnd), self.trTimestep, int(self.isCritical), int(self.isSurcharged),
+                serialize_list(self.dates), serialize_list(self.rawData), serialize_list(self.smoothedData),
+                serialize_timestamp_list(self.peaksDates), serialize_list(self.peaksData),
+                serialize_list(self.peaksInitialized), int(self.verifyForFlow), int(self.verifyForDepth),
+                serialize_list(self.frac), serialize_list(self.peaks_prominance), serialize_list(self.peaks_width),
+                serialize_list(self.peaks_distance), self.flowNSE, self.flowTp_Diff_Hrs, self.flowQp_Diff_Pcnt,
+                self.flowVol_Diff_Pcnt, self.depthTp_Diff_Hrs, self.depthDp_Diff_Pcnt, self.depthDp_Diff,
+                self.verificationDepthScore, self.verificationFlowScore, self.verificationDepthComment,
+                self.verificationFlowComment, self.verificationOverallComment)
+
     def from_database_row(self, row):
         self.index = row[0]
         self.pageTitle = row[2]
@@ -317,8 +370,7 @@ class icmTraceLocation(object):
 
         self.peaksData[typeIndex] = np.asarray(
             self.smoothedData[typeIndex])[peaks].tolist()
-        self.peaksDates[typeIndex] = np.asarray(
-            self.dates)[peaks].tolist()
+        self.peaksDates[typeIndex] = [self.dates[i] for i in peaks]
 
         myDict = {'Obs': self.rawData[self.iObsFlow].copy(
         ), 'Pred': self.rawData[self.iPredFlow].copy()}
@@ -423,110 +475,63 @@ class icmTraceLocation(object):
 
     #     # i = datePred.index(pDate)
 
-    def updateMaxTimeToPeakDifference(self, forFlow: bool = True):
-
+    def peakTypeIndices(self, forFlow: bool = True):
         if forFlow:
-            dateObs = self.peaksDates[self.iObsFlow].copy()
-            datePred = self.peaksDates[self.iPredFlow].copy()
-        else:
-            dateObs = self.peaksDates[self.iObsDepth].copy()
-            datePred = self.peaksDates[self.iPredDepth].copy()
+            return self.iObsFlow, self.iPredFlow
+        return self.iObsDepth, self.iPredDepth
 
-        absDiffRecord = 0
-        diffRecord = 0
-
-        for oDate in dateObs:
-            pDate = self.getClosestDate(oDate, datePred)
-            if pDate is not None:
-                dateDiff = ((pDate - oDate).total_seconds())/(60*60)
-            else:
-                dateDiff = ((dateObs[0] - oDate).total_seconds())/(60*60)
+    def updateMaxTimeToPeakDifference(self, forFlow: bool = True):
 
-            if abs(dateDiff) > absDiffRecord:
-                absDiffRecord = abs(dateDiff)
-                diffRecord = dateDiff
+        iObs, iPred = self.peakTypeIndices(forFlow)
+        timesObs = epoch_array(self.peaksDates[iObs])
+        timesPred = epoch_array(self.peaksDates[iPred])
 
-        for pDate in datePred:
-            oDate = self.getClosestDate(pDate, dateObs)
-            if oDate is not None:
-                dateDiff = abs(((pDate - oDate).total_seconds())/(60*60))
-            else:
-                dateDiff = abs(((datePred[0] - pDate).total_seconds())/(60*60))
+        # Observed peaks against their closest predicted peak, then predicted peaks against their closest
+        # observed peak, in hours.  Where the other trace has no peaks the first peak of the same trace is used.
+        if len(timesPred) > 0:
+            diffObs = timesPred[nearest_indices(timesObs, timesPred)] - timesObs
+        else:
+            diffObs = timesObs[:1] - timesObs
+        if len(timesObs) > 0:
+            diffPred = np.abs(timesPred - timesObs[nearest_indices(timesPred, timesObs)])
+        else:
+            diffPred = np.abs(timesPred[:1] - timesPred)
 
-            if abs(dateDiff) > absDiffRecord:
-                absDiffRecord = abs(dateDiff)
-                diffRecord = dateDiff
+        diffRecord = largest_difference(np.concatenate([diffObs, diffPred]) / NS_PER_HOUR)
 
         if forFlow:
             self.flowTp_Diff_Hrs = diffRecord
         else:
             self.depthTp_Diff_Hrs = diffRecord
 
-        # i = datePred.index(pDate)
-
     def updateMaximumPeakPcntDifference(self, forFlow: bool = True):
 
-        if forFlow:
-            dateObs = self.peaksDates[self.iObsFlow].copy()
-            obsData = self.peaksData[self.iObsFlow].copy()
-            datePred = self.peaksDates[self.iPredFlow].copy()
-            predData = self.peaksData[self.iPredFlow].copy()
+        iObs, iPred = self.peakTypeIndices(forFlow)
+        timesObs = epoch_array(self.peaksDates[iObs])
+        timesPred = epoch_array(self.peaksDates[iPred])
+        obsData = np.asarray(self.peaksData[iObs], dtype=float)
+        predData = np.asarray(self.peaksData[iPred], dtype=float)
+
+        # Each predicted peak against its closest observed peak, then each observed peak against its
+        # closest predicted peak.  A peak with nothing to compare against counts as its own value.
+        if len(timesObs) > 0:
+            matchedObs = obsData[nearest_indices(timesPred, timesObs)]
+            diffValPred = predData - matchedObs
+            pcntBase = matchedObs
         else:
-            dateObs = self.peaksDates[self.iObsDepth].copy()
-            obsData = self.peaksData[self.iObsDepth].copy()
-            datePred = self.peaksDates[self.iPredDepth].copy()
-            predData = self.peaksData[self.iPredDepth].copy()
-
-        absDiffValRecord = 0
-        diffValRecord = 0
-        absDiffPcntRecord = 0
-        diffPcntRecord = 0
-
-        for i in range(len(datePred)):
-            # iCountPeaks += 1
-            pDate = datePred[i]
-            oDate = self.getClosestDate(pDate, dateObs)
-            if oDate is not None:
-                j = dateObs.index(oDate)
-                diffVal = predData[i] - obsData[j]
-                if obsData[j] != 0:
-                    diffPcnt = (diffVal / obsData[j]) * 100
-                else:
-                    diffPcnt = 99999
-            else:
-                diffVal = predData[i]
-                diffPcnt = 99999
-
-            if abs(diffVal) > absDiffValRecord:
-                absDiffValRecord = abs(diffVal)
-                diffValRecord = diffVal
-
-            if abs(diffPcnt) > absDiffPcntRecord:
-                absDiffPcntRecord = abs(diffPcnt)
-                diffPcntRecord = diffPcnt
-
-        for i in range(len(dateObs)):
-            # iCountPeaks += 1
-            oDate = dateObs[i]
-            pDate = self.getClosestDate(oDate, datePred)
-            if pDate is not None:
-                j = datePred.index(pDate)
-                diffVal = predData[j] - obsData[i]
-                if obsData[i] != 0:
-                    diffPcnt = (diffVal / obsData[i]) * 100
-                else:
-                    diffPcnt = 99999
-            else:
-                diffVal = obsData[i]
-                diffPcnt = 99999
+            diffValPred = predData
+            pcntBase = np.zeros(len(predData))
+        diffPcntPred = peak_pcnt_differences(diffValPred, pcntBase)
 
-            if abs(diffVal) > absDiffValRecord:
-                absDiffValRecord = abs(diffVal)
-                diffValRecord = diffVal
+        if len(timesPred) > 0:
+            diffValObs = predData[nearest_indices(timesObs, timesPred)] - obsData
+            diffPcntObs = peak_pcnt_differences(diffValObs, obsData)
+        else:
+            diffValObs = obsData
+            diffPcntObs = np.full(len(obsData), 99999.0)
 
-            if abs(diffPcnt) > absDiffPcntRecord:
-                absDiffPcntRecord = abs(diffPcnt)
-                diffPcntRecord = diffPcnt
+        diffValRecord = largest_difference(np.concatenate([diffValPred, diffValObs]))
+        diffPcntRecord = largest_difference(np.concatenate([diffPcntPred, diffPcntObs]))
 
         if forFlow:
             self.flowQp_Diff_Pcnt = diffPcntRecord
@@ -635,9 +640,9 @@ class icmTraceLocation(object):
         if len(test_date_list) == 0:
             return None
         else:
-            cloz_dict = {abs(test_date.timestamp() - date.timestamp()): date for date in test_date_list}
+            i = nearest_indices(epoch_array([test_date]), epoch_array(test_date_list))[0]
 
-            return cloz_dict[min(cloz_dict.keys())]
+            return test_date_list[i]
 
     def updateVolumePcntDifference(self):
 
@@ -655,7 +660,7 @@ class icmTraceLocation(object):
         self.flowVol_Diff_Pcnt = volDiffPcnt
 
 
-class icmTrace(object):
+class icmTrace(TrackedObject):
 
     def __init__(self):
 
@@ -685,72 +690,8 @@ class icmTrace(object):
             tl.from_database_row(tl_row)
             self.dictLocations[tl.index] = tl
 
-    def write_to_database(self, conn: sqlite3.Connection):
-
-        try:
-            # with closing(conn.cursor()) as c:
-
-            conn.execute(f'''CREATE TABLE IF NOT EXISTS {Tables.ICM_TRACE_LOCATION} (
-                            itl_index INTEGER,
-                            it_traceID TEXT,
-                            pageTitle TEXT,
-                            shortTitle TEXT,
-                            obsLocation TEXT,
-                            predLocation TEXT,
-                            upstreamEnd INTEGER,
-                            trTimestep INTEGER,
-                            isCritical INTEGER,
-                            isSurcharged INTEGER,
-                            dates TEXT,
-                            rawData TEXT,
-                            smoothedData TEXT,
-                            peaksDates TEXT,
-                            peaksData TEXT,
-                            peaksInitialized TEXT,
-                            verifyForFlow INTEGER,
-                            verifyForDepth INTEGER,
-                            frac TEXT,
-                            peaks_prominance TEXT,
-                            peaks_width TEXT,
-                            peaks_distance TEXT,
-                            flowNSE REAL,
-                            flowTp_Diff_Hrs REAL,
-                            flowQp_Diff_Pcnt REAL,
-                            flowVol_Diff_Pcnt REAL,
-                            depthTp_Diff_Hrs REAL,
-                            depthDp_Diff_Pcnt REAL,
-                            depthDp_Diff REAL,
-                            verificationDepthScore REAL,
-                            verificationFlowScore REAL,
-                            verificationDepthComment TEXT,
-                            verificationFlowComment TEXT,
-                            verificationOverallComment TEXT,
-                            CONSTRAINT pk_{Tables.ICM_TRACE_LOCATION} PRIMARY KEY (itl_index, it_traceID),
-                            FOREIGN KEY (it_traceID) REFERENCES {Tables.ICM_TRACE}(traceID)                  
-                        )''')
-            for loc in self.dictLocations.values():
-                conn.execute(f'''INSERT OR REPLACE INTO {Tables.ICM_TRACE_LOCATION} VALUES (
-                        ?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)''',
-                        (loc.index, self.traceID, loc.pageTitle, loc.shortTitle, loc.obsLocation, loc.predLocation,
-                        int(loc.upstreamEnd), loc.trTimestep, int(loc.isCritical), int(loc.isSurcharged),
-                        serialize_list(loc.dates), serialize_list(loc.rawData), serialize_list(loc.smoothedData),
-                        serialize_timestamp_list(loc.peaksDates), serialize_list(loc.peaksData), 
-                        serialize_list(loc.peaksInitialized), int(loc.verifyForFlow), int(loc.verifyForDepth), 
-                        serialize_list(loc.frac), serialize_list(loc.peaks_prominance), serialize_list(loc.peaks_width),
-                        serialize_list(loc.peaks_distance), loc.flowNSE, loc.flowTp_Diff_Hrs, loc.flowQp_Diff_Pcnt,
-                        loc.flowVol_Diff_Pcnt, loc.depthTp_Diff_Hrs, loc.depthDp_Diff_Pcnt, loc.depthDp_Diff,
-                        loc.verificationDepthScore, loc.verificationFlowScore, loc.verificationDepthComment,
-                        loc.verificationFlowComment, loc.verificationOverallComment))
-            conn.commit()
-
-        except sqlite3.Error as e:
-            print(f"Database error: {e}")
-            conn.rollback()
-        except Exception as e:
-            print(f"Exception in _query: {e}")
-            conn.rollback()
-        # finally:
-        #     conn.close()
+    def to_database_row(self) -> tuple:
+        return (self.traceID, self.csvFileSpec, self.currentLocation)
 
     def allVerifiedForDepth(self) -> bool:
         iCount = 0
@@ -793,40 +734,83 @@ class icmTraces():
         for row in rows:
             tr = icmTrace()
             tr.from_database_row(row, conn)
+            tr.mark_clean()
             self.dictIcmTraces[tr.traceID] = tr
 
     def write_to_database(self, conn: sqlite3.Connection) -> bool:
+        """
+        Writes added and changed traces and deletes removed ones, within the caller's transaction.
+        Trace locations are edited in place in many places so they are always rewritten.
+        """
         result = False
 
         try:
-            conn.execute(f'''DROP TABLE IF EXISTS {Tables.ICM_TRACE}''')
-            conn.execute(f'''CREATE TABLE IF NOT EXISTS {Tables.ICM_TRACE} (
+            write_changed_rows(conn, Tables.ICM_TRACE, f'''CREATE TABLE IF NOT EXISTS {Tables.ICM_TRACE} (
                          traceID TEXT PRIMARY KEY,
                          csvFileSpec TEXT,
                          currentLocation INTEGER
-                         )''')
-            for tr in self.dictIcmTraces.values():
-                conn.execute(f'''INSERT OR REPLACE INTO {Tables.ICM_TRACE} VALUES (?, ?, ?)''',
-                             (tr.traceID, tr.csvFileSpec, tr.currentLocation))
-                tr.write_to_database(conn)
-                # for tl in tr.dictLocations.values():
-                #     tl.write_to_database(conn)
-            conn.commit()
+                         )''',
+                               self.dictIcmTraces.values(),
+                               lambda tr: (tr.traceID,),
+                               icmTrace.to_database_row)
+            write_changed_rows(conn, Tables.ICM_TRACE_LOCATION, f'''CREATE TABLE IF NOT EXISTS {Tables.ICM_TRACE_LOCATION} (
+                                itl_index INTEGER,
+                                it_traceID TEXT,
+                                pageTitle TEXT,
+                                shortTitle TEXT,
+                                obsLocation TEXT,
+                                predLocation TEXT,
+                                upstreamEnd INTEGER,
+                                trTimestep INTEGER,
+                                isCritical INTEGER,
+                                isSurcharged INTEGER,
+                                dates TEXT,
+                                rawData TEXT,
+                                smoothedData TEXT,
+                                peaksDates TEXT,
+                                peaksData TEXT,
+                                peaksInitialized TEXT,
+                                verifyForFlow INTEGER,
+                                verifyForDepth INTEGER,
+                                frac TEXT,
+                                peaks_prominance TEXT,
+                                peaks_width TEXT,
+                                peaks_distance TEXT,
+                                flowNSE REAL,
+                                flowTp_Diff_Hrs REAL,
+                                flowQp_Diff_Pcnt REAL,
+                                flowVol_Diff_Pcnt REAL,
+                                depthTp_Diff_Hrs REAL,
+                                depthDp_Diff_Pcnt REAL,
+                                depthDp_Diff REAL,
+                                verificationDepthScore REAL,
+                                verificationFlowScore REAL,
+                                verificationDepthComment TEXT,
+                                verificationFlowComment TEXT,
+                                verificationOverallComment TEXT,
+                                CONSTRAINT pk_{Tables.ICM_TRACE_LOCATION} PRIMARY KEY (itl_index, it_traceID),
+                                FOREIGN KEY (it_traceID) REFERENCES {Tables.ICM_TRACE}(traceID)                  
+                            )''',
+                               [(tr, loc) for tr in self.dictIcmTraces.values() for loc in tr.dictLocations.values()],
+                               lambda tr_loc: (tr_loc[1].index, tr_loc[0].traceID),
+                               lambda tr_loc: tr_loc[1].to_database_row(tr_loc[0].traceID))
             result = True
             logger.debug("icmTraces.write_to_database Completed")
 
         except sqlite3.Error as e:
             logger.error(f"icmTraces.write_to_database: Database error: {e}")
             # print(f"Database error: {e}")
-            conn.rollback()
         except Exception as e:
             logger.error(f"icmTraces.write_to_database: Exception in _query: {e}")
             # print(f"Exception in _query: {e}")
-            conn.rollback()
         finally:
             return result
         #     conn.close()
 
+    def mark_saved(self):
+        for tr in self.dictIcmTraces.values():
+            tr.mark_clean()
+
     def addTrace(self, objTrace: icmTrace):
         if not self.alreadyOpen(objTrace):
             self.dictIcmTraces[objTrace.traceID] = objTrace
@@ -2,9 +2,8 @@ from typing import Dict, Optional
 from datetime import datetime
 import pandas as pd
 import sqlite3
-import pickle
-from flowbot_database import Tables
-from flowbot_helper import resource_path
+from flowbot_database import Tables, TrackedObject, write_changed_rows
+from flowbot_helper import resource_path, serialize_item, deserialize_item
 from PyQt5 import QtGui
 from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QLabel, QComboBox,
                              QPushButton, QTableWidget, QTableWidgetItem,
@@ -13,7 +12,7 @@ from PyQt5.QtCore import Qt
 from flowbot_logging import get_logger
 logger = get_logger('flowbot_logger')
 
-class fwqMonitor(object):
+class fwqMonitor(TrackedObject):
 
     def __init__(self):
         self.monitor_id: str = ''
@@ -35,17 +34,20 @@ class fwqMonitor(object):
         self.data_end = datetime.fromisoformat(row[3])
         self.data_interval = row[4]
         if row[5] is not None:
-            self.data_cond = pickle.loads(row[5])
+            self.data_cond = deserialize_item(row[5])
         if row[6] is not None:
-            self.data_do = pickle.loads(row[6])
+            self.data_do = deserialize_item(row[6])
         if row[7] is not None:
-            self.data_do_sat = pickle.loads(row[7])
+            self.data_do_sat = deserialize_item(row[7])
         if row[8] is not None:
-            self.data_nh4 = pickle.loads(row[8])
+            self.data_nh4 = deserialize_item(row[8])
         if row[9] is not None:
-            self.data_ph = pickle.loads(row[9])
+            self.data_ph = deserialize_item(row[9])
         if row[10] is not None:
-            self.data_temp = pickle.loads(row[10])
+            self.data_temp = deserialize_item(row[10])
+
+    def to_database_row(self) -> tuple:
+        return (self.monitor_id, self.csv_filespec, self.data_start.isoformat(), self.data_end.isoformat(), int(self.data_interval), serialize_item(self.data_cond), serialize_item(self.data_do), serialize_item(self.data_do_sat), serialize_item(self.data_nh4), serialize_item(self.data_ph), serialize_item(self.data_temp))
 
     @staticmethod
     def from_file_with_mapping(file_path: str, mapping: dict):
@@ -198,13 +200,14 @@ class fwqMonitors:
         for row in rows:
             monitor = fwqMonitor()
             monitor.from_database_row(row)
+            monitor.mark_clean()
             self.dictfwqMonitors[monitor.monitor_id] = monitor
 
     def write_to_database(self, conn: sqlite3.Connection) -> bool:
+        """Writes added and changed WQ monitors and deletes removed ones, within the caller's transaction."""
         result = False
         try:
-            conn.execute(f'''DROP TABLE IF EXISTS {Tables.WQ_MONITOR}''')
-            conn.execute(f'''CREATE TABLE IF NOT EXISTS {Tables.WQ_MONITOR} (
+            write_changed_rows(conn, Tables.WQ_MONITOR, f'''CREATE TABLE IF NOT EXISTS {Tables.WQ_MONITOR} (
                             monitor_id TEXT PRIMARY KEY,
                             csv_filespec TEXT,
                             data_start TEXT,
@@ -216,25 +219,26 @@ class fwqMonitors:
                             data_nh4 TEXT,
                             data_ph TEXT,
                             data_temp TEXT
-                        )''')
-            for monitor in self.dictfwqMonitors.values():
-                conn.execute(f'''INSERT OR REPLACE INTO {Tables.WQ_MONITOR} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                             (monitor.monitor_id, monitor.csv_filespec, monitor.data_start.isoformat(), monitor.data_end.isoformat(), int(monitor.data_interval), pickle.dumps(monitor.data_cond), pickle.dumps(monitor.data_do), pickle.dumps(monitor.data_do_sat), pickle.dumps(monitor.data_nh4), pickle.dumps(monitor.data_ph), pickle.dumps(monitor.data_temp)))
-            conn.commit()
+                        )''',
+                               self.dictfwqMonitors.values(),
+                               lambda monitor: (monitor.monitor_id,),
+                               fwqMonitor.to_database_row)
             result = True
             logger.debug("fwqMonitors.write_to_database Completed")
 
         except sqlite3.Error as e:
             logger.error(f"fwqMonitors.write_to_database: Database error: {e}")
             # print(f"Database error: {e}")
-            conn.rollback()
         except Exception as e:
             logger.error(f"fwqMonitors.write_to_database: Exception in _query: {e}")
             # print(f"Exception in _query: {e}")
-            conn.rollback()
         finally:
             return result
 
+    def mark_saved(self):
+        for monitor in self.dictfwqMonitors.values():
+            monitor.mark_clean()
+
 
 class plottedWQMonitors():
 
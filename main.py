@@ -17,6 +17,7 @@ import sys
 import os
 import traceback
 import logging
+import multiprocessing
 
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QtCore import (QFile, QByteArray, Qt)
@@ -86,35 +87,6 @@ def setup_qgis(qgs_app):
     qgs_app.initQgis()
 
 
-app = QApplication(sys.argv)
-app.setStyle('Fusion')
-
-qgs = QgsApplication([], True)
-setup_qgis(qgs)
-
-mainWindow = FlowbotMainWindowGis(None, app, qgs)
-
-stylesheet_path = os.path.join(os.path.dirname(
-    __file__), f'resources/qss/{rps_or_tt}_default.qss')
-
-# Open the file
-file = QFile(stylesheet_path)
-content = None  # noqa: N806  # Not a constant, local variable is correct
-if file.open(QFile.ReadOnly):
-    # Read the content
-    content = QByteArray(file.readAll())
-    # Close the file
-    file.close()
-else:
-    print("Failed to open " + stylesheet_path)
-
-# Set the stylesheet
-if content is not None:
-    app.setStyleSheet(str(content, encoding='utf-8'))
-# mainWindow.setWindowTitle("Flowbot v" + strVersion)
-mainWindow.show()
-
-
 def excepthook(exctype, value, tb):
     """
     Custom exception hook to print uncaught exceptions with a full traceback.
@@ -136,6 +108,38 @@ def excepthook(exctype, value, tb):
     # sys.exit(1)
 
 
-sys.excepthook = excepthook
+if __name__ == '__main__':
+    # Raw data jobs run in worker processes, which must not start the application again
+    multiprocessing.freeze_support()
+
+    app = QApplication(sys.argv)
+    app.setStyle('Fusion')
+
+    qgs = QgsApplication([], True)
+    setup_qgis(qgs)
+
+    mainWindow = FlowbotMainWindowGis(None, app, qgs)
+
+    stylesheet_path = os.path.join(os.path.dirname(
+        __file__), f'resources/qss/{rps_or_tt}_default.qss')
+
+    # Open the file
+    file = QFile(stylesheet_path)
+    content = None  # noqa: N806  # Not a constant, local variable is correct
+    if file.open(QFile.ReadOnly):
+        # Read the content
+        content = QByteArray(file.readAll())
+        # Close the file
+        file.close()
+    else:
+        print("Failed to open " + stylesheet_path)
+
+    # Set the stylesheet
+    if content is not None:
+        app.setStyleSheet(str(content, encoding='utf-8'))
+    # mainWindow.setWindowTitle("Flowbot v" + strVersion)
+    mainWindow.show()
+
+    sys.excepthook = excepthook
 
-app.exec_()
+    app.exec_()
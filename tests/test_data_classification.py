@@ -0,0 +1,76 @@
+import statistics
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+data_classification = pytest.importorskip("flowbot_data_classification")
+
+
+def flow_monitor(name: str, seed: int) -> SimpleNamespace:
+    """Three days of 2 minute readings with a gap in the logging, a short last day and some zero readings."""
+    dates = pd.date_range('2024-03-01', '2024-03-03 00:08', freq='2min')
+    # Nothing logged for six hours of the first day
+    dates = dates[(dates < '2024-03-01 06:00') | (dates >= '2024-03-01 12:00')]
+    rng = np.random.default_rng(seed)
+    depth = rng.uniform(50, 150, len(dates)).round(1)
+    velocity = rng.uniform(0.2, 1.2, len(dates)).round(3)
+    depth[:40] = 0.0
+    velocity[100:130] = 0.0
+    return SimpleNamespace(monitorName=name, dateArray=dates.to_numpy(), depthArray=depth, velocityArray=velocity)
+
+
+def classifier(fms) -> "data_classification.dataClassification":
+    a_class = data_classification.dataClassification.__new__(data_classification.dataClassification)
+    a_class.classifiedFMs = SimpleNamespace(classFMs={fm.monitorName: fm for fm in fms})
+    return a_class
+
+
+def old_daily_feature_data(fms, start_date, end_date) -> pd.DataFrame:
+    """The per-day loop getDailyFeatureData replaced."""
+    rows = []
+    for fm in fms:
+        days = pd.DatetimeIndex(fm.dateArray).strftime("%d/%m/%Y")
+        for day in sorted(set(days), key=lambda d: datetime.strptime(d, "%d/%m/%Y")):
+            if start_date <= datetime.strptime(day, "%d/%m/%Y") <= end_date:
+                list_of_depth = fm.depthArray[days == day].tolist()
+                list_of_velocity = fm.velocityArray[days == day].tolist()
+                norm_factor = 720 / len(list_of_depth)
+                if len(list_of_depth) > 5:
+                    rows.append({'monitor_name': fm.monitorName, 'day': day,
+                                 'max_depth': max(list_of_depth), 'min_depth': min(list_of_depth),
+                                 'ave_depth': statistics.mean(list_of_depth),
+                                 'std_dev_depth': statistics.stdev(list_of_depth),
+                                 'zero_depth': list_of_depth.count(0.0) * norm_factor,
+                                 'max_velocity': max(list_of_velocity), 'min_velocity': min(list_of_velocity),
+                                 'ave_velocity': statistics.mean(list_of_velocity),
+                                 'std_dev_velocity': statistics.stdev(list_of_velocity),
+                                 'zero_velocity': list_of_velocity.count(0.0) * norm_factor})
+    return pd.DataFrame(rows)
+
+
+def test_daily_features_match_per_day_statistics():
+    fms = [flow_monitor('FM01', 0), flow_monitor('FM02', 1)]
+    start_date, end_date = datetime(2024, 3, 1), datetime(2024, 3, 3)
+
+    features = classifier(fms).getDailyFeatureData(start_date, end_date)
+    expected = old_daily_feature_data(fms, start_date, end_date)
+
+    # The last day has only five readings, so it is left out
+    assert list(features['day'].unique()) == ['01/03/2024', '02/03/2024']
+    pd.testing.assert_frame_equal(features.reset_index(drop=True), expected, check_dtype=False)
+
+
+def test_missing_reading_makes_the_day_nan():
+    fm = flow_monitor('FM01', 0)
+    fm.depthArray[500] = np.nan
+
+    features = classifier([fm]).getDailyFeatureData(datetime(2024, 3, 1), datetime(2024, 3, 3))
+
+    nan_day = features['day'] == pd.Timestamp(fm.dateArray[500]).strftime("%d/%m/%Y")
+    depth_stats = ['max_depth', 'min_depth', 'ave_depth', 'std_dev_depth']
+    assert features.loc[nan_day, depth_stats].isna().all(axis=None)
+    assert features.loc[~nan_day, depth_stats].notna().all(axis=None)
+    assert features[['max_velocity', 'min_velocity', 'ave_velocity', 'std_dev_velocity']].notna().all(axis=None)
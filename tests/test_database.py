@@ -0,0 +1,190 @@
+import pickle
+import sqlite3
+from contextlib import closing
+
+import pandas as pd
+import pytest
+
+from flowbot_database import Tables, TrackedObject, deferredColumn, column_loader, columnLoadError, read_rows_deferring, \
+    write_changed_rows, configure_connection, is_network_path, update_schema
+
+TABLE = 'item'
+CREATE_SQL = f"CREATE TABLE {TABLE} (item_id TEXT PRIMARY KEY, name TEXT, payload BLOB)"
+
+
+class Item(TrackedObject):
+    payload = deferredColumn()
+
+    def __init__(self, item_id: str, name: str, payload=None):
+        self.item_id = item_id
+        self.name = name
+        self.payload = payload
+
+
+def row_key(item: Item) -> tuple:
+    return (item.item_id,)
+
+
+def row_values(item: Item) -> tuple:
+    return (item.item_id, item.name, pickle.dumps(item.payload))
+
+
+def save(database: str, items):
+    with closing(sqlite3.connect(database)) as conn:
+        write_changed_rows(conn, TABLE, CREATE_SQL, items, row_key, row_values)
+        conn.commit()
+    for item in items:
+        item.mark_clean()
+
+
+def load(database: str):
+    """Reads the items back the way the project readers do, leaving the payloads in the file."""
+    with closing(sqlite3.connect(database)) as conn:
+        rows, deferred = read_rows_deferring(conn, TABLE, ['payload'])
+    items = []
+    for row in rows:
+        item = Item(row['item_id'], row['name'])
+        for column in deferred:
+            getattr(Item, column).set_loader(item, column_loader(database, TABLE, 'item_id', item.item_id, column,
+                                                                 pickle.loads))
+        item.mark_clean()
+        items.append(item)
+    return items
+
+
+def log_writes(database: str):
+    """Records the key of every row written to the table from now on."""
+    with closing(sqlite3.connect(database)) as conn:
+        conn.execute("CREATE TABLE write_log (item_id TEXT)")
+        conn.execute(f"CREATE TRIGGER log_insert AFTER INSERT ON {TABLE} "
+                     "BEGIN INSERT INTO write_log VALUES (new.item_id); END")
+        conn.commit()
+
+
+def written_keys(database: str):
+    with closing(sqlite3.connect(database)) as conn:
+        return [row[0] for row in conn.execute("SELECT item_id FROM write_log")]
+
+
+def stored_payloads(database: str):
+    with closing(sqlite3.connect(database)) as conn:
+        return {key: pickle.loads(blob) for key, blob in conn.execute(f"SELECT item_id, payload FROM {TABLE}")}
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = str(tmp_path / 'project.fbsqlite')
+    save(database, [Item(f'I{i}', f'item {i}', list(range(i))) for i in range(3)])
+    return database
+
+
+def test_save_rewrites_only_dirty_rows(database):
+    items = load(database)
+    log_writes(database)
+
+    items[1].name = 'renamed'
+    save(database, items)
+
+    assert written_keys(database) == ['I1']
+    assert stored_payloads(database) == {'I0': [], 'I1': [0], 'I2': [0, 1]}
+    assert {item.item_id: item.name for item in load(database)} == {'I0': 'item 0', 'I1': 'renamed', 'I2': 'item 2'}
+    # Only the rewritten row needed its payload
+    assert not Item.payload.is_loaded(items[0])
+    assert Item.payload.is_loaded(items[1])
+
+
+def test_save_deletes_removed_rows(database):
+    items = load(database)
+
+    save(database, items[1:])
+
+    assert sorted(stored_payloads(database)) == ['I1', 'I2']
+
+
+def test_in_place_edit_is_saved_once_marked_dirty(database):
+    items = load(database)
+    items[2].payload = pd.DataFrame({'Classification': ['A']})
+    save(database, items)
+    log_writes(database)
+
+    items = load(database)
+    items[2].payload.loc[0, 'Classification'] = 'B'
+    save(database, items)
+    assert written_keys(database) == []
+
+    items[2].payload.loc[0, 'Classification'] = 'B'
+    items[2].mark_dirty()
+    save(database, items)
+    assert written_keys(database) == ['I2']
+    assert stored_payloads(database)['I2'].loc[0, 'Classification'] == 'B'
+
+
+def test_save_as_writes_every_deferred_column(database, tmp_path):
+    items = load(database)
+    new_database = str(tmp_path / 'copy.fbsqlite')
+
+    save(new_database, items)
+
+    assert all(Item.payload.is_loaded(item) for item in items)
+    assert stored_payloads(new_database) == stored_payloads(database)
+
+
+def test_deferred_column_of_deleted_row_is_none(database):
+    items = load(database)
+    with closing(sqlite3.connect(database)) as conn:
+        conn.execute(f"DELETE FROM {TABLE} WHERE item_id = 'I1'")
+        conn.commit()
+
+    assert items[1].payload is None
+    assert items[2].payload == [0, 1]
+
+
+def test_deferred_column_of_corrupt_database_raises(database):
+    items = load(database)
+    with open(database, 'wb') as f:
+        f.write(b'not a database' * 100)
+
+    with pytest.raises(columnLoadError):
+        items[1].payload
+
+    # The loader is kept so that the failed read cannot be saved back as an empty value
+    assert not Item.payload.is_loaded(items[1])
+
+
+def test_set_user_classification_marks_install_dirty():
+    flowbot_management = pytest.importorskip("flowbot_management")
+    inst = flowbot_management.fsmInstall()
+    inst.class_data_user = pd.DataFrame({'Date': [pd.Timestamp('2024-01-01')], 'Classification': ['WD'],
+                                         'Confidence': [0.5]})
+    inst.mark_clean()
+
+    inst.set_user_classification(pd.Timestamp('2024-01-01'), 'R')
+    assert inst.is_dirty()
+    assert inst.class_data_user.loc[0, 'Classification'] == 'R'
+    assert inst.class_data_user.loc[0, 'Confidence'] == 1.0
+
+    inst.mark_clean()
+    inst.set_user_classification(pd.Timestamp('2024-01-02'), 'WD')
+    assert inst.is_dirty()
+    assert len(inst.class_data_user) == 2
+
+
+def test_local_database_uses_write_ahead_log(database):
+    with closing(sqlite3.connect(database)) as conn:
+        configure_connection(conn, database)
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+
+
+def test_unc_path_is_network_path():
+    assert is_network_path('\\\\server\\share\\project.fbsqlite')
+    assert is_network_path('//server/share/project.fbsqlite')
+
+
+def test_update_schema_drops_unlisted_indexes(database):
+    with closing(sqlite3.connect(database)) as conn:
+        conn.execute(f"CREATE INDEX idx_{TABLE}_name ON {TABLE} (name)")
+        conn.execute(f"CREATE TABLE {Tables.ICM_TRACE_LOCATION} (itl_index INTEGER, it_traceID TEXT)")
+        update_schema(conn)
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+    assert f"idx_{TABLE}_name" not in indexes
+    assert f"idx_{Tables.ICM_TRACE_LOCATION}_it_traceID" in indexes
@@ -0,0 +1,40 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+import flowbot_dwf_profile as dwf_profile
+
+
+def survey_frame(days: int = 7, freq: str = '15min') -> pd.DataFrame:
+    dates = pd.date_range('2024-01-01', periods=days * pd.Timedelta('1D') // pd.Timedelta(freq), freq=freq)
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({'Date': dates,
+                         'FlowData': rng.uniform(10, 20, len(dates)),
+                         'DepthData': rng.uniform(100, 200, len(dates)),
+                         'VelocityData': rng.uniform(0.5, 1.5, len(dates))})
+
+
+def test_sg_filter_with_weekday_only_dry_days():
+    # 2024-01-02 and 2024-01-03 are a Tuesday and a Wednesday, so every weekend curve is NaN
+    source = survey_frame()
+    engine = dwf_profile.dwfProfileEngine()
+
+    profile = engine.get_profile(source, [date(2024, 1, 2), date(2024, 1, 3)], use_sg_filter=True)
+
+    assert np.isfinite(profile.curves[dwf_profile.DWF_PROFILE_COLUMNS].to_numpy()).all()
+    assert profile.curves['WeekendAvgFlowData'].isna().all()
+    assert len(profile.average) == 96
+
+
+def test_sg_filter_smooths_profile_curves():
+    source = survey_frame()
+    dry_days = [date(2024, 1, 2), date(2024, 1, 6)]
+    engine = dwf_profile.dwfProfileEngine()
+
+    raw = engine.get_profile(source, dry_days)
+    smoothed = engine.get_profile(source, dry_days, use_sg_filter=True)
+
+    assert not np.allclose(raw.curves['AvgFlowData'], smoothed.curves['AvgFlowData'])
+    pd.testing.assert_frame_equal(raw.curves[['TimeOfDay', 'P10FlowData']],
+                                  smoothed.curves[['TimeOfDay', 'P10FlowData']])
@@ -0,0 +1,34 @@
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+verification = pytest.importorskip("flowbot_verification")
+
+
+def closest_index(test_date: datetime, test_date_list: list) -> int:
+    """The closest date lookup the peak comparisons made before nearest_indices."""
+    cloz_dict = {abs(test_date.timestamp() - date.timestamp()): date for date in test_date_list}
+    return test_date_list.index(cloz_dict[min(cloz_dict.keys())])
+
+
+def test_nearest_indices_match_closest_date_lookup():
+    rng = random.Random(0)
+    base = datetime(2024, 1, 1)
+    for _ in range(3000):
+        # Peak dates are in time order, and a coarse grid makes repeated and equidistant dates common
+        reference = sorted(base + timedelta(minutes=15 * rng.randint(0, 20)) for _ in range(rng.randint(1, 8)))
+        times = [base + timedelta(minutes=5 * rng.randint(-5, 65)) for _ in range(rng.randint(1, 8))]
+
+        indices = verification.nearest_indices(verification.epoch_array(times), verification.epoch_array(reference))
+
+        assert indices.tolist() == [closest_index(t, reference) for t in times]
+
+
+def test_nearest_indices_take_first_of_repeated_time():
+    reference = verification.epoch_array([datetime(2024, 1, 1, 1), datetime(2024, 1, 1, 2),
+                                          datetime(2024, 1, 1, 2), datetime(2024, 1, 1, 3)])
+    times = verification.epoch_array([datetime(2024, 1, 1, 2, 10), datetime(2024, 1, 1, 1, 30)])
+
+    assert verification.nearest_indices(times, reference).tolist() == [1, 1]